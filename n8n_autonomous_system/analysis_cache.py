@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+🗃️ ANALYSIS CACHE - Ограниченный персистентный кэш анализов ошибок
+
+Двухуровневый кэш результатов анализа по отпечатку ошибки:
+- в памяти: LRU (OrderedDict) с TTL, ограничением по числу записей и
+  объему, учетом размера и метриками попаданий/вытеснений
+- на диске: SQLite в режиме WAL, из которого кэш прогревается после
+  рестарта
+
+Каждая запись помечена версией правил (скомпилированные паттерны и
+таблицы стратегий). При смене версии записи старой версии удаляются
+и из памяти, и с диска - анализы, полученные по старым правилам, не
+возвращаются.
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Метрики кэша (label cache - имя экземпляра кэша)
+CACHE_LOOKUPS = REGISTRY.counter("n8n_analysis_cache_lookups", "Cache lookups by result", ["cache", "result"])
+CACHE_EVICTIONS = REGISTRY.counter("n8n_analysis_cache_evictions", "Evicted cache entries by reason", ["cache", "reason"])
+CACHE_ENTRIES = REGISTRY.gauge("n8n_analysis_cache_entries", "Entries in the in-memory cache", ["cache"])
+CACHE_BYTES = REGISTRY.gauge("n8n_analysis_cache_bytes", "Serialized size of in-memory cache entries", ["cache"])
+
+@dataclass
+class CacheEntry:
+    """Запись кэша"""
+    value: Any
+    created_at: float
+    size: int
+
+class AnalysisCache:
+    """
+    LRU + TTL кэш с опциональным хранилищем в SQLite
+
+    Значения сериализуются функцией serialize в JSON-совместимый dict
+    (для учета размера и записи на диск) и восстанавливаются deserialize
+    при прогреве. Запись на диск идет сразу при put (анализы - редкие
+    промахи кэша), попадания диск не трогают.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = 86400,
+                 max_bytes: Optional[int] = None, path: Optional[str] = None,
+                 serialize: Callable[[Any], Dict[str, Any]] = None,
+                 deserialize: Callable[[Dict[str, Any]], Any] = None,
+                 name: str = "analysis"):
+        """Инициализация кэша"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.path = Path(path) if path else None
+        self.name = name
+        self._serialize = serialize or (lambda value: value)
+        self._deserialize = deserialize or (lambda data: data)
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.size_bytes = 0
+        self.version = ""
+
+        # Статистика
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if self.path:
+            self._open_db()
+
+        CACHE_ENTRIES.labels(name).set_function(lambda: len(self._entries))
+        CACHE_BYTES.labels(name).set_function(lambda: self.size_bytes)
+
+    def _open_db(self):
+        """Открывает SQLite хранилище в режиме WAL"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY, version TEXT NOT NULL, created_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._expired(entry, time.time())
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.created_at > self.ttl_seconds
+
+    def set_version(self, version: str):
+        """Устанавливает версию правил; записи других версий удаляются"""
+        if version == self.version:
+            return
+
+        dropped = len(self._entries)
+        self._entries.clear()
+        self.size_bytes = 0
+        self.version = version
+
+        if self._db is not None:
+            cursor = self._db.execute("DELETE FROM cache_entries WHERE version != ?", (version,))
+            self._db.commit()
+            dropped = max(dropped, cursor.rowcount)
+
+        if dropped:
+            self.evictions += dropped
+            CACHE_EVICTIONS.labels(self.name, "version").inc(dropped)
+            logger.info(f"🗃️ Analysis cache invalidated: rules version {version[:12]} ({dropped} entries dropped)")
+
+    def load(self) -> int:
+        """Прогревает кэш с диска (самые свежие записи текущей версии); возвращает число записей"""
+        if self._db is None:
+            return 0
+
+        now = time.time()
+        since = now - self.ttl_seconds if self.ttl_seconds is not None else 0
+        rows = self._db.execute(
+            "SELECT key, created_at, value FROM cache_entries"
+            " WHERE version = ? AND created_at >= ? ORDER BY created_at DESC LIMIT ?",
+            (self.version, since, self.max_entries)
+        ).fetchall()
+
+        loaded = 0
+        # Старые первыми: в LRU порядке самые свежие окажутся последними
+        for key, created_at, value in reversed(rows):
+            try:
+                entry = CacheEntry(self._deserialize(json.loads(value)), created_at, len(value))
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping unreadable cache entry {key}: {e}")
+                continue
+            self._store(key, entry)
+            loaded += 1
+
+        self._db.execute("DELETE FROM cache_entries WHERE created_at < ?", (since,))
+        self._db.commit()
+
+        logger.info(f"🗃️ Analysis cache warmed up with {loaded} entries")
+        return loaded
+
+    def get(self, key: str) -> Optional[Any]:
+        """Возвращает значение (и отмечает использование) или None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+
+        if self._expired(entry, time.time()):
+            self._remove(key, "ttl")
+            self.misses += 1
+            CACHE_LOOKUPS.labels(self.name, "expired").inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_LOOKUPS.labels(self.name, "hit").inc()
+        return entry.value
+
+    def put(self, key: str, value: Any):
+        """Сохраняет значение в памяти и на диске"""
+        serialized = json.dumps(self._serialize(value), default=str)
+        entry = CacheEntry(value, time.time(), len(serialized))
+        self._store(key, entry)
+
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, version, created_at, value) VALUES (?, ?, ?, ?)",
+                (key, self.version, entry.created_at, serialized)
+            )
+            self._db.commit()
+
+    def _store(self, key: str, entry: CacheEntry):
+        """Кладет запись в память и вытесняет лишнее по LRU"""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= previous.size
+
+        self._entries[key] = entry
+        self.size_bytes += entry.size
+
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self.size_bytes > self.max_bytes and len(self._entries) > 1
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest, "lru")
+
+    def _remove(self, key: str, reason: str):
+        """Удаляет запись из памяти и с диска"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size_bytes -= entry.size
+        self.evictions += 1
+        CACHE_EVICTIONS.labels(self.name, reason).inc()
+
+        if self._db is not None:
+            self._db.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            self._db.commit()
+
+    def invalidate(self, key: str):
+        """Удаляет одну запись"""
+        self._remove(key, "invalidated")
+
+    def clear(self):
+        """Очищает кэш в памяти и на диске"""
+        self._entries.clear()
+        self.size_bytes = 0
+        if self._db is not None:
+            self._db.execute("DELETE FROM cache_entries")
+            self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "version": self.version,
+            "persistent": self._db is not None
+        }
+
+    def close(self):
+        """Закрывает SQLite хранилище"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
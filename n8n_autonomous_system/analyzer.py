@@ -13,19 +13,43 @@
 Версия: 1.0
 """
 
+import asyncio
+import hashlib
 import json
+import os
 import logging
 import re
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
-import statistics
-from collections import defaultdict, Counter
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import REGISTRY
+from classifier import CompiledClassifier
+from error_clustering import ErrorCluster, ErrorClusterer
+from fingerprint import fingerprint_error, normalize_message
+from learned_classifier import HashedNaiveBayes
+from rolling_stats import RollingStats
+from strategy_learner import StrategyLearner
+from analysis_cache import AnalysisCache
 
 logger = logging.getLogger(__name__)
 
+# Метрики анализатора
+ANALYSES_TOTAL = REGISTRY.counter("n8n_analyzer_analyses", "Completed error analyses by category", ["category"])
+CLASSIFICATIONS = REGISTRY.counter(
+    "n8n_analyzer_classifications", "Analyses by classification source (rules, model, cluster)", ["source"]
+)
+ANALYSIS_DURATION = REGISTRY.histogram("n8n_analyzer_duration_seconds", "Duration of one uncached analysis")
+ANALYSIS_CONFIDENCE = REGISTRY.histogram(
+    "n8n_analyzer_confidence", "Classification confidence of analyses",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+FIX_OUTCOMES = REGISTRY.counter("n8n_analyzer_fix_outcomes", "Recorded fix outcomes by fix type", ["fix_type", "result"])
+
 class ErrorCategory(Enum):
     """Категории ошибок"""
     AUTHENTICATION = "authentication"
@@ -52,6 +76,12 @@ class FixType(Enum):
     ADD_ERROR_HANDLING = "add_error_handling"
     UPDATE_MAPPING = "update_mapping"
     ADD_CIRCUIT_BREAKER = "add_circuit_breaker"
+    TUNE_TIMEOUT_RETRY = "tune_timeout_retry"
+    # Производительность: предлагаются по профилю нод (performance.py), а не по ошибкам
+    ENABLE_BATCHING = "enable_batching"
+    RUN_ONCE_FOR_ALL_ITEMS = "run_once_for_all_items"
+    ADD_CACHE = "add_cache"
+    SPLIT_IN_BATCHES = "split_in_batches"
 
 @dataclass
 class ErrorPattern:
@@ -71,6 +101,29 @@ class RepairStrategy:
     parameters: Dict[str, Any] = field(default_factory=dict)
     prerequisites: List[str] = field(default_factory=list)
     risk_level: str = "low"  # low, medium, high
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Конвертирует в словарь"""
+        return {
+            "fix_type": self.fix_type.value,
+            "description": self.description,
+            "confidence_threshold": self.confidence_threshold,
+            "parameters": self.parameters,
+            "prerequisites": self.prerequisites,
+            "risk_level": self.risk_level
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RepairStrategy":
+        """Создает стратегию из словаря"""
+        return cls(
+            fix_type=FixType(data["fix_type"]),
+            description=data["description"],
+            confidence_threshold=data["confidence_threshold"],
+            parameters=data.get("parameters", {}),
+            prerequisites=data.get("prerequisites", []),
+            risk_level=data.get("risk_level", "low")
+        )
 
 @dataclass
 class ErrorAnalysis:
@@ -85,6 +138,98 @@ class ErrorAnalysis:
     affected_nodes: List[str] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
     analyzed_at: datetime = field(default_factory=datetime.now)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Конвертирует в словарь (для персистентного кэша)"""
+        return {
+            "error_id": self.error_id,
+            "category": self.category.value,
+            "confidence": self.confidence,
+            "description": self.description,
+            "suggested_fix": self.suggested_fix.to_dict(),
+            "alternative_fixes": [strategy.to_dict() for strategy in self.alternative_fixes],
+            "root_cause": self.root_cause,
+            "affected_nodes": self.affected_nodes,
+            "metadata": self.metadata,
+            "analyzed_at": self.analyzed_at.isoformat()
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ErrorAnalysis":
+        """Создает анализ из словаря"""
+        return cls(
+            error_id=data["error_id"],
+            category=ErrorCategory(data["category"]),
+            confidence=data["confidence"],
+            description=data["description"],
+            suggested_fix=RepairStrategy.from_dict(data["suggested_fix"]),
+            alternative_fixes=[RepairStrategy.from_dict(item) for item in data.get("alternative_fixes", [])],
+            root_cause=data.get("root_cause"),
+            affected_nodes=data.get("affected_nodes", []),
+            metadata=data.get("metadata", {}),
+            analyzed_at=datetime.fromisoformat(data["analyzed_at"])
+        )
+
+@dataclass
+class AnalysisRequest:
+    """Ошибка для пакетного анализа"""
+    workflow_id: str
+    error_type: str
+    error_message: str
+    node_name: Optional[str] = None
+    execution_id: Optional[str] = None
+    node_type: Optional[str] = None
+    
+    @property
+    def classification_key(self) -> Tuple:
+        """Все, от чего зависят отпечаток и классификация"""
+        return (self.workflow_id, self.error_type, self.error_message, self.node_name, self.node_type)
+
+def _classify_items(classifier: CompiledClassifier, items: List[Tuple], model: Optional[HashedNaiveBayes] = None,
+                    min_confidence: float = 1.0) -> List[Tuple[str, str, Optional[str], float, str]]:
+    """
+    Отпечаток и классификация сообщений: (fingerprint, template, category, confidence, source)
+    
+    Обученная модель классифицирует все сообщения одним пакетом; правила
+    применяются к сообщениям, где ее уверенность ниже min_confidence.
+    """
+    fingerprints = [
+        fingerprint_error(workflow_id, error_type, error_message, node_type or node_name)
+        for workflow_id, error_type, error_message, node_name, node_type in items
+    ]
+    
+    predictions = None
+    if model is not None and model.is_trained and items:
+        predictions = model.predict([
+            (template, item[1], item[4] or item[3]) for (_, template), item in zip(fingerprints, items)
+        ])
+    
+    results = []
+    for index, ((fingerprint, template), item) in enumerate(zip(fingerprints, items)):
+        _, error_type, error_message, node_name, _ = item
+        if predictions is not None and predictions[1][index] >= min_confidence:
+            results.append((fingerprint, template, predictions[0][index], float(predictions[1][index]), "model"))
+            continue
+        category, confidence = classifier.classify(error_message, error_type, node_name)
+        results.append((fingerprint, template, category.value if category else None, confidence, "rules"))
+    return results
+
+# Классификатор и модель процесса-воркера пула (строятся один раз в initializer'е)
+_worker_classifier: Optional[CompiledClassifier] = None
+_worker_model: Optional[HashedNaiveBayes] = None
+_worker_min_confidence = 1.0
+
+def _init_classifier_worker(patterns: List[ErrorPattern], model: Optional[HashedNaiveBayes] = None,
+                            min_confidence: float = 1.0):
+    """Initializer воркера: компилирует паттерны и принимает обученную модель"""
+    global _worker_classifier, _worker_model, _worker_min_confidence
+    _worker_classifier = CompiledClassifier(patterns)
+    _worker_model = model
+    _worker_min_confidence = min_confidence
+
+def _classify_in_worker(items: List[Tuple]) -> List[Tuple[str, str, Optional[str], float, str]]:
+    """Задача воркера пула"""
+    return _classify_items(_worker_classifier, items, _worker_model, _worker_min_confidence)
 
 class ErrorAnalyzer:
     """
@@ -97,22 +242,97 @@ class ErrorAnalyzer:
     - Обучение на исторических данных
     """
     
-    def __init__(self, config: Dict[str, Any] = None):
-        """Инициализация анализатора"""
+    def __init__(self, config: Dict[str, Any] = None, cache: Optional[AnalysisCache] = None):
+        """
+        Инициализация анализатора
+        
+        Args:
+            config: Конфигурация стратегий исправления
+            cache: Кэш анализов (по умолчанию - только в памяти)
+        """
         self.config = config or {}
         
         # Паттерны ошибок
         self.error_patterns = self._initialize_error_patterns()
         
+        # Скомпилированная форма паттернов для классификации за один проход
+        self.classifier = CompiledClassifier(self.error_patterns)
+        
         # Стратегии исправления
         self.repair_strategies = self._initialize_repair_strategies()
         
         # История анализов для обучения
-        self.analysis_history: List[ErrorAnalysis] = []
-        self.success_rates: Dict[str, List[bool]] = defaultdict(list)
+        # Последние анализы (кольцо фиксированного размера) и агрегаты по окнам времени
+        self.analysis_history: deque = deque(maxlen=self.config.get("history_size", 1000))
+        self.stats = RollingStats()
+        self.statistics_windows = self.config.get("statistics_windows", ["1h", "24h"])
+        
+        # Онлайн обучение выбору стратегий: затухающие Beta-оценки успешности
+        learning_config = self.config.get("strategy_learning", {})
+        self.learner = StrategyLearner(
+            half_life_hours=learning_config.get("half_life_hours", 168),
+            prior_successes=learning_config.get("prior_successes", 1.0),
+            prior_failures=learning_config.get("prior_failures", 1.0)
+        )
+        self.exploration = learning_config.get("exploration", "mean")
+        self.learning_state_path = learning_config.get("path")
+        if self.learning_state_path:
+            self.learner.load(self.learning_state_path)
+        
+        # Кэш анализов по отпечатку ошибки; записи привязаны к версии правил
+        self.error_cache = cache if cache is not None else AnalysisCache(
+            serialize=ErrorAnalysis.to_dict, deserialize=ErrorAnalysis.from_dict
+        )
+        self.rules_version = ""
+        self._update_rules_version()
+        self.error_cache.load()
+        
+        # Частота ошибок по отпечаткам и их шаблоны
+        self.fingerprint_counts: Counter = Counter()
+        self.fingerprint_templates: Dict[str, str] = {}
+        self.max_tracked_fingerprints = self.config.get("max_tracked_fingerprints", 10000)
+        
+        # Кластеризация похожих ошибок (MinHash + LSH): анализ один раз на кластер
+        clustering_config = self.config.get("error_clustering", {})
+        self.clusterer: Optional[ErrorClusterer] = None
+        if clustering_config.get("enabled", True):
+            self.clusterer = ErrorClusterer(
+                num_perm=clustering_config.get("num_perm", 64),
+                bands=clustering_config.get("bands", 16),
+                threshold=clustering_config.get("threshold", 0.5),
+                shingle_size=clustering_config.get("shingle_size", 2),
+                max_clusters=clustering_config.get("max_clusters", 5000),
+                rate_half_life_seconds=clustering_config.get("rate_half_life_seconds", 300)
+            )
+        self.storm_rate_per_minute = clustering_config.get("storm_rate_per_minute", 30)
+        
+        # Обучаемый классификатор (hashed TF-IDF + naive Bayes) поверх правил
+        learned_config = self.config.get("learned_classifier", {})
+        self.learned_enabled = learned_config.get("enabled", False)
+        self.model_min_confidence = learned_config.get("min_confidence", 0.9)
+        self.model_min_examples = learned_config.get("min_examples", 100)
+        self.model_retrain_every = learned_config.get("retrain_every", 200)
+        self.model_n_features = learned_config.get("n_features", 1 << 15)
+        self.model_path = learned_config.get("path")
+        self.learned_model: Optional[HashedNaiveBayes] = None
+        if self.learned_enabled and self.model_path:
+            self.learned_model = HashedNaiveBayes.load(self.model_path)
+            if self.learned_model is not None:
+                logger.info(f"🎓 Learned classifier loaded ({self.learned_model.trained_examples} examples)")
+        # Буфер примеров для обучения: (error_id, документ, категория, уверенность, источник)
+        self.training_examples: deque = deque(maxlen=learned_config.get("max_examples", 5000))
+        self._examples_since_training = 0
+        # Результаты исправлений по отпечатку: подтверждают (или опровергают) категорию для обучения
+        self.fix_outcomes: "OrderedDict[str, bool]" = OrderedDict()
         
-        # Кэш для часто встречающихся ошибок
-        self.error_cache: Dict[str, ErrorAnalysis] = {}
+        # Пакетный анализ: от скольких уникальных сообщений классифицировать в пуле процессов
+        batch_config = self.config.get("batch_analysis", {})
+        self.process_pool_threshold = batch_config.get("process_pool_threshold", 500)
+        self.process_pool_workers = batch_config.get("workers", min(4, os.cpu_count() or 1))
+        self.pool_chunk_size = batch_config.get("chunk_size", 2000)
+        self.loop_slice_size = batch_config.get("loop_slice_size", 200)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_version = ""
         
         logger.info("🧠 Error Analyzer initialized")
     
@@ -233,6 +453,13 @@ class ErrorAnalyzer:
             ],
             
             ErrorCategory.NETWORK: [
+                RepairStrategy(
+                    fix_type=FixType.TUNE_TIMEOUT_RETRY,
+                    description="Tune timeout and retry settings from observed node latency and failures",
+                    confidence_threshold=0.6,
+                    parameters={},
+                    risk_level="low"
+                ),
                 RepairStrategy(
                     fix_type=FixType.INCREASE_TIMEOUT,
                     description="Increase request timeout",
@@ -266,6 +493,23 @@ class ErrorAnalyzer:
                 )
             ],
             
+            ErrorCategory.TIMEOUT: [
+                RepairStrategy(
+                    fix_type=FixType.TUNE_TIMEOUT_RETRY,
+                    description="Tune timeout and retry settings from observed node latency and failures",
+                    confidence_threshold=0.6,
+                    parameters={},
+                    risk_level="low"
+                ),
+                RepairStrategy(
+                    fix_type=FixType.INCREASE_TIMEOUT,
+                    description="Increase request timeout",
+                    confidence_threshold=0.7,
+                    parameters={"timeout": 60000, "field": "options.timeout"},
+                    risk_level="low"
+                )
+            ],
+            
             ErrorCategory.MAPPING: [
                 RepairStrategy(
                     fix_type=FixType.ADD_VALIDATION,
@@ -324,7 +568,8 @@ class ErrorAnalyzer:
         return strategies
     
     async def analyze_error(self, workflow_id: str, error_type: str, error_message: str, 
-                          node_name: str = None, execution_id: str = None) -> ErrorAnalysis:
+                          node_name: str = None, execution_id: str = None,
+                          node_type: str = None) -> ErrorAnalysis:
         """
         Анализирует ошибку и предлагает исправления
         
@@ -334,22 +579,186 @@ class ErrorAnalyzer:
             error_message: Сообщение об ошибке
             node_name: Имя ноды (опционально)
             execution_id: ID выполнения (опционально)
+            node_type: Тип ноды для отпечатка (опционально, иначе имя ноды)
         
         Returns:
             Результат анализа с предложенными исправлениями
         """
-        error_id = f"{workflow_id}_{error_type}_{hash(error_message) % 10000}"
+        # Отпечаток по шаблону сообщения: одинаков между рестартами и для
+        # сообщений, отличающихся только ID, числами и временем
+        error_id, template = fingerprint_error(workflow_id, error_type, error_message, node_type or node_name)
+        self._track_fingerprint(error_id, template)
+        cluster = self._assign_cluster(template, error_type, node_type or node_name)
         
-        # Проверяем кэш
-        if error_id in self.error_cache:
-            cached_analysis = self.error_cache[error_id]
+        # Проверяем кэш (паттерны, добавленные в список напрямую, сначала компилируются)
+        self._sync_classifier()
+        cached_analysis = self.error_cache.get(error_id)
+        if cached_analysis is not None:
             logger.debug(f"📋 Using cached analysis for error {error_id}")
             return cached_analysis
         
+        analysis_started = time.perf_counter()
+        
+        # Похожая ошибка уже проанализирована: анализ кластера без классификации
+        representative = self._cluster_representative(cluster)
+        if representative is not None:
+            analysis = self._derive_analysis(
+                representative, cluster, error_id, template,
+                workflow_id, error_type, error_message, node_name, execution_id, node_type
+            )
+            self._record_analysis(analysis, time.perf_counter() - analysis_started)
+            logger.debug(f"🧩 Error {error_id} joined cluster {cluster.id} (size {cluster.size})")
+            return analysis
+        
         logger.info(f"🧠 Analyzing error: {error_type} in workflow {workflow_id}")
         
         # 1. Классификация ошибки
-        category, confidence = self._classify_error(error_message, error_type, node_name)
+        category, confidence, source = self._classify(error_message, error_type, node_name, template, node_type)
+        
+        analysis = self._build_analysis(
+            error_id, template, category, confidence,
+            workflow_id, error_type, error_message, node_name, execution_id, node_type, cluster, source
+        )
+        self._record_analysis(analysis, time.perf_counter() - analysis_started)
+        
+        logger.info(f"✅ Analysis completed: {category.value} (confidence: {confidence:.2f})")
+        
+        return analysis
+    
+    async def analyze_errors(self, batch: List[AnalysisRequest]) -> List[ErrorAnalysis]:
+        """
+        Анализирует пакет ошибок; результаты - в порядке входа
+        
+        Одинаковые сообщения классифицируются один раз, ошибки с одним
+        отпечатком получают один анализ (как при попадании в кэш), новые
+        отпечатки из уже проанализированного кластера - анализ кластера. Большие
+        пакеты (от process_pool_threshold уникальных сообщений)
+        нормализуются и классифицируются в ProcessPoolExecutor, маленькие -
+        в event loop'е с передачей управления между порциями.
+        """
+        if not batch:
+            return []
+        
+        self._sync_classifier()
+        started = time.perf_counter()
+        
+        # Уникальные сообщения (точные дубликаты не нормализуются повторно)
+        unique: Dict[Tuple, int] = {}
+        occurrences: List[int] = []
+        for request in batch:
+            index = unique.setdefault(request.classification_key, len(unique))
+            if index == len(occurrences):
+                occurrences.append(0)
+            occurrences[index] += 1
+        items = list(unique)
+        
+        if len(items) >= self.process_pool_threshold:
+            classified = await self._classify_in_pool(items)
+        else:
+            classified = await self._classify_in_loop(items)
+        
+        # Число ошибок пакета на отпечаток (для размера и частоты кластеров)
+        fingerprint_occurrences: Counter = Counter()
+        for (fingerprint, *_), count in zip(classified, occurrences):
+            fingerprint_occurrences[fingerprint] += count
+        
+        # Анализ на отпечаток: из кэша, кластера или по первому запросу с этим отпечатком
+        results: List[ErrorAnalysis] = []
+        by_fingerprint: Dict[str, ErrorAnalysis] = {}
+        analyzed = 0
+        for index, request in enumerate(batch):
+            fingerprint, template, category_value, confidence, source = classified[unique[request.classification_key]]
+            self._track_fingerprint(fingerprint, template)
+            
+            analysis = by_fingerprint.get(fingerprint)
+            if analysis is None:
+                cluster = self._assign_cluster(
+                    template, request.error_type, request.node_type or request.node_name,
+                    count=fingerprint_occurrences[fingerprint]
+                )
+                analysis = self.error_cache.get(fingerprint)
+                representative = self._cluster_representative(cluster) if analysis is None else None
+                if representative is not None:
+                    analysis = self._derive_analysis(
+                        representative, cluster, fingerprint, template,
+                        request.workflow_id, request.error_type, request.error_message,
+                        request.node_name, request.execution_id, request.node_type
+                    )
+                    self._record_analysis(analysis)
+                elif analysis is None:
+                    category = ErrorCategory(category_value) if category_value else ErrorCategory.UNKNOWN
+                    analysis = self._build_analysis(
+                        fingerprint, template, category, confidence if category_value else 0.1,
+                        request.workflow_id, request.error_type, request.error_message,
+                        request.node_name, request.execution_id, request.node_type, cluster, source
+                    )
+                    self._record_analysis(analysis)
+                    analyzed += 1
+                by_fingerprint[fingerprint] = analysis
+            results.append(analysis)
+            
+            if index % self.loop_slice_size == self.loop_slice_size - 1:
+                await asyncio.sleep(0)
+        
+        logger.info(
+            f"🧠 Batch analysis: {len(batch)} errors, {len(items)} unique messages, "
+            f"{len(by_fingerprint)} fingerprints, {analyzed} new analyses "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return results
+    
+    async def _classify_in_loop(self, items: List[Tuple]) -> List[Tuple[str, str, Optional[str], float, str]]:
+        """Классификация в event loop'е порциями (между порциями loop обрабатывает другие задачи)"""
+        classified = []
+        model = self.learned_model if self.learned_enabled else None
+        for i in range(0, len(items), self.loop_slice_size):
+            classified.extend(_classify_items(
+                self.classifier, items[i:i + self.loop_slice_size], model, self.model_min_confidence
+            ))
+            await asyncio.sleep(0)
+        return classified
+    
+    async def _classify_in_pool(self, items: List[Tuple]) -> List[Tuple[str, str, Optional[str], float, str]]:
+        """Классификация в пуле процессов (порции по pool_chunk_size)"""
+        try:
+            pool = self._get_process_pool()
+        except Exception as e:
+            logger.warning(f"⚠️ Process pool unavailable, classifying in the event loop: {e}")
+            return await self._classify_in_loop(items)
+        
+        loop = asyncio.get_running_loop()
+        chunks = [items[i:i + self.pool_chunk_size] for i in range(0, len(items), self.pool_chunk_size)]
+        results = await asyncio.gather(*[
+            loop.run_in_executor(pool, _classify_in_worker, chunk) for chunk in chunks
+        ])
+        return [item for chunk in results for item in chunk]
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Пул процессов с классификатором текущей версии правил и модели (пересоздается при их смене)"""
+        model = self.learned_model if self.learned_enabled else None
+        version = self.classifier.version + (model.version if model is not None else "")
+        if self._process_pool is not None and self._process_pool_version != version:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_pool_workers,
+                initializer=_init_classifier_worker,
+                initargs=(list(self.error_patterns), model, self.model_min_confidence)
+            )
+            self._process_pool_version = version
+            logger.info(f"🧠 Analysis process pool started ({self.process_pool_workers} workers)")
+        
+        return self._process_pool
+    
+    def _build_analysis(self, error_id: str, template: str, category: ErrorCategory, confidence: float,
+                        workflow_id: str, error_type: str, error_message: str,
+                        node_name: str = None, execution_id: str = None,
+                        node_type: str = None, cluster: Optional[ErrorCluster] = None,
+                        classified_by: str = "rules") -> ErrorAnalysis:
+        """Строит анализ по результату классификации (и делает его анализом кластера)"""
+        node_type = node_type or node_name
         
         # 2. Определение root cause
         root_cause = self._determine_root_cause(error_message, category)
@@ -358,10 +767,13 @@ class ErrorAnalyzer:
         repair_strategies = self._find_repair_strategies(category, error_message, node_name)
         
         # 4. Выбор лучшей стратегии
-        best_strategy = self._select_best_strategy(repair_strategies, confidence)
+        best_strategy = self._select_best_strategy(repair_strategies, confidence, category, node_type)
+        
+        if cluster is not None:
+            cluster.analysis_key = error_id
         
         # 5. Создание анализа
-        analysis = ErrorAnalysis(
+        return ErrorAnalysis(
             error_id=error_id,
             category=category,
             confidence=confidence,
@@ -374,60 +786,199 @@ class ErrorAnalyzer:
                 "workflow_id": workflow_id,
                 "execution_id": execution_id,
                 "original_error": error_message,
-                "error_type": error_type
+                "error_type": error_type,
+                "node_type": node_type,
+                "template": template,
+                "cluster_id": cluster.id if cluster is not None else None,
+                "classified_by": classified_by
             }
         )
+    
+    def _assign_cluster(self, template: str, error_type: str, node_type: Optional[str],
+                        count: int = 1) -> Optional[ErrorCluster]:
+        """Кластер ошибки (None - кластеризация выключена)"""
+        if self.clusterer is None:
+            return None
+        return self.clusterer.assign(template, f"{error_type}|{node_type or ''}", count=count)
+    
+    def _cluster_representative(self, cluster: Optional[ErrorCluster]) -> Optional[ErrorAnalysis]:
+        """Анализ, представляющий кластер (если он еще в кэше)"""
+        if cluster is None or cluster.analysis_key is None:
+            return None
+        return self.error_cache.get(cluster.analysis_key)
+    
+    def _derive_analysis(self, representative: ErrorAnalysis, cluster: ErrorCluster, error_id: str, template: str,
+                         workflow_id: str, error_type: str, error_message: str,
+                         node_name: str = None, execution_id: str = None, node_type: str = None) -> ErrorAnalysis:
+        """
+        Анализ ошибки по анализу ее кластера
         
-        # Сохраняем в кэш и историю
-        self.error_cache[error_id] = analysis
+        Категория, уверенность и выбранные стратегии - кластера; параметры
+        стратегий адаптируются под это сообщение (поле, timeout).
+        """
+        return ErrorAnalysis(
+            error_id=error_id,
+            category=representative.category,
+            confidence=representative.confidence,
+            description=f"{representative.category.value.title()} error: {representative.root_cause or error_message[:100]}",
+            suggested_fix=self._adapt_strategy(representative.suggested_fix, error_message, node_name),
+            alternative_fixes=[
+                self._adapt_strategy(strategy, error_message, node_name) for strategy in representative.alternative_fixes
+            ],
+            root_cause=representative.root_cause,
+            affected_nodes=[node_name] if node_name else [],
+            metadata={
+                "workflow_id": workflow_id,
+                "execution_id": execution_id,
+                "original_error": error_message,
+                "error_type": error_type,
+                "node_type": node_type or node_name,
+                "template": template,
+                "cluster_id": cluster.id,
+                "cluster_representative": representative.error_id,
+                "classified_by": "cluster"
+            }
+        )
+    
+    def _record_analysis(self, analysis: ErrorAnalysis, duration: Optional[float] = None):
+        """Сохраняет анализ в кэш и историю, обновляет метрики"""
+        self.error_cache.put(analysis.error_id, analysis)
         self.analysis_history.append(analysis)
+        self.stats.record_analysis(
+            analysis.category.value, analysis.confidence, analysis.metadata.get("classified_by", "rules")
+        )
         
-        # Ограничиваем размер истории
-        if len(self.analysis_history) > 1000:
-            self.analysis_history = self.analysis_history[-1000:]
-        
-        logger.info(f"✅ Analysis completed: {category.value} (confidence: {confidence:.2f})")
+        if duration is not None:
+            ANALYSIS_DURATION.observe(duration)
+        ANALYSIS_CONFIDENCE.observe(analysis.confidence)
+        ANALYSES_TOTAL.labels(analysis.category.value).inc()
+        CLASSIFICATIONS.labels(analysis.metadata.get("classified_by", "rules")).inc()
         
-        return analysis
+        # Периодическое переобучение модели на новых примерах правил
+        if self.learned_enabled and analysis.category != ErrorCategory.UNKNOWN:
+            metadata = analysis.metadata
+            source = metadata.get("classified_by", "rules")
+            self.training_examples.append((
+                analysis.error_id,
+                (metadata.get("template") or "", metadata.get("error_type"), metadata.get("node_type")),
+                analysis.category.value,
+                analysis.confidence,
+                source
+            ))
+            if source == "rules":
+                self._examples_since_training += 1
+                if self._examples_since_training >= self.model_retrain_every:
+                    self.train_learned_classifier()
     
-    def _classify_error(self, error_message: str, error_type: str, node_name: str = None) -> Tuple[ErrorCategory, float]:
-        """Классифицирует ошибку по категориям"""
-        error_text = f"{error_message} {error_type}".lower()
+    def save_learning_state(self):
+        """Сохраняет снимок обучения выбору стратегий (если задан path)"""
+        if not self.learning_state_path:
+            return
+        try:
+            self.learner.save(self.learning_state_path)
+            logger.info(f"💾 Strategy learning state saved ({len(self.learner)} arms)")
+        except Exception as e:
+            logger.error(f"❌ Failed to save strategy learning state: {e}")
+    
+    def close(self):
+        """Сохраняет обучение, останавливает пул процессов и закрывает кэш"""
+        self.save_learning_state()
+        if self.learned_model is not None and self.model_path:
+            try:
+                self.learned_model.save(self.model_path)
+            except Exception as e:
+                logger.error(f"❌ Failed to save learned classifier: {e}")
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        self.error_cache.close()
+    
+    def _classify(self, error_message: str, error_type: str, node_name: str = None, template: str = None,
+                  node_type: str = None) -> Tuple[ErrorCategory, float, str]:
+        """
+        Классифицирует ошибку; возвращает (категория, уверенность, источник)
         
-        category_scores = defaultdict(float)
+        Обученная модель используется, если ее уверенность не ниже
+        min_confidence, иначе - правила.
+        """
+        if self.learned_enabled and self.learned_model is not None:
+            labels, confidences = self.learned_model.predict([
+                (template if template is not None else normalize_message(error_message), error_type, node_type or node_name)
+            ])
+            if confidences[0] >= self.model_min_confidence:
+                return ErrorCategory(labels[0]), float(confidences[0]), "model"
         
-        # Проверяем каждый паттерн
-        for pattern in self.error_patterns:
-            score = 0.0
-            
-            # Проверка ключевых слов
-            keyword_matches = sum(1 for keyword in pattern.keywords if keyword.lower() in error_text)
-            if keyword_matches > 0:
-                score += (keyword_matches / len(pattern.keywords)) * 0.4
-            
-            # Проверка regex паттернов
-            regex_matches = sum(1 for regex in pattern.regex_patterns if re.search(regex, error_text, re.IGNORECASE))
-            if regex_matches > 0:
-                score += (regex_matches / len(pattern.regex_patterns)) * 0.4
-            
-            # Проверка типа ноды
-            if node_name and pattern.node_types:
-                node_type_matches = sum(1 for node_type in pattern.node_types if node_type in (node_name or ""))
-                if node_type_matches > 0:
-                    score += 0.2
+        category, confidence = self._classify_error(error_message, error_type, node_name)
+        return category, confidence, "rules"
+    
+    def train_learned_classifier(self) -> bool:
+        """
+        Обучает модель на буфере примеров
+        
+        Примеры - анализы, классифицированные правилами (с весом по их
+        уверенности), и анализы, подтвержденные успешным исправлением.
+        Анализы самой модели и кластеров без подтверждения не используются
+        (модель не учится на своих ответах); неудачное исправление снижает
+        вес примера.
+        """
+        self._examples_since_training = 0
+        documents, labels, weights = [], [], []
+        for error_id, document, label, confidence, source in self.training_examples:
+            outcome = self.fix_outcomes.get(error_id)
+            if source != "rules" and outcome is not True:
+                continue
             
-            # Бонус за уверенность
-            score += pattern.confidence_boost
+            weight = confidence
+            if outcome is True:
+                weight += 1.0
+            elif outcome is False:
+                weight *= 0.25
             
-            if score > 0:
-                category_scores[pattern.category] += score
+            documents.append(document)
+            labels.append(label)
+            weights.append(weight)
         
-        # Выбираем категорию с наивысшим счетом
-        if category_scores:
-            best_category = max(category_scores.items(), key=lambda x: x[1])
-            return best_category[0], min(best_category[1], 1.0)
-        else:
+        if len(documents) < self.model_min_examples or len(set(labels)) < 2:
+            logger.debug(f"🎓 Not enough examples to train the learned classifier: {len(documents)}")
+            return False
+        
+        model = HashedNaiveBayes(
+            [category.value for category in ErrorCategory if category != ErrorCategory.UNKNOWN],
+            n_features=self.model_n_features
+        )
+        self.learned_model = model.fit(documents, labels, weights)
+        logger.info(f"🎓 Learned classifier trained on {len(documents)} examples ({len(set(labels))} categories)")
+        return True
+    
+    def _classify_error(self, error_message: str, error_type: str, node_name: str = None) -> Tuple[ErrorCategory, float]:
+        """Классифицирует ошибку по категориям (скомпилированным классификатором)"""
+        self._sync_classifier()
+        category, confidence = self.classifier.classify(error_message, error_type, node_name)
+        if category is None:
             return ErrorCategory.UNKNOWN, 0.1
+        return category, confidence
+    
+    def _sync_classifier(self):
+        """Докомпилирует паттерны, добавленные в список напрямую"""
+        if len(self.classifier) < len(self.error_patterns):
+            self.classifier.add_patterns(self.error_patterns[len(self.classifier):])
+            self._update_rules_version()
+    
+    def _update_rules_version(self):
+        """
+        Пересчитывает версию правил (паттерны + таблицы стратегий)
+        
+        Кэш удаляет анализы другой версии, поэтому после изменения правил
+        ошибки анализируются заново.
+        """
+        strategies = json.dumps({
+            category.value: [strategy.to_dict() for strategy in strategies]
+            for category, strategies in self.repair_strategies.items()
+        }, sort_keys=True, default=str)
+        self.rules_version = hashlib.blake2b(
+            (self.classifier.version + strategies).encode("utf-8"), digest_size=16
+        ).hexdigest()
+        self.error_cache.set_version(self.rules_version)
     
     def _determine_root_cause(self, error_message: str, category: ErrorCategory) -> Optional[str]:
         """Определяет корневую причину ошибки"""
@@ -509,8 +1060,16 @@ class ErrorAnalyzer:
             return int(timeout_match.group(1))
         return None
     
-    def _select_best_strategy(self, strategies: List[RepairStrategy], error_confidence: float) -> RepairStrategy:
-        """Выбирает лучшую стратегию исправления"""
+    def _select_best_strategy(self, strategies: List[RepairStrategy], error_confidence: float,
+                              category: ErrorCategory = None, node_type: str = None) -> RepairStrategy:
+        """
+        Выбирает лучшую стратегию исправления
+        
+        Порог стратегии снижается тем сильнее, чем выше ее оценка успешности
+        для этой категории и типа ноды. В режиме "mean" выбирается первая
+        стратегия с историей, прошедшая порог; в режиме "thompson" - прошедшая
+        порог с наибольшей выборкой из апостериорного распределения.
+        """
         if not strategies:
             # Fallback стратегия
             return RepairStrategy(
@@ -522,12 +1081,21 @@ class ErrorAnalyzer:
         
         # Выбираем стратегию с учетом confidence и исторических данных
         best_strategy = strategies[0]
+        category_value = category.value if category else None
+        
+        if self.exploration == "thompson":
+            best_sample = -1.0
+            for strategy in strategies:
+                sample = self.learner.sample_success(category_value, strategy.fix_type.value, node_type)
+                adjusted_threshold = strategy.confidence_threshold * (1 - sample * 0.2)
+                if error_confidence >= adjusted_threshold and sample > best_sample:
+                    best_strategy, best_sample = strategy, sample
+            return best_strategy
         
         for strategy in strategies:
             # Проверяем историческую успешность
-            strategy_key = f"{strategy.fix_type.value}"
-            if strategy_key in self.success_rates:
-                success_rate = statistics.mean(self.success_rates[strategy_key])
+            success_rate = self.learner.expected_success(category_value, strategy.fix_type.value, node_type)
+            if success_rate is not None:
                 # Корректируем confidence threshold на основе успешности
                 adjusted_threshold = strategy.confidence_threshold * (1 - success_rate * 0.2)
                 
@@ -537,42 +1105,101 @@ class ErrorAnalyzer:
         
         return best_strategy
     
-    def record_fix_result(self, error_id: str, fix_type: FixType, success: bool):
-        """Записывает результат применения исправления для обучения"""
-        strategy_key = fix_type.value
-        self.success_rates[strategy_key].append(success)
-        
-        # Ограничиваем размер истории
-        if len(self.success_rates[strategy_key]) > 100:
-            self.success_rates[strategy_key] = self.success_rates[strategy_key][-100:]
+    def _track_fingerprint(self, fingerprint: str, template: str):
+        """Учитывает появление ошибки; при переполнении забываются самые редкие отпечатки"""
+        self.fingerprint_counts[fingerprint] += 1
+        self.fingerprint_templates[fingerprint] = template
         
-        logger.debug(f"📊 Recorded fix result: {fix_type.value} = {'success' if success else 'failure'}")
+        if len(self.fingerprint_counts) > self.max_tracked_fingerprints:
+            keep = self.max_tracked_fingerprints // 2
+            self.fingerprint_counts = Counter(dict(self.fingerprint_counts.most_common(keep)))
+            self.fingerprint_templates = {
+                fingerprint: self.fingerprint_templates[fingerprint] for fingerprint in self.fingerprint_counts
+            }
     
-    def get_error_statistics(self) -> Dict[str, Any]:
-        """Возвращает статистику анализа ошибок"""
-        if not self.analysis_history:
-            return {"total_analyses": 0}
+    def record_fix_result(self, error_id: str, fix_type: FixType, success: bool,
+                          category: ErrorCategory = None, node_type: str = None):
+        """
+        Записывает результат применения исправления для обучения
+        
+        Категория и тип ноды по умолчанию берутся из анализа ошибки в кэше.
+        После неудачи анализ (и анализ представителя его кластера) удаляется
+        из кэша: следующая такая ошибка выберет стратегию заново по
+        обновленным оценкам.
+        """
+        analysis = self.error_cache.get(error_id)
+        if category is None and analysis is not None:
+            category = analysis.category
+            node_type = node_type or analysis.metadata.get("node_type")
+        
+        self.learner.record(category.value if category else None, fix_type.value, success, node_type)
         
-        # Подсчет по категориям
-        category_counts = Counter(analysis.category for analysis in self.analysis_history)
+        if not success and analysis is not None:
+            self.error_cache.invalidate(error_id)
+            representative = analysis.metadata.get("cluster_representative")
+            if representative:
+                self.error_cache.invalidate(representative)
         
-        # Средняя уверенность
-        avg_confidence = statistics.mean(analysis.confidence for analysis in self.analysis_history)
+        self.fix_outcomes[error_id] = success
+        self.fix_outcomes.move_to_end(error_id)
+        if len(self.fix_outcomes) > self.max_tracked_fingerprints:
+            self.fix_outcomes.popitem(last=False)
+        self.stats.record_fix(fix_type.value, success)
+        FIX_OUTCOMES.labels(fix_type.value, "success" if success else "failure").inc()
         
-        # Успешность исправлений
-        fix_success_rates = {}
-        for fix_type, results in self.success_rates.items():
-            if results:
-                fix_success_rates[fix_type] = statistics.mean(results)
+        logger.debug(f"📊 Recorded fix result: {fix_type.value} = {'success' if success else 'failure'}")
+    
+    def get_error_statistics(self, window: Union[str, float, None] = None) -> Dict[str, Any]:
+        """
+        Возвращает статистику анализа ошибок
+        
+        Args:
+            window: Окно ("15m", "1h", "7d" или секунды); по умолчанию - за все время
+        """
+        summary = self.stats.summary(window)
+        if not summary["analyses"] and window is None:
+            return {"total_analyses": 0}
         
         return {
-            "total_analyses": len(self.analysis_history),
-            "category_distribution": dict(category_counts),
-            "average_confidence": avg_confidence,
-            "fix_success_rates": fix_success_rates,
-            "cache_size": len(self.error_cache)
+            "total_analyses": summary["analyses"],
+            "category_distribution": {
+                ErrorCategory(category): count for category, count in summary["category_distribution"].items()
+            },
+            "average_confidence": summary["average_confidence"],
+            # Успешность исправлений (апостериорные средние с затуханием) и фактические исходы окна
+            "fix_success_rates": self.learner.get_success_rates(),
+            "fix_outcomes": summary["fix_outcomes"],
+            "windows": {
+                name: self.get_window_statistics(name) for name in self.statistics_windows
+            },
+            "cache_size": len(self.error_cache),
+            "cache": self.error_cache.get_stats(),
+            "unique_fingerprints": len(self.fingerprint_counts),
+            "error_clusters": len(self.clusterer) if self.clusterer else 0,
+            "learned_classifier": {
+                "enabled": self.learned_enabled,
+                "trained_examples": self.learned_model.trained_examples if self.learned_model else 0,
+                "buffered_examples": len(self.training_examples),
+                "sources": summary["sources"]
+            },
+            "top_clusters": self.clusterer.get_top_clusters(10) if self.clusterer else [],
+            "error_storms": self.get_error_storms(),
+            "top_fingerprints": [
+                {"fingerprint": fingerprint, "template": self.fingerprint_templates.get(fingerprint), "count": count}
+                for fingerprint, count in self.fingerprint_counts.most_common(10)
+            ]
         }
     
+    def get_window_statistics(self, window: Union[str, float]) -> Dict[str, Any]:
+        """Сводка окна из временных корзин: анализы, средняя уверенность, категории, исправления"""
+        return self.stats.summary(window)
+    
+    def get_error_storms(self) -> List[Dict[str, Any]]:
+        """Кластеры с частотой от storm_rate_per_minute ошибок в минуту"""
+        if self.clusterer is None:
+            return []
+        return self.clusterer.get_storms(self.storm_rate_per_minute)
+    
     def clear_cache(self):
         """Очищает кэш анализов"""
         self.error_cache.clear()
@@ -612,6 +1239,8 @@ class ErrorAnalyzer:
                 new_patterns.append(pattern)
             
             self.error_patterns.extend(new_patterns)
+            self.classifier.add_patterns(new_patterns)
+            self._update_rules_version()
             logger.info(f"📥 Imported {len(new_patterns)} error patterns")
             
         except Exception as e:
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+💾 BACKUP STORE - Content-addressed хранилище backup'ов workflow'ов
+
+Перед каждой попыткой исправления делается backup, и почти все они
+совпадают: те же ноды того же workflow'а. Хранилище раскладывает backup
+на блобы и хранит каждый уникальный блоб один раз:
+
+- блоб - каноническая JSON сериализация ноды или объекта connections
+  (sort_keys, без пробелов), ключ - blake2b хеш, данные сжаты zlib
+- backup - маленький манифест: хеши нод по порядку и хеш connections;
+  один backup может предшествовать нескольким исправлениям (транзакция)
+- у блоба счетчик ссылок манифестов; блоб без ссылок удаляется вместе
+  с последним backup'ом, который на него ссылался
+
+Хранилище - SQLite в режиме WAL (path=None - в памяти), backup'ы
+переживают рестарт. Объем растет с числом различающихся нод, а не с
+числом backup'ов.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BLOB_WRITES = REGISTRY.counter(
+    "n8n_backup_store_blob_writes", "Backup blob references by result (stored or deduplicated)", ["result"]
+)
+BLOBS_STORED = REGISTRY.gauge("n8n_backup_store_blobs", "Unique blobs in the backup store")
+BLOB_BYTES = REGISTRY.gauge("n8n_backup_store_bytes", "Compressed size of unique blobs in the backup store")
+
+@dataclass
+class BackupManifest:
+    """Манифест backup'а: ссылки на блобы вместо содержимого"""
+    backup_id: str
+    workflow_id: str
+    instance: str
+    created_at: datetime
+    description: str
+    node_hashes: List[str]
+    connections_hash: str
+    fix_ids: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+def canonical_json(value: Any) -> bytes:
+    """Каноническая сериализация: одинаковое содержимое - одинаковые байты"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def content_hash(data: bytes) -> str:
+    """Адрес блоба"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class BackupStore:
+    """Дедуплицирующее хранилище backup'ов в SQLite"""
+
+    _COLUMNS = ("backup_id, workflow_id, instance, created_at, description,"
+                " node_hashes, connections_hash, metadata")
+
+    def __init__(self, path: Optional[str] = None, compression_level: int = 6):
+        """
+        Инициализация
+
+        Args:
+            path: Файл SQLite (None - хранилище в памяти, без персистентности)
+            compression_level: Уровень сжатия zlib для новых блобов
+        """
+        self.path = Path(path) if path else None
+        self.compression_level = compression_level
+
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path) if self.path else ":memory:")
+        if self.path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " hash TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, refs INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS backups ("
+            " backup_id TEXT PRIMARY KEY, workflow_id TEXT NOT NULL, instance TEXT NOT NULL,"
+            " created_at REAL NOT NULL, description TEXT NOT NULL,"
+            " node_hashes TEXT NOT NULL, connections_hash TEXT NOT NULL, metadata TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS backups_created_at ON backups (created_at);"
+            "CREATE TABLE IF NOT EXISTS backup_fixes (fix_id TEXT PRIMARY KEY, backup_id TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS backup_fixes_backup_id ON backup_fixes (backup_id);"
+        )
+        self._db.commit()
+
+        self.blob_count, self.blob_bytes = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+        ).fetchone()
+        self.backup_count = self._db.execute("SELECT COUNT(*) FROM backups").fetchone()[0]
+
+        BLOBS_STORED.set_function(lambda: self.blob_count)
+        BLOB_BYTES.set_function(lambda: self.blob_bytes)
+
+        if self.backup_count:
+            logger.info(f"💾 Backup store loaded: {self.backup_count} backups, "
+                        f"{self.blob_count} blobs ({self.blob_bytes / 1024:.1f} KB)")
+
+    def __len__(self) -> int:
+        return self.backup_count
+
+    def __contains__(self, backup_id: str) -> bool:
+        return self._db.execute("SELECT 1 FROM backups WHERE backup_id = ?", (backup_id,)).fetchone() is not None
+
+    def put(self, backup_id: str, workflow_id: str, nodes: List[Dict[str, Any]], connections: Dict[str, Any],
+            description: str, instance: str, created_at: Optional[datetime] = None,
+            fix_ids: Optional[List[str]] = None, metadata: Optional[Dict[str, Any]] = None) -> BackupManifest:
+        """
+        Сохраняет backup: новые блобы сжимаются и пишутся, известные получают ссылку
+
+        fix_ids - исправления, перед которыми сделан backup (по ним он
+        находится для отката и после рестарта)
+        """
+        blobs = {}
+        node_hashes = []
+        for node in nodes:
+            data = canonical_json(node)
+            digest = content_hash(data)
+            blobs[digest] = data
+            node_hashes.append(digest)
+        data = canonical_json(connections)
+        connections_hash = content_hash(data)
+        blobs[connections_hash] = data
+
+        manifest = BackupManifest(
+            backup_id=backup_id,
+            workflow_id=workflow_id,
+            instance=instance,
+            created_at=created_at or datetime.now(),
+            description=description,
+            node_hashes=node_hashes,
+            connections_hash=connections_hash,
+            fix_ids=list(fix_ids or []),
+            metadata=metadata or {}
+        )
+
+        references = Counter(node_hashes)
+        references[connections_hash] += 1
+
+        stored_bytes = 0
+        with self._db:
+            known = self._known(list(blobs))
+            for digest, data in blobs.items():
+                if digest in known:
+                    continue
+                compressed = zlib.compress(data, self.compression_level)
+                self._db.execute("INSERT INTO blobs (hash, data, size, refs) VALUES (?, ?, ?, 0)",
+                                 (digest, compressed, len(compressed)))
+                stored_bytes += len(compressed)
+            self._db.executemany("UPDATE blobs SET refs = refs + ? WHERE hash = ?",
+                                 [(count, digest) for digest, count in references.items()])
+            self._db.execute(
+                f"INSERT INTO backups ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (backup_id, workflow_id, instance, manifest.created_at.timestamp(), description,
+                 json.dumps(node_hashes), connections_hash, json.dumps(manifest.metadata, ensure_ascii=False))
+            )
+            self._db.executemany("INSERT OR REPLACE INTO backup_fixes (fix_id, backup_id) VALUES (?, ?)",
+                                 [(fix_id, backup_id) for fix_id in manifest.fix_ids])
+        stored = len(blobs) - len(known)
+        self.blob_count += stored
+        self.blob_bytes += stored_bytes
+        self.backup_count += 1
+
+        BLOB_WRITES.labels("stored").inc(stored)
+        BLOB_WRITES.labels("deduplicated").inc(sum(references.values()) - stored)
+        return manifest
+
+    def _known(self, hashes: List[str]) -> set:
+        """Хеши, блобы которых уже есть в хранилище"""
+        known = set()
+        # Лимит параметров SQLite - 999 в старых сборках
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT hash FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            )
+            known.update(row[0] for row in rows)
+        return known
+
+    def _load_blobs(self, hashes: List[str]) -> Dict[str, Any]:
+        """Распакованные блобы по хешам"""
+        unique = list(dict.fromkeys(hashes))
+        values = {}
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT hash, data FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for digest, data in rows:
+                values[digest] = json.loads(zlib.decompress(data))
+        missing = set(unique) - values.keys()
+        if missing:
+            raise KeyError(f"Backup store is missing {len(missing)} blobs")
+        return values
+
+    def _manifest(self, row) -> BackupManifest:
+        backup_id, workflow_id, instance, created_at, description, node_hashes, connections_hash, metadata = row
+        fix_ids = [fix_row[0] for fix_row in self._db.execute(
+            "SELECT fix_id FROM backup_fixes WHERE backup_id = ?", (backup_id,)
+        )]
+        return BackupManifest(
+            backup_id=backup_id,
+            workflow_id=workflow_id,
+            instance=instance,
+            created_at=datetime.fromtimestamp(created_at),
+            description=description,
+            node_hashes=json.loads(node_hashes),
+            connections_hash=connections_hash,
+            fix_ids=fix_ids,
+            metadata=json.loads(metadata)
+        )
+
+    def get_manifest(self, backup_id: str) -> Optional[BackupManifest]:
+        """Манифест backup'а (None - не найден)"""
+        row = self._db.execute(f"SELECT {self._COLUMNS} FROM backups WHERE backup_id = ?", (backup_id,)).fetchone()
+        return self._manifest(row) if row else None
+
+    def find_by_fix(self, fix_id: str) -> Optional[BackupManifest]:
+        """Backup, сделанный перед исправлением fix_id"""
+        row = self._db.execute("SELECT backup_id FROM backup_fixes WHERE fix_id = ?", (fix_id,)).fetchone()
+        return self.get_manifest(row[0]) if row else None
+
+    def list_backups(self, workflow_id: Optional[str] = None, limit: int = 50) -> List[BackupManifest]:
+        """Манифесты backup'ов (новые первыми)"""
+        if workflow_id is None:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM backups ORDER BY created_at DESC LIMIT ?", (limit,)
+            )
+        else:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM backups WHERE workflow_id = ? ORDER BY created_at DESC LIMIT ?",
+                (workflow_id, limit)
+            )
+        return [self._manifest(row) for row in rows]
+
+    def assemble(self, manifest: BackupManifest) -> Dict[str, Any]:
+        """Собирает workflow по манифесту: {"nodes": [...], "connections": {...}}"""
+        blobs = self._load_blobs(manifest.node_hashes + [manifest.connections_hash])
+        return {
+            "nodes": [blobs[digest] for digest in manifest.node_hashes],
+            "connections": blobs[manifest.connections_hash]
+        }
+
+    def delete(self, backup_ids: List[str]) -> int:
+        """Удаляет backup'ы и блобы, на которые больше никто не ссылается"""
+        deleted = 0
+        with self._db:
+            for backup_id in backup_ids:
+                row = self._db.execute(
+                    "SELECT node_hashes, connections_hash FROM backups WHERE backup_id = ?", (backup_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+                references = Counter(json.loads(row[0]))
+                references[row[1]] += 1
+                self._db.executemany("UPDATE blobs SET refs = refs - ? WHERE hash = ?",
+                                     [(count, digest) for digest, count in references.items()])
+                self._db.execute("DELETE FROM backups WHERE backup_id = ?", (backup_id,))
+                self._db.execute("DELETE FROM backup_fixes WHERE backup_id = ?", (backup_id,))
+                deleted += 1
+
+            if deleted:
+                freed_count, freed_bytes = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs WHERE refs <= 0"
+                ).fetchone()
+                self._db.execute("DELETE FROM blobs WHERE refs <= 0")
+                self.blob_count -= freed_count
+                self.blob_bytes -= freed_bytes
+        self.backup_count -= deleted
+        return deleted
+
+    def delete_older_than(self, cutoff: datetime) -> int:
+        """Удаляет backup'ы, созданные раньше cutoff"""
+        rows = self._db.execute("SELECT backup_id FROM backups WHERE created_at < ?", (cutoff.timestamp(),))
+        return self.delete([row[0] for row in rows])
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Число backup'ов, уникальных блобов, объем и коэффициент дедупликации"""
+        references = self._db.execute("SELECT COALESCE(SUM(refs), 0) FROM blobs").fetchone()[0]
+        return {
+            "backups": self.backup_count,
+            "blobs": self.blob_count,
+            "stored_bytes": self.blob_bytes,
+            "blob_references": references,
+            "deduplication_ratio": references / self.blob_count if self.blob_count else 0.0
+        }
+
+    def close(self):
+        """Закрывает SQLite соединение"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
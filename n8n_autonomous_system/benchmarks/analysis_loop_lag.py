@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+⏱️ ANALYSIS LOOP LAG - Задержка event loop'а при всплеске ошибок
+
+Пока анализатор обрабатывает всплеск ошибок (по умолчанию 50k), в том же
+event loop'е работает тикер: спит 10 мс и записывает, на сколько позже
+проснулся. Это задержка, которую во время всплеска получают health check'и,
+мониторинг и HTTP сервер метрик.
+
+Сравниваются:
+- последовательный analyze_error (как было в цикле оркестратора)
+- analyze_errors в event loop'е (порогом пула выше размера пакета)
+- analyze_errors с пулом процессов
+
+Пропускная способность пула зависит от числа ядер: на одном ядре
+воркеры конкурируют с event loop'ом за CPU, и выигрыш только в задержке.
+
+Запуск: python benchmarks/analysis_loop_lag.py --errors 50000 --workers 2
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from analyzer import AnalysisRequest, ErrorAnalyzer
+from benchmarks.classifier_benchmark import generate_messages
+
+TICK_SECONDS = 0.01
+
+async def measure_lag(work):
+    """Выполняет work() и возвращает (секунды, задержки тикера в мс)"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await task
+    return elapsed, np.array(lags or [0.0])
+
+def build_requests(count: int, workflows: int, rng: random.Random):
+    """Всплеск ошибок по нескольким workflow'ам"""
+    return [
+        AnalysisRequest(
+            workflow_id=f"wf-{rng.randrange(workflows)}",
+            error_type=error_type,
+            error_message=message,
+            node_name=node_name,
+            execution_id=str(index)
+        )
+        for index, (message, error_type, node_name) in enumerate(generate_messages(count, rng))
+    ]
+
+def new_analyzer(batch_config):
+    """Анализатор с пустым кэшем в памяти"""
+    return ErrorAnalyzer(config={"batch_analysis": batch_config})
+
+async def run(args):
+    """Печатает сравнение"""
+    requests = build_requests(args.errors, args.workflows, random.Random(42))
+    scenarios = []
+
+    analyzer = new_analyzer({})
+
+    async def sequential():
+        for request in requests:
+            await analyzer.analyze_error(
+                request.workflow_id, request.error_type, request.error_message,
+                node_name=request.node_name, execution_id=request.execution_id
+            )
+    scenarios.append(("sequential analyze_error", analyzer, sequential))
+
+    in_loop = new_analyzer({"process_pool_threshold": len(requests) + 1})
+    scenarios.append(("analyze_errors in loop", in_loop, lambda: in_loop.analyze_errors(requests)))
+
+    pooled = new_analyzer({"process_pool_threshold": 1, "workers": args.workers})
+    scenarios.append((f"analyze_errors pool x{args.workers}", pooled, lambda: pooled.analyze_errors(requests)))
+
+    # Прогрев пула: старт процессов не относится к обработке всплеска
+    pooled._get_process_pool()
+
+    print(f"⏱️ Loop lag benchmark: {len(requests):,} errors, {args.workflows} workflows, tick {TICK_SECONDS * 1000:.0f} ms")
+    for name, scenario_analyzer, work in scenarios:
+        elapsed, lags = await measure_lag(work)
+        print(
+            f"   {name:28s} {len(requests) / elapsed:10,.0f} err/s   "
+            f"lag p50 {np.percentile(lags, 50):7.1f} ms  p99 {np.percentile(lags, 99):7.1f} ms  "
+            f"max {lags.max():8.1f} ms"
+        )
+        scenario_analyzer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Event loop lag during an error burst")
+    parser.add_argument("--errors", type=int, default=50_000)
+    parser.add_argument("--workflows", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+💾 BACKUP STORE BENCHMARK - Объем backup'ов: полные копии против блобов
+
+Имитирует попытки исправлений: перед каждой делается backup workflow'а
+из --nodes нод, между попытками меняется одна нода. Печатает объем
+полных JSON копий (как хранились backup'ы в памяти) и объем хранилища
+блобов, а также время put и сборки workflow'а по манифесту.
+
+Запуск: python benchmarks/backup_store_benchmark.py --workflows 20 --attempts 5
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backup_store import BackupStore
+
+def make_node(index: int, rng: random.Random):
+    """Code нода с кодом в несколько килобайт"""
+    return {
+        "id": f"node-{index}",
+        "name": f"Node {index}",
+        "type": "n8n-nodes-base.code",
+        "parameters": {"jsCode": "\n".join(f"const v{i} = $json.f{rng.randint(0, 99)};" for i in range(80))},
+        "position": [index * 200, 300]
+    }
+
+def main():
+    """Печатает объемы и задержки"""
+    parser = argparse.ArgumentParser(description="Backup store benchmark")
+    parser.add_argument("--workflows", type=int, default=20)
+    parser.add_argument("--nodes", type=int, default=50)
+    parser.add_argument("--attempts", type=int, default=5)
+    parser.add_argument("--incidents", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as directory:
+        store = BackupStore(str(Path(directory) / "backups.sqlite3"))
+        full_bytes = 0
+        put_ms, assemble_ms, manifests = [], [], []
+
+        for workflow in range(args.workflows):
+            nodes = [make_node(i, rng) for i in range(args.nodes)]
+            connections = {node["name"]: {"main": [[{"node": f"Node {i + 1}", "type": "main", "index": 0}]]}
+                           for i, node in enumerate(nodes[:-1])}
+            for incident in range(args.incidents):
+                for attempt in range(args.attempts):
+                    full_bytes += len(json.dumps({"nodes": nodes, "connections": connections}))
+                    started = time.perf_counter()
+                    manifests.append(store.put(f"{workflow}-{incident}-{attempt}", f"wf-{workflow}",
+                                               nodes, connections, "benchmark", "default"))
+                    put_ms.append((time.perf_counter() - started) * 1000)
+                    # Попытка исправления меняет одну ноду
+                    changed = rng.randrange(args.nodes)
+                    nodes[changed] = dict(nodes[changed], parameters={"jsCode": f"// attempt {attempt}\n" +
+                                                                      nodes[changed]["parameters"]["jsCode"]})
+
+        for manifest in rng.sample(manifests, min(200, len(manifests))):
+            started = time.perf_counter()
+            store.assemble(manifest)
+            assemble_ms.append((time.perf_counter() - started) * 1000)
+
+        stats = store.get_statistics()
+        store.close()
+
+    print(f"💾 Backup store benchmark: {stats['backups']:,} backups of {args.nodes}-node workflows")
+    print(f"   full copies:  {full_bytes / 1024 ** 2:8.1f} MB")
+    print(f"   blob store:   {stats['stored_bytes'] / 1024 ** 2:8.1f} MB  "
+          f"({stats['blobs']:,} blobs, {stats['deduplication_ratio']:.1f} references per blob)")
+    print(f"   put:          p50 {np.percentile(put_ms, 50):6.2f} ms  p99 {np.percentile(put_ms, 99):6.2f} ms")
+    print(f"   assemble:     p50 {np.percentile(assemble_ms, 50):6.2f} ms  p99 {np.percentile(assemble_ms, 99):6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+🔎 CLASSIFIER BENCHMARK - Скомпилированный классификатор против цикла по паттернам
+
+Классифицирует корпус сообщений об ошибках N8N исходным алгоритмом (цикл по
+паттернам, подстроки и re.search на каждый regex) и CompiledClassifier,
+сверяет результаты и печатает сообщений в секунду.
+
+По умолчанию корпус - 100k сообщений из типичных ошибок нод N8N (HTTP
+Request, OpenAI/LangChain, Google Drive, Code, Postgres) с переменными
+частями. Свой корпус: --input errors.txt (одно сообщение на строку,
+например выгрузка error.message из execution_data).
+
+Запуск: python benchmarks/classifier_benchmark.py --messages 100000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from analyzer import ErrorAnalyzer, ErrorCategory
+from classifier import CompiledClassifier
+
+TEMPLATES = [
+    ("NodeApiError", "Authorization failed - please check your credentials"),
+    ("NodeApiError", "The resource you are requesting could not be found"),
+    ("NodeApiError", "Request failed with status code {status}"),
+    ("NodeApiError", "The service is receiving too many requests from you"),
+    ("NodeApiError", "Service unavailable - try again later or consider setting this node to retry automatically"),
+    ("NodeApiError", "Bad gateway - the service failed to handle your request"),
+    ("NodeApiError", "HTTP Error {status}: Internal Server Error"),
+    ("NodeApiError", "Rate limit exceeded: retry after {seconds}s"),
+    ("NodeApiError", "You exceeded your current quota, please check your plan and billing details"),
+    ("NodeApiError", "Incorrect API key provided: sk-{key}. You can find your API key at https://platform.openai.com"),
+    ("NodeApiError", "Invalid token: the access token expired at {timestamp}"),
+    ("NodeOperationError", "connect ECONNREFUSED 10.0.{octet}.{octet}:5432"),
+    ("NodeOperationError", "getaddrinfo ENOTFOUND api-{key}.elevenlabs.io"),
+    ("NodeOperationError", "timeout of {millis}ms exceeded"),
+    ("NodeOperationError", "ETIMEDOUT while uploading file {key}.mp4 to Google Drive"),
+    ("NodeOperationError", "socket hang up"),
+    ("NodeOperationError", "No session ID found. Expected to find the session ID in an input field called 'sessionId'"),
+    ("NodeOperationError", "Cannot read properties of undefined (reading '{field}')"),
+    ("NodeOperationError", "Cannot read property '{field}' of null [line {line}]"),
+    ("NodeOperationError", "Missing required field '{field}' in item {line}"),
+    ("NodeOperationError", "The path 'data.{field}' was not found in the input"),
+    ("NodeOperationError", "Credential with ID \"{key}\" does not exist for type \"googleDriveOAuth2Api\""),
+    ("NodeOperationError", "Node does not have any credentials set for \"openAiApi\""),
+    ("NodeOperationError", "ReferenceError: {field} is not defined [line {line}]"),
+    ("NodeOperationError", "SyntaxError: Unexpected token '}}' [line {line}]"),
+    ("NodeOperationError", "TypeError: items.map is not a function"),
+    ("NodeOperationError", "duplicate key value violates unique constraint \"{field}_pkey\""),
+    ("NodeOperationError", "MCP render job {key} failed: ffmpeg exited with code {status}"),
+    ("WorkflowOperationError", "Workflow did not finish, possible out-of-memory issue"),
+    ("WorkflowOperationError", "This execution failed to be processed too many times and will no longer retry"),
+]
+
+FIELDS = ["json", "body", "title", "script", "audio_url", "video_id", "text", "choices", "output"]
+
+NODES = ["HTTP Request", "OpenAI", "Google Drive Upload", "Code", "Postgres", "ElevenLabs TTS", "MCP Render"]
+
+def render_message(template: str, rng: random.Random) -> str:
+    """Подставляет случайные переменные части в шаблон"""
+    return template.format(
+        status=rng.choice([400, 401, 403, 404, 429, 500, 502, 503, 504]),
+        seconds=rng.randrange(1, 120),
+        key=f"{rng.getrandbits(48):012x}",
+        timestamp=f"2025-10-{rng.randrange(1, 29):02d}T{rng.randrange(24):02d}:00:00Z",
+        octet=rng.randrange(256),
+        millis=rng.choice([30000, 60000, 300000]),
+        field=rng.choice(FIELDS),
+        line=rng.randrange(1, 200)
+    )
+
+def generate_messages(count: int, rng: random.Random):
+    """Синтетический корпус (error_message, error_type, node_name)"""
+    messages = []
+    for _ in range(count):
+        error_type, template = rng.choice(TEMPLATES)
+        messages.append((render_message(template, rng), error_type, rng.choice(NODES)))
+    return messages
+
+def load_messages(path: str):
+    """Корпус из файла: одно сообщение на строку"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return [(line.rstrip("\n"), "NodeOperationError", None) for line in f if line.strip()]
+
+def reference_classify(patterns, error_message: str, error_type: str, node_name: str = None):
+    """Исходный алгоритм ErrorAnalyzer._classify_error"""
+    error_text = f"{error_message} {error_type}".lower()
+    category_scores = defaultdict(float)
+
+    for pattern in patterns:
+        score = 0.0
+        keyword_matches = sum(1 for keyword in pattern.keywords if keyword.lower() in error_text)
+        if keyword_matches > 0:
+            score += (keyword_matches / len(pattern.keywords)) * 0.4
+        regex_matches = sum(1 for regex in pattern.regex_patterns if re.search(regex, error_text, re.IGNORECASE))
+        if regex_matches > 0:
+            score += (regex_matches / len(pattern.regex_patterns)) * 0.4
+        if node_name and pattern.node_types:
+            if sum(1 for node_type in pattern.node_types if node_type in (node_name or "")) > 0:
+                score += 0.2
+        score += pattern.confidence_boost
+        if score > 0:
+            category_scores[pattern.category] += score
+
+    if category_scores:
+        best_category = max(category_scores.items(), key=lambda x: x[1])
+        return best_category[0], min(best_category[1], 1.0)
+    return ErrorCategory.UNKNOWN, 0.1
+
+def throughput(function, messages) -> float:
+    """Сообщений в секунду"""
+    started = time.perf_counter()
+    for message in messages:
+        function(*message)
+    return len(messages) / (time.perf_counter() - started)
+
+def main():
+    """Печатает сравнение"""
+    parser = argparse.ArgumentParser(description="Error classifier benchmark")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--input", help="File with one error message per line")
+    args = parser.parse_args()
+
+    messages = load_messages(args.input) if args.input else generate_messages(args.messages, random.Random(42))
+    analyzer = ErrorAnalyzer()
+    patterns = analyzer.error_patterns
+
+    started = time.perf_counter()
+    classifier = CompiledClassifier(patterns)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    mismatches = 0
+    for message in messages:
+        expected = reference_classify(patterns, *message)
+        category, confidence = classifier.classify(*message)
+        actual = (category, confidence) if category is not None else (ErrorCategory.UNKNOWN, 0.1)
+        if actual != expected:
+            mismatches += 1
+    assert mismatches == 0, f"{mismatches} classifications differ from the reference"
+
+    reference_rate = throughput(lambda *message: reference_classify(patterns, *message), messages)
+    compiled_rate = throughput(classifier.classify, messages)
+    analyzer_rate = throughput(analyzer._classify_error, messages)
+
+    print(f"🔎 Classifier benchmark: {len(messages):,} messages, {len(patterns)} patterns (build {build_ms:.1f} ms)")
+    print(f"   reference loop:       {reference_rate:12,.0f} msg/s")
+    print(f"   compiled classifier:  {compiled_rate:12,.0f} msg/s ({compiled_rate / reference_rate:.1f}x)")
+    print(f"   analyzer._classify:   {analyzer_rate:12,.0f} msg/s")
+    print("   results identical to reference: yes")
+
+if __name__ == "__main__":
+    main()
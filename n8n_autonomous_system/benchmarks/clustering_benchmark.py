@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+🧩 CLUSTERING BENCHMARK - Задержка сопоставления ошибки кластеру
+
+Прогоняет корпус ошибок через ErrorClusterer и печатает:
+- задержку assign для повторного шаблона (поиск в таблице) и нового
+  шаблона (MinHash + LSH), p50/p99 в микросекундах
+- сколько полных анализов нужно по отпечаткам и сколько по кластерам
+
+К синтетическому корпусу добавляются варианты формулировок одной
+причины (OpenRouter, Google Drive, MCP render сервер), которые не
+сводятся друг к другу нормализацией.
+
+Запуск: python benchmarks/clustering_benchmark.py --messages 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.classifier_benchmark import generate_messages, load_messages
+from error_clustering import ErrorClusterer
+from fingerprint import fingerprint_error
+
+VARIANTS = [
+    ("NodeApiError", "OpenRouter", "Request failed with status code 429: rate limit exceeded for model {model}"),
+    ("NodeApiError", "OpenRouter", "OpenRouter error: Request failed with status code 429 for model {model}"),
+    ("NodeApiError", "OpenRouter", "Request failed with status code 429 (provider {model} is rate limited)"),
+    ("NodeApiError", "Google Drive Upload", "The resource you are requesting could not be found: file {model}"),
+    ("NodeApiError", "Google Drive Upload", "Drive API: The resource you are requesting could not be found"),
+    ("NodeOperationError", "MCP Render", "MCP render job failed: ffmpeg exited with code {code} on {model}"),
+    ("NodeOperationError", "MCP Render", "render job failed: ffmpeg exited with code {code}"),
+]
+
+def generate_variants(count: int, rng: random.Random):
+    """Разные формулировки одних и тех же ошибок"""
+    messages = []
+    for _ in range(count):
+        error_type, node, template = rng.choice(VARIANTS)
+        message = template.format(model=rng.choice(["gpt-4o", "claude-3.5", "llama-3"]), code=rng.choice([1, 137]))
+        messages.append((message, error_type, node))
+    return messages
+
+def main():
+    """Печатает задержки и сокращение числа анализов"""
+    parser = argparse.ArgumentParser(description="Error clustering benchmark")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--input", help="File with one error message per line")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    messages = load_messages(args.input) if args.input else generate_messages(args.messages, rng)
+    messages += generate_variants(len(messages) // 10, rng)
+    rng.shuffle(messages)
+
+    clusterer = ErrorClusterer()
+    fingerprints, seen = set(), set()
+    exact, new = [], []
+    for message, error_type, node in messages:
+        fingerprint, template = fingerprint_error("wf-1", error_type, message, node)
+        fingerprints.add(fingerprint)
+        scope = f"{error_type}|{node or ''}"
+        known = (scope, template) in seen
+        seen.add((scope, template))
+
+        started = time.perf_counter()
+        clusterer.assign(template, scope)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        (exact if known else new).append(elapsed_us)
+
+    exact, new = np.array(exact or [0.0]), np.array(new or [0.0])
+    print(f"🧩 Clustering benchmark: {len(messages):,} errors")
+    print(f"   known template:  p50 {np.percentile(exact, 50):7.1f} us  p99 {np.percentile(exact, 99):7.1f} us")
+    print(f"   new template:    p50 {np.percentile(new, 50):7.1f} us  p99 {np.percentile(new, 99):7.1f} us  ({len(new)} templates)")
+    print(f"   analyses needed: {len(fingerprints):,} by fingerprint -> {len(clusterer):,} by cluster")
+    for cluster in clusterer.get_top_clusters(5):
+        print(f"   {cluster['size']:8,} errors  {cluster['templates']:3} templates  {cluster['representative'][:70]}")
+
+if __name__ == "__main__":
+    main()
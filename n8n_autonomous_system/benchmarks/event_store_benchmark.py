@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+📊 EVENT STORE BENCHMARK - Колоночное хранилище против обхода объектов
+
+Генерирует синтетические события (по умолчанию миллион за сутки), считает
+одни и те же агрегации обходом списка ExecutionEvent и через EventStore,
+сверяет результаты и печатает время и память.
+
+Запуск: python benchmarks/event_store_benchmark.py --events 1000000
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from event_store import EventStore
+from monitor import COMPLETION_EVENT_TYPES, EventType, ExecutionEvent, Severity
+
+NODES = ["OpenAI", "ElevenLabs TTS", "MCP Render", "Google Drive Upload", "HTTP Request", "Code"]
+ERRORS = ["NodeApiError", "NodeOperationError", "TimeoutError", "AuthenticationError"]
+
+def generate_events(count: int, rng: random.Random):
+    """Синтетические события за последние сутки"""
+    now = datetime.now()
+    events = []
+    for i in range(count):
+        timestamp = now - timedelta(seconds=rng.random() * 86400)
+        workflow_id = f"wf_{rng.randrange(50)}"
+        roll = rng.random()
+        if roll < 0.45:
+            events.append(ExecutionEvent(str(i), EventType.EXECUTION_STARTED, Severity.INFO, workflow_id, str(i), timestamp))
+        elif roll < 0.85:
+            events.append(ExecutionEvent(str(i), EventType.EXECUTION_COMPLETED, Severity.INFO, workflow_id, str(i),
+                                         timestamp, duration=rng.expovariate(1 / 40)))
+        elif roll < 0.93:
+            events.append(ExecutionEvent(str(i), EventType.EXECUTION_FAILED, Severity.ERROR, workflow_id, str(i),
+                                         timestamp, error_type=rng.choice(ERRORS), node_name=rng.choice(NODES)))
+        else:
+            events.append(ExecutionEvent(str(i), EventType.NODE_ERROR, Severity.ERROR, workflow_id, str(i),
+                                         timestamp, error_type=rng.choice(ERRORS), node_name=rng.choice(NODES)))
+    return events
+
+def python_error_rate(events, window_seconds: float, now: float):
+    """Error rate по workflow'ам обходом объектов"""
+    since = datetime.fromtimestamp(now - window_seconds)
+    totals, failures = defaultdict(int), defaultdict(int)
+    for event in events:
+        if event.timestamp >= since and event.event_type in COMPLETION_EVENT_TYPES:
+            totals[event.workflow_id] += 1
+            if event.event_type != EventType.EXECUTION_COMPLETED:
+                failures[event.workflow_id] += 1
+    return {workflow: failures[workflow] / total for workflow, total in totals.items()}
+
+def python_node_failures(events, window_seconds: float, now: float):
+    """Ошибки нод по имени ноды обходом объектов"""
+    since = datetime.fromtimestamp(now - window_seconds)
+    return Counter(
+        event.node_name for event in events
+        if event.timestamp >= since and event.event_type == EventType.NODE_ERROR
+    )
+
+def timed(function, repeat: int = 3):
+    """Лучшее время из repeat запусков и результат"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    """Печатает сравнение"""
+    parser = argparse.ArgumentParser(description="Columnar event store benchmark")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    events = generate_events(args.events, random.Random(42))
+    objects_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    store = EventStore(capacity=args.events)
+    started = time.perf_counter()
+    for i in range(0, len(events), 10000):
+        store.extend(events[i:i + 10000])
+    load_seconds = time.perf_counter() - started
+
+    print(f"📊 Event store benchmark: {args.events:,} events")
+    print(f"   memory: objects {objects_bytes / 1024 ** 2:,.0f} MiB, columns {store.memory_bytes / 1024 ** 2:,.0f} MiB")
+    print(f"   load into store: {load_seconds:.2f}s")
+
+    # Общий момент отсчета окон, чтобы граница окна совпадала в обоих вариантах
+    now = time.time()
+
+    python_time, python_rates = timed(lambda: python_error_rate(events, 900, now))
+    store_time, store_rates = timed(lambda: store.error_rate(by="workflow", window="15m", now=now))
+    assert python_rates.keys() == store_rates.keys()
+    assert all(abs(python_rates[key] - store_rates[key]) < 1e-9 for key in python_rates)
+    print(f"   error_rate(by=workflow, 15m):   python {python_time * 1000:8.1f} ms   store {store_time * 1000:6.1f} ms")
+
+    python_time, python_rates = timed(lambda: python_error_rate(events, 86400, now))
+    store_time, store_rates = timed(lambda: store.error_rate(by="workflow", window="1d", now=now))
+    assert all(abs(python_rates[key] - store_rates[key]) < 1e-9 for key in python_rates)
+    print(f"   error_rate(by=workflow, 1d):    python {python_time * 1000:8.1f} ms   store {store_time * 1000:6.1f} ms")
+
+    python_time, python_counts = timed(lambda: python_node_failures(events, 3600, now))
+    store_time, store_counts = timed(lambda: store.count(by="node", window="1h", event_types=[EventType.NODE_ERROR], now=now))
+    assert dict(python_counts) == store_counts
+    print(f"   count(by=node, NODE_ERROR, 1h): python {python_time * 1000:8.1f} ms   store {store_time * 1000:6.1f} ms")
+
+    store_time, _ = timed(lambda: store.events_per_interval("1m", "1d", now=now))
+    print(f"   events_per_interval(1m, 1d):                      store {store_time * 1000:6.1f} ms")
+
+    store_time, _ = timed(lambda: store.duration_percentiles(by="workflow", window="1d", now=now))
+    print(f"   duration_percentiles(by=workflow, 1d):            store {store_time * 1000:6.1f} ms")
+
+if __name__ == "__main__":
+    main()
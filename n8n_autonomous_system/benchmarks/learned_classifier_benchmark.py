@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+🎓 LEARNED CLASSIFIER BENCHMARK - Правила против hashed TF-IDF + naive Bayes
+
+На размеченном корпусе сравнивает точность и пропускную способность:
+- правил (ErrorAnalyzer._classify_error, по одному сообщению)
+- обученной модели (HashedNaiveBayes, пакетный вывод)
+- гибрида, как в анализаторе: модель при уверенности от --min-confidence,
+  иначе правила
+
+Корпус по умолчанию - шаблоны classifier_benchmark с ручной разметкой
+(обучение и проверка - разные случайные выборки) и отдельный набор
+перефразированных сообщений, которых нет в обучении. Свой корпус:
+--input labelled.tsv (category<TAB>error_type<TAB>message), делится 80/20.
+
+Запуск: python benchmarks/learned_classifier_benchmark.py --messages 50000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from analyzer import ErrorAnalyzer, ErrorCategory
+from benchmarks.classifier_benchmark import NODES, TEMPLATES, render_message
+from fingerprint import normalize_message
+from learned_classifier import HashedNaiveBayes
+
+# Разметка TEMPLATES по индексу
+TEMPLATE_LABELS = [
+    "authentication", "external_api", "external_api", "external_api", "external_api",
+    "external_api", "external_api", "external_api", "external_api", "credentials",
+    "authentication", "network", "network", "timeout", "timeout",
+    "network", "configuration", "mapping", "mapping", "validation",
+    "mapping", "credentials", "credentials", "internal", "internal",
+    "internal", "validation", "internal", "resource", "resource",
+]
+
+# Перефразированные сообщения тех же причин (в обучении их нет)
+PARAPHRASES = [
+    ("authentication", "NodeApiError", "Authentication failed: your credentials are invalid or expired"),
+    ("external_api", "NodeApiError", "Upstream service responded with too many requests, slow down"),
+    ("external_api", "NodeApiError", "Service temporarily unavailable, please try again later"),
+    ("network", "NodeOperationError", "connect ECONNRESET 10.0.{octet}.{octet}:443"),
+    ("timeout", "NodeOperationError", "Request timeout after {millis}ms while waiting for ElevenLabs"),
+    ("mapping", "NodeOperationError", "Cannot read properties of null (reading '{field}') in expression"),
+    ("credentials", "NodeOperationError", "No credentials found for \"googleDriveOAuth2Api\" on this node"),
+    ("internal", "NodeOperationError", "TypeError: Cannot convert undefined to object [line {line}]"),
+    ("validation", "NodeOperationError", "Required field '{field}' is missing in item {line}"),
+    ("resource", "WorkflowOperationError", "Execution stopped: JavaScript heap out of memory"),
+]
+
+def labelled_corpus(count: int, rng: random.Random, templates):
+    """(category, error_type, message, node) по размеченным шаблонам"""
+    corpus = []
+    for _ in range(count):
+        label, error_type, template = rng.choice(templates)
+        corpus.append((label, error_type, render_message(template, rng), rng.choice(NODES)))
+    return corpus
+
+def load_corpus(path: str):
+    """Размеченный корпус из TSV"""
+    corpus = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) == 3:
+                corpus.append((parts[0], parts[1], parts[2], None))
+    return corpus
+
+def documents(corpus):
+    return [(normalize_message(message), error_type, node) for _, error_type, message, node in corpus]
+
+def accuracy(predicted, corpus) -> float:
+    return sum(p == label for p, (label, *_) in zip(predicted, corpus)) / len(corpus)
+
+def evaluate(name: str, analyzer: ErrorAnalyzer, model: HashedNaiveBayes, corpus, min_confidence: float):
+    """Печатает точность и скорость на корпусе"""
+    started = time.perf_counter()
+    rules = [analyzer._classify_error(message, error_type, node)[0].value for _, error_type, message, node in corpus]
+    rules_rate = len(corpus) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    labels, confidences = model.predict(documents(corpus))
+    model_rate = len(corpus) / (time.perf_counter() - started)
+
+    hybrid = [label if confidence >= min_confidence else rule
+              for label, confidence, rule in zip(labels, confidences, rules)]
+    model_share = sum(confidence >= min_confidence for confidence in confidences) / len(corpus)
+
+    print(f"   {name} ({len(corpus):,} messages)")
+    print(f"      rules:  accuracy {accuracy(rules, corpus):6.1%}   {rules_rate:10,.0f} msg/s")
+    print(f"      model:  accuracy {accuracy(labels, corpus):6.1%}   {model_rate:10,.0f} msg/s (batched, incl. normalisation)")
+    print(f"      hybrid: accuracy {accuracy(hybrid, corpus):6.1%}   model used for {model_share:.0%}")
+
+def main():
+    """Печатает сравнение"""
+    parser = argparse.ArgumentParser(description="Learned classifier benchmark")
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--input", help="Labelled TSV: category<TAB>error_type<TAB>message")
+    parser.add_argument("--min-confidence", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    if args.input:
+        corpus = load_corpus(args.input)
+        rng.shuffle(corpus)
+        split = int(len(corpus) * 0.8)
+        train, tests = corpus[:split], [("held-out", corpus[split:])]
+    else:
+        labelled = [(label, error_type, template) for label, (error_type, template) in zip(TEMPLATE_LABELS, TEMPLATES)]
+        train = labelled_corpus(args.messages, rng, labelled)
+        tests = [
+            ("same templates", labelled_corpus(args.messages, rng, labelled)),
+            ("paraphrases", labelled_corpus(args.messages // 10, rng, PARAPHRASES)),
+        ]
+
+    classes = [category.value for category in ErrorCategory if category != ErrorCategory.UNKNOWN]
+    started = time.perf_counter()
+    model = HashedNaiveBayes(classes).fit(documents(train), [label for label, *_ in train])
+    train_seconds = time.perf_counter() - started
+
+    analyzer = ErrorAnalyzer()
+    print(f"🎓 Learned classifier benchmark: trained on {len(train):,} messages in {train_seconds:.2f}s")
+    for name, corpus in tests:
+        evaluate(name, analyzer, model, corpus, args.min_confidence)
+    analyzer.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+⏱️ METRICS OVERHEAD - Стоимость инструментирования горячих путей
+
+Измеряет среднее время одного обновления Counter/Gauge/Histogram (с label'ами
+и без) и время рендеринга реестра в OpenMetrics text при росте числа серий.
+
+Запуск: python benchmarks/metrics_overhead.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from metrics import MetricsRegistry
+
+ITERATIONS = 1_000_000
+
+def per_call_ns(function, iterations: int = ITERATIONS) -> float:
+    """Среднее время вызова в наносекундах (за вычетом пустого цикла)"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    baseline = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started - baseline) / iterations * 1e9
+
+def main():
+    """Печатает стоимость операций"""
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_events", "Events")
+    labeled = registry.counter("bench_events_by_type", "Events by type", ["type", "severity"])
+    gauge = registry.gauge("bench_depth", "Depth")
+    histogram = registry.histogram("bench_duration_seconds", "Duration")
+    child = labeled.labels("execution_failed", "error")
+
+    print(f"⏱️ Metrics overhead ({ITERATIONS:,} iterations)")
+    print(f"   counter.inc():                {per_call_ns(counter.inc):7.1f} ns")
+    print(f"   cached child.inc():           {per_call_ns(child.inc):7.1f} ns")
+    print(f"   labels(a, b).inc():           {per_call_ns(lambda: labeled.labels('execution_failed', 'error').inc()):7.1f} ns")
+    print(f"   gauge.set(v):                 {per_call_ns(lambda: gauge.set(42)):7.1f} ns")
+    print(f"   histogram.observe(v):         {per_call_ns(lambda: histogram.observe(0.37)):7.1f} ns")
+
+    for series in (100, 1000, 10000):
+        registry = MetricsRegistry()
+        family = registry.histogram("bench_latency_seconds", "Latency", ["workflow"])
+        for i in range(series // 14):
+            family.labels(f"wf_{i}").observe(0.1)
+        counter = registry.counter("bench_total", "Total", ["workflow"])
+        for i in range(series - series // 14 * 14):
+            counter.labels(f"wf_{i}").inc()
+
+        started = time.perf_counter()
+        body = registry.render()
+        elapsed = time.perf_counter() - started
+        print(f"   render ~{series:>5} series:        {elapsed * 1000:7.2f} ms ({len(body) / 1024:.0f} KiB)")
+
+if __name__ == "__main__":
+    main()
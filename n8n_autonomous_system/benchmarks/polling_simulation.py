@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+📉 POLLING SIMULATION - Сравнение постоянного и адаптивного polling'а
+
+Дискретная симуляция монитора на синтетических трассах (idle, steady, burst):
+считает количество запросов к БД и задержку обнаружения завершений
+для фиксированного интервала и AdaptivePollScheduler (с webhook'ами и без).
+
+Запуск: python benchmarks/polling_simulation.py
+"""
+
+import random
+import statistics
+import sys
+from pathlib import Path
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from monitor import AdaptivePollScheduler
+
+HOURS = 6
+DURATION = HOURS * 3600
+
+def idle_trace(rng):
+    """Нет выполнений вообще"""
+    return []
+
+def steady_trace(rng):
+    """Выполнение каждые 5 минут по ~90 секунд, 10% падают"""
+    executions = []
+    t = 0.0
+    while t < DURATION:
+        duration = rng.uniform(60, 120)
+        executions.append((t, t + duration, rng.random() < 0.1))
+        t += 300
+    return executions
+
+def burst_trace(rng):
+    """Простой, затем 10 минут по выполнению каждые 2 секунды, 30% падают"""
+    executions = []
+    t = DURATION / 2
+    while t < DURATION / 2 + 600:
+        duration = rng.uniform(20, 60)
+        executions.append((t, t + duration, rng.random() < 0.3))
+        t += 2
+    return executions
+
+def simulate(executions, scheduler, webhook: bool):
+    """Проигрывает трассу и возвращает (запросов к БД, задержки обнаружения)"""
+    ends = sorted((end, failed) for _, end, failed in executions)
+    failure_ends = [end for end, failed in ends if failed]
+
+    queries = 0
+    latencies = []
+    detected = 0
+    t = 0.0
+
+    while t < DURATION:
+        # Опрос: один запрос списка выполнений + один на ошибки каждого упавшего
+        queries += 1
+        in_flight = sum(1 for start, end, _ in executions if start <= t < end)
+        new_errors = 0
+
+        while detected < len(ends) and ends[detected][0] <= t:
+            end, failed = ends[detected]
+            latencies.append(t - end)
+            if failed:
+                new_errors += 1
+                queries += 1
+            detected += 1
+
+        scheduler.record_poll(in_flight, new_errors)
+        next_poll = t + scheduler.next_delay()
+
+        # Webhook о падении будит монитор раньше запланированного опроса
+        if webhook:
+            for end in failure_ends:
+                if t < end < next_poll:
+                    scheduler.notify()
+                    next_poll = end + 0.05
+                    break
+
+        t = next_poll
+
+    return queries, latencies
+
+def main():
+    """Печатает сравнительную таблицу"""
+    traces = {"idle": idle_trace, "steady": steady_trace, "burst": burst_trace}
+    policies = {
+        "fixed 10s": (lambda: AdaptivePollScheduler.fixed(10), False),
+        "adaptive": (lambda: AdaptivePollScheduler(5, 60, 2.0, 0.1), False),
+        "adaptive+webhook": (lambda: AdaptivePollScheduler(5, 60, 2.0, 0.1), True),
+    }
+
+    print(f"📉 Polling simulation over {HOURS}h traces")
+    print(f"{'trace':<8} {'policy':<18} {'db queries':>10} {'mean lat s':>11} {'p95 lat s':>10} {'max lat s':>10}")
+
+    for trace_name, trace in traces.items():
+        for policy_name, (factory, webhook) in policies.items():
+            random.seed(42)
+            executions = trace(random.Random(7))
+            queries, latencies = simulate(executions, factory(), webhook)
+
+            if latencies:
+                mean = statistics.mean(latencies)
+                p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1]
+                worst = max(latencies)
+                print(f"{trace_name:<8} {policy_name:<18} {queries:>10} {mean:>11.2f} {p95:>10.2f} {worst:>10.2f}")
+            else:
+                print(f"{trace_name:<8} {policy_name:<18} {queries:>10} {'-':>11} {'-':>10} {'-':>10}")
+
+if __name__ == "__main__":
+    main()
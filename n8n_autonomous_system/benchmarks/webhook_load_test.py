@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+🚚 WEBHOOK LOAD TEST - Нагрузочный тест пакетного приема событий
+
+Поднимает webhook приложение монитора на localhost в этом же процессе
+(один event loop, одно ядро) и отправляет в /webhook/events пакеты NDJSON.
+Печатает принятые события/сек, глубину очереди и количество отказов (429).
+
+Запуск: python benchmarks/webhook_load_test.py --seconds 10 --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем директорию системы в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiohttp import ClientSession, web
+
+from event_log import EventLog
+from monitor import ExecutionMonitor
+
+def build_batch(batch_size: int, use_gzip: bool) -> bytes:
+    """Готовит тело пакета один раз, чтобы клиент почти не тратил CPU"""
+    lines = []
+    for i in range(batch_size):
+        failed = i % 10 == 0
+        lines.append(json.dumps({
+            "eventType": "execution_failed" if failed else "execution_completed",
+            "severity": "error" if failed else "info",
+            "workflowId": f"wf_{i % 20}",
+            "executionId": str(100000 + i),
+            "errorType": "NodeApiError" if failed else None,
+            "errorMessage": "Request timeout after 30000ms" if failed else None,
+            "nodeName": "HTTP Request" if failed else None,
+            "duration": 12.5
+        }))
+    body = ("\n".join(lines) + "\n").encode("utf-8")
+    return gzip.compress(body) if use_gzip else body
+
+async def run(args):
+    """Запускает сервер и клиентов, собирает статистику"""
+    event_log = EventLog(tempfile.mkdtemp(prefix="event_log_")) if args.event_log else None
+    monitor = ExecutionMonitor(None, event_log=event_log, webhook_config={"ingest_queue_size": args.queue_size})
+    monitor.is_running = True
+
+    runner = web.AppRunner(monitor.create_webhook_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    ingestion_task = asyncio.create_task(monitor._ingestion_loop())
+
+    body = build_batch(args.batch_size, args.gzip)
+    headers = {"Content-Type": "application/x-ndjson"}
+    if args.gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    url = f"http://127.0.0.1:{args.port}/webhook/events"
+    deadline = time.monotonic() + args.seconds
+    statuses = {}
+
+    async def client(session):
+        while time.monotonic() < deadline:
+            async with session.post(url, data=body, headers=headers) as response:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                await response.read()
+                if response.status == 429:
+                    await asyncio.sleep(0.01)
+
+    started = time.monotonic()
+    async with ClientSession() as session:
+        await asyncio.gather(*[client(session) for _ in range(args.clients)])
+
+    # Дожидаемся обработки всего принятого
+    while monitor.ingestion_stats.queue_depth:
+        await asyncio.sleep(0.01)
+    elapsed = time.monotonic() - started
+
+    monitor.is_running = False
+    await ingestion_task
+    await runner.cleanup()
+    if event_log:
+        event_log.close()
+
+    stats = monitor.get_ingestion_stats()
+    print(f"🚚 Webhook load test: {args.seconds}s, {args.clients} clients, batch {args.batch_size}, "
+          f"gzip={args.gzip}, event_log={args.event_log}")
+    print(f"   HTTP statuses:       {statuses}")
+    print(f"   Processed events:    {stats.processed_events}")
+    print(f"   Sustained rate:      {stats.processed_events / elapsed:,.0f} events/s")
+    print(f"   Max queue depth:     {stats.max_queue_depth}")
+    print(f"   Rejected (429):      {stats.rejected_batches} batches / {stats.rejected_events} events")
+    print(f"   Invalid events:      {stats.invalid_events}")
+
+def main():
+    """Точка входа"""
+    parser = argparse.ArgumentParser(description="Webhook batch ingestion load test")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=100000)
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--event-log", action="store_true", help="Писать события в журнал во временной директории")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+🔎 CLASSIFIER - Скомпилированный однопроходный классификатор ошибок
+
+Строится один раз из списка ErrorPattern анализатора:
+- все ключевые слова и литеральные "якоря" regex'ов собираются в один
+  trie-regex с именованными группами; один проход finditer по тексту
+  находит все вхождения (включая перекрывающиеся - как автомат
+  Aho-Corasick)
+- regex паттерна выполняется, только если в тексте найден его якорь
+  (обязательный литеральный префикс), остальные отсекаются без поиска
+- счет паттернов и категорий совпадает с исходным алгоритмом
+  ErrorAnalyzer._classify_error один в один
+
+При добавлении паттернов (import_patterns) компилируются только новые
+regex'ы; общий trie-regex пересобирается из таблицы литералов.
+"""
+
+import hashlib
+import logging
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Метасимволы, на которых заканчивается литеральный префикс regex'а
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+# Минимальная длина якоря: короче - префильтр почти ничего не отсекает
+MIN_ANCHOR_LENGTH = 3
+
+def regex_anchor(pattern: str) -> Optional[str]:
+    """Литеральный префикс regex'а в нижнем регистре (None, если его нет)"""
+    literal = []
+    for index, char in enumerate(pattern):
+        if char in _REGEX_META:
+            # Квантификатор относится к последнему символу префикса
+            if char in "*?{" and literal:
+                literal.pop()
+            if char == "|" or "|" in pattern[index:]:
+                return None
+            break
+        literal.append(char)
+    anchor = "".join(literal).lower()
+    return anchor if len(anchor) >= MIN_ANCHOR_LENGTH else None
+
+def _pattern_signature(pattern) -> str:
+    """Каноническое представление паттерна для версии"""
+    category = getattr(pattern.category, "value", pattern.category)
+    return repr((category, list(pattern.keywords), list(pattern.regex_patterns),
+                 list(pattern.node_types), pattern.confidence_boost))
+
+def _build_trie_regex(literals: Sequence[str]) -> str:
+    """
+    Trie-regex по литералам: на каждой позиции находится самый длинный литерал
+
+    Каждый литерал заканчивается пустой группой (?P<l{index}>), поэтому
+    match.lastgroup сразу дает индекс найденного литерала. Продолжение
+    литерала пробуется раньше, чем его окончание.
+    """
+    trie: Dict = {}
+    for index, literal in enumerate(literals):
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = index
+
+    def render(node: Dict) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if "" in node:
+            branches.append(f"(?P<l{node['']}>)")
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    # Lookahead нулевой ширины: finditer проверяет каждую позицию, вхождения могут перекрываться.
+    # Внешняя группа не захватывающая, иначе lastgroup указывал бы на нее
+    return f"(?={render(trie)})"
+
+class CompiledClassifier:
+    """
+    Классификатор ошибок по паттернам за один проход по тексту
+
+    Каждое ключевое слово и каждый regex получают свой бит. Таблица литералов
+    общая для ключевых слов и якорей; для каждого литерала заранее посчитано
+    замыкание - биты ключевых слов и regex'ов всех литералов, которые
+    являются его подстроками (они тоже есть в тексте). Совпадения
+    собираются OR'ом масок, счет паттерна - число бит в пересечении с его
+    маской.
+    """
+
+    def __init__(self, patterns: Sequence = ()):
+        """Инициализация классификатора"""
+        self.patterns: List = []
+
+        # Таблица литералов: биты ключевых слов и regex'ов, которые дает сам литерал
+        self._literals: List[str] = []
+        self._literal_index: Dict[str, int] = {}
+        self._literal_keywords: List[int] = []
+        self._literal_regexes: List[int] = []
+
+        # Замыкания по имени группы литерала и общий trie-regex
+        self._closure: Dict[str, Tuple[int, int]] = {}
+        self._scanner: Optional[re.Pattern] = None
+
+        # Скомпилированные regex'ы по номеру бита; regex'ы без якоря проверяются всегда
+        self._regexes: List[re.Pattern] = []
+        self._unanchored = 0
+        self._keyword_count = 0
+
+        # Для счета: (категория, бонус, число ключевых слов, число regex'ов, маски паттерна)
+        self._scoring: List[Tuple[object, float, int, int, int, int]] = []
+        self._node_hits: Dict[str, Tuple[bool, ...]] = {}
+
+        # Версия набора паттернов: хеш-цепочка по добавленным паттернам
+        self.version = ""
+
+        self.add_patterns(patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _literal(self, text: str) -> int:
+        """Индекс литерала в таблице (добавляет новый)"""
+        index = self._literal_index.get(text)
+        if index is None:
+            index = len(self._literals)
+            self._literal_index[text] = index
+            self._literals.append(text)
+            self._literal_keywords.append(0)
+            self._literal_regexes.append(0)
+        return index
+
+    def add_patterns(self, patterns: Sequence):
+        """Добавляет паттерны: компилируются только их regex'ы, trie-regex пересобирается"""
+        if not patterns:
+            return
+
+        for pattern in patterns:
+            self.patterns.append(pattern)
+
+            # Каждое ключевое слово паттерна (и повтор тоже) - отдельный бит, как в исходном подсчете
+            keyword_mask = 0
+            for keyword in pattern.keywords:
+                bit = 1 << self._keyword_count
+                self._keyword_count += 1
+                self._literal_keywords[self._literal(keyword.lower())] |= bit
+                keyword_mask |= bit
+
+            regex_mask = 0
+            for regex in pattern.regex_patterns:
+                bit = 1 << len(self._regexes)
+                self._regexes.append(re.compile(regex, re.IGNORECASE))
+                anchor = regex_anchor(regex)
+                if anchor is None:
+                    self._unanchored |= bit
+                else:
+                    self._literal_regexes[self._literal(anchor)] |= bit
+                regex_mask |= bit
+
+            self.version = hashlib.blake2b(
+                (self.version + _pattern_signature(pattern)).encode("utf-8"), digest_size=16
+            ).hexdigest()
+
+            self._scoring.append((
+                pattern.category, pattern.confidence_boost,
+                len(pattern.keywords), len(pattern.regex_patterns),
+                keyword_mask, regex_mask
+            ))
+
+        self._rebuild()
+        logger.debug(f"🔎 Classifier compiled: {len(self.patterns)} patterns, {len(self._literals)} literals")
+
+    def _rebuild(self):
+        """Пересобирает замыкания литералов и общий trie-regex"""
+        closure = {}
+        for index, literal in enumerate(self._literals):
+            keywords = regexes = 0
+            for other_index, other in enumerate(self._literals):
+                if other in literal:
+                    keywords |= self._literal_keywords[other_index]
+                    regexes |= self._literal_regexes[other_index]
+            closure[f"l{index}"] = (keywords, regexes)
+
+        self._closure = closure
+        self._scanner = re.compile(_build_trie_regex(self._literals)) if self._literals else None
+        self._node_hits.clear()
+
+    def _node_matches(self, node_name: str) -> Tuple[bool, ...]:
+        """Совпадения типов нод по паттернам (кэш по имени ноды)"""
+        hits = self._node_hits.get(node_name)
+        if hits is None:
+            hits = tuple(
+                bool(pattern.node_types) and any(node_type in node_name for node_type in pattern.node_types)
+                for pattern in self.patterns
+            )
+            self._node_hits[node_name] = hits
+        return hits
+
+    def match(self, text: str) -> Tuple[int, int]:
+        """
+        Маски совпавших ключевых слов и regex'ов
+
+        Args:
+            text: Текст ошибки в нижнем регистре
+        """
+        keyword_mask = 0
+        candidates = self._unanchored
+
+        if self._scanner is not None:
+            closure = self._closure
+            for match in self._scanner.finditer(text):
+                keywords, regexes = closure[match.lastgroup]
+                keyword_mask |= keywords
+                candidates |= regexes
+
+        # Regex'ы выполняются только для найденных якорей
+        regex_mask = 0
+        regexes = self._regexes
+        while candidates:
+            bit = candidates & -candidates
+            candidates ^= bit
+            if regexes[bit.bit_length() - 1].search(text):
+                regex_mask |= bit
+
+        return keyword_mask, regex_mask
+
+    def classify(self, error_message: str, error_type: str, node_name: str = None) -> Tuple[Optional[object], float]:
+        """
+        Классифицирует ошибку; возвращает (категория, уверенность)
+
+        Категория None - ни один паттерн не дал положительного счета.
+        """
+        error_text = f"{error_message} {error_type}".lower()
+        keyword_mask, regex_mask = self.match(error_text)
+        node_hits = self._node_matches(node_name) if node_name else None
+
+        # Порядок сложения тот же, что в исходном алгоритме: результаты совпадают до бита
+        category_scores: Dict = {}
+        for index, (category, boost, keywords, regexes, pattern_keywords, pattern_regexes) in enumerate(self._scoring):
+            score = 0.0
+
+            keyword_matches = (keyword_mask & pattern_keywords).bit_count()
+            if keyword_matches > 0:
+                score += (keyword_matches / keywords) * 0.4
+
+            regex_matches = (regex_mask & pattern_regexes).bit_count()
+            if regex_matches > 0:
+                score += (regex_matches / regexes) * 0.4
+
+            if node_hits and node_hits[index]:
+                score += 0.2
+
+            score += boost
+
+            if score > 0:
+                category_scores[category] = category_scores.get(category, 0.0) + score
+
+        if not category_scores:
+            return None, 0.0
+
+        best_category = max(category_scores.items(), key=lambda item: item[1])
+        return best_category[0], min(best_category[1], 1.0)
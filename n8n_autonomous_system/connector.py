@@ -20,14 +20,17 @@ import subprocess
 import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
 import aiohttp
 import asyncpg
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Имя инстанса, когда система работает с одним N8N
+DEFAULT_INSTANCE = "default"
+
 @dataclass
 class WorkflowInfo:
     """Информация о workflow"""
@@ -60,6 +63,88 @@ class NodeInfo:
     parameters: Dict[str, Any]
     position: List[int]
     credentials: Optional[Dict[str, Any]] = None
+    # Остальные поля ноды n8n: typeVersion, настройки retryOnFail/maxTries/waitBetweenTries,
+    # onError и т.д. (сохраняются при записи без изменений, если их не меняет исправление)
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+# Поля ноды, разобранные в атрибуты NodeInfo
+NODE_FIELDS = ("id", "name", "type", "parameters", "position", "credentials")
+
+def node_to_dict(node: NodeInfo) -> Dict[str, Any]:
+    """Нода в формате nodes workflow'а n8n"""
+    node_dict = {
+        "id": node.id,
+        "name": node.name,
+        "type": node.type,
+        "parameters": node.parameters,
+        "position": node.position
+    }
+    if node.credentials:
+        node_dict["credentials"] = node.credentials
+    node_dict.update(node.settings)
+    return node_dict
+
+@dataclass
+class WorkflowContent:
+    """Содержимое workflow'а с версией (updatedAt и md5 содержимого, посчитанный в БД)"""
+    id: str
+    name: str
+    nodes: List[NodeInfo]
+    connections: Dict[str, Any]
+    updated_at: Optional[datetime] = None
+    content_hash: Optional[str] = None
+
+# md5 содержимого считается в PostgreSQL: сверка версий не передает ноды по сети
+CONTENT_HASH_SQL = """md5(COALESCE(nodes::text, '') || '|' || COALESCE(connections::text, ''))"""
+
+def parse_nodes(nodes_data: Any) -> List[NodeInfo]:
+    """Ноды из колонки nodes (JSON строка или уже разобранный список)"""
+    if not nodes_data:
+        return []
+    if isinstance(nodes_data, str):
+        nodes_data = json.loads(nodes_data)
+    return [
+        NodeInfo(
+            id=node_data.get("id", ""),
+            name=node_data.get("name", ""),
+            type=node_data.get("type", ""),
+            parameters=node_data.get("parameters", {}),
+            position=node_data.get("position", [0, 0]),
+            credentials=node_data.get("credentials"),
+            settings={key: value for key, value in node_data.items() if key not in NODE_FIELDS}
+        )
+        for node_data in nodes_data
+    ]
+
+def parse_connections(connections: Any) -> Dict[str, Any]:
+    """connections из колонки connections (JSON строка или уже разобранный объект)"""
+    if not connections:
+        return {}
+    return json.loads(connections) if isinstance(connections, str) else dict(connections)
+
+def extract_errors(execution_id: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Извлекает ошибки нод из execution data"""
+    errors = []
+    
+    if "resultData" in data and "runData" in data["resultData"]:
+        run_data = data["resultData"]["runData"]
+        
+        for node_name, node_results in run_data.items():
+            if isinstance(node_results, list) and len(node_results) > 0:
+                node_result = node_results[0]
+                
+                if "error" in node_result:
+                    errors.append({
+                        "node": node_name,
+                        "error": node_result["error"],
+                        "execution_id": execution_id
+                    })
+    
+    return errors
+
+def extract_run_data(data: Dict[str, Any]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """runData (запуски нод с startTime/executionTime) из execution data"""
+    return data.get("resultData", {}).get("runData") or None
 
 class N8NConnector:
     """
@@ -71,8 +156,16 @@ class N8NConnector:
     - PostgreSQL для прямого доступа к данным
     """
     
-    def __init__(self, api_url: str = None, ssh_host: str = None, db_config: Dict = None):
+    def __init__(self, api_url: str = None, ssh_host: str = None, db_config: Dict = None,
+                 instance: str = DEFAULT_INSTANCE, n8n_container: str = "root-n8n-1",
+                 db_container: str = "root-db-1", pool_max_size: int = 10):
         """Инициализация коннектора"""
+        # Имя инстанса N8N (label событий и метрик)
+        self.instance = instance
+        self.n8n_container = n8n_container
+        self.db_container = db_container
+        self.pool_max_size = pool_max_size
+        
         self.api_url = api_url or "https://mayersn8n.duckdns.org"
         self.ssh_host = ssh_host or "root@178.156.142.35"
         self.db_config = db_config or {
@@ -82,8 +175,9 @@ class N8NConnector:
             "user": "n8n"
         }
         
-        # HTTP сессия для API запросов
+        # HTTP сессия для API запросов (может быть общей для нескольких коннекторов)
         self.session: Optional[aiohttp.ClientSession] = None
+        self._owns_session = True
         
         # PostgreSQL пул соединений
         self.db_pool: Optional[asyncpg.Pool] = None
@@ -93,7 +187,7 @@ class N8NConnector:
         self._cache_ttl = 300  # 5 минут
         self._last_cache_update = 0
         
-        logger.info("🔌 N8N Connector initialized")
+        logger.info(f"🔌 N8N Connector initialized ({self.instance})")
     
     async def __aenter__(self):
         """Async context manager entry"""
@@ -107,9 +201,11 @@ class N8NConnector:
     async def connect(self):
         """Устанавливает соединения с N8N"""
         try:
-            # HTTP сессия
-            timeout = aiohttp.ClientTimeout(total=30)
-            self.session = aiohttp.ClientSession(timeout=timeout)
+            # HTTP сессия (своя, если не передана общая)
+            if self.session is None:
+                timeout = aiohttp.ClientTimeout(total=30)
+                self.session = aiohttp.ClientSession(timeout=timeout)
+                self._owns_session = True
             
             # PostgreSQL пул
             self.db_pool = await asyncpg.create_pool(
@@ -118,29 +214,34 @@ class N8NConnector:
                 database=self.db_config["database"],
                 user=self.db_config["user"],
                 min_size=1,
-                max_size=10
+                max_size=self.pool_max_size
             )
             
-            logger.info("✅ N8N Connector connected successfully")
+            logger.info(f"✅ N8N Connector connected successfully ({self.instance})")
             
         except Exception as e:
-            logger.error(f"❌ Failed to connect N8N Connector: {e}")
+            logger.error(f"❌ Failed to connect N8N Connector ({self.instance}): {e}")
             raise
     
     async def close(self):
         """Закрывает соединения"""
         try:
-            if self.session:
+            if self.session and self._owns_session:
                 await self.session.close()
             
             if self.db_pool:
                 await self.db_pool.close()
             
-            logger.info("🔌 N8N Connector closed")
+            logger.info(f"🔌 N8N Connector closed ({self.instance})")
             
         except Exception as e:
             logger.error(f"❌ Error closing N8N Connector: {e}")
     
+    def use_session(self, session: aiohttp.ClientSession):
+        """Использует общую HTTP сессию (ее закрывает владелец, а не коннектор)"""
+        self.session = session
+        self._owns_session = False
+    
     async def health_check(self) -> bool:
         """Проверяет здоровье N8N сервиса"""
         try:
@@ -161,7 +262,7 @@ class N8NConnector:
     async def database_health_check(self) -> bool:
         """Проверяет здоровье PostgreSQL"""
         try:
-            result = await self._run_ssh_command("docker exec root-db-1 pg_isready -U n8n")
+            result = await self._run_ssh_command(f"docker exec {self.db_container} pg_isready -U n8n")
             
             if result["success"] and "accepting" in result["stdout"]:
                 logger.debug("✅ PostgreSQL is healthy")
@@ -289,19 +390,7 @@ class N8NConnector:
             if not row or not row["nodes"]:
                 return []
             
-            nodes_data = json.loads(row["nodes"])
-            nodes = []
-            
-            for node_data in nodes_data:
-                node = NodeInfo(
-                    id=node_data.get("id", ""),
-                    name=node_data.get("name", ""),
-                    type=node_data.get("type", ""),
-                    parameters=node_data.get("parameters", {}),
-                    position=node_data.get("position", [0, 0]),
-                    credentials=node_data.get("credentials")
-                )
-                nodes.append(node)
+            nodes = parse_nodes(row["nodes"])
             
             logger.debug(f"📦 Retrieved {len(nodes)} nodes for workflow {workflow_id}")
             return nodes
@@ -310,34 +399,122 @@ class N8NConnector:
             logger.error(f"❌ Failed to get workflow nodes: {e}")
             return []
     
-    async def update_workflow_nodes(self, workflow_id: str, nodes: List[NodeInfo]) -> bool:
-        """Обновляет ноды workflow'а"""
+    async def get_workflow_connections(self, workflow_id: str) -> Dict[str, Any]:
+        """Получает связи нод workflow'а ({source: {"main": [[{"node": target, ...}]]}})"""
+        try:
+            query = "SELECT connections FROM workflow_entity WHERE id = $1"
+            
+            async with self.db_pool.acquire() as conn:
+                row = await conn.fetchrow(query, workflow_id)
+            
+            if not row or not row["connections"]:
+                return {}
+            
+            return parse_connections(row["connections"])
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get workflow connections: {e}")
+            return {}
+    
+    async def get_workflow_versions(self, active_only: bool = True) -> Optional[Dict[str, Tuple[Optional[datetime], str]]]:
+        """
+        Версии workflow'ов одним запросом: id -> (updatedAt, md5 содержимого)
+        
+        Returns:
+            Словарь версий или None, если запрос не удался (пустой словарь - workflow'ов нет)
+        """
+        try:
+            query = f'SELECT id, "updatedAt", {CONTENT_HASH_SQL} AS content_hash FROM workflow_entity'
+            if active_only:
+                query += " WHERE active = true"
+            
+            async with self.db_pool.acquire() as conn:
+                rows = await conn.fetch(query)
+            
+            return {row["id"]: (row["updatedAt"], row["content_hash"]) for row in rows}
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get workflow versions: {e}")
+            return None
+    
+    async def stream_workflow_contents(self, workflow_ids: Optional[List[str]] = None, active_only: bool = True,
+                                       prefetch: int = 50) -> AsyncIterator[WorkflowContent]:
+        """
+        Содержимое workflow'ов одним запросом через серверный курсор
+        
+        Args:
+            workflow_ids: Только эти workflow'ы (None - все)
+            active_only: Только активные workflow'ы
+            prefetch: Строк за одну выборку курсора
+        """
+        conditions = []
+        args = []
+        if workflow_ids is not None:
+            if not workflow_ids:
+                return
+            args.append(list(workflow_ids))
+            conditions.append(f"id = ANY(${len(args)})")
+        if active_only:
+            conditions.append("active = true")
+        
+        query = f"""
+        SELECT id, name, nodes, connections, "updatedAt", {CONTENT_HASH_SQL} AS content_hash
+        FROM workflow_entity
+        """
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        try:
+            async with self.db_pool.acquire() as conn:
+                # Курсор PostgreSQL существует только внутри транзакции
+                async with conn.transaction():
+                    async for row in conn.cursor(query, *args, prefetch=prefetch):
+                        yield WorkflowContent(
+                            id=row["id"],
+                            name=row["name"],
+                            nodes=parse_nodes(row["nodes"]),
+                            connections=parse_connections(row["connections"]),
+                            updated_at=row["updatedAt"],
+                            content_hash=row["content_hash"]
+                        )
+        except Exception as e:
+            logger.error(f"❌ Failed to stream workflow contents: {e}")
+    
+    async def update_workflow_nodes(self, workflow_id: str, nodes: List[NodeInfo],
+                                    connections: Optional[Dict[str, Any]] = None,
+                                    expected_updated_at: Optional[datetime] = None) -> bool:
+        """
+        Обновляет ноды workflow'а (и связи, если переданы connections)
+        
+        expected_updated_at - оптимистичная блокировка: запись выполняется, только если
+        workflow не менялся после чтения этой версии (иначе False)
+        """
         try:
             # Конвертируем ноды в JSON формат
-            nodes_data = []
-            for node in nodes:
-                node_dict = {
-                    "id": node.id,
-                    "name": node.name,
-                    "type": node.type,
-                    "parameters": node.parameters,
-                    "position": node.position
-                }
-                if node.credentials:
-                    node_dict["credentials"] = node.credentials
-                nodes_data.append(node_dict)
-            
-            nodes_json = json.dumps(nodes_data, ensure_ascii=False)
+            nodes_json = json.dumps([node_to_dict(node) for node in nodes], ensure_ascii=False)
             
             # Обновляем в базе данных
-            query = """
-            UPDATE workflow_entity 
-            SET nodes = $1, "updatedAt" = NOW()
-            WHERE id = $2
-            """
+            if connections is None:
+                query = """
+                UPDATE workflow_entity 
+                SET nodes = $1, "updatedAt" = NOW()
+                WHERE id = $2
+                """
+                args = (nodes_json, workflow_id)
+            else:
+                query = """
+                UPDATE workflow_entity 
+                SET nodes = $1, connections = $2, "updatedAt" = NOW()
+                WHERE id = $3
+                """
+                args = (nodes_json, json.dumps(connections, ensure_ascii=False), workflow_id)
+            
+            if expected_updated_at is not None:
+                query += f' AND "updatedAt" = ${len(args) + 1}'
+                args = (*args, expected_updated_at)
             
             async with self.db_pool.acquire() as conn:
-                result = await conn.execute(query, nodes_json, workflow_id)
+                result = await conn.execute(query, *args)
             
             if result == "UPDATE 1":
                 # Инвалидируем кэш
@@ -349,6 +526,9 @@ class N8NConnector:
                 
                 logger.info(f"✅ Updated nodes for workflow {workflow_id}")
                 return True
+            elif expected_updated_at is not None:
+                logger.warning(f"⚠️ Workflow {workflow_id} changed since {expected_updated_at}, update skipped")
+                return False
             else:
                 logger.error(f"❌ Failed to update workflow {workflow_id}")
                 return False
@@ -363,20 +543,7 @@ class N8NConnector:
             workflow_id = str(uuid.uuid4())
             
             # Подготавливаем данные
-            nodes_data = []
-            for node in nodes:
-                node_dict = {
-                    "id": node.id,
-                    "name": node.name,
-                    "type": node.type,
-                    "parameters": node.parameters,
-                    "position": node.position
-                }
-                if node.credentials:
-                    node_dict["credentials"] = node.credentials
-                nodes_data.append(node_dict)
-            
-            nodes_json = json.dumps(nodes_data, ensure_ascii=False)
+            nodes_json = json.dumps([node_to_dict(node) for node in nodes], ensure_ascii=False)
             connections_json = json.dumps(connections or {}, ensure_ascii=False)
             
             # Создаем workflow в базе данных
@@ -478,7 +645,7 @@ class N8NConnector:
             await self._run_ssh_command(write_cmd)
             
             # Выполняем workflow
-            execute_cmd = f"docker exec root-n8n-1 n8n execute:workflow --id={workflow_id} --input={temp_file}"
+            execute_cmd = f"docker exec {self.n8n_container} n8n execute:workflow --id={workflow_id} --input={temp_file}"
             result = await self._run_ssh_command(execute_cmd, timeout=300)
             
             # Удаляем временный файл
@@ -532,41 +699,60 @@ class N8NConnector:
     
     async def get_execution_errors(self, execution_id: str) -> List[Dict[str, Any]]:
         """Получает ошибки выполнения"""
+        errors_by_execution = await self.get_executions_errors([execution_id])
+        return errors_by_execution.get(execution_id, [])
+    
+    async def get_executions_data(self, execution_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получает execution data нескольких выполнений одним запросом
+        
+        Blob'ы execution_data - самые тяжелые данные в БД: монитор читает их
+        один раз на пакет завершений, а ошибки (extract_errors) и runData
+        профайлера (extract_run_data) разбираются из одного результата.
+        """
+        if not execution_ids:
+            return {}
+        
         try:
             query = """
-            SELECT data
+            SELECT "executionId", data
             FROM execution_data
-            WHERE "executionId" = $1
+            WHERE "executionId" = ANY($1)
             """
             
             async with self.db_pool.acquire() as conn:
-                row = await conn.fetchrow(query, execution_id)
-            
-            if not row or not row["data"]:
-                return []
+                rows = await conn.fetch(query, list(execution_ids))
             
-            data = json.loads(row["data"])
-            errors = []
+            data_by_execution = {}
+            for row in rows:
+                if row["data"]:
+                    data = json.loads(row["data"])
+                    if isinstance(data, dict):
+                        data_by_execution[row["executionId"]] = data
             
-            if "resultData" in data and "runData" in data["resultData"]:
-                run_data = data["resultData"]["runData"]
-                
-                for node_name, node_results in run_data.items():
-                    if isinstance(node_results, list) and len(node_results) > 0:
-                        node_result = node_results[0]
-                        
-                        if "error" in node_result:
-                            errors.append({
-                                "node": node_name,
-                                "error": node_result["error"],
-                                "execution_id": execution_id
-                            })
-            
-            return errors
+            return data_by_execution
             
         except Exception as e:
-            logger.error(f"❌ Failed to get execution errors: {e}")
-            return []
+            logger.error(f"❌ Failed to get execution data: {e}")
+            return {}
+    
+    async def get_executions_errors(self, execution_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Получает ошибки нескольких выполнений одним запросом"""
+        data_by_execution = await self.get_executions_data(execution_ids)
+        return {
+            execution_id: extract_errors(execution_id, data)
+            for execution_id, data in data_by_execution.items()
+        }
+    
+    async def get_executions_run_data(self, execution_ids: List[str]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Получает runData (запуски нод с startTime/executionTime) нескольких выполнений одним запросом"""
+        data_by_execution = await self.get_executions_data(execution_ids)
+        run_data_by_execution = {}
+        for execution_id, data in data_by_execution.items():
+            run_data = extract_run_data(data)
+            if run_data:
+                run_data_by_execution[execution_id] = run_data
+        return run_data_by_execution
     
     async def get_recent_executions(self, limit: int = 50) -> List[ExecutionInfo]:
         """Получает последние выполнения"""
@@ -604,6 +790,50 @@ class N8NConnector:
             logger.error(f"❌ Failed to get recent executions: {e}")
             return []
     
+    async def get_finished_executions(self, limit: int = 100, before: Optional[datetime] = None,
+                                      workflow_id: Optional[str] = None) -> List[ExecutionInfo]:
+        """
+        Получает завершенные выполнения, начиная с самых новых
+        
+        Постраничный обход истории: следующая страница запрашивается с
+        before = started_at последнего выполнения предыдущей.
+        """
+        try:
+            query = """
+            SELECT id, "workflowId", status, finished, "startedAt", "stoppedAt"
+            FROM execution_entity
+            WHERE "stoppedAt" IS NOT NULL
+              AND ($2::timestamptz IS NULL OR "startedAt" < $2)
+              AND ($3::text IS NULL OR "workflowId" = $3)
+            ORDER BY "startedAt" DESC
+            LIMIT $1
+            """
+            
+            async with self.db_pool.acquire() as conn:
+                rows = await conn.fetch(query, limit, before, workflow_id)
+            
+            executions = []
+            for row in rows:
+                execution_time = None
+                if row["startedAt"] and row["stoppedAt"]:
+                    execution_time = (row["stoppedAt"] - row["startedAt"]).total_seconds()
+                
+                executions.append(ExecutionInfo(
+                    id=row["id"],
+                    workflow_id=row["workflowId"],
+                    status=row["status"],
+                    finished=row["finished"],
+                    started_at=row["startedAt"],
+                    stopped_at=row["stoppedAt"],
+                    execution_time=execution_time
+                ))
+            
+            return executions
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get finished executions: {e}")
+            return []
+    
     async def _run_ssh_command(self, command: str, timeout: int = 30) -> Dict[str, Any]:
         """Выполняет SSH команду асинхронно"""
         try:
@@ -636,7 +866,7 @@ class N8NConnector:
         """Перезапускает N8N для применения изменений"""
         try:
             logger.info("🔄 Restarting N8N...")
-            result = await self._run_ssh_command("docker restart root-n8n-1")
+            result = await self._run_ssh_command(f"docker restart {self.n8n_container}")
             
             if result["success"]:
                 # Ждем запуска
@@ -658,6 +888,124 @@ class N8NConnector:
         self._last_cache_update = 0
         logger.debug("🗑️ Cache cleared")
 
+class ConnectorFleet:
+    """
+    Коннекторы к нескольким инстансам N8N с общими ресурсами
+    
+    Все коннекторы используют одну HTTP сессию (общий пул TCP/TLS соединений),
+    а бюджет соединений PostgreSQL делится между инстансами, поэтому число
+    соединений процесса не растет линейно с числом инстансов.
+    """
+    
+    def __init__(self, connectors: List[N8NConnector], db_connection_budget: int = 10,
+                 http_connection_limit: int = 20, min_pool_size: int = 2):
+        """Инициализация набора коннекторов"""
+        if not connectors:
+            raise ValueError("ConnectorFleet requires at least one connector")
+        
+        self.connectors: Dict[str, N8NConnector] = {}
+        for connector in connectors:
+            if connector.instance in self.connectors:
+                raise ValueError(f"Duplicate N8N instance name: {connector.instance}")
+            self.connectors[connector.instance] = connector
+        
+        self.db_connection_budget = db_connection_budget
+        self.http_connection_limit = http_connection_limit
+        self.min_pool_size = min_pool_size
+        self.session: Optional[aiohttp.ClientSession] = None
+        
+        # Бюджет соединений БД делится поровну, но не меньше min_pool_size на инстанс
+        pool_size = max(min_pool_size, db_connection_budget // len(self.connectors))
+        for connector in self.connectors.values():
+            connector.pool_max_size = pool_size
+    
+    @classmethod
+    def from_config(cls, integrations: Dict[str, Any]) -> "ConnectorFleet":
+        """
+        Создает коннекторы из секции integrations
+        
+        Если integrations.n8n.instances пуст, создается один инстанс
+        из api_url/ssh_host (прежнее поведение).
+        """
+        n8n_config = integrations.get("n8n", {}) or {}
+        postgresql_config = integrations.get("postgresql", {}) or {}
+        instances = n8n_config.get("instances") or [{
+            "name": DEFAULT_INSTANCE,
+            "api_url": n8n_config.get("api_url"),
+            "ssh_host": n8n_config.get("ssh_host")
+        }]
+        
+        connectors = []
+        for instance in instances:
+            kwargs = {}
+            if instance.get("n8n_container"):
+                kwargs["n8n_container"] = instance["n8n_container"]
+            if instance.get("db_container"):
+                kwargs["db_container"] = instance["db_container"]
+            
+            connectors.append(N8NConnector(
+                api_url=instance.get("api_url"),
+                ssh_host=instance.get("ssh_host"),
+                db_config=instance.get("db"),
+                instance=instance.get("name", DEFAULT_INSTANCE),
+                **kwargs
+            ))
+        
+        return cls(
+            connectors,
+            db_connection_budget=postgresql_config.get("max_connections", 10),
+            http_connection_limit=n8n_config.get("http_connection_limit", 20)
+        )
+    
+    @property
+    def primary(self) -> N8NConnector:
+        """Первый инстанс (для компонентов, работающих с одним N8N)"""
+        return next(iter(self.connectors.values()))
+    
+    def get(self, instance: Optional[str] = None) -> N8NConnector:
+        """Коннектор инстанса (без имени - первый)"""
+        if instance is None:
+            return self.primary
+        connector = self.connectors.get(instance)
+        if connector is None:
+            raise ValueError(f"Unknown N8N instance: {instance}")
+        return connector
+    
+    def __iter__(self):
+        return iter(self.connectors.values())
+    
+    def __len__(self) -> int:
+        return len(self.connectors)
+    
+    async def connect(self):
+        """Подключает все инстансы параллельно через общую HTTP сессию"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30),
+                connector=aiohttp.TCPConnector(limit=self.http_connection_limit)
+            )
+            for connector in self.connectors.values():
+                connector.use_session(self.session)
+        
+        results = await asyncio.gather(
+            *[connector.connect() for connector in self.connectors.values()],
+            return_exceptions=True
+        )
+        failed = [name for name, result in zip(self.connectors, results) if isinstance(result, Exception)]
+        if len(failed) == len(self.connectors):
+            raise ConnectionError(f"Failed to connect any N8N instance: {failed}")
+        if failed:
+            logger.warning(f"⚠️ N8N instances unavailable at startup: {failed}")
+        
+        logger.info(f"✅ Connected {len(self.connectors) - len(failed)}/{len(self.connectors)} N8N instances")
+    
+    async def close(self):
+        """Закрывает все коннекторы и общую сессию"""
+        await asyncio.gather(*[connector.close() for connector in self.connectors.values()])
+        if self.session:
+            await self.session.close()
+            self.session = None
+
 # Утилитарные функции для работы с N8N
 
 async def create_test_workflow() -> Optional[str]:
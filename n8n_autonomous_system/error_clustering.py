@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+🧩 ERROR CLUSTERING - Инкрементальная кластеризация ошибок (MinHash + LSH)
+
+Даже после нормализации сообщения одной причины различаются формулировкой:
+разные версии нод, OpenRouter и OpenAI, Google Drive API, MCP render
+сервер. Кластеризатор объединяет похожие шаблоны:
+
+- шаблон разбивается на токены, шинглы - k-граммы токенов
+- MinHash сигнатура: num_perm минимумов универсальных хешей
+  (a * h + b) mod (2^61 - 1) по шинглам (векторно в NumPy)
+- LSH: сигнатура режется на bands полос по rows значений; шаблоны с
+  совпавшей полосой - кандидаты, кандидат принимается, если оценка
+  сходства Жаккара не ниже threshold
+
+Новый шаблон сопоставляется кластеру за O(bands) поисков в словарях,
+повторный - за один поиск в таблице шаблонов. Кластеры разделены по
+области (scope, например тип ошибки и нода): одинаковый текст на разных
+нодах требует разных исправлений. HTTP статусы, сохраненные
+нормализацией, тоже входят в область.
+
+Размер кластера и затухающая частота (событий в минуту) - индикаторы
+шторма ошибок.
+"""
+
+import logging
+import math
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_ASSIGNMENTS = REGISTRY.counter(
+    "n8n_error_cluster_assignments", "Error to cluster assignments by lookup path", ["result"]
+)
+CLUSTERS_ACTIVE = REGISTRY.gauge("n8n_error_clusters", "Tracked error clusters")
+LARGEST_CLUSTER_RATE = REGISTRY.gauge(
+    "n8n_error_cluster_max_rate_per_minute", "Decayed error rate of the busiest cluster"
+)
+
+# Простое число Мерсенна для универсального хеширования
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_TOKEN = re.compile(r"<\w+>|[a-z0-9_']+")
+
+# После нормализации числа остаются только в HTTP статусах: 429 и 500 - разные кластеры
+_STATUS = re.compile(r"\b[1-5]\d\d\b")
+
+@dataclass
+class ErrorCluster:
+    """Кластер похожих ошибок"""
+    id: int
+    scope: str
+    representative: str
+    first_seen: float
+    last_seen: float
+    size: int = 0
+    rate: float = 0.0
+    templates: set = field(default_factory=set)
+    # Сигнатуры проиндексированных шаблонов (первая - представителя)
+    signatures: List[np.ndarray] = field(default_factory=list)
+    band_keys: List[Tuple[int, int]] = field(default_factory=list)
+    # Отпечаток ошибки, анализ которой представляет кластер
+    analysis_key: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "scope": self.scope,
+            "representative": self.representative,
+            "size": self.size,
+            "templates": len(self.templates),
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen
+        }
+
+def shingles(template: str, size: int = 2) -> List[str]:
+    """Шинглы шаблона: k-граммы токенов (короткий шаблон - один шингл целиком)"""
+    tokens = _TOKEN.findall(template.lower())
+    if len(tokens) <= size:
+        return [" ".join(tokens)]
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+class ErrorClusterer:
+    """Инкрементальная кластеризация шаблонов ошибок"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.5,
+                 shingle_size: int = 2, max_clusters: int = 5000,
+                 max_templates_per_cluster: int = 32, rate_half_life_seconds: float = 300,
+                 seed: int = 1):
+        """
+        Инициализация
+
+        Args:
+            num_perm: Длина MinHash сигнатуры
+            bands: Число LSH полос (num_perm должно делиться на bands)
+            threshold: Минимальная оценка сходства Жаккара для попадания в кластер
+            shingle_size: Длина шингла в токенах
+            max_clusters: Максимум кластеров (лишние вытесняются по давности)
+            max_templates_per_cluster: Сколько шаблонов кластера индексируется в LSH
+            rate_half_life_seconds: Период полураспада частоты кластера
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_clusters = max_clusters
+        self.max_templates_per_cluster = max_templates_per_cluster
+        self.rate_half_life_seconds = rate_half_life_seconds
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self.clusters: Dict[int, ErrorCluster] = {}
+        # (scope, шаблон) -> id кластера
+        self._templates: Dict[Tuple[str, str], int] = {}
+        # (номер полосы, хеш области и полосы) -> id кластеров
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+        self._next_id = 1
+
+        CLUSTERS_ACTIVE.set_function(lambda: len(self.clusters))
+        LARGEST_CLUSTER_RATE.set_function(
+            lambda: max((self.current_rate(cluster) for cluster in self.clusters.values()), default=0.0)
+        )
+
+    def __len__(self) -> int:
+        return len(self.clusters)
+
+    def signature(self, template: str) -> np.ndarray:
+        """MinHash сигнатура шаблона"""
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(template, self.shingle_size)),
+            dtype=np.uint64
+        )
+        # a, h < 2^32: a * h + b не переполняет uint64
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, scope: str, signature: np.ndarray) -> List[Tuple[int, int]]:
+        """Ключи LSH полос (область входит в хеш полосы)"""
+        scope_bytes = scope.encode("utf-8")
+        rows = self.rows
+        return [
+            (band, zlib.crc32(signature[band * rows:(band + 1) * rows].tobytes(), zlib.crc32(scope_bytes)))
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Оценка сходства Жаккара по сигнатурам"""
+        return float(np.count_nonzero(first == second)) / len(first)
+
+    def assign(self, template: str, scope: str = "", now: Optional[float] = None, count: int = 1) -> ErrorCluster:
+        """Возвращает кластер шаблона (создает новый) и учитывает count событий"""
+        now = time.time() if now is None else now
+        statuses = _STATUS.findall(template)
+        if statuses:
+            scope = f"{scope}|{','.join(statuses)}"
+
+        cluster_id = self._templates.get((scope, template))
+        if cluster_id is not None:
+            cluster = self.clusters[cluster_id]
+            CLUSTER_ASSIGNMENTS.labels("exact").inc()
+        else:
+            signature = self.signature(template)
+            band_keys = self._band_keys(scope, signature)
+            cluster = self._find_candidate(signature, band_keys)
+
+            if cluster is None:
+                cluster = self._create(template, scope, signature, now)
+                CLUSTER_ASSIGNMENTS.labels("new").inc()
+            else:
+                CLUSTER_ASSIGNMENTS.labels("similar").inc()
+
+            self._templates[(scope, template)] = cluster.id
+            cluster.templates.add(template)
+            # Индексируются и новые формулировки: кластер "дрейфует" вместе с ними
+            if len(cluster.signatures) < self.max_templates_per_cluster:
+                self._index(cluster, signature, band_keys)
+
+        self._touch(cluster, now, count)
+        return cluster
+
+    def _find_candidate(self, signature: np.ndarray, band_keys: List[Tuple[int, int]]) -> Optional[ErrorCluster]:
+        """Лучший кластер среди LSH кандидатов (None - похожих нет)"""
+        candidates = set()
+        for key in band_keys:
+            candidates.update(self._buckets.get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for cluster_id in candidates:
+            cluster = self.clusters[cluster_id]
+            similarity = max(self.similarity(signature, other) for other in cluster.signatures)
+            if similarity >= best_similarity:
+                best, best_similarity = cluster, similarity
+        return best
+
+    def _create(self, template: str, scope: str, signature: np.ndarray, now: float) -> ErrorCluster:
+        """Новый кластер (при переполнении вытесняются давно не встречавшиеся)"""
+        if len(self.clusters) >= self.max_clusters:
+            self._evict(len(self.clusters) - self.max_clusters // 2 + 1)
+
+        cluster = ErrorCluster(id=self._next_id, scope=scope, representative=template, first_seen=now, last_seen=now)
+        self._next_id += 1
+        self.clusters[cluster.id] = cluster
+        return cluster
+
+    def _index(self, cluster: ErrorCluster, signature: np.ndarray, band_keys: List[Tuple[int, int]]):
+        """Добавляет сигнатуру шаблона и ее полосы в LSH индекс кластера"""
+        cluster.signatures.append(signature)
+        for key in band_keys:
+            bucket = self._buckets.setdefault(key, [])
+            if cluster.id not in bucket:
+                bucket.append(cluster.id)
+                cluster.band_keys.append(key)
+
+    def _touch(self, cluster: ErrorCluster, now: float, count: int = 1):
+        """Учитывает события: размер и затухающая частота (в минуту)"""
+        elapsed = max(0.0, now - cluster.last_seen)
+        decay = 0.5 ** (elapsed / self.rate_half_life_seconds)
+        # Частота - затухающий счетчик, нормированный на его среднее время жизни
+        cluster.rate = cluster.rate * decay + count * 60 * math.log(2) / self.rate_half_life_seconds
+        cluster.size += count
+        cluster.last_seen = now
+
+    def _evict(self, count: int):
+        """Удаляет count давно не встречавшихся кластеров"""
+        for cluster in sorted(self.clusters.values(), key=lambda c: c.last_seen)[:count]:
+            self.remove(cluster.id)
+
+    def remove(self, cluster_id: int):
+        """Удаляет кластер из индексов"""
+        cluster = self.clusters.pop(cluster_id, None)
+        if cluster is None:
+            return
+        for key in cluster.band_keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.remove(cluster_id)
+                if not bucket:
+                    del self._buckets[key]
+        for template in cluster.templates:
+            self._templates.pop((cluster.scope, template), None)
+
+    def current_rate(self, cluster: ErrorCluster, now: Optional[float] = None) -> float:
+        """Частота кластера на момент now (событий в минуту)"""
+        now = time.time() if now is None else now
+        return cluster.rate * 0.5 ** (max(0.0, now - cluster.last_seen) / self.rate_half_life_seconds)
+
+    def get_storms(self, min_rate_per_minute: float = 10.0, limit: int = 10,
+                   now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Кластеры с частотой не ниже порога - индикаторы шторма ошибок"""
+        now = time.time() if now is None else now
+        storms = []
+        for cluster in self.clusters.values():
+            rate = self.current_rate(cluster, now)
+            if rate >= min_rate_per_minute:
+                storm = cluster.to_dict()
+                storm["rate_per_minute"] = round(rate, 3)
+                storms.append(storm)
+        storms.sort(key=lambda storm: storm["rate_per_minute"], reverse=True)
+        return storms[:limit]
+
+    def get_top_clusters(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Самые большие кластеры"""
+        now = time.time()
+        top = []
+        for cluster in sorted(self.clusters.values(), key=lambda c: c.size, reverse=True)[:limit]:
+            entry = cluster.to_dict()
+            entry["rate_per_minute"] = round(self.current_rate(cluster, now), 3)
+            top.append(entry)
+        return top
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+📼 EVENT LOG - Персистентный журнал событий мониторинга
+
+Append-only журнал событий на диске:
+- Сегменты в формате компактных JSON lines с монотонными offset'ами
+- Пакетный fsync (по количеству записей и по времени)
+- Ротация сегментов по размеру и удаление старых по retention
+- Последовательное чтение (replay) с любого offset'а: разреженный индекс
+  offset -> байт в сегменте, чтение начинается с ближайшей точки индекса,
+  а не с начала сегмента
+- Подтвержденные offset'ы потребителей для продолжения после рестарта
+- Восстановление при старте за время, ограниченное размером одного сегмента
+"""
+
+import bisect
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".log"
+CONSUMER_OFFSETS_FILE = "consumers.json"
+
+# Шаг разреженного индекса: позиция каждой INDEX_INTERVAL-й записи сегмента
+INDEX_INTERVAL = 256
+
+class EventLog:
+    """
+    Сегментированный append-only журнал
+
+    Каждый сегмент называется по offset'у своей первой записи
+    (events-00000000000000001000.log), поэтому поиск сегмента для
+    произвольного offset'а - бинарный поиск по списку имен, а при старте
+    достаточно просканировать только последний сегмент.
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 fsync_interval: float = 1.0, fsync_batch: int = 256,
+                 retention_bytes: Optional[int] = None):
+        """Инициализация журнала"""
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.retention_bytes = retention_bytes
+
+        # Базовые offset'ы сегментов (отсортированы)
+        self._segments: List[int] = []
+        # Разреженный индекс: base -> байтовые позиции записей base, base + INDEX_INTERVAL, ...
+        # (заполняется подряд: при восстановлении, записи и чтении)
+        self._index: Dict[int, List[int]] = {}
+        self._active = None
+        self._active_size = 0
+
+        self.next_offset = 0
+
+        # Пакетный fsync
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        # Подтвержденные offset'ы потребителей: name -> offset
+        self._consumer_offsets: Dict[str, int] = {}
+        self._offsets_dirty = False
+
+        self._open()
+
+    def _open(self):
+        """Открывает журнал и восстанавливает состояние после рестарта"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segments = sorted(
+            int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")
+        )
+
+        if not self._segments:
+            self._segments.append(0)
+            self.next_offset = 0
+        else:
+            self.next_offset = self._recover_segment(self._segments[-1])
+
+        offsets_path = self.directory / CONSUMER_OFFSETS_FILE
+        if offsets_path.exists():
+            with open(offsets_path, "r", encoding="utf-8") as f:
+                self._consumer_offsets = json.load(f)
+
+        path = self._segment_path(self._segments[-1])
+        self._active = open(path, "ab")
+        self._active_size = self._active.tell()
+
+        logger.info(f"📼 Event log opened at {self.directory} (next offset {self.next_offset})")
+
+    def _recover_segment(self, base_offset: int) -> int:
+        """Сканирует последний сегмент, обрезает недописанный хвост и возвращает следующий offset"""
+        path = self._segment_path(base_offset)
+        count = 0
+        valid_size = 0
+        positions = self._index[base_offset] = []
+
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                if count % INDEX_INTERVAL == 0:
+                    positions.append(valid_size)
+                count += 1
+                valid_size += len(line)
+
+        if valid_size < path.stat().st_size:
+            logger.warning(f"⚠️ Truncating torn tail of {path.name} at byte {valid_size}")
+            with open(path, "r+b") as f:
+                f.truncate(valid_size)
+
+        return base_offset + count
+
+    def _segment_path(self, base_offset: int) -> Path:
+        """Путь к файлу сегмента"""
+        return self.directory / f"{SEGMENT_PREFIX}{base_offset:020d}{SEGMENT_SUFFIX}"
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Добавляет запись и возвращает ее offset"""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+        if self._active_size and self._active_size + len(line) > self.segment_max_bytes:
+            self._rotate()
+
+        offset = self.next_offset
+        positions = self._index.setdefault(self._segments[-1], [])
+        if offset - self._segments[-1] == len(positions) * INDEX_INTERVAL:
+            positions.append(self._active_size)
+        self._active.write(line)
+        self._active_size += len(line)
+        self.next_offset += 1
+
+        self._pending += 1
+        if self._pending >= self.fsync_batch:
+            self.sync()
+        else:
+            self.maybe_sync()
+
+        return offset
+
+    def maybe_sync(self):
+        """Выполняет fsync, если с последней синхронизации прошло fsync_interval"""
+        if (self._pending or self._offsets_dirty) and time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """Сбрасывает буфер и выполняет fsync активного сегмента"""
+        if self._active is None:
+            return
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+        if self._offsets_dirty:
+            self._write_consumer_offsets()
+
+    def commit_offset(self, consumer: str, offset: int):
+        """Запоминает последний обработанный потребителем offset (пишется при следующем sync)"""
+        if offset > self._consumer_offsets.get(consumer, -1):
+            self._consumer_offsets[consumer] = offset
+            self._offsets_dirty = True
+
+    def committed_offset(self, consumer: str) -> Optional[int]:
+        """Возвращает последний подтвержденный offset потребителя"""
+        return self._consumer_offsets.get(consumer)
+
+    def _write_consumer_offsets(self):
+        """Атомарно записывает offset'ы потребителей"""
+        path = self.directory / CONSUMER_OFFSETS_FILE
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._consumer_offsets, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._offsets_dirty = False
+
+    def _rotate(self):
+        """Закрывает активный сегмент и открывает новый"""
+        self.sync()
+        self._active.close()
+
+        self._segments.append(self.next_offset)
+        self._active = open(self._segment_path(self.next_offset), "ab")
+        self._active_size = 0
+
+        logger.debug(f"📼 Rotated event log segment at offset {self.next_offset}")
+
+        if self.retention_bytes:
+            self._apply_retention()
+
+    def _apply_retention(self):
+        """Удаляет самые старые сегменты сверх retention_bytes"""
+        sizes = [self._segment_path(base).stat().st_size for base in self._segments]
+        total = sum(sizes)
+
+        while len(self._segments) > 1 and total > self.retention_bytes:
+            base = self._segments.pop(0)
+            self._index.pop(base, None)
+            total -= sizes.pop(0)
+            self._segment_path(base).unlink()
+            logger.info(f"🗑️ Removed event log segment {base} (retention)")
+
+    @property
+    def first_offset(self) -> int:
+        """Первый доступный offset"""
+        return self._segments[0]
+
+    def read_from(self, offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Последовательно читает записи начиная с offset'а"""
+        # Читатель видит только записи, сброшенные из буфера
+        if self._active is not None:
+            self._active.flush()
+
+        end_offset = self.next_offset
+        offset = max(offset, self.first_offset)
+        if offset >= end_offset:
+            return
+
+        index = bisect.bisect_right(self._segments, offset) - 1
+        produced = 0
+
+        for base in self._segments[index:]:
+            # Начинаем с ближайшей к offset'у точки индекса, попутно дописывая индекс
+            positions = self._index.setdefault(base, [])
+            if not positions:
+                positions.append(0)
+            point = min(max(offset - base, 0) // INDEX_INTERVAL, len(positions) - 1)
+            current = base + point * INDEX_INTERVAL
+            position = positions[point]
+            with open(self._segment_path(base), "rb") as f:
+                f.seek(position)
+                for line in f:
+                    if current >= end_offset:
+                        return
+                    relative = current - base
+                    if relative % INDEX_INTERVAL == 0 and relative // INDEX_INTERVAL == len(positions):
+                        positions.append(position)
+                    if current >= offset:
+                        yield current, json.loads(line)
+                        produced += 1
+                        if limit is not None and produced >= limit:
+                            return
+                    current += 1
+                    position += len(line)
+
+    def close(self):
+        """Закрывает журнал"""
+        if self._active is not None:
+            self.sync()
+            self._active.close()
+            self._active = None
+            logger.info("📼 Event log closed")
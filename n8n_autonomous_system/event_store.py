@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+📊 EVENT STORE - Колоночное in-memory хранилище событий для аналитики
+
+Кольцевой буфер фиксированной емкости, где каждое поле события - отдельный
+массив NumPy:
+- timestamp (float64, epoch секунды), duration (float32, NaN если нет)
+- event_type и severity (int8 коды enum'ов)
+- workflow, node, error_type, instance (int32 коды словарей строк)
+
+Агрегации (счетчики, error rate, перцентили длительности, события по
+интервалам) выполняются векторно через выборки строк и np.bincount, поэтому запрос
+по миллиону событий занимает миллисекунды, а память - ~30 байт на событие
+против килобайт на объект ExecutionEvent.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from monitor import ExecutionEvent, EventType, Severity, COMPLETION_EVENT_TYPES
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPE_CODES = {event_type: code for code, event_type in enumerate(EventType)}
+SEVERITY_CODES = {severity: code for code, severity in enumerate(Severity)}
+
+# Неуспешные завершения (числитель error rate)
+FAILURE_TYPES = (EventType.EXECUTION_FAILED, EventType.EXECUTION_TIMEOUT)
+
+_WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_WINDOW_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd])\s*$")
+
+def parse_window(window: Union[str, float, int, None]) -> Optional[float]:
+    """Переводит окно ("15m", "1h", 900) в секунды"""
+    if window is None:
+        return None
+    if isinstance(window, (int, float)):
+        return float(window)
+
+    match = _WINDOW_RE.match(window)
+    if not match:
+        raise ValueError(f"Invalid window: {window!r} (expected e.g. '30s', '15m', '1h', '7d')")
+    return float(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+
+class _Dictionary:
+    """Словарное кодирование строк в int32 (код -1 - отсутствующее значение)"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        """Возвращает код значения, добавляя его в словарь"""
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+class EventStore:
+    """
+    Колоночный кольцевой буфер событий
+
+    При заполнении новые события перезаписывают самые старые. Словари строк
+    не сжимаются: число различных workflow'ов, нод и типов ошибок невелико.
+    """
+
+    # Колонки, по которым поддерживается group-by
+    GROUP_COLUMNS = ("workflow", "node", "error_type", "instance")
+
+    def __init__(self, capacity: int = 1_000_000):
+        """Инициализация хранилища"""
+        self.capacity = capacity
+
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.duration = np.full(capacity, np.nan, dtype=np.float32)
+        self.event_type = np.zeros(capacity, dtype=np.int8)
+        self.severity = np.zeros(capacity, dtype=np.int8)
+        self.workflow = np.full(capacity, -1, dtype=np.int32)
+        self.node = np.full(capacity, -1, dtype=np.int32)
+        self.error_type = np.full(capacity, -1, dtype=np.int32)
+        self.instance = np.full(capacity, -1, dtype=np.int32)
+
+        self.dictionaries = {column: _Dictionary() for column in self.GROUP_COLUMNS}
+
+        # Позиция следующей записи и число заполненных строк
+        self._head = 0
+        self.size = 0
+        self.total_appended = 0
+
+        logger.info(f"📊 Event store initialized (capacity {capacity:,}, {self.memory_bytes / 1024 ** 2:.0f} MiB)")
+
+    @property
+    def memory_bytes(self) -> int:
+        """Память, занятая колонками"""
+        return sum(column.nbytes for column in (
+            self.timestamp, self.duration, self.event_type, self.severity,
+            self.workflow, self.node, self.error_type, self.instance
+        ))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, event: ExecutionEvent):
+        """Добавляет одно событие"""
+        self.extend([event])
+
+    def extend(self, events: Sequence[ExecutionEvent]):
+        """Добавляет пакет событий (колонки заполняются срезами)"""
+        count = len(events)
+        if not count:
+            return
+
+        # Если пакет больше емкости, сохраняем только его хвост
+        if count > self.capacity:
+            events = events[-self.capacity:]
+            count = self.capacity
+
+        workflows = self.dictionaries["workflow"]
+        nodes = self.dictionaries["node"]
+        error_types = self.dictionaries["error_type"]
+        instances = self.dictionaries["instance"]
+
+        columns = {
+            "timestamp": np.fromiter((event.timestamp.timestamp() for event in events), np.float64, count),
+            "duration": np.fromiter(
+                (event.duration if event.duration is not None else np.nan for event in events), np.float32, count
+            ),
+            "event_type": np.fromiter((EVENT_TYPE_CODES[event.event_type] for event in events), np.int8, count),
+            "severity": np.fromiter((SEVERITY_CODES[event.severity] for event in events), np.int8, count),
+            "workflow": np.fromiter((workflows.encode(event.workflow_id) for event in events), np.int32, count),
+            "node": np.fromiter((nodes.encode(event.node_name) for event in events), np.int32, count),
+            "error_type": np.fromiter((error_types.encode(event.error_type) for event in events), np.int32, count),
+            "instance": np.fromiter((instances.encode(event.instance) for event in events), np.int32, count),
+        }
+
+        # Запись с переходом через конец кольца - не больше двух срезов
+        first = min(count, self.capacity - self._head)
+        for name, values in columns.items():
+            column = getattr(self, name)
+            column[self._head:self._head + first] = values[:first]
+            if first < count:
+                column[:count - first] = values[first:]
+
+        self._head = (self._head + count) % self.capacity
+        self.size = min(self.capacity, self.size + count)
+        self.total_appended += count
+
+    def clear(self):
+        """Удаляет все события (словари сохраняются)"""
+        self._head = 0
+        self.size = 0
+
+    # ------------------------------------------------------------------
+    # Выборки
+    # ------------------------------------------------------------------
+
+    def _select(self, window: Union[str, float, None] = None, now: Optional[float] = None,
+                event_types: Optional[Iterable[EventType]] = None) -> np.ndarray:
+        """
+        Индексы заполненных строк в окне времени и с нужными типами событий
+
+        Заполненные строки кольца - всегда [0, size): до заполнения запись идет
+        с начала, после - заполнены все. Сначала применяется окно, поэтому
+        узкие окна дальше работают только со своими строками.
+        """
+        seconds = parse_window(window)
+        if seconds is not None:
+            since = (now if now is not None else time.time()) - seconds
+            rows = np.flatnonzero(self.timestamp[:self.size] >= since)
+        else:
+            rows = np.arange(self.size)
+
+        if event_types is not None:
+            rows = rows[_type_table(event_types)[self.event_type[rows]]]
+
+        return rows
+
+    def _group_column(self, by: str) -> np.ndarray:
+        """Колонка кодов для group-by"""
+        if by not in self.GROUP_COLUMNS:
+            raise ValueError(f"Unsupported group-by column: {by!r} (expected one of {self.GROUP_COLUMNS})")
+        return getattr(self, by)
+
+    def _bincount(self, by: str, rows: np.ndarray) -> np.ndarray:
+        """Счетчики по кодам; индекс 0 - отсутствующее значение, код k - индекс k + 1"""
+        codes = self._group_column(by)[rows]
+        return np.bincount(codes + 1, minlength=len(self.dictionaries[by]) + 1)
+
+    def _decode(self, by: str, counts: np.ndarray) -> Dict[Optional[str], Any]:
+        """Превращает массив по кодам в словарь {значение: счетчик} без нулей"""
+        values = self.dictionaries[by].values
+        return {
+            (values[index - 1] if index else None): counts[index].item()
+            for index in np.flatnonzero(counts)
+        }
+
+    def count(self, by: Optional[str] = None, window: Union[str, float, None] = None,
+              event_types: Optional[Iterable[EventType]] = None,
+              now: Optional[float] = None) -> Union[int, Dict[Optional[str], int]]:
+        """
+        Количество событий (всего или по группам)
+
+        Например, падения по нодам за час:
+        count(by="node", window="1h", event_types=[EventType.NODE_ERROR])
+        """
+        rows = self._select(window, now, event_types)
+        if by is None:
+            return len(rows)
+        return self._decode(by, self._bincount(by, rows))
+
+    def error_rate(self, by: Optional[str] = "workflow", window: Union[str, float, None] = "15m",
+                   now: Optional[float] = None) -> Union[float, Dict[Optional[str], float]]:
+        """
+        Доля неуспешных завершений (failed + timeout) среди всех завершений
+
+        Args:
+            by: Колонка группировки (workflow, instance, ...) или None для общего значения
+            window: Окно времени ("15m", "1h", секунды) или None для всех событий
+        """
+        completions = self._select(window, now, COMPLETION_EVENT_TYPES)
+        failures = completions[_type_table(FAILURE_TYPES)[self.event_type[completions]]]
+
+        if by is None:
+            return len(failures) / len(completions) if len(completions) else 0.0
+
+        totals = self._bincount(by, completions)
+        failed = self._bincount(by, failures)
+        values = self.dictionaries[by].values
+        return {
+            (values[index - 1] if index else None): float(failed[index] / totals[index])
+            for index in np.flatnonzero(totals)
+        }
+
+    def events_per_interval(self, interval: Union[str, float] = "1m", window: Union[str, float] = "1h",
+                            event_types: Optional[Iterable[EventType]] = None,
+                            now: Optional[float] = None) -> np.ndarray:
+        """Количество событий по интервалам окна (последний элемент - текущий интервал)"""
+        now = now if now is not None else time.time()
+        step = parse_window(interval)
+        span = parse_window(window)
+        buckets = max(1, int(np.ceil(span / step)))
+
+        age = now - self.timestamp[self._select(span, now, event_types)]
+        index = buckets - 1 - (age // step).astype(np.int64)
+        index = index[(index >= 0) & (index < buckets)]
+        return np.bincount(index, minlength=buckets)
+
+    def duration_percentiles(self, by: Optional[str] = "workflow", window: Union[str, float, None] = None,
+                             percentiles: Sequence[float] = (50, 95, 99),
+                             event_types: Optional[Iterable[EventType]] = (EventType.EXECUTION_COMPLETED,),
+                             now: Optional[float] = None) -> Dict[Optional[str], Dict[str, float]]:
+        """Перцентили длительности (по умолчанию - успешных выполнений) по группам"""
+        rows = self._select(window, now, event_types)
+        rows = rows[~np.isnan(self.duration[rows])]
+        durations = self.duration[rows]
+
+        if by is None:
+            if not len(durations):
+                return {}
+            values = np.percentile(durations, percentiles)
+            return {None: {f"p{p:g}": float(v) for p, v in zip(percentiles, values)}}
+
+        # Сортировка по (группа, длительность) и перцентили по срезам групп
+        codes = self._group_column(by)[rows]
+        order = np.lexsort((durations, codes))
+        codes, durations = codes[order], durations[order]
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(codes)]))
+
+        names = self.dictionaries[by].values
+        result = {}
+        for start, end in zip(starts, ends):
+            if start == end:
+                continue
+            code = codes[start]
+            values = np.percentile(durations[start:end], percentiles)
+            result[names[code] if code >= 0 else None] = {
+                f"p{p:g}": float(v) for p, v in zip(percentiles, values)
+            }
+        return result
+
+def _type_table(event_types: Iterable[EventType]) -> np.ndarray:
+    """Таблица code -> bool для фильтра по типам событий одной выборкой"""
+    table = np.zeros(len(EVENT_TYPE_CODES), dtype=bool)
+    table[[EVENT_TYPE_CODES[event_type] for event_type in event_types]] = True
+    return table
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+🧬 FINGERPRINT - Нормализация сообщений об ошибках и стабильные отпечатки
+
+Сообщения одной и той же ошибки отличаются переменными частями: ID,
+числами, URL, UUID, временными метками ("timeout after 30012ms" и
+"timeout after 30044ms"). Нормализация за один проход заменяет их
+плейсхолдерами и получает шаблон, а отпечаток - криптографический хеш
+(workflow, нода, тип ошибки, шаблон), одинаковый между рестартами.
+
+HTTP статусы после "status"/"code"/"HTTP" сохраняются: 429 и 500 - разные
+ошибки с разными исправлениями.
+"""
+
+import hashlib
+import re
+from typing import Optional, Tuple
+
+# Плейсхолдеры - без цифр, поэтому нормализация идемпотентна
+_NORMALIZER = re.compile(
+    r"(?P<uuid>\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b)"
+    r"|(?P<url>\b[a-zA-Z][a-zA-Z0-9+.-]*://[^\s'\"<>)\]]+)"
+    r"|(?P<email>\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b)"
+    r"|(?P<ts>\b\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?)"
+    r"|(?P<ip>(?<![\d.])\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?(?![\d.]))"
+    r"|(?P<status>\b(?:status(?: code)?|code|http(?:/\d(?:\.\d)?)?(?: error)?)[\s:]+[1-5]\d\d\b)"
+    r"|(?P<hex>\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b)"
+    r"|(?P<id>\b(?=(?:[\w-]*?\d){2})(?=[\w-]*[a-zA-Z])[\w-]{12,}\b)"
+    r"|(?P<num>(?<![a-zA-Z])\d+(?:\.\d+)?)",
+    re.IGNORECASE
+)
+
+_PLACEHOLDERS = {
+    "uuid": "<uuid>",
+    "url": "<url>",
+    "email": "<email>",
+    "ts": "<ts>",
+    "ip": "<ip>",
+    "hex": "<hex>",
+    "id": "<id>",
+    "num": "<n>",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Ограничение длины шаблона: хвосты стектрейсов не должны делать ошибки разными
+MAX_TEMPLATE_LENGTH = 500
+
+def _replace(match: re.Match) -> str:
+    kind = match.lastgroup
+    if kind == "status":
+        return match.group(0)
+    return _PLACEHOLDERS[kind]
+
+def normalize_message(message: Optional[str]) -> str:
+    """Превращает сообщение об ошибке в шаблон без переменных частей"""
+    if not message:
+        return ""
+    template = _NORMALIZER.sub(_replace, message)
+    return _WHITESPACE.sub(" ", template).strip()[:MAX_TEMPLATE_LENGTH]
+
+def error_fingerprint(workflow_id: Optional[str], node: Optional[str],
+                      error_type: Optional[str], template: str) -> str:
+    """Стабильный отпечаток ошибки (blake2b, 32 hex символа)"""
+    key = "\x1f".join((workflow_id or "", node or "", error_type or "", template))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+def fingerprint_error(workflow_id: Optional[str], error_type: Optional[str], error_message: Optional[str],
+                      node: Optional[str] = None) -> Tuple[str, str]:
+    """Нормализует сообщение и возвращает (отпечаток, шаблон)"""
+    template = normalize_message(error_message)
+    return error_fingerprint(workflow_id, node, error_type, template), template
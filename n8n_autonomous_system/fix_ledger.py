@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+📒 FIX LEDGER - Индексированный персистентный журнал исправлений
+
+Каждое исправление и каждая смена его статуса (rollback) дописываются в
+append-only журнал EventLog, при старте журнал проигрывается заново -
+история переживает рестарт. В памяти поддерживаются:
+
+- индекс по fix_id (O(1) поиск для rollback)
+- индексы по workflow'у (инстанс, workflow_id) и по backup_id (транзакция),
+  добавление и вытеснение за O(1)
+- временной индекс: отсортированные applied_at - последние N исправлений
+  и выборка за интервал (bisect) за O(log n + N); записи дописываются
+  в конец, bisect-вставка только для опоздавших
+- счетчики статусов, обновляемые при записи - статистика за O(1)
+
+В памяти держатся последние max_entries исправлений (старые вытесняются
+пачками), счетчики статистики ведутся по всему журналу. Незавершенные
+проверки до/после исправлений производительности тоже пишутся в журнал
+и после рестарта продолжаются с того же момента записи.
+"""
+
+import bisect
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from connector import DEFAULT_INSTANCE
+from event_log import EventLog
+
+logger = logging.getLogger(__name__)
+
+class FixStatus(Enum):
+    """Статусы исправления"""
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    APPLIED = "applied"
+    TESTED = "tested"
+    DEPLOYED = "deployed"
+    FAILED = "failed"
+    ROLLED_BACK = "rolled_back"
+
+@dataclass
+class FixResult:
+    """Результат применения исправления"""
+    fix_id: str
+    success: bool
+    status: FixStatus
+    applied_at: datetime
+    description: str
+    changes_made: List[Dict[str, Any]] = field(default_factory=list)
+    backup_id: Optional[str] = None
+    error: Optional[str] = None
+    rollback_available: bool = False
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    workflow_id: Optional[str] = None
+    instance: str = DEFAULT_INSTANCE
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Конвертирует в словарь"""
+        return {
+            "fix_id": self.fix_id,
+            "success": self.success,
+            "status": self.status.value,
+            "applied_at": self.applied_at.isoformat(),
+            "description": self.description,
+            "changes_made": self.changes_made,
+            "backup_id": self.backup_id,
+            "error": self.error,
+            "rollback_available": self.rollback_available,
+            "metadata": self.metadata,
+            "workflow_id": self.workflow_id,
+            "instance": self.instance
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FixResult":
+        """Восстанавливает результат из словаря"""
+        return cls(
+            fix_id=data["fix_id"],
+            success=data["success"],
+            status=FixStatus(data["status"]),
+            applied_at=datetime.fromisoformat(data["applied_at"]),
+            description=data.get("description", ""),
+            changes_made=data.get("changes_made", []),
+            backup_id=data.get("backup_id"),
+            error=data.get("error"),
+            rollback_available=data.get("rollback_available", False),
+            metadata=data.get("metadata", {}),
+            workflow_id=data.get("workflow_id"),
+            instance=data.get("instance", DEFAULT_INSTANCE)
+        )
+
+class FixLedger:
+    """Журнал исправлений с индексами и инкрементальной статистикой"""
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 10000,
+                 segment_max_bytes: int = 8 * 1024 * 1024, retention_bytes: Optional[int] = None):
+        """
+        Инициализация
+
+        Args:
+            directory: Каталог журнала (None - только в памяти)
+            max_entries: Сколько последних исправлений держать в индексах
+            segment_max_bytes: Размер сегмента журнала
+            retention_bytes: Предел объема журнала на диске (None - без удаления)
+        """
+        self.max_entries = max_entries
+
+        self._fixes: Dict[str, FixResult] = {}
+        # Упорядоченные множества fix_id (dict хранит порядок вставки,
+        # удаление при вытеснении - O(1))
+        self._by_workflow: Dict[Tuple[str, str], Dict[str, None]] = {}
+        self._by_backup: Dict[str, Dict[str, None]] = {}
+        # Временной индекс: параллельные списки, отсортированы по applied_at
+        self._times: List[float] = []
+        self._timeline: List[str] = []
+
+        # Счетчики по всему журналу
+        self._total = 0
+        self._successful = 0
+        self._statuses: Counter = Counter()
+
+        # Незавершенные проверки до/после: fix_id -> состояние проверки
+        self._benchmarks: Dict[str, Dict[str, Any]] = {}
+
+        self._log: Optional[EventLog] = None
+        if directory is not None:
+            # Исправления редки: fsync делается явно после каждой записи
+            self._log = EventLog(directory, segment_max_bytes=segment_max_bytes,
+                                 fsync_interval=3600.0, retention_bytes=retention_bytes)
+            self._replay()
+
+    def __len__(self) -> int:
+        return len(self._fixes)
+
+    def __contains__(self, fix_id: str) -> bool:
+        return fix_id in self._fixes
+
+    # ------------------------------------------------------------------
+    # Запись
+    # ------------------------------------------------------------------
+
+    def record(self, results: Iterable[FixResult]):
+        """Добавляет исправления (одна транзакция - один fsync)"""
+        results = list(results)
+        for result in results:
+            if self._log is not None:
+                self._log.append({"type": "fix", **result.to_dict()})
+            self._index(result)
+        if self._log is not None and results:
+            self._log.sync()
+        self._evict()
+
+    def update_status(self, fix_ids: Iterable[str], status: FixStatus) -> List[FixResult]:
+        """Меняет статус исправлений и возвращает измененные"""
+        changed = []
+        for fix_id in fix_ids:
+            result = self._fixes.get(fix_id)
+            if result is None or result.status == status:
+                continue
+            if self._log is not None:
+                self._log.append({"type": "status", "fix_id": fix_id, "status": status.value,
+                                  "at": datetime.now().isoformat()})
+            self._set_status(result, status)
+            changed.append(result)
+        if self._log is not None and changed:
+            self._log.sync()
+        return changed
+
+    def start_benchmark(self, fix_id: str, state: Dict[str, Any]):
+        """Запоминает начатую проверку исправления"""
+        self._write_benchmark(fix_id, state)
+
+    def finish_benchmark(self, fix_id: str):
+        """Снимает проверку исправления с учета (вынесен вердикт)"""
+        if fix_id in self._benchmarks:
+            self._write_benchmark(fix_id, None)
+
+    def pending_benchmarks(self) -> List[Dict[str, Any]]:
+        """Состояния незавершенных проверок в порядке начала"""
+        return list(self._benchmarks.values())
+
+    def _write_benchmark(self, fix_id: str, state: Optional[Dict[str, Any]]):
+        if self._log is not None:
+            self._log.append({"type": "benchmark", "fix_id": fix_id, "state": state})
+            self._log.sync()
+        self._set_benchmark(fix_id, state)
+
+    def _set_benchmark(self, fix_id: str, state: Optional[Dict[str, Any]]):
+        if state is None:
+            self._benchmarks.pop(fix_id, None)
+        else:
+            self._benchmarks[fix_id] = state
+
+    def _index(self, result: FixResult):
+        """Добавляет исправление в индексы и счетчики"""
+        if result.fix_id in self._fixes:
+            return
+        self._fixes[result.fix_id] = result
+
+        key = (result.instance, result.workflow_id)
+        self._by_workflow.setdefault(key, {})[result.fix_id] = None
+        if result.backup_id:
+            self._by_backup.setdefault(result.backup_id, {})[result.fix_id] = None
+
+        # Исправления приходят почти по порядку времени: дописываются в конец,
+        # вставка в середину - только для опоздавших записей
+        timestamp = result.applied_at.timestamp()
+        if not self._times or timestamp >= self._times[-1]:
+            self._times.append(timestamp)
+            self._timeline.append(result.fix_id)
+        else:
+            position = bisect.bisect_right(self._times, timestamp)
+            self._times.insert(position, timestamp)
+            self._timeline.insert(position, result.fix_id)
+
+        self._total += 1
+        self._successful += result.success
+        self._statuses[result.status.value] += 1
+
+    def _set_status(self, result: FixResult, status: FixStatus):
+        self._statuses[result.status.value] -= 1
+        self._statuses[status.value] += 1
+        result.status = status
+
+    def _evict(self):
+        """Вытесняет старейшие исправления из индексов (пачкой, с запасом 10%)"""
+        overflow = len(self._timeline) - self.max_entries
+        if overflow <= max(1, self.max_entries // 10):
+            return
+
+        for fix_id in self._timeline[:overflow]:
+            result = self._fixes.pop(fix_id)
+            key = (result.instance, result.workflow_id)
+            workflow_fixes = self._by_workflow[key]
+            del workflow_fixes[fix_id]
+            if not workflow_fixes:
+                del self._by_workflow[key]
+            if result.backup_id:
+                transaction = self._by_backup[result.backup_id]
+                del transaction[fix_id]
+                if not transaction:
+                    del self._by_backup[result.backup_id]
+
+        del self._times[:overflow]
+        del self._timeline[:overflow]
+
+    def _replay(self):
+        """Восстанавливает индексы и счетчики из журнала"""
+        records = 0
+        for _, record in self._log.read_from(self._log.first_offset):
+            records += 1
+            if record.get("type") == "fix":
+                self._index(FixResult.from_dict(record))
+            elif record.get("type") == "status":
+                result = self._fixes.get(record["fix_id"])
+                if result is not None:
+                    self._set_status(result, FixStatus(record["status"]))
+            elif record.get("type") == "benchmark":
+                self._set_benchmark(record["fix_id"], record.get("state"))
+        self._evict()
+
+        if records:
+            logger.info(f"📒 Fix ledger restored: {self._total} fixes, {len(self._benchmarks)} pending benchmarks "
+                        f"from {records} records")
+
+    # ------------------------------------------------------------------
+    # Запросы
+    # ------------------------------------------------------------------
+
+    def get(self, fix_id: str) -> Optional[FixResult]:
+        """Исправление по fix_id"""
+        return self._fixes.get(fix_id)
+
+    def by_backup(self, backup_id: str) -> List[FixResult]:
+        """Исправления транзакции с этим backup'ом"""
+        return [self._fixes[fix_id] for fix_id in self._by_backup.get(backup_id, ())]
+
+    def by_workflow(self, workflow_id: str, instance: str = DEFAULT_INSTANCE,
+                    limit: Optional[int] = None) -> List[FixResult]:
+        """Исправления workflow'а, новые первыми"""
+        fix_ids = reversed(self._by_workflow.get((instance, workflow_id), ()))
+        return [self._fixes[fix_id] for fix_id in islice(fix_ids, limit)]
+
+    def recent(self, limit: int = 50) -> List[FixResult]:
+        """Последние исправления по времени, новые первыми"""
+        return [self._fixes[fix_id] for fix_id in islice(reversed(self._timeline), limit)]
+
+    def between(self, since: datetime, until: Optional[datetime] = None) -> List[FixResult]:
+        """Исправления за интервал [since, until], по возрастанию времени"""
+        start = bisect.bisect_left(self._times, since.timestamp())
+        end = len(self._times) if until is None else bisect.bisect_right(self._times, until.timestamp())
+        return [self._fixes[fix_id] for fix_id in self._timeline[start:end]]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Статистика по всему журналу"""
+        return {
+            "total_fixes": self._total,
+            "successful_fixes": self._successful,
+            "failed_fixes": self._total - self._successful,
+            "rolled_back_fixes": self._statuses[FixStatus.ROLLED_BACK.value],
+            "success_rate": self._successful / self._total if self._total else 0,
+            "status_counts": {status: count for status, count in self._statuses.items() if count}
+        }
+
+    def close(self):
+        """Закрывает журнал"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -5,7 +5,13 @@
 Этот модуль обеспечивает безопасное автоматическое исправление ошибок:
 - Применение исправлений на основе анализа
 - Создание backup'ов перед изменениями
+- Исправления нескольких инцидентов одного workflow'а - одна транзакция
+- Офлайн симуляция и статическая проверка кандидатов до записи
 - Rollback механизм при неудаче
+- Персистентный журнал исправлений с индексами (fix_ledger.py)
+- Граф и backup из локальных копий workflow'ов (snapshots.py) без запросов к БД
+- Timeout и retry нод по профилю латентности и ошибок (tuning.py)
+- Исправления производительности медленных нод с проверкой до/после (performance.py)
 - Staging-first подход для безопасности
 
 Автор: AI Assistant
@@ -17,40 +23,141 @@ import json
 import logging
 import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, field
-from enum import Enum
+from dataclasses import dataclass, field, replace
 import copy
 
-from connector import N8NConnector, NodeInfo
-from analyzer import ErrorAnalysis, FixType, RepairStrategy
+from connector import N8NConnector, NodeInfo, DEFAULT_INSTANCE, parse_nodes
+from analyzer import ErrorAnalysis, ErrorCategory, FixType, RepairStrategy
+from backup_store import BackupManifest, BackupStore
+from fix_ledger import FixLedger, FixResult, FixStatus
+from simulator import FixSimulator, SimulationResult, StaticVerifier
+from snapshots import WorkflowSnapshots
+from profiler import WorkflowProfiler
+from performance import RISK_ORDER, BenchmarkTracker, PerformanceAdvisor, PerformanceFinding, runs_once_for_all_items
+from tuning import ResilienceTuner
+from workflow_graph import WorkflowGraph
+from metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
-class FixStatus(Enum):
-    """Статусы исправления"""
-    PENDING = "pending"
-    IN_PROGRESS = "in_progress"
-    APPLIED = "applied"
-    TESTED = "tested"
-    DEPLOYED = "deployed"
-    FAILED = "failed"
-    ROLLED_BACK = "rolled_back"
+# Метрики исправителя
+FIXES_TOTAL = REGISTRY.counter("n8n_fixer_fixes", "Applied fixes by fix type and status", ["fix_type", "status"])
+FIX_DURATION = REGISTRY.histogram("n8n_fixer_duration_seconds", "Duration of backup plus fix application")
+ROLLBACKS_TOTAL = REGISTRY.counter("n8n_fixer_rollbacks", "Fix rollbacks by result", ["result"])
+BACKUPS_STORED = REGISTRY.gauge("n8n_fixer_backups", "Workflow backups in the backup store")
+FIX_TRANSACTION_SIZE = REGISTRY.histogram(
+    "n8n_fixer_transaction_fixes", "Fixes coalesced into one workflow write", buckets=(1, 2, 3, 5, 10, 20)
+)
 
-@dataclass
-class FixResult:
-    """Результат применения исправления"""
-    fix_id: str
-    success: bool
-    status: FixStatus
-    applied_at: datetime
-    description: str
-    changes_made: List[Dict[str, Any]] = field(default_factory=list)
-    backup_id: Optional[str] = None
-    error: Optional[str] = None
-    rollback_available: bool = False
-    metadata: Dict[str, Any] = field(default_factory=dict)
+# Подстроки типов нод с параметром options.timeout (retry - настройка любой ноды)
+TIMEOUT_NODE_TYPES = ("httpRequest", "lmChat")
+
+# Circuit breaker: guard перед нодой пропускает вызов или (после failure_threshold
+# вызовов подряд без успешного сброса) открывает цепь на recovery_timeout секунд;
+# reset после успешного выхода ноды сбрасывает счетчик. Состояние - в static data
+# workflow'а (сохраняется между production выполнениями)
+CIRCUIT_GUARD_CODE = """// Circuit breaker guard for __NAME__
+const breakers = $getWorkflowStaticData('global').circuitBreakers ??= {};
+const circuit = breakers[__KEY__] ??= {pending: 0, openUntil: 0};
+const now = Date.now();
+if (circuit.openUntil > now) {
+    console.log('Circuit for ' + __KEY__ + ' is open until ' + new Date(circuit.openUntil).toISOString());
+    return [];
+}
+if (circuit.pending >= __THRESHOLD__) {
+    circuit.openUntil = now + __RECOVERY__ * 1000;
+    circuit.pending = 0;
+    return [];
+}
+circuit.pending += 1;
+return $input.all();
+"""
+
+CIRCUIT_RESET_CODE = """// Circuit breaker reset for __NAME__
+const breakers = $getWorkflowStaticData('global').circuitBreakers ??= {};
+breakers[__KEY__] = {pending: 0, openUntil: 0};
+return $input.all();
+"""
+
+# Code нода "Run Once for Each Item" -> "Run Once for All Items": прежний код
+# выполняется в цикле внутри одного запуска. $json, $binary, $itemIndex,
+# $input.item, $('Нода').item и $('Нода').pairedItem() подставляются для
+# каждого item'а как в режиме по item'ам, pairedItem результата задается явно.
+# Код с устаревшими обращениями к item'у не переводится (runs_once_for_all_items)
+RUN_ONCE_FOR_ALL_CODE = """// Runs the former per-item code once for all items
+const __results = [];
+const __items = $input.all();
+const __nodes = (index) => (name) => {
+    const node = $(name);
+    return Object.create(node, {
+        item: {get: () => node.itemMatching(index)},
+        pairedItem: {value: () => node.itemMatching(index)}
+    });
+};
+for (let __index = 0; __index < __items.length; __index++) {
+    const __item = __items[__index];
+    const __output = await (async ($json, $binary, $itemIndex, $input, $) => {
+__CODE__
+    })(__item.json, __item.binary, __index, Object.create($input, {item: {value: __item}}), __nodes(__index));
+    if (__output === undefined || __output === null) {
+        continue;
+    }
+    for (const __entry of Array.isArray(__output) ? __output : [__output]) {
+        const __wrapped = __entry && typeof __entry.json === 'object' ? __entry : {json: __entry};
+        __results.push({...__wrapped, pairedItem: {item: __index}});
+    }
+}
+return __results;
+"""
+
+# Кэш ответов LLM/TTS ноды в static data workflow'а (как и circuit breaker -
+# сохраняется между production выполнениями). Lookup отдает попадания готовым
+# ответом, промахи пропускает без изменений; признак попадания идет в
+# pairedItem, а не в json - вход ноды и хэш входа остаются прежними. Store
+# заново считает ключ по входу ноды (itemMatching идет по pairedItem до Lookup)
+CACHE_HASH_CODE = """const hash = (text) => {
+    let h = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        h = Math.imul(h ^ text.charCodeAt(i), 0x01000193);
+    }
+    return (h >>> 0).toString(16) + ':' + text.length;
+};"""
+
+CACHE_LOOKUP_CODE = """// Response cache lookup for __NAME__
+const caches = $getWorkflowStaticData('global').responseCache ??= {};
+const entries = caches[__KEY__] ??= {};
+const now = Date.now();
+__HASH__
+return $input.all().map((item, index) => {
+    const entry = entries[hash(JSON.stringify(item.json))];
+    if (entry && entry.expires > now) {
+        return {json: entry.json, pairedItem: {item: index, cacheHit: true}};
+    }
+    return {...item, pairedItem: {item: index}};
+});
+"""
+
+CACHE_HIT_CONDITION = "={{ $input.item.pairedItem?.cacheHit === true }}"
+
+CACHE_STORE_CODE = """// Response cache store for __NAME__
+const caches = $getWorkflowStaticData('global').responseCache ??= {};
+const entries = caches[__KEY__] ??= {};
+const expires = Date.now() + __TTL__ * 1000;
+__HASH__
+const results = $input.all().map((item, index) => {
+    const key = hash(JSON.stringify($('__LOOKUP__').itemMatching(index).json));
+    delete entries[key];
+    entries[key] = {json: item.json, expires};
+    return item;
+});
+const keys = Object.keys(entries);
+for (const key of keys.slice(0, Math.max(0, keys.length - __MAX_ENTRIES__))) {
+    delete entries[key];
+}
+return results;
+"""
 
 @dataclass
 class WorkflowBackup:
@@ -62,6 +169,7 @@ class WorkflowBackup:
     created_at: datetime
     description: str
     metadata: Dict[str, Any] = field(default_factory=dict)
+    instance: str = DEFAULT_INSTANCE
 
 class AutoFixer:
     """
@@ -74,20 +182,70 @@ class AutoFixer:
     - Откатывает при неудаче
     """
     
-    def __init__(self, connector: N8NConnector, config: Dict[str, Any] = None):
+    def __init__(self, connector: N8NConnector, config: Dict[str, Any] = None,
+                 connectors: Dict[str, N8NConnector] = None,
+                 snapshots: Optional[WorkflowSnapshots] = None,
+                 profiler: Optional[WorkflowProfiler] = None):
         """Инициализация исправителя"""
         self.connector = connector
         self.config = config or {}
         
-        # Хранилище backup'ов
-        self.backups: Dict[str, WorkflowBackup] = {}
+        # Коннекторы по имени инстанса N8N (workflow ID уникальны только внутри инстанса)
+        self.connectors = connectors or {connector.instance: connector}
+        
+        # Локальные копии активных workflow'ов: граф и backup без запросов к БД
+        self.snapshots = snapshots
         
-        # История исправлений
-        self.fix_history: List[FixResult] = []
+        # Подбор timeout'ов и retry по профилю нод
+        self.profiler = profiler
+        self.tuner = ResilienceTuner(**self.config.get("tuning", {}))
+        
+        # Хранилище backup'ов: уникальные ноды и connections хранятся один раз
+        store_config = self.config.get("backup_store", {})
+        self.backup_store = BackupStore(
+            path=store_config.get("path", "data/workflow_backups.sqlite3") if store_config.get("persistent", True) else None,
+            compression_level=store_config.get("compression_level", 6)
+        )
+        
+        # Журнал исправлений: индексы по fix_id, workflow'у, backup'у и времени
+        ledger_config = self.config.get("fix_ledger", {})
+        retention_mb = ledger_config.get("retention_mb")
+        self.ledger = FixLedger(
+            directory=ledger_config.get("directory", "data/fix_ledger") if ledger_config.get("persistent", True) else None,
+            max_entries=ledger_config.get("max_entries", 10000),
+            segment_max_bytes=int(ledger_config.get("segment_size_mb", 8) * 1024 * 1024),
+            retention_bytes=int(retention_mb * 1024 * 1024) if retention_mb else None
+        )
         
         # Шаблоны исправлений
         self.fix_templates = self._initialize_fix_templates()
         
+        # Симуляция кандидатов на копии графа до записи
+        simulation_config = self.config.get("simulation", {})
+        self.simulator: Optional[FixSimulator] = None
+        if simulation_config.get("enabled", True):
+            self.simulator = FixSimulator(
+                self._apply_fix_strategy,
+                StaticVerifier(),
+                reject_on_warnings=simulation_config.get("reject_on_warnings", False)
+            )
+        self.max_candidates = simulation_config.get("max_candidates", 3)
+        
+        # Исправления производительности по профилю нод и их проверка до/после
+        performance_config = self.config.get("performance", {})
+        self.performance_advisor: Optional[PerformanceAdvisor] = None
+        self.benchmarks: Optional[BenchmarkTracker] = None
+        if profiler is not None:
+            self.performance_advisor = PerformanceAdvisor(profiler, **performance_config.get("advisor", {}))
+            self.benchmarks = BenchmarkTracker(profiler, self.ledger, **performance_config.get("benchmark", {}))
+        self.performance_max_risk = performance_config.get("max_risk", "medium")
+        self.rollback_without_gain = performance_config.get("rollback_without_gain", True)
+        # (инстанс, workflow, нода, тип) - не прошедшие проверку и уже показанные рекомендации
+        self._rejected_findings: set = set()
+        self._recommended_findings: set = set()
+        
+        BACKUPS_STORED.set_function(lambda: len(self.backup_store))
+        
         logger.info("🔧 Auto Fixer initialized")
     
     def _initialize_fix_templates(self) -> Dict[FixType, Dict[str, Any]]:
@@ -151,184 +309,444 @@ class AutoFixer:
                 "description": "Add circuit breaker pattern",
                 "risk_level": "high",
                 "reversible": True
+            },
+            
+            FixType.TUNE_TIMEOUT_RETRY: {
+                "description": "Derive timeout and retry settings from node profile",
+                "risk_level": "low",
+                "reversible": True
+            },
+            
+            FixType.ENABLE_BATCHING: {
+                "description": "Limit concurrent per-item HTTP requests with batching",
+                "risk_level": "low",
+                "reversible": True
+            },
+            
+            FixType.RUN_ONCE_FOR_ALL_ITEMS: {
+                "description": "Run per-item Code node once for all items",
+                "risk_level": "high",
+                "reversible": True
+            },
+            
+            FixType.ADD_CACHE: {
+                "description": "Cache responses of repeated identical calls",
+                "risk_level": "medium",
+                "reversible": True
+            },
+            
+            FixType.SPLIT_IN_BATCHES: {
+                "description": "Process large item lists in batches",
+                "risk_level": "medium",
+                "reversible": True
             }
         }
         
         return templates
     
-    async def apply_fix(self, workflow_id: str, analysis: ErrorAnalysis) -> FixResult:
+    def _connector_for(self, instance: Optional[str]) -> N8NConnector:
+        """Коннектор инстанса (по умолчанию - основной)"""
+        if instance is None:
+            return self.connector
+        connector = self.connectors.get(instance)
+        if connector is None:
+            raise ValueError(f"Unknown N8N instance: {instance}")
+        return connector
+    
+    async def apply_fix(self, workflow_id: str, analysis: ErrorAnalysis,
+                        instance: Optional[str] = None) -> FixResult:
         """
         Применяет исправление на основе анализа ошибки
         
         Args:
             workflow_id: ID workflow'а для исправления
             analysis: Результат анализа ошибки
+            instance: Инстанс N8N, в котором находится workflow
         
         Returns:
             Результат применения исправления
         """
-        fix_id = str(uuid.uuid4())
+        return (await self.apply_fixes(workflow_id, [analysis], instance))[0]
+    
+    async def apply_fixes(self, workflow_id: str, analyses: List[ErrorAnalysis],
+                          instance: Optional[str] = None) -> List[FixResult]:
+        """
+        Применяет исправления нескольких инцидентов одного workflow'а одной транзакцией
+        
+        Изменения всех анализов компонуются в памяти на одном WorkflowGraph
+        (ноды и connections читаются один раз): один backup, одна запись
+        (и один перезапуск n8n). Записывается только то, что показал diff
+        графа; connections - только если менялась структура.
+        Каждое исправление получает свой FixResult со своими изменениями;
+        общий backup_id и transaction_id в metadata связывают их для отката.
+        Исправление, упавшее при применении, не попадает в запись, остальные
+        применяются.
+        
+        Args:
+            workflow_id: ID workflow'а для исправления
+            analyses: Анализы ошибок этого workflow'а
+            instance: Инстанс N8N, в котором находится workflow
+        
+        Returns:
+            Результаты в порядке analyses
+        """
+        if not analyses:
+            return []
         
-        logger.info(f"🔧 Applying fix {fix_id} for workflow {workflow_id}")
-        logger.info(f"   Fix type: {analysis.suggested_fix.fix_type.value}")
-        logger.info(f"   Description: {analysis.suggested_fix.description}")
+        connector = self._connector_for(instance)
+        transaction_id = str(uuid.uuid4())
+        fix_started = time.perf_counter()
+        
+        results = [
+            FixResult(
+                fix_id=str(uuid.uuid4()),
+                success=False,
+                status=FixStatus.IN_PROGRESS,
+                applied_at=datetime.now(),
+                description=analysis.suggested_fix.description,
+                metadata={"transaction_id": transaction_id, "fix_type": analysis.suggested_fix.fix_type.value},
+                workflow_id=workflow_id,
+                instance=connector.instance
+            )
+            for analysis in analyses
+        ]
+        
+        logger.info(f"🔧 Applying {len(analyses)} fix(es) to workflow {workflow_id} (transaction {transaction_id})")
         
         try:
-            # 1. Создаем backup
-            backup_id = await self._create_backup(workflow_id, f"Before fix {fix_id}")
+            # 1. Граф workflow'а загружается один раз: backup и исправления работают с ним
+            graph = await self._load_graph(connector, workflow_id)
             
-            # 2. Применяем исправление
-            fix_result = await self._apply_fix_strategy(
-                workflow_id, analysis.suggested_fix, fix_id, backup_id
+            # 2. Создаем backup (состояние графа на момент загрузки)
+            backup_id = await self._create_backup(
+                workflow_id, f"Before transaction {transaction_id}", instance,
+                fix_ids=[result.fix_id for result in results], graph=graph
             )
             
-            # 3. Сохраняем в историю
-            self.fix_history.append(fix_result)
+            # 3. Компонуем изменения всех исправлений в памяти
+            for analysis, result in zip(analyses, results):
+                analysis = self._with_tuning_plans(analysis, workflow_id, connector.instance)
+                strategy = analysis.suggested_fix
+                result.backup_id = backup_id
+                result.rollback_available = True
+                logger.info(f"   Fix {result.fix_id}: {strategy.fix_type.value} - {strategy.description}")
+                
+                if self.simulator is not None:
+                    # Кандидаты проверяются на копиях графа; принятый лучший заменяет граф транзакции
+                    ranking = await self._rank_candidates(graph, analysis)
+                    result.metadata["simulation"] = [simulation.to_dict() for simulation in ranking]
+                    best = ranking[0]
+                    if not best.accepted:
+                        logger.warning(f"🧮 Fix {result.fix_id} rejected by simulation: {best.reason}")
+                        result.status = FixStatus.FAILED
+                        result.error = f"Rejected by simulation: {best.reason}"
+                        continue
+                    
+                    if best.strategy is not strategy:
+                        logger.info(f"🧮 Simulation prefers {best.strategy.fix_type.value} over {strategy.fix_type.value}")
+                        result.description = best.strategy.description
+                        result.metadata["fix_type"] = best.strategy.fix_type.value
+                    graph = best.graph
+                    result.changes_made = best.changes
+                    continue
+                
+                # Частично примененное упавшее исправление не должно попасть в запись
+                checkpoint = graph.copy() if len(analyses) > 1 else None
+                try:
+                    result.changes_made = await self._apply_fix_strategy(graph, strategy, analysis.affected_nodes)
+                except Exception as e:
+                    logger.error(f"❌ Fix {result.fix_id} application failed: {e}")
+                    result.status = FixStatus.FAILED
+                    result.error = str(e)
+                    if checkpoint is not None:
+                        graph = checkpoint
             
-            # Ограничиваем размер истории
-            if len(self.fix_history) > 1000:
-                self.fix_history = self.fix_history[-1000:]
+            applied = [result for result in results if result.status != FixStatus.FAILED]
             
-            return fix_result
+            # 4. Одна запись на все изменения
+            patch = graph.diff()
+            if patch:
+                connections = graph.to_connections() if graph.connections_changed else None
+                if not await connector.update_workflow_nodes(workflow_id, graph.nodes, connections,
+                                                             expected_updated_at=graph.version):
+                    # Копия могла устареть (workflow изменили в n8n) - следующая попытка читает БД
+                    if self.snapshots is not None:
+                        self.snapshots.invalidate(workflow_id, connector.instance)
+                    raise Exception("Failed to save workflow changes")
+                if self.snapshots is not None:
+                    self.snapshots.record_write(workflow_id, connector.instance, graph.nodes, connections)
+                for result in applied:
+                    result.metadata["workflow_diff"] = patch
+                logger.info(f"✅ Transaction {transaction_id} applied: {len(applied)} fix(es), "
+                            f"{len(patch)} patch operations")
+            elif applied:
+                logger.warning(f"⚠️ No changes made in transaction {transaction_id}")
+            
+            for result in applied:
+                result.success = True
+                result.status = FixStatus.APPLIED
             
         except Exception as e:
-            logger.error(f"❌ Failed to apply fix {fix_id}: {e}")
+            logger.error(f"❌ Failed to apply fixes to workflow {workflow_id}: {e}")
+            for result in results:
+                if result.status != FixStatus.FAILED:
+                    result.status = FixStatus.FAILED
+                    result.error = str(e)
+                    result.changes_made = []
+        
+        # Сохраняем в журнал
+        self.ledger.record(results)
+        
+        for result in results:
+            FIXES_TOTAL.labels(result.metadata["fix_type"], result.status.value).inc()
+        FIX_DURATION.observe(time.perf_counter() - fix_started)
+        FIX_TRANSACTION_SIZE.observe(len(analyses))
+        return results
+    
+    async def _rank_candidates(self, graph: WorkflowGraph, analysis: ErrorAnalysis,
+                               simulator: Optional[FixSimulator] = None) -> List[SimulationResult]:
+        """Симулирует предложенное исправление и альтернативы, лучший кандидат первым"""
+        candidates = [analysis.suggested_fix] + analysis.alternative_fixes[:max(0, self.max_candidates - 1)]
+        return await (simulator or self.simulator).rank(graph, candidates, analysis.affected_nodes)
+    
+    async def simulate_fix(self, workflow_id: str, analysis: ErrorAnalysis,
+                           instance: Optional[str] = None) -> List[SimulationResult]:
+        """
+        Пробный прогон без записи: кандидаты анализа на копиях текущего workflow'а
+        
+        Returns:
+            Результаты симуляции, лучший принятый кандидат первым
+        """
+        connector = self._connector_for(instance)
+        graph = await self._load_graph(connector, workflow_id)
+        analysis = self._with_tuning_plans(analysis, workflow_id, connector.instance)
+        return await self._rank_candidates(graph, analysis, self.simulator or FixSimulator(self._apply_fix_strategy))
+    
+    def _with_tuning_plans(self, analysis: ErrorAnalysis, workflow_id: str, instance: str) -> ErrorAnalysis:
+        """Подставляет в стратегии подбора timeout'а и retry планы затронутых нод по профилю"""
+        def tuned(strategy: RepairStrategy) -> RepairStrategy:
+            if strategy.fix_type != FixType.TUNE_TIMEOUT_RETRY or "plans" in strategy.parameters:
+                return strategy
+            plans = {}
+            if self.profiler is not None:
+                for node_name in analysis.affected_nodes:
+                    durations, failures = self.profiler.get_node_behaviour(workflow_id, node_name, instance)
+                    plans[node_name] = self.tuner.plan(node_name, durations, failures).to_dict()
+            return replace(strategy, parameters={**strategy.parameters, "plans": plans})
+        
+        strategies = [analysis.suggested_fix] + analysis.alternative_fixes
+        if not any(strategy.fix_type == FixType.TUNE_TIMEOUT_RETRY for strategy in strategies):
+            return analysis
+        return replace(
+            analysis,
+            suggested_fix=tuned(analysis.suggested_fix),
+            alternative_fixes=[tuned(strategy) for strategy in analysis.alternative_fixes]
+        )
+    
+    async def optimize_workflow(self, workflow_id: str, instance: Optional[str] = None) -> Optional[FixResult]:
+        """
+        Применяет одно исправление производительности по профилю нод workflow'а
+        
+        Берется находка по самой медленной ноде с риском не выше max_risk;
+        более рискованные только логируются как рекомендации. Пока примененное
+        исправление не прошло проверку до/после, workflow новых исправлений
+        производительности не получает: вердикт относится к одному изменению.
+        
+        Returns:
+            Результат исправления (None - нечего исправлять или идет проверка)
+        """
+        if self.performance_advisor is None:
+            return None
+        
+        connector = self._connector_for(instance)
+        if self.benchmarks.pending_for(workflow_id, connector.instance):
+            return None
+        
+        graph = await self._load_graph(connector, workflow_id)
+        max_risk = RISK_ORDER.get(self.performance_max_risk, RISK_ORDER["medium"])
+        
+        for finding in self.performance_advisor.advise(graph, workflow_id, connector.instance):
+            key = (connector.instance, workflow_id, finding.node, finding.fix_type.value)
+            if key in self._rejected_findings:
+                continue
             
-            return FixResult(
-                fix_id=fix_id,
-                success=False,
-                status=FixStatus.FAILED,
-                applied_at=datetime.now(),
-                description=f"Fix application failed: {e}",
-                error=str(e)
-            )
+            risk_level = self.fix_templates[finding.fix_type]["risk_level"]
+            if RISK_ORDER[risk_level] > max_risk:
+                if key not in self._recommended_findings:
+                    self._recommended_findings.add(key)
+                    logger.info(f"💡 Recommended {finding.fix_type.value} for node {finding.node} of workflow "
+                                f"{workflow_id} (risk {risk_level}, not applied): {'; '.join(finding.reasons)}")
+                continue
+            
+            result = await self.apply_fix(workflow_id, self._performance_analysis(finding, workflow_id),
+                                          connector.instance)
+            if not (result.success and result.changes_made):
+                self._rejected_findings.add(key)
+            elif self.benchmarks.start(result.fix_id, finding, workflow_id, connector.instance) is None:
+                logger.warning(f"⚠️ Not enough profiled executions of workflow {workflow_id} "
+                               f"for a before/after check of fix {result.fix_id}")
+            return result
+        
+        return None
     
-    async def _create_backup(self, workflow_id: str, description: str) -> str:
-        """Создает backup workflow'а"""
+    def _performance_analysis(self, finding: PerformanceFinding, workflow_id: str) -> ErrorAnalysis:
+        """Находка профиля в виде анализа для apply_fixes (симуляция, backup, журнал)"""
+        template = self.fix_templates[finding.fix_type]
+        return ErrorAnalysis(
+            error_id=f"performance:{workflow_id}:{finding.node}:{finding.fix_type.value}",
+            category=ErrorCategory.RESOURCE,
+            confidence=1.0,
+            description="; ".join(finding.reasons),
+            suggested_fix=RepairStrategy(
+                fix_type=finding.fix_type,
+                description=f"{template['description']}: {finding.node}",
+                confidence_threshold=0.0,
+                parameters={**finding.parameters, "reasons": finding.reasons},
+                risk_level=template["risk_level"]
+            ),
+            affected_nodes=[finding.node],
+            metadata={"performance": finding.to_dict()}
+        )
+    
+    async def check_benchmarks(self) -> List[Dict[str, Any]]:
+        """
+        Проверки до/после исправлений производительности, набравших выполнения
+        
+        improved - исправление помечается tested; regressed (и no_gain при
+        rollback_without_gain) - откатывается, находка больше не предлагается.
+        Откат пропускается, если после исправления workflow получил другие:
+        backup исправления старше их, откат стер бы и их.
+        
+        Returns:
+            Вердикты с длительностями workflow'а до и после
+        """
+        if self.benchmarks is None:
+            return []
+        
+        reports = []
+        for benchmark, verdict in self.benchmarks.evaluate():
+            outcome = verdict["verdict"]
+            rolled_back = False
+            
+            if outcome == "improved":
+                self.ledger.update_status([benchmark.fix_id], FixStatus.TESTED)
+            elif outcome == "regressed" or (outcome == "no_gain" and self.rollback_without_gain):
+                self._rejected_findings.add((benchmark.instance, benchmark.workflow_id, benchmark.node, benchmark.fix_type))
+                result = self.ledger.get(benchmark.fix_id)
+                latest = self.ledger.by_workflow(benchmark.workflow_id, benchmark.instance, limit=1)
+                if result is None or result.status == FixStatus.ROLLED_BACK:
+                    verdict["note"] = "fix is no longer applied"
+                elif latest and latest[0].fix_id != benchmark.fix_id:
+                    verdict["note"] = "later fixes applied to the workflow, rollback skipped"
+                else:
+                    rolled_back = await self.rollback_fix(benchmark.fix_id)
+            
+            verdict.update(fix_id=benchmark.fix_id, fix_type=benchmark.fix_type, workflow_id=benchmark.workflow_id,
+                           instance=benchmark.instance, node=benchmark.node, rolled_back=rolled_back)
+            after = f" -> {verdict['after_p50']:.2f}s" if "after_p50" in verdict else ""
+            logger.info(f"📊 Benchmark of {benchmark.fix_type} on {benchmark.node} (workflow {benchmark.workflow_id}): "
+                        f"{outcome}, p50 {verdict['before_p50']:.2f}s{after}"
+                        + (", rolled back" if rolled_back else ""))
+            reports.append(verdict)
+        
+        return reports
+    
+    async def _load_graph(self, connector: N8NConnector, workflow_id: str) -> WorkflowGraph:
+        """Граф workflow'а: из локальной копии, иначе ноды и connections из БД"""
+        if self.snapshots is not None:
+            graph = self.snapshots.graph(workflow_id, connector.instance)
+            if graph is not None:
+                return graph
+        
+        nodes = await connector.get_workflow_nodes(workflow_id)
+        if not nodes:
+            raise Exception("Failed to get workflow nodes")
+        connections = await connector.get_workflow_connections(workflow_id)
+        return WorkflowGraph(nodes, connections)
+    
+    async def _create_backup(self, workflow_id: str, description: str, instance: Optional[str] = None,
+                             fix_ids: Optional[List[str]] = None,
+                             graph: Optional[WorkflowGraph] = None) -> str:
+        """Создает backup workflow'а (ноды и connections) в хранилище backup'ов"""
         backup_id = str(uuid.uuid4())
+        connector = self._connector_for(instance)
         
         try:
-            # Получаем текущие ноды
-            nodes = await self.connector.get_workflow_nodes(workflow_id)
-            
-            # Получаем workflow info для connections
-            workflow_info = await self.connector.get_workflow_by_id(workflow_id)
-            
-            if not nodes:
-                raise Exception("Failed to get workflow nodes for backup")
-            
-            # Конвертируем ноды в dict формат
-            nodes_data = []
-            for node in nodes:
-                node_dict = {
-                    "id": node.id,
-                    "name": node.name,
-                    "type": node.type,
-                    "parameters": node.parameters,
-                    "position": node.position
-                }
-                if node.credentials:
-                    node_dict["credentials"] = node.credentials
-                nodes_data.append(node_dict)
-            
-            # Создаем backup
-            backup = WorkflowBackup(
+            # Граф загружается, если его еще не загрузил вызывающий
+            if graph is None:
+                graph = await self._load_graph(connector, workflow_id)
+            
+            # Имя workflow'а для метаданных (из локальной копии, если она есть)
+            snapshot = self.snapshots.get(workflow_id, connector.instance) if self.snapshots is not None else None
+            if snapshot is not None:
+                workflow_name = snapshot.name
+            else:
+                workflow_info = await connector.get_workflow_by_id(workflow_id)
+                workflow_name = workflow_info.name if workflow_info else "Unknown"
+            
+            # Сохраняется состояние на момент загрузки графа, даже если исправления уже начались
+            manifest = self.backup_store.put(
                 backup_id=backup_id,
                 workflow_id=workflow_id,
-                nodes=nodes_data,
-                connections={},  # TODO: получить connections из БД
-                created_at=datetime.now(),
+                nodes=graph.original_nodes(),
+                connections=graph.original_connections,
                 description=description,
-                metadata={"workflow_name": workflow_info.name if workflow_info else "Unknown"}
+                instance=connector.instance,
+                fix_ids=fix_ids,
+                metadata={"workflow_name": workflow_name}
             )
             
-            self.backups[backup_id] = backup
-            
-            logger.info(f"💾 Created backup {backup_id} for workflow {workflow_id}")
+            logger.info(f"💾 Created backup {backup_id} for workflow {workflow_id} "
+                        f"({len(manifest.node_hashes)} nodes)")
             return backup_id
             
         except Exception as e:
             logger.error(f"❌ Failed to create backup: {e}")
             raise
     
-    async def _apply_fix_strategy(self, workflow_id: str, strategy: RepairStrategy, 
-                                fix_id: str, backup_id: str) -> FixResult:
-        """Применяет конкретную стратегию исправления"""
-        
-        fix_result = FixResult(
-            fix_id=fix_id,
-            success=False,
-            status=FixStatus.IN_PROGRESS,
-            applied_at=datetime.now(),
-            description=strategy.description,
-            backup_id=backup_id,
-            rollback_available=True
-        )
+    async def _apply_fix_strategy(self, graph: WorkflowGraph, strategy: RepairStrategy,
+                                  affected_nodes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Применяет стратегию исправления к графу в памяти, возвращает изменения"""
+        if strategy.fix_type == FixType.ADD_PARAMETER:
+            return await self._fix_add_parameter(graph, strategy.parameters)
         
-        try:
-            # Получаем текущие ноды
-            nodes = await self.connector.get_workflow_nodes(workflow_id)
-            if not nodes:
-                raise Exception("Failed to get workflow nodes")
-            
-            # Применяем исправление в зависимости от типа
-            changes_made = []
-            
-            if strategy.fix_type == FixType.ADD_PARAMETER:
-                changes_made = await self._fix_add_parameter(nodes, strategy.parameters)
-            
-            elif strategy.fix_type == FixType.UPDATE_PARAMETER:
-                changes_made = await self._fix_update_parameter(nodes, strategy.parameters)
-            
-            elif strategy.fix_type == FixType.FIX_CREDENTIALS:
-                changes_made = await self._fix_credentials(nodes, strategy.parameters)
-            
-            elif strategy.fix_type == FixType.INCREASE_TIMEOUT:
-                changes_made = await self._fix_increase_timeout(nodes, strategy.parameters)
-            
-            elif strategy.fix_type == FixType.ADD_RETRY:
-                changes_made = await self._fix_add_retry(nodes, strategy.parameters)
-            
-            elif strategy.fix_type == FixType.ADD_VALIDATION:
-                changes_made = await self._fix_add_validation(nodes, strategy.parameters)
-            
-            elif strategy.fix_type == FixType.UPDATE_MAPPING:
-                changes_made = await self._fix_update_mapping(nodes, strategy.parameters)
-            
-            elif strategy.fix_type == FixType.ADD_ERROR_HANDLING:
-                changes_made = await self._fix_add_error_handling(nodes, strategy.parameters)
-            
-            else:
-                raise Exception(f"Unsupported fix type: {strategy.fix_type}")
-            
-            # Сохраняем изменения
-            if changes_made:
-                success = await self.connector.update_workflow_nodes(workflow_id, nodes)
-                
-                if success:
-                    fix_result.success = True
-                    fix_result.status = FixStatus.APPLIED
-                    fix_result.changes_made = changes_made
-                    
-                    logger.info(f"✅ Fix {fix_id} applied successfully")
-                    logger.info(f"   Changes made: {len(changes_made)}")
-                else:
-                    raise Exception("Failed to save workflow changes")
-            else:
-                logger.warning(f"⚠️ No changes made for fix {fix_id}")
-                fix_result.success = True
-                fix_result.status = FixStatus.APPLIED
-            
-            return fix_result
-            
-        except Exception as e:
-            logger.error(f"❌ Fix application failed: {e}")
-            fix_result.success = False
-            fix_result.status = FixStatus.FAILED
-            fix_result.error = str(e)
-            return fix_result
+        elif strategy.fix_type == FixType.UPDATE_PARAMETER:
+            return await self._fix_update_parameter(graph, strategy.parameters)
+        
+        elif strategy.fix_type == FixType.FIX_CREDENTIALS:
+            return await self._fix_credentials(graph, strategy.parameters)
+        
+        elif strategy.fix_type == FixType.INCREASE_TIMEOUT:
+            return await self._fix_increase_timeout(graph, strategy.parameters)
+        
+        elif strategy.fix_type == FixType.ADD_RETRY:
+            return await self._fix_add_retry(graph, strategy.parameters)
+        
+        elif strategy.fix_type == FixType.ADD_VALIDATION:
+            return await self._fix_add_validation(graph, strategy.parameters)
+        
+        elif strategy.fix_type == FixType.UPDATE_MAPPING:
+            return await self._fix_update_mapping(graph, strategy.parameters)
+        
+        elif strategy.fix_type == FixType.ADD_ERROR_HANDLING:
+            return await self._fix_add_error_handling(graph, strategy.parameters)
+        
+        elif strategy.fix_type == FixType.ADD_CIRCUIT_BREAKER:
+            return await self._fix_add_circuit_breaker(graph, strategy.parameters, affected_nodes or [])
+        elif strategy.fix_type == FixType.TUNE_TIMEOUT_RETRY:
+            return await self._fix_tune_timeout_retry(graph, strategy.parameters)
+        elif strategy.fix_type == FixType.ENABLE_BATCHING:
+            return await self._fix_enable_batching(graph, strategy.parameters, affected_nodes or [])
+        elif strategy.fix_type == FixType.RUN_ONCE_FOR_ALL_ITEMS:
+            return await self._fix_run_once_for_all_items(graph, strategy.parameters, affected_nodes or [])
+        elif strategy.fix_type == FixType.ADD_CACHE:
+            return await self._fix_add_cache(graph, strategy.parameters, affected_nodes or [])
+        elif strategy.fix_type == FixType.SPLIT_IN_BATCHES:
+            return await self._fix_split_in_batches(graph, strategy.parameters, affected_nodes or [])
+        
+        raise Exception(f"Unsupported fix type: {strategy.fix_type}")
     
-    async def _fix_add_parameter(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_add_parameter(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Добавляет параметр к ноде"""
         changes = []
         
@@ -339,16 +757,14 @@ class AutoFixer:
         if not param_name or param_value is None:
             return changes
         
-        for node in nodes:
-            # Проверяем, нужно ли добавлять параметр к этой ноде
-            should_add = False
-            
-            if target_node_type and target_node_type in node.type:
-                should_add = True
-            elif "memory" in node.type.lower() and param_name == "sessionIdExpression":
-                should_add = True
-            
-            if should_add and param_name not in node.parameters:
+        # Ноды, к которым нужно добавить параметр
+        targets = graph.nodes_where_type(
+            lambda node_type: bool(target_node_type and target_node_type in node_type)
+            or ("memory" in node_type.lower() and param_name == "sessionIdExpression")
+        )
+        
+        for node in targets:
+            if param_name not in node.parameters:
                 node.parameters[param_name] = param_value
                 
                 changes.append({
@@ -363,7 +779,7 @@ class AutoFixer:
         
         return changes
     
-    async def _fix_update_parameter(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_update_parameter(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Обновляет существующий параметр"""
         changes = []
         
@@ -374,10 +790,12 @@ class AutoFixer:
         if not param_name or param_value is None:
             return changes
         
-        for node in nodes:
-            if target_node_name and node.name != target_node_name:
-                continue
-            
+        if target_node_name:
+            targets = [graph.node(target_node_name)] if target_node_name in graph else []
+        else:
+            targets = graph.nodes
+        
+        for node in targets:
             if param_name in node.parameters:
                 old_value = node.parameters[param_name]
                 node.parameters[param_name] = param_value
@@ -395,7 +813,7 @@ class AutoFixer:
         
         return changes
     
-    async def _fix_credentials(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_credentials(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Исправляет credentials нод"""
         changes = []
         
@@ -405,114 +823,162 @@ class AutoFixer:
         if not credential_type or not credential_id:
             return changes
         
-        for node in nodes:
-            # Определяем, нужны ли credentials этой ноде
-            needs_credentials = False
+        def needs_credentials(node_type: str) -> bool:
+            """Нужны ли credentials нодам этого типа"""
+            node_type = node_type.lower()
+            if "openrouter" in node_type and credential_type == "openRouterApi":
+                return True
+            if "google" in node_type and "googleDrive" in credential_type:
+                return True
+            return "langchain" in node_type and credential_type == "openRouterApi"
+        
+        for node in graph.nodes_where_type(needs_credentials):
+            if not node.credentials:
+                node.credentials = {}
             
-            if "openrouter" in node.type.lower() and credential_type == "openRouterApi":
-                needs_credentials = True
-            elif "google" in node.type.lower() and "googleDrive" in credential_type:
-                needs_credentials = True
-            elif "langchain" in node.type.lower() and credential_type == "openRouterApi":
-                needs_credentials = True
+            old_credentials = node.credentials.get(credential_type)
+            node.credentials[credential_type] = {
+                "id": credential_id,
+                "name": f"{credential_type} account"
+            }
             
-            if needs_credentials:
-                if not node.credentials:
-                    node.credentials = {}
-                
-                old_credentials = node.credentials.get(credential_type)
-                node.credentials[credential_type] = {
-                    "id": credential_id,
-                    "name": f"{credential_type} account"
-                }
-                
-                changes.append({
-                    "action": "fix_credentials",
-                    "node_id": node.id,
-                    "node_name": node.name,
-                    "credential_type": credential_type,
-                    "credential_id": credential_id,
-                    "old_credentials": old_credentials
-                })
-                
-                logger.debug(f"   Fixed credentials for node {node.name}")
+            changes.append({
+                "action": "fix_credentials",
+                "node_id": node.id,
+                "node_name": node.name,
+                "credential_type": credential_type,
+                "credential_id": credential_id,
+                "old_credentials": old_credentials
+            })
+            
+            logger.debug(f"   Fixed credentials for node {node.name}")
         
         return changes
     
-    async def _fix_increase_timeout(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_increase_timeout(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Увеличивает timeout"""
         changes = []
         
         timeout_value = parameters.get("timeout", 60000)
         timeout_field = parameters.get("field", "options.timeout")
         
-        for node in nodes:
-            if "httpRequest" in node.type or "http" in node.type.lower():
-                # Обновляем timeout в options
-                if "options" not in node.parameters:
-                    node.parameters["options"] = {}
-                
-                old_timeout = node.parameters["options"].get("timeout")
-                node.parameters["options"]["timeout"] = timeout_value
-                
-                changes.append({
-                    "action": "increase_timeout",
-                    "node_id": node.id,
-                    "node_name": node.name,
-                    "field": timeout_field,
-                    "old_value": old_timeout,
-                    "new_value": timeout_value
-                })
-                
-                logger.debug(f"   Increased timeout for node {node.name} to {timeout_value}ms")
+        for node in graph.nodes_where_type(lambda node_type: "httpRequest" in node_type or "http" in node_type.lower()):
+            # Обновляем timeout в options
+            if "options" not in node.parameters:
+                node.parameters["options"] = {}
+            
+            old_timeout = node.parameters["options"].get("timeout")
+            node.parameters["options"]["timeout"] = timeout_value
+            
+            changes.append({
+                "action": "increase_timeout",
+                "node_id": node.id,
+                "node_name": node.name,
+                "field": timeout_field,
+                "old_value": old_timeout,
+                "new_value": timeout_value
+            })
+            
+            logger.debug(f"   Increased timeout for node {node.name} to {timeout_value}ms")
         
         return changes
     
-    async def _fix_add_retry(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_add_retry(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Добавляет retry механизм"""
         changes = []
         
         max_retries = parameters.get("max_retries", 3)
         backoff_factor = parameters.get("backoff_factor", 2)
         
-        for node in nodes:
-            if "httpRequest" in node.type:
-                # Добавляем retry параметры
-                if "options" not in node.parameters:
-                    node.parameters["options"] = {}
-                
-                node.parameters["options"]["retry"] = {
-                    "enabled": True,
-                    "maxRetries": max_retries,
-                    "backoffFactor": backoff_factor
-                }
-                
-                changes.append({
-                    "action": "add_retry",
-                    "node_id": node.id,
-                    "node_name": node.name,
-                    "max_retries": max_retries,
-                    "backoff_factor": backoff_factor
-                })
-                
-                logger.debug(f"   Added retry mechanism to node {node.name}")
+        for node in graph.nodes_where_type(lambda node_type: "httpRequest" in node_type):
+            # Добавляем retry параметры
+            if "options" not in node.parameters:
+                node.parameters["options"] = {}
+            
+            node.parameters["options"]["retry"] = {
+                "enabled": True,
+                "maxRetries": max_retries,
+                "backoffFactor": backoff_factor
+            }
+            
+            changes.append({
+                "action": "add_retry",
+                "node_id": node.id,
+                "node_name": node.name,
+                "max_retries": max_retries,
+                "backoff_factor": backoff_factor
+            })
+            
+            logger.debug(f"   Added retry mechanism to node {node.name}")
         
         return changes
     
-    async def _fix_add_validation(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_tune_timeout_retry(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Применяет подобранные по профилю timeout и retry (планы - в parameters["plans"])"""
+        changes = []
+        
+        for node_name, plan in parameters.get("plans", {}).items():
+            if node_name not in graph:
+                continue
+            node = graph.node(node_name)
+            old_value: Dict[str, Any] = {}
+            new_value: Dict[str, Any] = {}
+            
+            timeout_ms = plan.get("timeout_ms")
+            if timeout_ms is not None and any(marker in node.type for marker in TIMEOUT_NODE_TYPES):
+                options = node.parameters.setdefault("options", {})
+                if options.get("timeout") != timeout_ms:
+                    old_value["timeout"] = options.get("timeout")
+                    new_value["timeout"] = timeout_ms
+                    options["timeout"] = timeout_ms
+            
+            # retryOnFail, maxTries и waitBetweenTries - поля самой ноды, а не parameters
+            if plan.get("retry_on_fail") is not None:
+                settings = {"retryOnFail": plan["retry_on_fail"]}
+                if plan["retry_on_fail"]:
+                    settings.update(maxTries=plan["max_tries"], waitBetweenTries=plan["wait_between_tries_ms"])
+                for key, value in settings.items():
+                    if node.settings.get(key) != value:
+                        old_value[key] = node.settings.get(key)
+                        new_value[key] = value
+                        node.settings[key] = value
+                if not plan["retry_on_fail"]:
+                    for key in ("maxTries", "waitBetweenTries"):
+                        if key in node.settings:
+                            old_value[key] = node.settings.pop(key)
+                            new_value[key] = None
+            
+            if not new_value:
+                continue
+            
+            changes.append({
+                "action": "tune_timeout_retry",
+                "node_id": node.id,
+                "node_name": node.name,
+                "old_value": old_value,
+                "new_value": new_value,
+                "reasons": plan.get("reasons", []),
+                "samples": plan.get("samples", 0),
+                "failures": plan.get("failures", 0)
+            })
+            
+            logger.debug(f"   Tuned {', '.join(new_value)} for node {node.name}")
+        
+        return changes
+    
+    async def _fix_add_validation(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Добавляет валидацию входных данных"""
         changes = []
         
         add_null_checks = parameters.get("add_null_checks", True)
         provide_defaults = parameters.get("provide_defaults", True)
         
-        for node in nodes:
-            if node.type == "n8n-nodes-base.code":
-                # Модифицируем JavaScript код для добавления валидации
-                current_code = node.parameters.get("jsCode", "")
-                
-                if add_null_checks and "null" not in current_code:
-                    validation_code = """
+        for node in graph.nodes_of_type("n8n-nodes-base.code"):
+            # Модифицируем JavaScript код для добавления валидации
+            current_code = node.parameters.get("jsCode", "")
+            
+            if add_null_checks and "null" not in current_code:
+                validation_code = """
 // Input validation
 const input = $input.first();
 if (!input || !input.json) {
@@ -520,77 +986,75 @@ if (!input || !input.json) {
 }
 
 """
-                    node.parameters["jsCode"] = validation_code + current_code
-                    
-                    changes.append({
-                        "action": "add_validation",
-                        "node_id": node.id,
-                        "node_name": node.name,
-                        "validation_type": "null_checks"
-                    })
-                    
-                    logger.debug(f"   Added validation to code node {node.name}")
+                node.parameters["jsCode"] = validation_code + current_code
+                
+                changes.append({
+                    "action": "add_validation",
+                    "node_id": node.id,
+                    "node_name": node.name,
+                    "validation_type": "null_checks"
+                })
+                
+                logger.debug(f"   Added validation to code node {node.name}")
         
         return changes
     
-    async def _fix_update_mapping(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_update_mapping(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Исправляет mapping данных"""
         changes = []
         
         problematic_field = parameters.get("problematic_field")
         fix_paths = parameters.get("fix_paths", True)
         
-        for node in nodes:
-            if node.type == "n8n-nodes-base.set":
-                # Исправляем пути в Set node
-                values = node.parameters.get("values", {})
-                
-                for value_type, value_list in values.items():
-                    if isinstance(value_list, list):
-                        for value_item in value_list:
-                            if isinstance(value_item, dict) and "value" in value_item:
-                                old_value = value_item["value"]
+        for node in graph.nodes_of_type("n8n-nodes-base.set"):
+            # Исправляем пути в Set node
+            values = node.parameters.get("values", {})
+            
+            for value_type, value_list in values.items():
+                if isinstance(value_list, list):
+                    for value_item in value_list:
+                        if isinstance(value_item, dict) and "value" in value_item:
+                            old_value = value_item["value"]
+                            
+                            # Исправляем общие проблемы с путями
+                            if isinstance(old_value, str):
+                                new_value = old_value
                                 
-                                # Исправляем общие проблемы с путями
-                                if isinstance(old_value, str):
-                                    new_value = old_value
-                                    
-                                    # Исправляем отсутствующие $json
-                                    if "data" in new_value and "$json" not in new_value:
-                                        new_value = new_value.replace("data", "$json.data")
+                                # Исправляем отсутствующие $json
+                                if "data" in new_value and "$json" not in new_value:
+                                    new_value = new_value.replace("data", "$json.data")
+                                
+                                # Исправляем двойные точки
+                                new_value = new_value.replace("..", ".")
+                                
+                                if new_value != old_value:
+                                    value_item["value"] = new_value
                                     
-                                    # Исправляем двойные точки
-                                    new_value = new_value.replace("..", ".")
+                                    changes.append({
+                                        "action": "update_mapping",
+                                        "node_id": node.id,
+                                        "node_name": node.name,
+                                        "field": value_item.get("name", "unknown"),
+                                        "old_value": old_value,
+                                        "new_value": new_value
+                                    })
                                     
-                                    if new_value != old_value:
-                                        value_item["value"] = new_value
-                                        
-                                        changes.append({
-                                            "action": "update_mapping",
-                                            "node_id": node.id,
-                                            "node_name": node.name,
-                                            "field": value_item.get("name", "unknown"),
-                                            "old_value": old_value,
-                                            "new_value": new_value
-                                        })
-                                        
-                                        logger.debug(f"   Fixed mapping in node {node.name}")
+                                    logger.debug(f"   Fixed mapping in node {node.name}")
         
         return changes
     
-    async def _fix_add_error_handling(self, nodes: List[NodeInfo], parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _fix_add_error_handling(self, graph: WorkflowGraph, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Добавляет обработку ошибок"""
         changes = []
         
         wrap_in_try_catch = parameters.get("wrap_in_try_catch", True)
         provide_fallback = parameters.get("provide_fallback", True)
         
-        for node in nodes:
-            if node.type == "n8n-nodes-base.code":
-                current_code = node.parameters.get("jsCode", "")
-                
-                if wrap_in_try_catch and "try" not in current_code:
-                    wrapped_code = f"""
+        for node in graph.nodes_of_type("n8n-nodes-base.code"):
+            current_code = node.parameters.get("jsCode", "")
+            
+            if wrap_in_try_catch and "try" not in current_code:
+                wrapped_code = f"""
 try {{
 {current_code}
 }} catch (error) {{
@@ -604,62 +1068,307 @@ try {{
     }}];
 }}
 """
-                    node.parameters["jsCode"] = wrapped_code
-                    
-                    changes.append({
-                        "action": "add_error_handling",
-                        "node_id": node.id,
-                        "node_name": node.name,
-                        "handling_type": "try_catch"
-                    })
-                    
-                    logger.debug(f"   Added error handling to node {node.name}")
+                node.parameters["jsCode"] = wrapped_code
+                
+                changes.append({
+                    "action": "add_error_handling",
+                    "node_id": node.id,
+                    "node_name": node.name,
+                    "handling_type": "try_catch"
+                })
+                
+                logger.debug(f"   Added error handling to node {node.name}")
+        
+        return changes
+    
+    async def _fix_add_circuit_breaker(self, graph: WorkflowGraph, parameters: Dict[str, Any],
+                                       affected_nodes: List[str]) -> List[Dict[str, Any]]:
+        """Оборачивает упавшие ноды circuit breaker'ом: guard перед нодой и reset после нее"""
+        changes = []
+        
+        failure_threshold = int(parameters.get("failure_threshold", 5))
+        recovery_timeout = int(parameters.get("recovery_timeout", 60))
+        
+        for name in parameters.get("node_names") or affected_nodes:
+            node = graph.node(name)
+            guard_name = f"{name} Circuit Guard"
+            reset_name = f"{name} Circuit Reset"
+            
+            # Уже обернута - или нода без main входа (триггер): guard перед ней не выполнится
+            if node is None or guard_name in graph or not graph.predecessors(name, "main"):
+                continue
+            
+            x, y = (list(node.position) + [0, 0])[:2]
+            guard_code = (CIRCUIT_GUARD_CODE.replace("__THRESHOLD__", str(failure_threshold))
+                          .replace("__RECOVERY__", str(recovery_timeout)))
+            graph.insert_before(name, self._circuit_node(guard_name, name, guard_code, [x - 100, y + 200]))
+            graph.insert_after(name, self._circuit_node(reset_name, name, CIRCUIT_RESET_CODE, [x + 100, y + 200]))
+            
+            changes.append({
+                "action": "add_circuit_breaker",
+                "node_id": node.id,
+                "node_name": name,
+                "guard_node": guard_name,
+                "reset_node": reset_name,
+                "failure_threshold": failure_threshold,
+                "recovery_timeout": recovery_timeout
+            })
+            
+            logger.debug(f"   Added circuit breaker around node {name}")
+        
+        return changes
+    
+    @staticmethod
+    def _circuit_node(node_name: str, protected_name: str, template: str, position: List[int]) -> NodeInfo:
+        """Code нода circuit breaker'а для ноды protected_name"""
+        return NodeInfo(
+            id=str(uuid.uuid4()),
+            name=node_name,
+            type="n8n-nodes-base.code",
+            parameters={"jsCode": template.replace("__NAME__", protected_name).replace("__KEY__", json.dumps(protected_name))},
+            position=position
+        )
+    
+    async def _fix_enable_batching(self, graph: WorkflowGraph, parameters: Dict[str, Any],
+                                   affected_nodes: List[str]) -> List[Dict[str, Any]]:
+        """Включает options.batching у HTTP Request нод: пачки запросов вместо запроса на каждый item сразу"""
+        changes = []
+        
+        batching = {"batch": {
+            "batchSize": int(parameters.get("batch_size", 10)),
+            "batchInterval": int(parameters.get("batch_interval_ms", 0))
+        }}
+        
+        for name in parameters.get("node_names") or affected_nodes:
+            node = graph.node(name)
+            if node is None or "httpRequest" not in node.type:
+                continue
+            options = node.parameters.setdefault("options", {})
+            if options.get("batching"):
+                continue
+            options["batching"] = copy.deepcopy(batching)
+            
+            changes.append({
+                "action": "enable_batching",
+                "node_id": node.id,
+                "node_name": name,
+                "new_value": batching,
+                "reasons": parameters.get("reasons", [])
+            })
+            
+            logger.debug(f"   Enabled batching for node {name}")
         
         return changes
     
+    async def _fix_run_once_for_all_items(self, graph: WorkflowGraph, parameters: Dict[str, Any],
+                                          affected_nodes: List[str]) -> List[Dict[str, Any]]:
+        """Переводит JavaScript Code ноды из режима "для каждого item'а" в один запуск на все item'ы"""
+        changes = []
+        
+        for name in parameters.get("node_names") or affected_nodes:
+            node = graph.node(name)
+            if node is None or node.type != "n8n-nodes-base.code" or node.parameters.get("mode") != "runOnceForEachItem":
+                continue
+            code = node.parameters.get("jsCode")
+            if node.parameters.get("language", "javaScript") != "javaScript" or not code:
+                continue
+            if not runs_once_for_all_items(code):
+                logger.warning(f"⚠️ Node {name} uses legacy per-item accessors, keeping it per item")
+                continue
+            
+            node.parameters["jsCode"] = RUN_ONCE_FOR_ALL_CODE.replace("__CODE__", code)
+            node.parameters["mode"] = "runOnceForAllItems"
+            
+            changes.append({
+                "action": "run_once_for_all_items",
+                "node_id": node.id,
+                "node_name": name,
+                "old_value": {"mode": "runOnceForEachItem", "jsCode": code},
+                "new_value": {"mode": "runOnceForAllItems"},
+                "reasons": parameters.get("reasons", [])
+            })
+            
+            logger.debug(f"   Switched node {name} to run once for all items")
+        
+        return changes
+    
+    async def _fix_add_cache(self, graph: WorkflowGraph, parameters: Dict[str, Any],
+                             affected_nodes: List[str]) -> List[Dict[str, Any]]:
+        """
+        Ставит кэш ответов вокруг ноды: Lookup -> IF попадание -> (нет) нода -> Store
+        
+        Попадания идут из IF сразу в ноды, следующие за исходной нодой.
+        """
+        changes = []
+        
+        ttl_seconds = int(parameters.get("ttl_seconds", 86400))
+        max_entries = int(parameters.get("max_entries", 1000))
+        
+        for name in parameters.get("node_names") or affected_nodes:
+            node = graph.node(name)
+            lookup_name = f"{name} Cache Lookup"
+            hit_name = f"{name} Cache Hit?"
+            store_name = f"{name} Cache Store"
+            
+            # Уже с кэшем - или нода без main входа (триггер, под-нода агента)
+            if node is None or lookup_name in graph or not graph.predecessors(name, "main"):
+                continue
+            
+            x, y = (list(node.position) + [0, 0])[:2]
+            key = json.dumps(name)
+            lookup_code = (CACHE_LOOKUP_CODE.replace("__NAME__", name).replace("__KEY__", key)
+                           .replace("__HASH__", CACHE_HASH_CODE))
+            store_code = (CACHE_STORE_CODE.replace("__NAME__", name).replace("__KEY__", key)
+                          .replace("__HASH__", CACHE_HASH_CODE)
+                          .replace("__LOOKUP__", lookup_name.replace("'", "\\'"))
+                          .replace("__TTL__", str(ttl_seconds)).replace("__MAX_ENTRIES__", str(max_entries)))
+            
+            graph.insert_before(name, self._code_node(lookup_name, lookup_code, [x - 400, y]))
+            graph.insert_after(name, self._code_node(store_name, store_code, [x + 200, y]))
+            
+            # Lookup -> IF: попадание (выход 0) - сразу дальше, промах (выход 1) - в ноду
+            graph.add_node(NodeInfo(
+                id=str(uuid.uuid4()),
+                name=hit_name,
+                type="n8n-nodes-base.if",
+                parameters={"conditions": {"boolean": [{"value1": CACHE_HIT_CONDITION, "value2": True}]}},
+                position=[x - 200, y],
+                settings={"typeVersion": 1}
+            ))
+            for edge in [edge for edge in graph.outgoing[lookup_name] if edge.target == name]:
+                graph.disconnect(edge)
+            graph.connect(lookup_name, hit_name)
+            graph.connect(hit_name, name, source_output=1)
+            for edge in [edge for edge in graph.outgoing[store_name] if edge.kind == "main"]:
+                graph.connect(hit_name, edge.target, source_output=0, target_input=edge.target_input)
+            
+            changes.append({
+                "action": "add_cache",
+                "node_id": node.id,
+                "node_name": name,
+                "lookup_node": lookup_name,
+                "hit_node": hit_name,
+                "store_node": store_name,
+                "ttl_seconds": ttl_seconds,
+                "max_entries": max_entries,
+                "reasons": parameters.get("reasons", [])
+            })
+            
+            logger.debug(f"   Added response cache around node {name}")
+        
+        return changes
+    
+    async def _fix_split_in_batches(self, graph: WorkflowGraph, parameters: Dict[str, Any],
+                                    affected_nodes: List[str]) -> List[Dict[str, Any]]:
+        """
+        Пропускает item'ы ноды пачками через Split In Batches
+        
+        Вход ноды идет в Split In Batches, его выход "loop" - в ноду, нода
+        возвращается в него; выход "done" (все обработанные item'ы) ведет
+        туда, куда вел первый выход ноды.
+        """
+        changes = []
+        
+        batch_size = int(parameters.get("batch_size", 100))
+        
+        for name in parameters.get("node_names") or affected_nodes:
+            node = graph.node(name)
+            batches_name = f"{name} Batches"
+            if node is None or batches_name in graph or not graph.predecessors(name, "main"):
+                continue
+            
+            outgoing = [edge for edge in graph.outgoing.get(name, ()) if edge.kind == "main"]
+            if any(edge.source_output > 0 for edge in outgoing):
+                continue
+            
+            x, y = (list(node.position) + [0, 0])[:2]
+            graph.insert_before(name, NodeInfo(
+                id=str(uuid.uuid4()),
+                name=batches_name,
+                type="n8n-nodes-base.splitInBatches",
+                parameters={"batchSize": batch_size, "options": {}},
+                position=[x - 200, y],
+                settings={"typeVersion": 3}
+            ))
+            for edge in [edge for edge in graph.outgoing[batches_name] if edge.target == name]:
+                graph.disconnect(edge)
+            graph.connect(batches_name, name, source_output=1)
+            for edge in outgoing:
+                graph.disconnect(edge)
+                graph.connect(batches_name, edge.target, source_output=0, target_input=edge.target_input)
+            graph.connect(name, batches_name)
+            
+            changes.append({
+                "action": "split_in_batches",
+                "node_id": node.id,
+                "node_name": name,
+                "batches_node": batches_name,
+                "batch_size": batch_size,
+                "reasons": parameters.get("reasons", [])
+            })
+            
+            logger.debug(f"   Added Split In Batches ({batch_size}) before node {name}")
+        
+        return changes
+    
+    @staticmethod
+    def _code_node(node_name: str, code: str, position: List[int]) -> NodeInfo:
+        """Служебная JavaScript Code нода"""
+        return NodeInfo(
+            id=str(uuid.uuid4()),
+            name=node_name,
+            type="n8n-nodes-base.code",
+            parameters={"jsCode": code},
+            position=position
+        )
+    
     async def rollback_fix(self, fix_id: str) -> bool:
-        """Откатывает исправление"""
+        """Откатывает исправление (backup ищется и после рестарта - по fix_id в хранилище)"""
         try:
-            # Находим исправление в истории
-            fix_result = next((f for f in self.fix_history if f.fix_id == fix_id), None)
+            # Находим исправление в журнале
+            fix_result = self.ledger.get(fix_id)
             
-            if not fix_result:
-                logger.error(f"❌ Fix {fix_id} not found in history")
-                return False
+            if fix_result and fix_result.backup_id:
+                manifest = self.backup_store.get_manifest(fix_result.backup_id)
+            else:
+                manifest = self.backup_store.find_by_fix(fix_id)
             
-            if not fix_result.backup_id:
+            if not manifest:
                 logger.error(f"❌ No backup available for fix {fix_id}")
                 return False
             
-            # Получаем backup
-            backup = self.backups.get(fix_result.backup_id)
-            if not backup:
-                logger.error(f"❌ Backup {fix_result.backup_id} not found")
-                return False
-            
             logger.info(f"🔄 Rolling back fix {fix_id}")
             
-            # Конвертируем backup nodes в NodeInfo
-            nodes = []
-            for node_data in backup.nodes:
-                node = NodeInfo(
-                    id=node_data["id"],
-                    name=node_data["name"],
-                    type=node_data["type"],
-                    parameters=node_data["parameters"],
-                    position=node_data["position"],
-                    credentials=node_data.get("credentials")
-                )
-                nodes.append(node)
+            backup = self._assemble_backup(manifest)
             
-            # Восстанавливаем workflow
-            success = await self.connector.update_workflow_nodes(backup.workflow_id, nodes)
+            # Конвертируем backup nodes в NodeInfo (с настройками ноды)
+            nodes = parse_nodes(backup.nodes)
+            
+            # Восстанавливаем workflow; пустые connections не перезаписываются:
+            # коннектор возвращает {} и при ошибке чтения связей
+            connector = self._connector_for(backup.instance)
+            success = await connector.update_workflow_nodes(
+                backup.workflow_id, nodes, backup.connections or None
+            )
             
             if success:
-                fix_result.status = FixStatus.ROLLED_BACK
-                logger.info(f"✅ Fix {fix_id} rolled back successfully")
+                if self.snapshots is not None:
+                    self.snapshots.record_write(backup.workflow_id, connector.instance, nodes, backup.connections or None)
+                
+                # Backup транзакции предшествует всем ее исправлениям - откатываются все
+                self.ledger.update_status(
+                    [result.fix_id for result in self.ledger.by_backup(manifest.backup_id)
+                     if result.status != FixStatus.FAILED],
+                    FixStatus.ROLLED_BACK
+                )
+                ROLLBACKS_TOTAL.labels("success").inc()
+                if len(manifest.fix_ids) > 1:
+                    logger.info(f"✅ Fix {fix_id} rolled back with its transaction ({len(manifest.fix_ids)} fixes)")
+                else:
+                    logger.info(f"✅ Fix {fix_id} rolled back successfully")
                 return True
             else:
+                ROLLBACKS_TOTAL.labels("failure").inc()
                 logger.error(f"❌ Failed to rollback fix {fix_id}")
                 return False
                 
@@ -667,44 +1376,55 @@ try {{
             logger.error(f"❌ Rollback error: {e}")
             return False
     
-    def get_fix_history(self, limit: int = 50) -> List[FixResult]:
-        """Возвращает историю исправлений"""
-        return sorted(self.fix_history, key=lambda x: x.applied_at, reverse=True)[:limit]
+    def get_fix_history(self, limit: int = 50, workflow_id: Optional[str] = None,
+                        instance: Optional[str] = None) -> List[FixResult]:
+        """Возвращает историю исправлений (всех или одного workflow'а), новые первыми"""
+        if workflow_id is not None:
+            return self.ledger.by_workflow(workflow_id, instance or self.connector.instance, limit)
+        return self.ledger.recent(limit)
+    
+    def _assemble_backup(self, manifest: BackupManifest) -> WorkflowBackup:
+        """Собирает backup из блобов по манифесту"""
+        workflow = self.backup_store.assemble(manifest)
+        return WorkflowBackup(
+            backup_id=manifest.backup_id,
+            workflow_id=manifest.workflow_id,
+            nodes=workflow["nodes"],
+            connections=workflow["connections"],
+            created_at=manifest.created_at,
+            description=manifest.description,
+            metadata=manifest.metadata,
+            instance=manifest.instance
+        )
     
     def get_backup_info(self, backup_id: str) -> Optional[WorkflowBackup]:
         """Возвращает информацию о backup'е"""
-        return self.backups.get(backup_id)
+        manifest = self.backup_store.get_manifest(backup_id)
+        return self._assemble_backup(manifest) if manifest else None
     
     def cleanup_old_backups(self, days: int = 7):
-        """Очищает старые backup'ы"""
+        """Очищает старые backup'ы (и блобы, на которые больше никто не ссылается)"""
         cutoff_time = datetime.now() - timedelta(days=days)
+        removed = self.backup_store.delete_older_than(cutoff_time)
         
-        old_backups = [
-            backup_id for backup_id, backup in self.backups.items()
-            if backup.created_at < cutoff_time
-        ]
-        
-        for backup_id in old_backups:
-            del self.backups[backup_id]
-        
-        logger.info(f"🗑️ Cleaned up {len(old_backups)} old backups")
+        if removed:
+            logger.info(f"🗑️ Cleaned up {removed} old backups")
+    
+    def close(self):
+        """Закрывает хранилище backup'ов и журнал исправлений"""
+        self.backup_store.close()
+        self.ledger.close()
     
     def get_statistics(self) -> Dict[str, Any]:
         """Возвращает статистику исправлений"""
-        if not self.fix_history:
-            return {"total_fixes": 0}
-        
-        successful_fixes = [f for f in self.fix_history if f.success]
-        failed_fixes = [f for f in self.fix_history if not f.success]
-        rolled_back_fixes = [f for f in self.fix_history if f.status == FixStatus.ROLLED_BACK]
+        ledger_statistics = self.ledger.get_statistics()
+        if not ledger_statistics["total_fixes"]:
+            return {"total_fixes": 0, "total_backups": len(self.backup_store)}
         
         return {
-            "total_fixes": len(self.fix_history),
-            "successful_fixes": len(successful_fixes),
-            "failed_fixes": len(failed_fixes),
-            "rolled_back_fixes": len(rolled_back_fixes),
-            "success_rate": len(successful_fixes) / len(self.fix_history) if self.fix_history else 0,
-            "total_backups": len(self.backups)
+            **ledger_statistics,
+            "total_backups": len(self.backup_store),
+            "backup_store": self.backup_store.get_statistics()
         }
 
 # Утилитарные функции
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+🎓 LEARNED CLASSIFIER - Обучаемый классификатор ошибок (hashed TF-IDF + naive Bayes)
+
+Дополнение к правилам CompiledClassifier: мультиномиальный naive Bayes
+по TF-IDF признакам нормализованных шаблонов.
+
+- признаки: токены и биграммы шаблона, тип ошибки и нода; хешируются
+  (crc32) в n_features корзин - словарь не хранится, новые слова не
+  требуют переобучения структуры
+- TF: 1 + log(tf), IDF по обучающей выборке, L2 нормировка строки
+- пакет сообщений - разреженная матрица в CSR виде (indices, values,
+  offsets) по уникальным документам; вывод - одно произведение на
+  матрицу log-вероятностей признаков: выборка строк весов по indices и
+  np.add.reduceat по строкам (SciPy не нужен)
+
+Модель маленькая (n_features x число категорий float32) и
+сериализуется в .npz.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"<\w+>|[a-z0-9_']+")
+
+# Документ: (нормализованный шаблон, тип ошибки, нода)
+Document = Tuple[str, Optional[str], Optional[str]]
+
+def document_features(document: Document, n_features: int) -> Counter:
+    """Хешированные признаки документа с частотами"""
+    template, error_type, node_name = document
+    tokens = _TOKEN.findall(template.lower())
+    features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+    features.append(f"type={error_type or ''}")
+    if node_name:
+        features.append(f"node={node_name.lower()}")
+    mask = n_features - 1
+    return Counter(zlib.crc32(feature.encode("utf-8")) & mask for feature in features)
+
+def vectorize(documents: Iterable[Document], n_features: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Пакет документов в CSR виде
+
+    Returns:
+        (indices, values, offsets): признаки и сублинейные TF всех строк подряд,
+        offsets[i] - начало строки i (у каждой строки есть хотя бы признак типа)
+    """
+    indices: List[int] = []
+    values: List[float] = []
+    offsets: List[int] = []
+    for document in documents:
+        offsets.append(len(indices))
+        for feature, count in document_features(document, n_features).items():
+            indices.append(feature)
+            values.append(1.0 + math.log(count))
+    return (
+        np.array(indices, dtype=np.int64),
+        np.array(values, dtype=np.float32),
+        np.array(offsets, dtype=np.int64)
+    )
+
+class HashedNaiveBayes:
+    """Мультиномиальный naive Bayes по hashed TF-IDF признакам"""
+
+    def __init__(self, classes: Sequence[str], n_features: int = 1 << 15, alpha: float = 0.1):
+        """
+        Инициализация
+
+        Args:
+            classes: Метки классов (значения ErrorCategory)
+            n_features: Число хеш-корзин (степень двойки)
+            alpha: Сглаживание Лапласа
+        """
+        if n_features & (n_features - 1):
+            raise ValueError(f"n_features must be a power of two, got {n_features}")
+
+        self.classes = list(classes)
+        self.n_features = n_features
+        self.alpha = alpha
+
+        self.idf: Optional[np.ndarray] = None
+        # (n_features, классы): строки выбираются по индексам признаков
+        self.feature_log_prob: Optional[np.ndarray] = None
+        self.class_log_prior: Optional[np.ndarray] = None
+        self.trained_examples = 0
+        self.version = ""
+
+    @property
+    def is_trained(self) -> bool:
+        return self.feature_log_prob is not None
+
+    def _tfidf(self, indices: np.ndarray, values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """TF-IDF значения с L2 нормировкой строк"""
+        weighted = values * self.idf[indices]
+        norms = np.sqrt(np.add.reduceat(weighted * weighted, offsets))
+        lengths = np.diff(np.append(offsets, len(indices)))
+        return weighted / np.repeat(np.maximum(norms, 1e-12), lengths)
+
+    def fit(self, documents: Sequence[Document], labels: Sequence[str],
+            weights: Optional[Sequence[float]] = None) -> "HashedNaiveBayes":
+        """Обучает модель (метки вне classes пропускаются)"""
+        class_index = {label: index for index, label in enumerate(self.classes)}
+        rows = [i for i, label in enumerate(labels) if label in class_index]
+        if not rows:
+            raise ValueError("No training examples with known classes")
+
+        documents = [documents[i] for i in rows]
+        targets = np.array([class_index[labels[i]] for i in rows], dtype=np.int64)
+        sample_weights = np.ones(len(rows), dtype=np.float32) if weights is None else \
+            np.array([weights[i] for i in rows], dtype=np.float32)
+
+        indices, values, offsets = vectorize(documents, self.n_features)
+        lengths = np.diff(np.append(offsets, len(indices)))
+
+        # IDF: признаки строки уникальны, поэтому bincount по indices - документная частота
+        document_frequency = np.bincount(indices, minlength=self.n_features)
+        self.idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        tfidf = self._tfidf(indices, values, offsets)
+        class_counts = np.zeros((self.n_features, len(self.classes)), dtype=np.float64)
+        np.add.at(class_counts, (indices, np.repeat(targets, lengths)), tfidf * np.repeat(sample_weights, lengths))
+
+        smoothed = class_counts + self.alpha
+        self.feature_log_prob = np.log(smoothed / smoothed.sum(axis=0)).astype(np.float32)
+
+        class_weight = np.bincount(targets, weights=sample_weights, minlength=len(self.classes))
+        # Классы без примеров не предсказываются
+        with np.errstate(divide="ignore"):
+            self.class_log_prior = np.log(class_weight / class_weight.sum()).astype(np.float32)
+
+        self.trained_examples = len(documents)
+        self.version = hashlib.blake2b(
+            self.feature_log_prob.tobytes() + self.class_log_prior.tobytes(), digest_size=8
+        ).hexdigest()
+        return self
+
+    def predict_proba(self, documents: Sequence[Document]) -> np.ndarray:
+        """Вероятности классов для пакета (строки - документы)"""
+        if not self.is_trained:
+            raise RuntimeError("Model is not trained")
+        if not documents:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+
+        # Шаблоны повторяются: признаки считаются один раз на уникальный документ
+        unique: dict = {}
+        inverse = np.fromiter((unique.setdefault(document, len(unique)) for document in documents),
+                              dtype=np.int64, count=len(documents))
+
+        indices, values, offsets = vectorize(unique, self.n_features)
+        tfidf = self._tfidf(indices, values, offsets)
+
+        # Разреженное произведение X @ W: строки W по признакам, суммы по строкам X
+        joint = np.add.reduceat(self.feature_log_prob[indices] * tfidf[:, None], offsets, axis=0)
+        joint += self.class_log_prior
+
+        joint -= joint.max(axis=1, keepdims=True)
+        probabilities = np.exp(joint)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities[inverse]
+
+    def predict(self, documents: Sequence[Document]) -> Tuple[List[str], np.ndarray]:
+        """Метки и вероятности лучших классов для пакета"""
+        probabilities = self.predict_proba(documents)
+        best = probabilities.argmax(axis=1)
+        return [self.classes[index] for index in best], probabilities[np.arange(len(best)), best]
+
+    def save(self, path: str):
+        """Сохраняет обученную модель в .npz"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            np.savez_compressed(
+                f,
+                classes=np.array(self.classes),
+                n_features=self.n_features,
+                alpha=self.alpha,
+                idf=self.idf,
+                feature_log_prob=self.feature_log_prob,
+                class_log_prior=self.class_log_prior,
+                trained_examples=self.trained_examples
+            )
+
+    @classmethod
+    def load(cls, path: str) -> Optional["HashedNaiveBayes"]:
+        """Загружает модель из .npz (None - файла нет или он не читается)"""
+        if not Path(path).exists():
+            return None
+        try:
+            with np.load(path) as data:
+                model = cls(data["classes"].tolist(), int(data["n_features"]), float(data["alpha"]))
+                model.idf = data["idf"]
+                model.feature_log_prob = data["feature_log_prob"]
+                model.class_log_prior = data["class_log_prior"]
+                model.trained_examples = int(data["trained_examples"])
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to load learned classifier from {path}: {e}")
+            return None
+        model.version = hashlib.blake2b(
+            model.feature_log_prob.tobytes() + model.class_log_prior.tobytes(), digest_size=8
+        ).hexdigest()
+        return model
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+📈 METRICS - Реестр метрик и экспорт в формате OpenMetrics
+
+Легковесный реестр метрик для горячих путей системы:
+- Counter, Gauge и Histogram с фиксированными бакетами
+- Дочерние метрики по значениям label'ов кэшируются, обновление - одна
+  операция над атрибутом без блокировок (все обновления идут из потока
+  event loop'а)
+- Gauge может вычисляться функцией в момент scrape'а (глубина очередей,
+  lag подписчиков), чтобы не обновлять его на каждом событии
+- Рендеринг в OpenMetrics text за O(число метрик) и небольшой HTTP сервер
+  с эндпоинтом /metrics
+"""
+
+import bisect
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value: float) -> str:
+    """Форматирует значение сэмпла"""
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    """Экранирует значение label'а"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Собирает {name="value",...}"""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class _CounterValue:
+    """Значение счетчика для одного набора label'ов"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        """Увеличивает счетчик"""
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        self.value += amount
+
+class _GaugeValue:
+    """Значение gauge для одного набора label'ов"""
+
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        """Устанавливает значение"""
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        """Увеличивает значение"""
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        """Уменьшает значение"""
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Вычислять значение функцией в момент scrape'а"""
+        self.function = function
+
+    def get(self) -> float:
+        """Текущее значение"""
+        if self.function is not None:
+            return self.function()
+        return self.value
+
+class _HistogramValue:
+    """Гистограмма для одного набора label'ов (бакеты хранятся не накопительно)"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Записывает наблюдение"""
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        """Количество наблюдений"""
+        return sum(self.counts)
+
+class MetricFamily:
+    """
+    Семейство метрик с общим именем и набором label'ов
+
+    Без label'ов методы обновления (inc, set, observe) привязаны прямо к
+    единственному значению, поэтому вызов не проходит через поиск в словаре.
+    """
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Инициализация семейства"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+        if not self.labelnames:
+            self._bind(self.labels())
+
+    def _new_value(self):
+        """Создает значение для нового набора label'ов"""
+        raise NotImplementedError
+
+    def _bind(self, child):
+        """Привязывает методы значения к семейству без label'ов"""
+
+    def labels(self, *values: str, **kwargs: str):
+        """Возвращает (и кэширует) значение для набора label'ов"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._new_value()
+            self._children[tuple(values)] = child
+        return child
+
+    def remove(self, *values: str):
+        """Удаляет значение для набора label'ов"""
+        self._children.pop(values, None)
+
+    def render(self, lines: List[str]):
+        """Дописывает семейство в формате OpenMetrics"""
+        lines.append(f"# TYPE {self.name} {self.metric_type}")
+        lines.append(f"# HELP {self.name} {_escape(self.documentation)}")
+        for values, child in list(self._children.items()):
+            self._render_child(lines, values, child)
+
+    def _render_child(self, lines: List[str], values: Tuple[str, ...], child):
+        """Дописывает сэмплы одного значения"""
+        raise NotImplementedError
+
+class Counter(MetricFamily):
+    """Монотонный счетчик (в выводе - сэмпл <name>_total)"""
+
+    metric_type = "counter"
+
+    def _new_value(self) -> _CounterValue:
+        return _CounterValue()
+
+    def _bind(self, child: _CounterValue):
+        self.inc = child.inc
+
+    def _render_child(self, lines: List[str], values: Tuple[str, ...], child: _CounterValue):
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_total{labels} {_format_value(child.value)}")
+
+class Gauge(MetricFamily):
+    """Значение, которое может расти и уменьшаться"""
+
+    metric_type = "gauge"
+
+    def _new_value(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def _bind(self, child: _GaugeValue):
+        self.set = child.set
+        self.inc = child.inc
+        self.dec = child.dec
+        self.set_function = child.set_function
+
+    def _render_child(self, lines: List[str], values: Tuple[str, ...], child: _GaugeValue):
+        try:
+            value = child.get()
+        except Exception as e:
+            logger.debug(f"⚠️ Gauge {self.name} callback failed: {e}")
+            return
+        lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+
+class Histogram(MetricFamily):
+    """Гистограмма с фиксированными бакетами"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets if not math.isinf(bound)))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_value(self) -> _HistogramValue:
+        return _HistogramValue(self.bounds)
+
+    def _bind(self, child: _HistogramValue):
+        self.observe = child.observe
+
+    def _render_child(self, lines: List[str], values: Tuple[str, ...], child: _HistogramValue):
+        labelnames = self.labelnames + ("le",)
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), child.counts):
+            cumulative += count
+            labels = _format_labels(labelnames, values + (_format_value(bound),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+
+class MetricsRegistry:
+    """
+    Реестр метрик
+
+    Повторная регистрация метрики с тем же именем возвращает существующее
+    семейство, поэтому компоненты можно создавать несколько раз.
+    """
+
+    def __init__(self):
+        """Инициализация реестра"""
+        self._families: Dict[str, MetricFamily] = {}
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> MetricFamily:
+        """Регистрирует семейство или возвращает уже зарегистрированное"""
+        family = self._families.get(name)
+        if family is not None:
+            if not isinstance(family, cls) or family.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return family
+
+        family = cls(name, documentation, labelnames, **kwargs)
+        self._families[name] = family
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Регистрирует счетчик"""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Регистрирует gauge"""
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Регистрирует гистограмму"""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[MetricFamily]:
+        """Возвращает семейство по имени"""
+        return self._families.get(name)
+
+    def render(self) -> str:
+        """Рендерит все метрики в OpenMetrics text"""
+        lines: List[str] = []
+        for family in list(self._families.values()):
+            family.render(lines)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+# Реестр по умолчанию, в который пишут компоненты системы
+REGISTRY = MetricsRegistry()
+
+class MetricsServer:
+    """HTTP сервер с эндпоинтом /metrics"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "0.0.0.0", port: int = 9464):
+        """Инициализация сервера"""
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    def create_app(self) -> web.Application:
+        """Создает aiohttp приложение"""
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        return app
+
+    async def _handle_metrics(self, request):
+        """Отдает текущие значения метрик"""
+        return web.Response(
+            body=self.registry.render().encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    async def start(self):
+        """Запускает сервер"""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"📈 Metrics endpoint started on {self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """Останавливает сервер"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -16,18 +16,43 @@
 import asyncio
 import json
 import logging
+import math
+import random
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Set
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Set, Callable, Tuple, Awaitable
+from dataclasses import dataclass, field, asdict, is_dataclass
 from enum import Enum
 import statistics
 from collections import defaultdict, deque
 
-from connector import N8NConnector, ExecutionInfo
+from aiohttp import web
+
+from connector import N8NConnector, ExecutionInfo, DEFAULT_INSTANCE, extract_errors, extract_run_data
+from event_log import EventLog
+from metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+# Метрики монитора
+EVENTS_TOTAL = REGISTRY.counter(
+    "n8n_monitor_events", "Events added to the monitor pipeline", ["instance", "type", "severity"]
+)
+POLLS_TOTAL = REGISTRY.counter("n8n_monitor_polls", "Execution polls", ["instance"])
+POLL_DURATION = REGISTRY.histogram("n8n_monitor_poll_duration_seconds", "Duration of one execution poll", ["instance"])
+IN_FLIGHT = REGISTRY.gauge("n8n_monitor_in_flight_executions", "Running executions seen by the last poll", ["instance"])
+EXECUTIONS_COMPLETED = REGISTRY.counter(
+    "n8n_monitor_executions_completed", "Completed executions by status", ["instance", "status"]
+)
+EXECUTION_DURATION = REGISTRY.histogram(
+    "n8n_execution_duration_seconds", "Duration of successful executions", ["instance"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+INGESTED_EVENTS = REGISTRY.counter("n8n_monitor_ingested_events", "Webhook batch events by result", ["result"])
+INGEST_QUEUE_DEPTH = REGISTRY.gauge("n8n_monitor_ingest_queue_depth", "Events waiting in the ingestion queue")
+SUBSCRIPTION_LAG = REGISTRY.gauge("n8n_monitor_subscription_lag", "Undelivered or unacked events per subscriber", ["subscriber"])
+ANOMALIES_TOTAL = REGISTRY.counter("n8n_monitor_anomalies", "Detected anomalies", ["type"])
+
 class EventType(Enum):
     """Типы событий мониторинга"""
     EXECUTION_STARTED = "execution_started"
@@ -46,6 +71,32 @@ class Severity(Enum):
     ERROR = "error"
     CRITICAL = "critical"
 
+# Завершения выполнений (знаменатель error rate)
+COMPLETION_EVENT_TYPES = (EventType.EXECUTION_COMPLETED, EventType.EXECUTION_FAILED, EventType.EXECUTION_TIMEOUT)
+
+# Таблицы для быстрого разбора enum'ов при пакетном приеме
+_EVENT_TYPES = {event_type.value: event_type for event_type in EventType}
+_SEVERITIES = {severity.value: severity for severity in Severity}
+
+def _optional_str(value: Any) -> Optional[str]:
+    """Идентификатор из webhook'а: строка (число приводится к строке) или None"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError(f"expected a string, got {type(value).__name__}")
+
+def _optional_float(value: Any) -> Optional[float]:
+    """Длительность из webhook'а: конечное число (или числовая строка) или None"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise TypeError("expected a number, got bool")
+    result = float(value)
+    if not math.isfinite(result):
+        raise ValueError(f"duration is not finite: {value}")
+    return result
+
 @dataclass
 class ExecutionEvent:
     """Событие выполнения"""
@@ -60,6 +111,8 @@ class ExecutionEvent:
     node_name: Optional[str] = None
     duration: Optional[float] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
+    instance: str = DEFAULT_INSTANCE  # Инстанс N8N, к которому относится событие
+    offset: Optional[int] = None  # Позиция в журнале событий
     
     def has_errors(self) -> bool:
         """Проверяет, содержит ли событие ошибки"""
@@ -68,6 +121,45 @@ class ExecutionEvent:
             EventType.NODE_ERROR,
             EventType.EXECUTION_TIMEOUT
         ]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализует событие для журнала"""
+        return {
+            "id": self.id,
+            "event_type": self.event_type.value,
+            "severity": self.severity.value,
+            "workflow_id": self.workflow_id,
+            "execution_id": self.execution_id,
+            "timestamp": self.timestamp.isoformat(),
+            "error_type": self.error_type,
+            "error_message": self.error_message,
+            "node_name": self.node_name,
+            "duration": self.duration,
+            "instance": self.instance,
+            "metadata": {
+                key: asdict(value) if is_dataclass(value) else value
+                for key, value in self.metadata.items()
+            }
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], offset: Optional[int] = None) -> "ExecutionEvent":
+        """Восстанавливает событие из записи журнала"""
+        return cls(
+            id=data["id"],
+            event_type=EventType(data["event_type"]),
+            severity=Severity(data["severity"]),
+            workflow_id=data["workflow_id"],
+            execution_id=data.get("execution_id"),
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            error_type=data.get("error_type"),
+            error_message=data.get("error_message"),
+            node_name=data.get("node_name"),
+            duration=data.get("duration"),
+            metadata=data.get("metadata") or {},
+            instance=data.get("instance", DEFAULT_INSTANCE),
+            offset=offset
+        )
 
 @dataclass
 class MonitoringStats:
@@ -86,6 +178,19 @@ class MonitoringStats:
         else:
             self.error_rate = 0.0
 
+@dataclass
+class IngestionStats:
+    """Статистика приема событий через webhook"""
+    accepted_batches: int = 0
+    accepted_events: int = 0
+    rejected_batches: int = 0
+    rejected_events: int = 0
+    invalid_events: int = 0
+    processed_events: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    events_per_second: float = 0.0
+
 @dataclass
 class AnomalyAlert:
     """Алерт об аномалии"""
@@ -98,22 +203,195 @@ class AnomalyAlert:
     threshold_value: Optional[float] = None
     actual_value: Optional[float] = None
 
+class AdaptivePollScheduler:
+    """
+    Адаптивный интервал polling'а
+    
+    Пока есть выполнения в работе или приходят ошибки, опрашивает с
+    минимальным интервалом. В простое интервал растет экспоненциально
+    (с jitter) до потолка. notify() будит ожидание немедленно - так
+    webhook'и и внешние сигналы сокращают задержку обнаружения.
+    """
+    
+    def __init__(self, min_interval: float = 5.0, max_interval: float = 60.0,
+                 backoff_factor: float = 2.0, jitter: float = 0.1):
+        """Инициализация планировщика"""
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        
+        self.current_interval = min_interval
+        self.polls = 0
+        self.wakeups = 0
+        self._wakeup = asyncio.Event()
+    
+    @classmethod
+    def fixed(cls, interval: float) -> "AdaptivePollScheduler":
+        """Планировщик с постоянным интервалом (прежнее поведение)"""
+        return cls(min_interval=interval, max_interval=interval, backoff_factor=1.0, jitter=0.0)
+    
+    def record_poll(self, in_flight: int, new_errors: int):
+        """Пересчитывает интервал по результату опроса"""
+        self.polls += 1
+        
+        if in_flight or new_errors:
+            self.current_interval = self.min_interval
+        else:
+            self.current_interval = min(self.current_interval * self.backoff_factor, self.max_interval)
+    
+    def next_delay(self) -> float:
+        """Задержка до следующего опроса с учетом jitter"""
+        if not self.jitter:
+            return self.current_interval
+        spread = self.current_interval * self.jitter
+        return max(0.0, self.current_interval + random.uniform(-spread, spread))
+    
+    def notify(self):
+        """Будит ожидание и сбрасывает интервал на минимальный"""
+        self.current_interval = self.min_interval
+        self._wakeup.set()
+    
+    async def wait(self) -> float:
+        """Ждет следующего опроса или notify(); возвращает запланированную задержку"""
+        delay = self.next_delay()
+        
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            self.wakeups += 1
+        except asyncio.TimeoutError:
+            pass
+        
+        self._wakeup.clear()
+        return delay
+
+@dataclass
+class MonitoredInstance:
+    """Состояние опроса одного инстанса N8N"""
+    name: str
+    connector: N8NConnector
+    scheduler: AdaptivePollScheduler
+    known_executions: Set[str] = field(default_factory=set)
+    # Первый опрос (или восстановление из журнала) уже выполнен: пустой
+    # known_executions у нового инстанса не означает, что опроса не было
+    initialized: bool = False
+    execution_states: Dict[str, str] = field(default_factory=dict)  # execution_id -> status
+    last_poll_time: datetime = field(default_factory=datetime.now)
+
+class EventSubscription:
+    """
+    Подписка потребителя на события монитора
+    
+    Каждое событие доставляется в ограниченную очередь ровно один раз.
+    Когда очередь заполнена, публикация ждет освобождения места
+    (backpressure), а не теряет события. Потребитель подтверждает
+    обработку через ack(), и при наличии журнала событий после рестарта
+    подписка продолжается с последнего подтвержденного offset'а.
+    """
+    
+    def __init__(self, name: str, maxsize: int = 1000, event_types: List[EventType] = None,
+                 on_ack: Optional[Callable[[int], None]] = None):
+        """Инициализация подписки"""
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.event_types = set(event_types) if event_types else None
+        self._on_ack = on_ack
+        
+        # Offset'ы доставки и подтверждения
+        self.delivered_offset = -1
+        self.acked_offset = -1
+        
+        # Пока подписка догоняет журнал, живые события читаются из журнала
+        self.catching_up = False
+        self.backpressure_waits = 0
+    
+    def matches(self, event: ExecutionEvent) -> bool:
+        """Проверяет, подходит ли событие под фильтр подписки"""
+        return self.event_types is None or event.event_type in self.event_types
+    
+    async def get(self) -> ExecutionEvent:
+        """Ждет следующее событие"""
+        return await self.queue.get()
+    
+    def drain(self, max_events: Optional[int] = None) -> List[ExecutionEvent]:
+        """Забирает все доступные события без ожидания"""
+        events = []
+        while not self.queue.empty() and (max_events is None or len(events) < max_events):
+            events.append(self.queue.get_nowait())
+        return events
+    
+    def ack(self, offset: int):
+        """Подтверждает обработку всех событий до offset'а включительно"""
+        if offset is None or offset <= self.acked_offset:
+            return
+        self.acked_offset = offset
+        if self._on_ack:
+            self._on_ack(offset)
+    
+    @property
+    def lag(self) -> int:
+        """Количество доставленных, но не обработанных событий"""
+        return self.queue.qsize()
+
 class ExecutionMonitor:
     """
     Монитор выполнений N8N
     
     Отслеживает выполнения workflow'ов в реальном времени и выявляет проблемы:
-    - Polling для периодической проверки
+    - Polling для периодической проверки (свой цикл и планировщик на каждый
+      инстанс N8N, общий конвейер событий, статистика и журнал)
     - Event aggregation для анализа
     - Anomaly detection для выявления аномалий
     - Performance tracking для оптимизации
     """
     
-    def __init__(self, connector: N8NConnector, poll_interval: int = 10):
-        """Инициализация монитора"""
+    def __init__(self, connector: Optional[N8NConnector], poll_interval: int = 10,
+                 event_log: Optional[EventLog] = None,
+                 scheduler: Optional[AdaptivePollScheduler] = None,
+                 webhook_config: Dict[str, Any] = None,
+                 max_concurrency: int = 5, error_batch_size: int = 10,
+                 connectors: Optional[List[N8NConnector]] = None,
+                 scheduler_factory: Optional[Callable[[], AdaptivePollScheduler]] = None,
+                 event_store=None, profiler=None, replay_limit: int = 10000):
+        """
+        Инициализация монитора
+        
+        Args:
+            connector: Коннектор единственного (или основного) инстанса
+            connectors: Коннекторы всех инстансов для мониторинга нескольких N8N
+            scheduler: Планировщик опросов для единственного инстанса
+            scheduler_factory: Создает планировщик для каждого инстанса
+            max_concurrency: Общий на все инстансы лимит параллельных запросов ошибок
+            event_store: Колоночное хранилище событий для аналитики (EventStore)
+            profiler: Профайлер нод по runData завершенных выполнений (WorkflowProfiler)
+            replay_limit: Сколько последних событий журнала проигрывать при старте
+        """
         self.connector = connector
         self.poll_interval = poll_interval
         
+        # Параллельная обработка завершений: запросов к БД одновременно и выполнений в запросе
+        self.max_concurrency = max_concurrency
+        self.error_batch_size = error_batch_size
+        self._db_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # Инстансы N8N: у каждого свой цикл опроса, планировщик и кэш выполнений
+        self.scheduler_factory = scheduler_factory or (lambda: AdaptivePollScheduler.fixed(poll_interval))
+        self.instances: Dict[str, MonitoredInstance] = {}
+        instance_connectors = connectors or ([connector] if connector else [])
+        for instance_connector in instance_connectors:
+            self.add_instance(instance_connector, scheduler if len(instance_connectors) == 1 else None)
+        
+        # Персистентный журнал событий (опционально)
+        self.event_log = event_log
+        self.replay_limit = replay_limit
+        
+        # Колоночное хранилище для оконных агрегаций (опционально)
+        self.event_store = event_store
+        self.anomaly_window = "15m"
+        
+        # Профилирование нод завершенных выполнений (опционально)
+        self.profiler = profiler
+        
         # Состояние мониторинга
         self.is_running = False
         self.last_poll_time = datetime.now()
@@ -122,9 +400,11 @@ class ExecutionMonitor:
         self.recent_events: deque = deque(maxlen=1000)  # Последние 1000 событий
         self.stats = MonitoringStats()
         
-        # Кэш для отслеживания изменений
-        self.known_executions: Set[str] = set()
-        self.execution_states: Dict[str, str] = {}  # execution_id -> status
+        # Подписки потребителей и счетчик offset'ов без журнала
+        self.subscriptions: Dict[str, EventSubscription] = {}
+        self._next_offset = 0
+        # Пакеты публикуются по очереди: подписки получают события в порядке offset'ов
+        self._publish_lock = asyncio.Lock()
         
         # Anomaly detection
         self.execution_times: deque = deque(maxlen=100)  # Последние 100 времен выполнения
@@ -136,10 +416,41 @@ class ExecutionMonitor:
         }
         
         # Webhook server (опционально)
+        webhook_config = webhook_config or {}
         self.webhook_server = None
-        self.webhook_port = 8080
+        self.webhook_host = webhook_config.get("host", "0.0.0.0")
+        self.webhook_port = webhook_config.get("port", 8080)
+        self.webhook_max_body_bytes = int(webhook_config.get("max_body_mb", 16) * 1024 * 1024)
+        
+        # Ограниченная очередь пакетного приема (в событиях)
+        self.ingest_queue_size = webhook_config.get("ingest_queue_size", 100000)
+        self._ingest_batches: deque = deque()
+        self._ingest_ready = asyncio.Event()
+        self.ingestion_stats = IngestionStats()
+        self._rate_window_start = time.monotonic()
+        self._rate_window_events = 0
+        
+        # Значения gauge'ей вычисляются в момент scrape'а
+        INGEST_QUEUE_DEPTH.set_function(lambda: self.ingestion_stats.queue_depth)
         
-        logger.info("👁️ Execution Monitor initialized")
+        logger.info(f"👁️ Execution Monitor initialized ({len(self.instances)} instances)")
+    
+    def add_instance(self, connector: N8NConnector,
+                     scheduler: Optional[AdaptivePollScheduler] = None) -> MonitoredInstance:
+        """Добавляет инстанс N8N под мониторинг (до start())"""
+        instance = MonitoredInstance(
+            name=connector.instance,
+            connector=connector,
+            scheduler=scheduler or self.scheduler_factory()
+        )
+        self.instances[instance.name] = instance
+        return instance
+    
+    @property
+    def scheduler(self) -> Optional[AdaptivePollScheduler]:
+        """Планировщик основного инстанса"""
+        instance = next(iter(self.instances.values()), None)
+        return instance.scheduler if instance else None
     
     async def start(self, enable_webhook: bool = False):
         """Запускает мониторинг"""
@@ -150,8 +461,15 @@ class ExecutionMonitor:
         self.is_running = True
         logger.info("🚀 Starting execution monitoring...")
         
-        # Запускаем polling в фоне
-        polling_task = asyncio.create_task(self._polling_loop())
+        # Восстанавливаем состояние из журнала после рестарта
+        if self.event_log:
+            self.restore_from_log()
+        
+        # Запускаем polling в фоне: отдельный цикл на каждый инстанс
+        polling_tasks = [
+            asyncio.create_task(self._polling_loop(instance))
+            for instance in self.instances.values()
+        ]
         
         # Запускаем webhook server если нужно
         webhook_task = None
@@ -163,7 +481,7 @@ class ExecutionMonitor:
         
         try:
             # Ждем завершения всех задач
-            tasks = [polling_task, anomaly_task]
+            tasks = polling_tasks + [anomaly_task]
             if webhook_task:
                 tasks.append(webhook_task)
             
@@ -181,43 +499,85 @@ class ExecutionMonitor:
         
         if self.webhook_server:
             await self.webhook_server.cleanup()
+        
+        if self.event_log:
+            self.event_log.close()
     
-    async def _polling_loop(self):
-        """Основной цикл polling'а"""
-        logger.info("🔄 Starting polling loop...")
+    async def _polling_loop(self, instance: MonitoredInstance):
+        """Цикл polling'а одного инстанса"""
+        logger.info(f"🔄 Starting polling loop for {instance.name}...")
         
         while self.is_running:
             try:
-                await self._poll_executions()
-                await asyncio.sleep(self.poll_interval)
+                in_flight, new_errors = await self._poll_executions(instance)
+                instance.scheduler.record_poll(in_flight, new_errors)
+                
+                if self.event_log:
+                    self.event_log.maybe_sync()
+                
+                await instance.scheduler.wait()
                 
             except Exception as e:
-                logger.error(f"❌ Polling error: {e}")
-                await asyncio.sleep(self.poll_interval)
+                logger.error(f"❌ Polling error ({instance.name}): {e}")
+                await instance.scheduler.wait()
     
-    async def _poll_executions(self):
-        """Опрашивает выполнения"""
+    async def _poll_executions(self, instance: MonitoredInstance) -> Tuple[int, int]:
+        """Опрашивает выполнения инстанса; возвращает (выполнений в работе, новых ошибок)"""
+        in_flight = 0
+        new_errors = 0
+        poll_started = time.perf_counter()
+        POLLS_TOTAL.labels(instance.name).inc()
+        
         try:
             # Получаем последние выполнения
-            executions = await self.connector.get_recent_executions(limit=100)
+            executions = await instance.connector.get_recent_executions(limit=100)
             
-            for execution in executions:
-                await self._process_execution(execution)
+            # Первый опрос без восстановленного состояния - только запоминаем
+            # текущие выполнения, чтобы не поднимать инциденты по истории
+            if not instance.initialized:
+                for execution in executions:
+                    instance.known_executions.add(execution.id)
+                    instance.execution_states[execution.id] = execution.status
+                    if not execution.finished:
+                        in_flight += 1
+                instance.initialized = True
+            else:
+                completed = []
+                for execution in executions:
+                    if not execution.finished:
+                        in_flight += 1
+                    if await self._process_execution(instance, execution):
+                        completed.append(execution)
+                
+                await self._process_completions(instance, completed)
+                new_errors = sum(1 for execution in completed if execution.status != "success")
             
-            self.last_poll_time = datetime.now()
+            instance.last_poll_time = self.last_poll_time = datetime.now()
             
         except Exception as e:
-            logger.error(f"❌ Failed to poll executions: {e}")
+            logger.error(f"❌ Failed to poll executions ({instance.name}): {e}")
+        
+        IN_FLIGHT.labels(instance.name).set(in_flight)
+        POLL_DURATION.labels(instance.name).observe(time.perf_counter() - poll_started)
+        return in_flight, new_errors
+    
+    def notify(self, instance: Optional[str] = None):
+        """Запрашивает немедленный опрос инстанса (или всех, если он не указан)"""
+        if instance in self.instances:
+            self.instances[instance].scheduler.notify()
+            return
+        for monitored in self.instances.values():
+            monitored.scheduler.notify()
     
-    async def _process_execution(self, execution: ExecutionInfo):
-        """Обрабатывает выполнение"""
+    async def _process_execution(self, instance: MonitoredInstance, execution: ExecutionInfo) -> bool:
+        """Обрабатывает выполнение; возвращает True, если оно только что завершилось"""
         execution_id = execution.id
         
         # Проверяем, новое ли это выполнение
-        if execution_id not in self.known_executions:
-            # Новое выполнение
-            self.known_executions.add(execution_id)
-            self.execution_states[execution_id] = execution.status
+        if execution_id not in instance.known_executions:
+            # Новое выполнение: статус записывается ниже, чтобы выполнение,
+            # завершившееся между опросами, тоже дало событие завершения
+            instance.known_executions.add(execution_id)
             
             # Создаем событие начала выполнения
             event = ExecutionEvent(
@@ -226,23 +586,111 @@ class ExecutionMonitor:
                 severity=Severity.INFO,
                 workflow_id=execution.workflow_id,
                 execution_id=execution_id,
-                timestamp=execution.started_at or datetime.now()
+                timestamp=execution.started_at or datetime.now(),
+                instance=instance.name
             )
             
             await self._add_event(event)
             self.stats.total_executions += 1
         
         # Проверяем изменение статуса
-        old_status = self.execution_states.get(execution_id)
+        old_status = instance.execution_states.get(execution_id)
         if old_status != execution.status:
-            self.execution_states[execution_id] = execution.status
-            
-            if execution.finished:
-                await self._handle_execution_completion(execution)
+            instance.execution_states[execution_id] = execution.status
+            return execution.finished
+        
+        return False
+    
+    async def _process_completions(self, instance: MonitoredInstance, completed: List[ExecutionInfo]):
+        """
+        Обрабатывает завершения за один тик
+        
+        Ошибки всех упавших выполнений запрашиваются пакетами параллельно
+        (не больше max_concurrency запросов одновременно на все инстансы),
+        а события создаются после этого в исходном порядке выполнений.
+        С профайлером execution data всех завершений читается один раз:
+        ошибки и runData разбираются из одного результата.
+        """
+        failed_ids = [execution.id for execution in completed if execution.status != "success"]
+        run_data = None
+        if self.profiler is not None and completed:
+            data_by_execution = await self._fetch_batched(
+                instance, [execution.id for execution in completed], instance.connector.get_executions_data
+            )
+            errors_by_execution = {
+                execution_id: extract_errors(execution_id, data_by_execution[execution_id])
+                for execution_id in failed_ids if execution_id in data_by_execution
+            }
+            run_data = {}
+            for execution_id, data in data_by_execution.items():
+                execution_run_data = extract_run_data(data)
+                if execution_run_data:
+                    run_data[execution_id] = execution_run_data
+        else:
+            errors_by_execution = await self._fetch_execution_errors(instance, failed_ids)
+        
+        for execution in completed:
+            await self._handle_execution_completion(
+                execution, errors_by_execution.get(execution.id, []), instance=instance
+            )
+        
+        if run_data is not None:
+            await self._profile_completions(instance, completed, run_data)
+    
+    async def _profile_completions(self, instance: MonitoredInstance, completed: List[ExecutionInfo],
+                                   run_data: Optional[Dict[str, Dict[str, List[Dict[str, Any]]]]] = None):
+        """Передает завершения тика профайлеру (под общим семафором запросов к БД)"""
+        if self._db_semaphore is None:
+            self._db_semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        try:
+            async with self._db_semaphore:
+                await self.profiler.profile_executions(completed, instance=instance.name, run_data=run_data)
+        except Exception as e:
+            logger.error(f"❌ Failed to profile executions ({instance.name}): {e}")
+    
+    async def _fetch_execution_errors(self, instance: MonitoredInstance,
+                                      execution_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Запрашивает ошибки выполнений пакетами с ограниченной параллельностью"""
+        return await self._fetch_batched(instance, execution_ids, instance.connector.get_executions_errors)
+    
+    async def _fetch_batched(self, instance: MonitoredInstance, execution_ids: List[str],
+                             fetch_chunk: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Запрашивает данные выполнений пакетами по error_batch_size с ограниченной параллельностью"""
+        if not execution_ids:
+            return {}
+        
+        # Семафор общий для всех инстансов: бюджет запросов к БД не растет с их числом
+        if self._db_semaphore is None:
+            self._db_semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._db_semaphore
+        
+        async def fetch(chunk: List[str]) -> Dict[str, Any]:
+            async with semaphore:
+                return await fetch_chunk(chunk)
+        
+        chunks = [
+            execution_ids[i:i + self.error_batch_size]
+            for i in range(0, len(execution_ids), self.error_batch_size)
+        ]
+        results = await asyncio.gather(*[fetch(chunk) for chunk in chunks], return_exceptions=True)
+        
+        by_execution = {}
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"❌ Failed to fetch execution data ({instance.name}): {result}")
+            else:
+                by_execution.update(result)
+        
+        return by_execution
     
-    async def _handle_execution_completion(self, execution: ExecutionInfo):
+    async def _handle_execution_completion(self, execution: ExecutionInfo,
+                                           errors: Optional[List[Dict[str, Any]]] = None,
+                                           instance: Optional[MonitoredInstance] = None):
         """Обрабатывает завершение выполнения"""
         execution_id = execution.id
+        instance = instance or next(iter(self.instances.values()))
+        EXECUTIONS_COMPLETED.labels(instance.name, execution.status or "unknown").inc()
         
         # Определяем тип события
         if execution.status == "success":
@@ -253,6 +701,7 @@ class ExecutionMonitor:
             # Записываем время выполнения для anomaly detection
             if execution.execution_time:
                 self.execution_times.append(execution.execution_time)
+                EXECUTION_DURATION.labels(instance.name).observe(execution.execution_time)
         
         else:
             event_type = EventType.EXECUTION_FAILED
@@ -270,12 +719,15 @@ class ExecutionMonitor:
             workflow_id=execution.workflow_id,
             execution_id=execution_id,
             timestamp=execution.stopped_at or datetime.now(),
-            duration=execution.execution_time
+            duration=execution.execution_time,
+            metadata={"status": execution.status},
+            instance=instance.name
         )
         
         # Получаем ошибки если есть
         if execution.status != "success":
-            errors = await self.connector.get_execution_errors(execution_id)
+            if errors is None:
+                errors = await instance.connector.get_execution_errors(execution_id)
             if errors:
                 # Берем первую ошибку для основного события
                 first_error = errors[0]
@@ -294,7 +746,8 @@ class ExecutionMonitor:
                         timestamp=datetime.now(),
                         error_type=error.get("error", {}).get("type", "unknown"),
                         error_message=error.get("error", {}).get("message", "Unknown error"),
-                        node_name=error.get("node")
+                        node_name=error.get("node"),
+                        instance=instance.name
                     )
                     await self._add_event(node_event)
         
@@ -305,7 +758,7 @@ class ExecutionMonitor:
     
     async def _add_event(self, event: ExecutionEvent):
         """Добавляет событие в очередь"""
-        self.recent_events.append(event)
+        await self._append_events([event])
         
         # Логируем важные события
         if event.severity in [Severity.ERROR, Severity.CRITICAL]:
@@ -313,6 +766,132 @@ class ExecutionMonitor:
         elif event.event_type == EventType.EXECUTION_COMPLETED:
             logger.debug(f"✅ Execution completed: {event.execution_id}")
     
+    async def _add_events(self, events: List[ExecutionEvent]):
+        """Добавляет пакет событий (одна сводная запись в лог вместо записи на событие)"""
+        if not events:
+            return
+        
+        await self._append_events(events)
+        
+        error_count = sum(1 for event in events if event.severity in (Severity.ERROR, Severity.CRITICAL))
+        if error_count:
+            logger.warning(f"⚠️ {error_count} error events in batch of {len(events)}")
+    
+    async def _append_events(self, events: List[ExecutionEvent]):
+        """Назначает offset'ы, пишет в журнал и доставляет подписчикам"""
+        if self.event_log:
+            for event in events:
+                event.offset = self.event_log.append(event.to_dict())
+        else:
+            for event in events:
+                event.offset = self._next_offset
+                self._next_offset += 1
+        
+        self.recent_events.extend(events)
+        
+        # Счетчик по (инстанс, тип, серьезность): одно обновление на ключ за пакет
+        counts: Dict[Tuple[str, EventType, Severity], int] = {}
+        for event in events:
+            key = (event.instance, event.event_type, event.severity)
+            counts[key] = counts.get(key, 0) + 1
+        for (instance, event_type, severity), count in counts.items():
+            EVENTS_TOTAL.labels(instance, event_type.value, severity.value).inc(count)
+        
+        if self.subscriptions:
+            async with self._publish_lock:
+                for event in events:
+                    await self._publish(event)
+        
+        # Аналитическое хранилище - после доставки: события уже в журнале, и ошибка
+        # колонок (пакет целиком не попадает в кольцо) не должна задерживать подписчиков
+        if self.event_store is not None:
+            try:
+                self.event_store.extend(events)
+            except Exception as e:
+                logger.error(f"❌ Failed to add {len(events)} events to event store: {e}")
+    
+    async def _publish(self, event: ExecutionEvent):
+        """Доставляет событие подписчикам"""
+        for subscription in list(self.subscriptions.values()):
+            if subscription.catching_up or not subscription.matches(event):
+                continue
+            
+            # Пока публикация ждала места в очереди другой подписки, эта могла
+            # дочитать журнал (он уже содержит весь пакет) и получить событие оттуда
+            if event.offset is not None and event.offset <= subscription.delivered_offset:
+                continue
+            
+            if subscription.queue.full():
+                subscription.backpressure_waits += 1
+                if subscription.backpressure_waits % 1000 == 1:
+                    logger.warning(f"⏳ Subscriber {subscription.name} is full ({subscription.lag} events), waiting")
+            
+            await subscription.queue.put(event)
+            subscription.delivered_offset = event.offset
+    
+    async def subscribe(self, name: str, maxsize: int = 1000, event_types: List[EventType] = None,
+                        from_offset: Optional[int] = None) -> EventSubscription:
+        """
+        Подписывает потребителя на события
+        
+        Args:
+            name: Уникальное имя потребителя (ключ подтвержденного offset'а)
+            maxsize: Размер очереди подписки
+            event_types: Фильтр по типам событий (опционально)
+            from_offset: С какого offset'а доставлять события; по умолчанию
+                продолжает после последнего подтвержденного offset'а из журнала
+        
+        Returns:
+            Подписка с ограниченной очередью
+        """
+        if name in self.subscriptions:
+            return self.subscriptions[name]
+        
+        on_ack = None
+        if self.event_log:
+            on_ack = lambda offset: self.event_log.commit_offset(name, offset)
+            if from_offset is None:
+                committed = self.event_log.committed_offset(name)
+                if committed is not None:
+                    from_offset = committed + 1
+        
+        subscription = EventSubscription(name, maxsize, event_types, on_ack)
+        self.subscriptions[name] = subscription
+        SUBSCRIPTION_LAG.labels(name).set_function(lambda: subscription.lag)
+        
+        if self.event_log and from_offset is not None and from_offset < self.event_log.next_offset:
+            subscription.acked_offset = from_offset - 1
+            subscription.catching_up = True
+            asyncio.create_task(self._catch_up(subscription, from_offset))
+        
+        logger.info(f"📬 Subscribed {name} (from offset {from_offset if from_offset is not None else 'live'})")
+        return subscription
+    
+    def unsubscribe(self, name: str):
+        """Отменяет подписку"""
+        self.subscriptions.pop(name, None)
+        SUBSCRIPTION_LAG.remove(name)
+    
+    async def _catch_up(self, subscription: EventSubscription, from_offset: int):
+        """Доставляет подписке события из журнала, пока она не догонит живой поток"""
+        offset = from_offset
+        batch_size = subscription.queue.maxsize or 1000
+        
+        while subscription.name in self.subscriptions:
+            batch = list(self.event_log.read_from(offset, batch_size))
+            if not batch:
+                # Журнал прочитан до конца: дальше события идут через _publish
+                subscription.catching_up = False
+                logger.info(f"📬 Subscriber {subscription.name} caught up at offset {offset}")
+                return
+            
+            for record_offset, record in batch:
+                offset = record_offset + 1
+                event = ExecutionEvent.from_dict(record, offset=record_offset)
+                if subscription.matches(event):
+                    await subscription.queue.put(event)
+                    subscription.delivered_offset = record_offset
+    
     def _update_stats(self):
         """Обновляет статистику"""
         # Обновляем процент ошибок
@@ -359,17 +938,24 @@ class ExecutionMonitor:
                     )
                     anomalies.append(anomaly)
         
-        # 2. Аномалии частоты ошибок
-        if self.stats.total_executions >= 10:
-            if self.stats.error_rate > self.anomaly_thresholds["error_rate_threshold"]:
+        # 2. Аномалии частоты ошибок (за окно, если есть хранилище событий)
+        if self.event_store is not None:
+            completions = self.event_store.count(window=self.anomaly_window, event_types=COMPLETION_EVENT_TYPES)
+            error_rate = self.event_store.error_rate(by=None, window=self.anomaly_window)
+        else:
+            completions = self.stats.total_executions
+            error_rate = self.stats.error_rate
+        
+        if completions >= 10:
+            if error_rate > self.anomaly_thresholds["error_rate_threshold"]:
                 anomaly = AnomalyAlert(
                     id=f"high_error_rate_{int(time.time())}",
                     anomaly_type="high_error_rate",
-                    description=f"Error rate {self.stats.error_rate:.1%} exceeds threshold {self.anomaly_thresholds['error_rate_threshold']:.1%}",
+                    description=f"Error rate {error_rate:.1%} exceeds threshold {self.anomaly_thresholds['error_rate_threshold']:.1%}",
                     severity=Severity.ERROR,
                     detected_at=datetime.now(),
                     threshold_value=self.anomaly_thresholds["error_rate_threshold"],
-                    actual_value=self.stats.error_rate
+                    actual_value=error_rate
                 )
                 anomalies.append(anomaly)
         
@@ -402,30 +988,33 @@ class ExecutionMonitor:
                 metadata={"anomaly": anomaly}
             )
             await self._add_event(event)
+            ANOMALIES_TOTAL.labels(anomaly.anomaly_type).inc()
             
             logger.warning(f"🚨 Anomaly detected: {anomaly.description}")
     
+    def create_webhook_app(self) -> web.Application:
+        """Создает aiohttp приложение webhook'ов"""
+        # client_max_size ограничивает тело уже после распаковки gzip
+        app = web.Application(client_max_size=self.webhook_max_body_bytes)
+        app.router.add_post('/webhook/execution', self._handle_webhook)
+        app.router.add_post('/webhook/events', self._handle_events_batch)
+        app.router.add_get('/webhook/health', self._webhook_health)
+        return app
+    
     async def _start_webhook_server(self):
         """Запускает webhook server для push-уведомлений"""
         try:
-            from aiohttp import web
-            
-            app = web.Application()
-            app.router.add_post('/webhook/execution', self._handle_webhook)
-            app.router.add_get('/webhook/health', self._webhook_health)
-            
-            runner = web.AppRunner(app)
+            runner = web.AppRunner(self.create_webhook_app())
             await runner.setup()
             
-            site = web.TCPSite(runner, '0.0.0.0', self.webhook_port)
+            site = web.TCPSite(runner, self.webhook_host, self.webhook_port)
             await site.start()
             
             self.webhook_server = runner
-            logger.info(f"🌐 Webhook server started on port {self.webhook_port}")
+            logger.info(f"🌐 Webhook server started on {self.webhook_host}:{self.webhook_port}")
             
-            # Держим сервер запущенным
-            while self.is_running:
-                await asyncio.sleep(1)
+            # Обрабатываем принятые пакеты, пока сервер запущен
+            await self._ingestion_loop()
                 
         except Exception as e:
             logger.error(f"❌ Webhook server error: {e}")
@@ -436,20 +1025,14 @@ class ExecutionMonitor:
             data = await request.json()
             
             # Создаем событие из webhook данных
-            event = ExecutionEvent(
-                id=f"webhook_{data.get('executionId', 'unknown')}_{int(time.time())}",
-                event_type=EventType(data.get('eventType', 'execution_completed')),
-                severity=Severity(data.get('severity', 'info')),
-                workflow_id=data.get('workflowId', 'unknown'),
-                execution_id=data.get('executionId'),
-                timestamp=datetime.now(),
-                error_type=data.get('errorType'),
-                error_message=data.get('errorMessage'),
-                node_name=data.get('nodeName'),
-                duration=data.get('duration')
-            )
+            events = self._events_from_records([data])
+            if not events:
+                return web.json_response({"error": "Invalid event"}, status=400)
             
-            await self._add_event(event)
+            await self._add_event(events[0])
+            
+            # Push-уведомление - повод опросить БД инстанса сразу за деталями
+            self.notify(events[0].instance)
             
             return web.json_response({"status": "ok"})
             
@@ -457,14 +1040,158 @@ class ExecutionMonitor:
             logger.error(f"❌ Webhook handling error: {e}")
             return web.json_response({"error": str(e)}, status=400)
     
+    async def _handle_events_batch(self, request):
+        """
+        Принимает пакет событий
+        
+        Тело - JSON-массив или NDJSON (одно событие на строку), допускается
+        Content-Encoding: gzip. Пакет ставится в ограниченную очередь целиком
+        либо отклоняется: 429, если очередь временно заполнена, 413, если
+        пакет больше всей очереди (повтор такого пакета не поможет).
+        """
+        try:
+            records = self._parse_batch(await request.read())
+        except ValueError as e:
+            return web.json_response({"error": f"Invalid batch: {e}"}, status=400)
+        
+        stats = self.ingestion_stats
+        
+        if len(records) > self.ingest_queue_size:
+            stats.rejected_batches += 1
+            stats.rejected_events += len(records)
+            INGESTED_EVENTS.labels("rejected").inc(len(records))
+            return web.json_response(
+                {"error": "Batch is larger than the ingestion queue", "max_batch_events": self.ingest_queue_size},
+                status=413
+            )
+        
+        if stats.queue_depth + len(records) > self.ingest_queue_size:
+            stats.rejected_batches += 1
+            stats.rejected_events += len(records)
+            INGESTED_EVENTS.labels("rejected").inc(len(records))
+            return web.json_response(
+                {"error": "Ingestion queue is full", "queue_depth": stats.queue_depth},
+                status=429,
+                headers={"Retry-After": "1"}
+            )
+        
+        self._ingest_batches.append(records)
+        stats.accepted_batches += 1
+        stats.accepted_events += len(records)
+        stats.queue_depth += len(records)
+        INGESTED_EVENTS.labels("accepted").inc(len(records))
+        stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+        self._ingest_ready.set()
+        
+        return web.json_response({"accepted": len(records), "queue_depth": stats.queue_depth}, status=202)
+    
+    def _parse_batch(self, body: bytes) -> List[Dict[str, Any]]:
+        """Разбирает тело пакета: JSON-массив или NDJSON"""
+        body = body.strip()
+        if not body:
+            return []
+        
+        if body[:1] == b"[":
+            records = json.loads(body)
+            if not isinstance(records, list):
+                raise ValueError("expected a JSON array")
+            return records
+        
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    
+    def _events_from_records(self, records: List[Dict[str, Any]]) -> List[ExecutionEvent]:
+        """Пакетно превращает записи webhook'а в события"""
+        now = datetime.now()
+        stamp = int(time.time())
+        events = []
+        
+        for record in records:
+            # Поля приходят от клиента: неверный тип любого из них - запись отбрасывается
+            try:
+                event_type = _EVENT_TYPES[record.get('eventType', 'execution_completed')]
+                severity = _SEVERITIES[record.get('severity', 'info')]
+                execution_id = _optional_str(record.get('executionId'))
+                workflow_id = _optional_str(record.get('workflowId'))
+                error_type = _optional_str(record.get('errorType'))
+                error_message = _optional_str(record.get('errorMessage'))
+                node_name = _optional_str(record.get('nodeName'))
+                duration = _optional_float(record.get('duration'))
+                instance = _optional_str(record.get('instance'))
+            except (KeyError, AttributeError, TypeError, ValueError):
+                self.ingestion_stats.invalid_events += 1
+                INGESTED_EVENTS.labels("invalid").inc()
+                continue
+            
+            events.append(ExecutionEvent(
+                id=f"webhook_{execution_id or 'unknown'}_{stamp}",
+                event_type=event_type,
+                severity=severity,
+                workflow_id=workflow_id or 'unknown',
+                execution_id=execution_id,
+                timestamp=now,
+                error_type=error_type,
+                error_message=error_message,
+                node_name=node_name,
+                duration=duration,
+                instance=instance or DEFAULT_INSTANCE
+            ))
+        
+        return events
+    
+    async def _ingestion_loop(self):
+        """Обрабатывает пакеты из очереди приема"""
+        while self.is_running:
+            if not self._ingest_batches:
+                self._ingest_ready.clear()
+                try:
+                    await asyncio.wait_for(self._ingest_ready.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            records = self._ingest_batches.popleft()
+            self.ingestion_stats.queue_depth -= len(records)
+            
+            try:
+                events = self._events_from_records(records)
+                await self._add_events(events)
+                
+                for instance in {event.instance for event in events if event.has_errors()}:
+                    self.notify(instance)
+                    
+            except Exception as e:
+                logger.error(f"❌ Batch ingestion error: {e}")
+            
+            self._update_ingestion_rate(len(records))
+    
+    def _update_ingestion_rate(self, count: int):
+        """Обновляет счетчики обработанных событий и скорость приема"""
+        self.ingestion_stats.processed_events += count
+        self._rate_window_events += count
+        
+        elapsed = time.monotonic() - self._rate_window_start
+        if elapsed >= 1.0:
+            self.ingestion_stats.events_per_second = self._rate_window_events / elapsed
+            self._rate_window_start = time.monotonic()
+            self._rate_window_events = 0
+    
     async def _webhook_health(self, request):
         """Health check для webhook сервера"""
         return web.json_response({
             "status": "healthy",
             "uptime": str(datetime.now() - self.last_poll_time),
-            "events_processed": len(self.recent_events)
+            "events_processed": len(self.recent_events),
+            "instances": {
+                name: instance.last_poll_time.isoformat()
+                for name, instance in self.instances.items()
+            },
+            "ingestion": asdict(self.ingestion_stats)
         })
     
+    def get_ingestion_stats(self) -> IngestionStats:
+        """Возвращает статистику приема событий"""
+        return self.ingestion_stats
+    
     async def get_recent_events(self, limit: int = 50, event_types: List[EventType] = None) -> List[ExecutionEvent]:
         """Получает последние события"""
         events = list(self.recent_events)
@@ -489,6 +1216,12 @@ class ExecutionMonitor:
         error_types = [EventType.EXECUTION_FAILED, EventType.NODE_ERROR, EventType.EXECUTION_TIMEOUT]
         return await self.get_recent_events(limit, error_types)
     
+    def get_error_rates(self, by: str = "workflow", window: str = "15m") -> Dict[Optional[str], float]:
+        """Error rate по группам за окно (нужно хранилище событий)"""
+        if self.event_store is None:
+            return {}
+        return self.event_store.error_rate(by=by, window=window)
+    
     def get_stats(self) -> MonitoringStats:
         """Возвращает статистику мониторинга"""
         return self.stats
@@ -503,9 +1236,62 @@ class ExecutionMonitor:
         logger.info(f"🔧 Updated anomaly thresholds: {thresholds}")
     
     async def force_poll(self):
-        """Принудительно выполняет polling"""
+        """Принудительно выполняет polling всех инстансов"""
         logger.info("🔄 Force polling executions...")
-        await self._poll_executions()
+        await asyncio.gather(*[self._poll_executions(instance) for instance in self.instances.values()])
+    
+    def replay_events(self, from_offset: int = 0, limit: Optional[int] = None) -> int:
+        """Проигрывает события из журнала в монитор начиная с offset'а"""
+        if not self.event_log:
+            return 0
+        
+        replayed = 0
+        batch = []
+        for offset, record in self.event_log.read_from(from_offset, limit):
+            event = ExecutionEvent.from_dict(record, offset=offset)
+            self.recent_events.append(event)
+            self._apply_replayed_event(event)
+            batch.append(event)
+            replayed += 1
+            
+            if len(batch) >= 10000:
+                self._store_replayed(batch)
+                batch = []
+        self._store_replayed(batch)
+        
+        logger.info(f"📼 Replayed {replayed} events from offset {from_offset}")
+        return replayed
+    
+    def _store_replayed(self, events: List[ExecutionEvent]):
+        """Добавляет проигранные события в хранилище аналитики"""
+        if self.event_store is not None and events:
+            self.event_store.extend(events)
+    
+    def restore_from_log(self) -> int:
+        """
+        Восстанавливает последние события и известные выполнения из журнала
+        
+        Проигрывается не больше replay_limit событий (но не меньше recent_events):
+        старт не должен читать весь журнал, даже если хранилище аналитики вмещает больше.
+        """
+        keep = max(self.recent_events.maxlen, self.replay_limit)
+        from_offset = max(0, self.event_log.next_offset - keep)
+        return self.replay_events(from_offset)
+    
+    def _apply_replayed_event(self, event: ExecutionEvent):
+        """Обновляет кэш выполнений инстанса по проигранному событию"""
+        instance = self.instances.get(event.instance)
+        if not event.execution_id or instance is None:
+            return
+        
+        # Состояние восстановлено: следующий опрос обрабатывает выполнения, а не запоминает историю
+        instance.initialized = True
+        if event.event_type == EventType.EXECUTION_STARTED:
+            instance.known_executions.add(event.execution_id)
+        elif event.event_type in [EventType.EXECUTION_COMPLETED, EventType.EXECUTION_FAILED]:
+            instance.known_executions.add(event.execution_id)
+            if "status" in event.metadata:
+                instance.execution_states[event.execution_id] = event.metadata["status"]
     
     def clear_events(self):
         """Очищает события (для тестирования)"""
@@ -29,13 +29,20 @@ from enum import Enum
 import uuid
 
 # Импорты компонентов системы
-from connector import N8NConnector
-from monitor import ExecutionMonitor, ExecutionEvent
-from analyzer import ErrorAnalyzer, ErrorAnalysis
+from connector import N8NConnector, ConnectorFleet, DEFAULT_INSTANCE
+from monitor import ExecutionMonitor, ExecutionEvent, EventType, AdaptivePollScheduler
+from event_log import EventLog
+from event_store import EventStore
+from profiler import WorkflowProfiler
+from snapshots import WorkflowSnapshots
+from analyzer import ErrorAnalyzer, ErrorAnalysis, AnalysisRequest, FixType
+from analysis_cache import AnalysisCache
 from fixer import AutoFixer, FixResult
 from test_harness import TestHarness, TestResult
 from audit import AuditLogger, AuditEntry
 from notifier import NotificationService, NotificationLevel
+from metrics import REGISTRY, MetricsServer
+from fingerprint import fingerprint_error
 
 # Настройка логирования
 logging.basicConfig(
@@ -48,6 +55,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Метрики оркестратора
+INCIDENTS_CREATED = REGISTRY.counter(
+    "n8n_orchestrator_incidents_created", "Created incidents by instance and severity", ["instance", "severity"]
+)
+INCIDENTS_DEDUPLICATED = REGISTRY.counter(
+    "n8n_orchestrator_incidents_deduplicated", "Errors folded into an active incident with the same fingerprint", ["instance"]
+)
+INCIDENTS_CLOSED = REGISTRY.counter("n8n_orchestrator_incidents_closed", "Closed incidents by outcome", ["outcome"])
+INCIDENTS_ACTIVE = REGISTRY.gauge("n8n_orchestrator_incidents_active", "Currently active incidents")
+RESOLUTION_TIME = REGISTRY.histogram(
+    "n8n_orchestrator_resolution_seconds", "Time from incident creation to resolution",
+    buckets=(10, 30, 60, 120, 300, 600, 1800, 3600)
+)
+CYCLE_DURATION = REGISTRY.histogram("n8n_orchestrator_cycle_duration_seconds", "Duration of one orchestration cycle")
+UPTIME = REGISTRY.gauge("n8n_orchestrator_uptime_seconds", "Seconds since orchestrator start")
+SUCCESS_RATE = REGISTRY.gauge("n8n_orchestrator_success_rate", "Share of incidents resolved automatically")
+
 class SystemState(Enum):
     """Состояния системы"""
     INITIALIZING = "initializing"
@@ -84,6 +108,11 @@ class Incident:
     resolved_at: Optional[datetime] = None
     escalated: bool = False
     escalated_at: Optional[datetime] = None
+    instance: str = DEFAULT_INSTANCE
+    node_name: Optional[str] = None
+    fingerprint: Optional[str] = None
+    occurrences: int = 1
+    last_seen_at: Optional[datetime] = None
 
 @dataclass
 class SystemMetrics:
@@ -118,8 +147,20 @@ class AutonomousOrchestrator:
         self.active_incidents: Dict[str, Incident] = {}
         self.incident_history: List[Incident] = []
         
+        # Активный инцидент по (инстанс, отпечаток ошибки): шторм одинаковых ошибок - один инцидент
+        self.incidents_by_fingerprint: Dict[Tuple[str, str], str] = {}
+        
+        # События подписки, обработка которых не дошла до ack: упавшее событие и следующие
+        # за ним повторяются в следующем цикле мониторинга
+        self._pending_events: List[ExecutionEvent] = []
+        self._pending_attempts = 0
+        
         # Метрики
         self.metrics = SystemMetrics(last_updated=datetime.now())
+        self.metrics_server: Optional[MetricsServer] = None
+        INCIDENTS_ACTIVE.set_function(lambda: len(self.active_incidents))
+        UPTIME.set_function(lambda: (datetime.now() - self.start_time).total_seconds())
+        SUCCESS_RATE.set_function(lambda: self.metrics.success_rate)
         
         # Инициализация компонентов
         self._initialize_components()
@@ -168,33 +209,65 @@ class AutonomousOrchestrator:
     def _initialize_components(self):
         """Инициализирует все компоненты системы"""
         try:
-            # N8N Connector
-            self.connector = N8NConnector(
-                api_url=self.config.get("integrations", {}).get("n8n", {}).get("api_url"),
-                ssh_host=self.config.get("integrations", {}).get("n8n", {}).get("ssh_host")
-            )
+            # N8N Connectors: один или несколько инстансов с общими ресурсами
+            self.connectors = ConnectorFleet.from_config(self.config.get("integrations", {}))
+            self.connector = self.connectors.primary
+            
+            # Profiler (тайминги нод из runData)
+            self.profiler = self._create_profiler()
             
             # Execution Monitor
             self.monitor = ExecutionMonitor(
                 connector=self.connector,
-                poll_interval=self.config["monitoring"]["poll_interval_seconds"]
+                connectors=list(self.connectors),
+                poll_interval=self.config["monitoring"]["poll_interval_seconds"],
+                event_log=self._create_event_log(),
+                scheduler_factory=self._create_poll_scheduler,
+                event_store=self._create_event_store(),
+                profiler=self.profiler,
+                webhook_config=self.config["monitoring"].get("webhook"),
+                max_concurrency=self.config.get("performance", {}).get("max_concurrent_operations", 5),
+                error_batch_size=self.config["monitoring"].get("error_batch_size", 10),
+                replay_limit=self.config["monitoring"].get("event_log", {}).get("replay_events", 10000)
             )
+            self.monitor.anomaly_window = self.config["monitoring"].get("event_store", {}).get("anomaly_window", "15m")
             
             # Error Analyzer
             self.analyzer = ErrorAnalyzer(
-                config=self.config.get("repair_strategies", {})
+                config={
+                    **self.config.get("repair_strategies", {}),
+                    "batch_analysis": self.config.get("batch_analysis", {}),
+                    "strategy_learning": self.config.get("strategy_learning", {}),
+                    "error_clustering": self.config.get("error_clustering", {}),
+                    "learned_classifier": self.config.get("learned_classifier", {})
+                },
+                cache=self._create_analysis_cache()
             )
             
+            # Локальные копии активных workflow'ов (загружаются при старте мониторинга)
+            self.snapshots = self._create_snapshots()
+            
             # Auto Fixer
             self.fixer = AutoFixer(
                 connector=self.connector,
-                config=self.config.get("repair_strategies", {})
+                config={
+                    **self.config.get("repair_strategies", {}),
+                    "backup_store": self.config.get("backup_store", {}),
+                    "fix_ledger": self.config.get("fix_ledger", {}),
+                    "simulation": self.config.get("fix_simulation", {}),
+                    "tuning": self.config.get("fix_tuning", {}),
+                    "performance": self.config.get("performance_fixes", {})
+                },
+                connectors=self.connectors.connectors,
+                snapshots=self.snapshots,
+                profiler=self.profiler
             )
             
             # Test Harness
             self.test_harness = TestHarness(
                 connector=self.connector,
-                config=self.config.get("testing", {})
+                config=self.config.get("testing", {}),
+                connectors=self.connectors.connectors
             )
             
             # Audit Logger
@@ -213,6 +286,84 @@ class AutonomousOrchestrator:
             logger.error(f"❌ Failed to initialize components: {e}")
             raise
     
+    def _create_event_log(self) -> Optional[EventLog]:
+        """Создает персистентный журнал событий монитора"""
+        log_config = self.config["monitoring"].get("event_log", {})
+        if not log_config.get("enabled", False):
+            return None
+        
+        retention_gb = log_config.get("retention_gb")
+        
+        return EventLog(
+            directory=log_config.get("directory", "data/event_log"),
+            segment_max_bytes=int(log_config.get("segment_size_mb", 64) * 1024 * 1024),
+            fsync_interval=log_config.get("fsync_interval_seconds", 1.0),
+            fsync_batch=log_config.get("fsync_batch", 256),
+            retention_bytes=int(retention_gb * 1024 ** 3) if retention_gb else None
+        )
+    
+    def _create_event_store(self) -> Optional[EventStore]:
+        """Создает колоночное хранилище событий для аналитики"""
+        store_config = self.config["monitoring"].get("event_store", {})
+        if not store_config.get("enabled", False):
+            return None
+        
+        return EventStore(capacity=store_config.get("capacity", 1_000_000))
+    
+    def _create_analysis_cache(self) -> AnalysisCache:
+        """Создает кэш анализов (с SQLite хранилищем для прогрева после рестарта)"""
+        cache_config = self.config.get("analysis_cache", {})
+        ttl_hours = cache_config.get("ttl_hours", 24)
+        max_mb = cache_config.get("max_mb")
+        
+        return AnalysisCache(
+            max_entries=cache_config.get("max_entries", 10000),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours else None,
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+            path=cache_config.get("path", "data/analysis_cache.sqlite3") if cache_config.get("persistent", True) else None,
+            serialize=ErrorAnalysis.to_dict,
+            deserialize=ErrorAnalysis.from_dict
+        )
+    
+    def _create_profiler(self) -> Optional[WorkflowProfiler]:
+        """Создает профайлер нод workflow'ов"""
+        profiler_config = self.config.get("profiler", {})
+        if not profiler_config.get("enabled", False):
+            return None
+        
+        return WorkflowProfiler(
+            connector=self.connector,
+            config=profiler_config,
+            connectors=self.connectors.connectors
+        )
+    
+    def _create_snapshots(self) -> Optional[WorkflowSnapshots]:
+        """Создает сервис локальных копий workflow'ов для исправителя"""
+        snapshot_config = self.config.get("workflow_snapshots", {})
+        if not snapshot_config.get("enabled", False):
+            return None
+        
+        return WorkflowSnapshots(
+            connectors=self.connectors.connectors,
+            active_only=snapshot_config.get("active_only", True),
+            prefetch=snapshot_config.get("prefetch", 50)
+        )
+    
+    def _create_poll_scheduler(self) -> AdaptivePollScheduler:
+        """Создает планировщик опросов монитора"""
+        poll_interval = self.config["monitoring"]["poll_interval_seconds"]
+        polling_config = self.config["monitoring"].get("adaptive_polling", {})
+        
+        if not polling_config.get("enabled", False):
+            return AdaptivePollScheduler.fixed(poll_interval)
+        
+        return AdaptivePollScheduler(
+            min_interval=polling_config.get("min_interval_seconds", 5),
+            max_interval=polling_config.get("max_interval_seconds", 60),
+            backoff_factor=polling_config.get("backoff_factor", 2.0),
+            jitter=polling_config.get("jitter", 0.1)
+        )
+    
     def _signal_handler(self, signum, frame):
         """Обработчик сигналов для graceful shutdown"""
         logger.info(f"📡 Received signal {signum}, initiating shutdown...")
@@ -245,6 +396,12 @@ class AutonomousOrchestrator:
                 NotificationLevel.INFO
             )
             
+            # Экспорт метрик для Prometheus
+            await self._start_metrics_server()
+            
+            # Подписываемся на ошибки и запускаем монитор в фоне
+            await self._start_monitoring()
+            
             # Основной цикл
             while not self.shutdown_requested:
                 cycle_start = time.time()
@@ -266,6 +423,7 @@ class AutonomousOrchestrator:
                     
                     # 5. Обновление метрик
                     self._update_metrics()
+                    CYCLE_DURATION.observe(time.time() - cycle_start)
                     
                 except Exception as e:
                     logger.error(f"💥 Error in orchestration cycle: {e}")
@@ -298,19 +456,20 @@ class AutonomousOrchestrator:
         """Проверяет здоровье всех компонентов системы"""
         logger.info("🔍 Performing system health check...")
         
-        health_status = {
-            "n8n": False,
-            "postgresql": False,
-            "mcp_server": False,
-            "components": False
-        }
+        health_status = {}
+        healthy_instances = 0
         
         try:
-            # Проверка N8N
-            health_status["n8n"] = await self.connector.health_check()
-            
-            # Проверка PostgreSQL
-            health_status["postgresql"] = await self.connector.database_health_check()
+            # Проверка N8N и PostgreSQL каждого инстанса (параллельно)
+            checks = await asyncio.gather(*[
+                asyncio.gather(connector.health_check(), connector.database_health_check())
+                for connector in self.connectors
+            ])
+            for connector, (n8n_ok, db_ok) in zip(self.connectors, checks):
+                suffix = "" if len(self.connectors) == 1 else f"[{connector.instance}]"
+                health_status[f"n8n{suffix}"] = n8n_ok
+                health_status[f"postgresql{suffix}"] = db_ok
+                healthy_instances += n8n_ok and db_ok
             
             # Проверка MCP Server
             health_status["mcp_server"] = await self.connector.mcp_server_health_check()
@@ -325,7 +484,12 @@ class AutonomousOrchestrator:
                 self.notifier is not None
             ])
             
-            overall_health = all(health_status.values())
+            # Недоступный инстанс не останавливает мониторинг остальных
+            overall_health = (
+                healthy_instances > 0
+                and health_status["mcp_server"]
+                and health_status["components"]
+            )
             
             # Логирование результатов
             for component, status in health_status.items():
@@ -347,23 +511,88 @@ class AutonomousOrchestrator:
             logger.error(f"💥 Health check error: {e}")
             return False
     
+    async def _start_metrics_server(self):
+        """Запускает эндпоинт /metrics, если экспорт включен"""
+        metrics_config = self.config.get("metrics", {})
+        if not metrics_config.get("export_prometheus", False):
+            return
+        
+        self.metrics_server = MetricsServer(
+            host=metrics_config.get("prometheus_host", "0.0.0.0"),
+            port=metrics_config.get("prometheus_port", 9464)
+        )
+        try:
+            await self.metrics_server.start()
+        except OSError as e:
+            logger.error(f"❌ Failed to start metrics endpoint: {e}")
+            self.metrics_server = None
+    
+    async def _start_monitoring(self):
+        """Подключается к инстансам N8N, подписывается на события ошибок и запускает монитор"""
+        await self.connectors.connect()
+        
+        # Все активные workflow'ы одним курсором: исправления не ждут чтения из БД
+        if self.snapshots:
+            await self.snapshots.load()
+            self._last_snapshot_refresh = time.time()
+        
+        monitoring_config = self.config["monitoring"]
+        self.event_subscription = await self.monitor.subscribe(
+            "orchestrator",
+            maxsize=monitoring_config.get("subscription_queue_size", 1000),
+            event_types=[EventType.EXECUTION_FAILED, EventType.NODE_ERROR, EventType.EXECUTION_TIMEOUT]
+        )
+        
+        self._monitor_task = asyncio.create_task(
+            self.monitor.start(enable_webhook=monitoring_config.get("realtime_monitoring", False))
+        )
+        
+        # Пакетное профилирование истории в фоне: распределения готовы до накопления живых данных
+        history_limit = self.config.get("profiler", {}).get("history_executions", 0)
+        if self.profiler and history_limit:
+            self._profile_history_task = asyncio.create_task(self.profiler.profile_history(limit=history_limit))
+    
     async def _monitoring_phase(self):
         """Фаза мониторинга - детекция новых проблем"""
         self.state = SystemState.MONITORING
         
-        try:
-            # Получаем события от монитора
-            events = await self.monitor.get_recent_events()
-            
-            for event in events:
-                if event.has_errors():
-                    await self._handle_execution_error(event)
-            
-        except Exception as e:
-            logger.error(f"❌ Monitoring phase error: {e}")
+        # Забираем только новые события: каждое доставляется один раз. ack подтверждает все
+        # offset'ы до события включительно, поэтому после упавшего события обработка
+        # останавливается, а оно и следующие остаются неподтвержденными до следующего цикла
+        events = self._pending_events + self.event_subscription.drain()
+        retried = self._pending_events[0] if self._pending_events else None
+        self._pending_events = []
+        max_attempts = self.config["monitoring"].get("event_max_attempts", 3)
+        
+        for index, event in enumerate(events):
+            try:
+                await self._handle_execution_error(event)
+            except Exception as e:
+                attempts = self._pending_attempts + 1 if event is retried else 1
+                if attempts < max_attempts:
+                    logger.error(f"❌ Failed to handle event {event.offset} "
+                                 f"(attempt {attempts}/{max_attempts}): {e}")
+                    self._pending_events = events[index:]
+                    self._pending_attempts = attempts
+                    return
+                logger.error(f"❌ Giving up on event {event.offset} after {attempts} attempts: {e}")
+            self.event_subscription.ack(event.offset)
+        self._pending_attempts = 0
     
     async def _handle_execution_error(self, event: ExecutionEvent):
-        """Обрабатывает ошибку выполнения"""
+        """Обрабатывает ошибку выполнения (повтор активной ошибки добавляется к ее инциденту)"""
+        fingerprint, _ = fingerprint_error(event.workflow_id, event.error_type, event.error_message, event.node_name)
+        
+        existing_id = self.incidents_by_fingerprint.get((event.instance, fingerprint))
+        existing = self.active_incidents.get(existing_id) if existing_id else None
+        if existing is not None:
+            existing.occurrences += 1
+            existing.last_seen_at = datetime.now()
+            existing.execution_id = event.execution_id
+            INCIDENTS_DEDUPLICATED.labels(event.instance).inc()
+            logger.debug(f"🔁 Error folded into incident {existing.id} ({existing.occurrences} occurrences)")
+            return
+        
         incident_id = str(uuid.uuid4())
         
         # Определяем серьезность
@@ -377,15 +606,20 @@ class AutonomousOrchestrator:
             severity=severity,
             error_type=event.error_type,
             description=event.error_message,
-            created_at=datetime.now()
+            created_at=datetime.now(),
+            instance=event.instance,
+            node_name=event.node_name,
+            fingerprint=fingerprint
         )
         
         self.active_incidents[incident_id] = incident
+        self.incidents_by_fingerprint[(incident.instance, fingerprint)] = incident_id
+        INCIDENTS_CREATED.labels(incident.instance, severity.value).inc()
         
         # Логируем инцидент
         await self.audit.log_incident_created(incident)
         
-        logger.warning(f"🚨 New incident detected: {incident_id} ({severity.value})")
+        logger.warning(f"🚨 New incident detected: {incident_id} ({severity.value}, instance {incident.instance})")
         
         # Уведомляем о критичных инцидентах
         if severity in [IncidentSeverity.CRITICAL, IncidentSeverity.EMERGENCY]:
@@ -396,14 +630,16 @@ class AutonomousOrchestrator:
     
     def _determine_severity(self, event: ExecutionEvent) -> IncidentSeverity:
         """Определяет серьезность инцидента"""
+        error_message = (event.error_message or "").lower()
+        
         # Простая логика определения серьезности
-        if "authentication" in event.error_message.lower():
+        if "authentication" in error_message:
             return IncidentSeverity.HIGH
-        elif "timeout" in event.error_message.lower():
+        elif "timeout" in error_message:
             return IncidentSeverity.MEDIUM
-        elif "network" in event.error_message.lower():
+        elif "network" in error_message:
             return IncidentSeverity.MEDIUM
-        elif "critical" in event.error_message.lower():
+        elif "critical" in error_message:
             return IncidentSeverity.CRITICAL
         else:
             return IncidentSeverity.LOW
@@ -412,6 +648,7 @@ class AutonomousOrchestrator:
         """Фаза анализа - анализ активных инцидентов"""
         self.state = SystemState.ANALYZING
         
+        pending = []
         for incident_id, incident in list(self.active_incidents.items()):
             try:
                 # Проверяем cooldown
@@ -423,13 +660,31 @@ class AutonomousOrchestrator:
                     await self._escalate_incident(incident)
                     continue
                 
-                # Анализируем ошибку
-                analysis = await self.analyzer.analyze_error(
-                    incident.workflow_id,
-                    incident.error_type,
-                    incident.description
+                pending.append((incident_id, incident))
+            except Exception as e:
+                logger.error(f"❌ Analysis error for incident {incident_id}: {e}")
+        
+        if not pending:
+            return
+        
+        # Все ошибки цикла анализируются одним пакетом (всплеск не блокирует event loop)
+        try:
+            analyses = await self.analyzer.analyze_errors([
+                AnalysisRequest(
+                    workflow_id=incident.workflow_id,
+                    error_type=incident.error_type,
+                    error_message=incident.description,
+                    node_name=incident.node_name,
+                    execution_id=incident.execution_id
                 )
-                
+                for _, incident in pending
+            ])
+        except Exception as e:
+            logger.error(f"❌ Batch analysis failed for {len(pending)} incidents: {e}")
+            return
+        
+        for (incident_id, incident), analysis in zip(pending, analyses):
+            try:
                 # Планируем исправление если уверенность достаточная
                 if analysis.confidence >= self.config["security"]["auto_apply_threshold"]:
                     incident.analysis = analysis
@@ -453,39 +708,72 @@ class AutonomousOrchestrator:
         return time_since_last_attempt.total_seconds() < cooldown_seconds
     
     async def _fixing_phase(self):
-        """Фаза исправления - применение исправлений"""
+        """Фаза исправления - применение исправлений (одна транзакция на workflow)"""
         self.state = SystemState.FIXING
         
-        for incident_id, incident in list(self.active_incidents.items()):
+        # Инциденты одного workflow'а исправляются вместе: один backup, одна
+        # запись, один перезапуск и одна проверка вместо отдельных на каждый
+        groups: Dict[Tuple[str, str], List[Incident]] = {}
+        for incident in list(self.active_incidents.values()):
+            # Пропускаем инциденты без анализа или в cooldown
+            if not hasattr(incident, 'analysis') or self._is_in_cooldown(incident):
+                continue
+            groups.setdefault((incident.instance, incident.workflow_id), []).append(incident)
+        
+        for (instance, workflow_id), incidents in groups.items():
             try:
-                # Пропускаем инциденты без анализа или в cooldown
-                if not hasattr(incident, 'analysis') or self._is_in_cooldown(incident):
-                    continue
+                for incident in incidents:
+                    incident.attempts += 1
+                    incident.last_attempt_at = datetime.now()
+                    logger.info(f"🔧 Applying fix for incident {incident.id} (attempt {incident.attempts})")
                 
-                # Применяем исправление
-                incident.attempts += 1
-                incident.last_attempt_at = datetime.now()
+                fix_results = await self.fixer.apply_fixes(
+                    workflow_id,
+                    [incident.analysis for incident in incidents],
+                    instance=instance
+                )
                 
-                logger.info(f"🔧 Applying fix for incident {incident_id} (attempt {incident.attempts})")
+                applied = []
+                for incident, fix_result in zip(incidents, fix_results):
+                    if fix_result.success:
+                        applied.append((incident, fix_result))
+                    else:
+                        self._record_fix_outcome(incident, False, fix_result)
+                        logger.error(f"❌ Fix application failed for incident {incident.id}: {fix_result.error}")
                 
-                fix_result = await self.fixer.apply_fix(
-                    incident.workflow_id,
-                    incident.analysis
-                )
+                if not applied:
+                    continue
                 
-                if fix_result.success:
-                    # Тестируем исправление
-                    test_result = await self._test_fix(incident, fix_result)
+                # Тестируем исправления одним прогоном workflow'а
+                test_result = await self._test_fix(*applied[0])
+                
+                for incident, fix_result in applied:
+                    self._record_fix_outcome(incident, test_result.success, fix_result)
                     
                     if test_result.success:
                         await self._resolve_incident(incident)
                     else:
-                        logger.warning(f"⚠️ Fix test failed for incident {incident_id}")
-                else:
-                    logger.error(f"❌ Fix application failed for incident {incident_id}: {fix_result.error}")
+                        logger.warning(f"⚠️ Fix test failed for incident {incident.id}")
                 
             except Exception as e:
-                logger.error(f"❌ Fixing error for incident {incident_id}: {e}")
+                logger.error(f"❌ Fixing error for workflow {workflow_id} ({len(incidents)} incidents): {e}")
+    
+    def _record_fix_outcome(self, incident: Incident, success: bool, fix_result: Optional[FixResult] = None):
+        """Передает результат исправления анализатору для обучения выбору стратегий"""
+        analysis = getattr(incident, "analysis", None)
+        if analysis is None or analysis.suggested_fix is None:
+            return
+        # Симуляция могла выбрать альтернативную стратегию - учитывается примененная
+        fix_type = analysis.suggested_fix.fix_type
+        if fix_result is not None and "fix_type" in fix_result.metadata:
+            fix_type = FixType(fix_result.metadata["fix_type"])
+        self.analyzer.record_fix_result(
+            analysis.error_id,
+            fix_type,
+            success,
+            category=analysis.category,
+            node_type=analysis.metadata.get("node_type")
+        )
     
     async def _test_fix(self, incident: Incident, fix_result: FixResult) -> TestResult:
         """Тестирует примененное исправление"""
@@ -495,7 +783,8 @@ class AutonomousOrchestrator:
             # Тестируем в staging среде
             test_result = await self.test_harness.test_workflow(
                 incident.workflow_id,
-                test_type="fix_validation"
+                test_type="fix_validation",
+                instance=incident.instance
             )
             
             return test_result
@@ -511,7 +800,9 @@ class AutonomousOrchestrator:
         
         # Перемещаем в историю
         self.incident_history.append(incident)
-        del self.active_incidents[incident.id]
+        self._remove_active_incident(incident)
+        INCIDENTS_CLOSED.labels("resolved").inc()
+        RESOLUTION_TIME.observe((incident.resolved_at - incident.created_at).total_seconds())
         
         # Логируем разрешение
         await self.audit.log_incident_resolved(incident)
@@ -524,12 +815,19 @@ class AutonomousOrchestrator:
             NotificationLevel.INFO
         )
     
+    def _remove_active_incident(self, incident: Incident):
+        """Убирает инцидент из активных (новые ошибки с тем же отпечатком откроют новый)"""
+        del self.active_incidents[incident.id]
+        if self.incidents_by_fingerprint.get((incident.instance, incident.fingerprint)) == incident.id:
+            del self.incidents_by_fingerprint[(incident.instance, incident.fingerprint)]
+    
     async def _escalate_incident(self, incident: Incident):
         """Эскалирует инцидент"""
         self.state = SystemState.ESCALATING
         
         incident.escalated = True
         incident.escalated_at = datetime.now()
+        INCIDENTS_CLOSED.labels("escalated").inc()
         
         # Логируем эскалацию
         await self.audit.log_incident_escalated(incident)
@@ -539,15 +837,17 @@ class AutonomousOrchestrator:
         # Отправляем уведомление об эскалации
         await self.notifier.send_notification(
             f"⬆️ ESCALATION: Incident {incident.id} requires manual intervention\n"
+            f"Instance: {incident.instance}\n"
             f"Workflow: {incident.workflow_id}\n"
             f"Error: {incident.description}\n"
-            f"Attempts: {incident.attempts}",
+            f"Attempts: {incident.attempts}\n"
+            f"Occurrences: {incident.occurrences}",
             NotificationLevel.CRITICAL
         )
         
         # Перемещаем в историю
         self.incident_history.append(incident)
-        del self.active_incidents[incident.id]
+        self._remove_active_incident(incident)
     
     async def _request_approval(self, incident: Incident, analysis: ErrorAnalysis):
         """Запрашивает ручное подтверждение для исправления"""
@@ -556,6 +856,7 @@ class AutonomousOrchestrator:
         approval_message = (
             f"🤖 APPROVAL REQUIRED\n\n"
             f"Incident: {incident.id}\n"
+            f"Instance: {incident.instance}\n"
             f"Workflow: {incident.workflow_id}\n"
             f"Error: {incident.description}\n"
             f"Proposed fix: {analysis.suggested_fix}\n"
@@ -580,6 +881,34 @@ class AutonomousOrchestrator:
         if (current_time - self._last_health_check).total_seconds() >= health_check_interval:
             await self._system_health_check()
             self._last_health_check = current_time
+            
+            # Снимок обучения выбору стратегий переживает аварийный рестарт
+            self.analyzer.save_learning_state()
+            
+            self.fixer.cleanup_old_backups(self.config.get("backup_store", {}).get("retention_days", 7))
+        
+        # Перечитываем изменившиеся workflow'ы (запрос версий + содержимое только изменившихся)
+        if self.snapshots:
+            refresh_interval = self.config.get("workflow_snapshots", {}).get("refresh_interval_seconds", 60)
+            if time.time() - getattr(self, "_last_snapshot_refresh", 0) >= refresh_interval:
+                await self.snapshots.refresh()
+                self._last_snapshot_refresh = time.time()
+        
+        # Исправления производительности по профилю нод и проверка до/после уже примененных
+        performance_config = self.config.get("performance_fixes", {})
+        if self.profiler and performance_config.get("enabled", False):
+            for report in await self.fixer.check_benchmarks():
+                if report["verdict"] == "regressed":
+                    await self.notifier.send_notification(
+                        f"📊 Performance fix {report['fix_type']} on {report['node']} (workflow {report['workflow_id']}) "
+                        f"slowed the workflow down by {report['change']:.0%}"
+                        + (", rolled back" if report["rolled_back"] else ""),
+                        NotificationLevel.WARNING
+                    )
+            
+            if time.time() - getattr(self, "_last_performance_pass", 0) >= performance_config.get("interval_seconds", 3600):
+                await self._optimize_performance(performance_config.get("max_fixes_per_cycle", 3))
+                self._last_performance_pass = time.time()
         
         # Очистка старых инцидентов из истории
         cutoff_time = current_time - timedelta(days=7)
@@ -588,6 +917,30 @@ class AutonomousOrchestrator:
             if incident.created_at > cutoff_time
         ]
     
+    async def _optimize_performance(self, max_fixes: int):
+        """Исправления производительности workflow'ов, самые долгие (по суммарному времени) первыми"""
+        workflows = sorted(self.profiler.workflow_durations.items(),
+                           key=lambda item: item[1].total, reverse=True)
+        applied = 0
+        for (instance, workflow_id), _ in workflows:
+            if applied >= max_fixes:
+                break
+            try:
+                result = await self.fixer.optimize_workflow(workflow_id, instance)
+            except Exception as e:
+                logger.warning(f"⚠️ Performance pass failed for workflow {workflow_id}: {e}")
+                continue
+            
+            if result is not None and result.success:
+                applied += 1
+                await self.notifier.send_notification(
+                    f"🚀 Performance fix applied to workflow {workflow_id}: {result.description}",
+                    NotificationLevel.INFO
+                )
+        
+        if applied:
+            logger.info(f"🚀 Applied {applied} performance fix(es), before/after checks pending")
+    
     def _update_metrics(self):
         """Обновляет метрики системы"""
         total_incidents = len(self.incident_history) + len(self.active_incidents)
@@ -631,12 +984,24 @@ class AutonomousOrchestrator:
             NotificationLevel.INFO
         )
         
+        # Останавливаем монитор
+        await self.monitor.stop()
+        if getattr(self, '_monitor_task', None):
+            self._monitor_task.cancel()
+        if getattr(self, '_profile_history_task', None):
+            self._profile_history_task.cancel()
+        
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        
         # Сохраняем состояние
         await self._save_state()
         
         # Закрываем соединения
-        if hasattr(self, 'connector'):
-            await self.connector.close()
+        if hasattr(self, 'connectors'):
+            await self.connectors.close()
+        self.analyzer.close()
+        self.fixer.close()
         
         logger.info("✅ Graceful shutdown completed")
     
@@ -664,6 +1029,8 @@ class AutonomousOrchestrator:
             "uptime": str(datetime.now() - self.start_time),
             "active_incidents": len(self.active_incidents),
             "metrics": asdict(self.metrics),
+            "time_by_stage": self.profiler.get_stage_breakdown() if self.profiler else {},
+            "error_storms": self.analyzer.get_error_storms(),
             "config_version": self.config.get("versioning", {}).get("config_version", "unknown")
         }
 
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+🚀 PERFORMANCE - Исправления пропускной способности медленных нод
+
+Исправления анализатора чинят ошибки; этот модуль предлагает изменения,
+которые ускоряют работающие workflow'ы. Находки выводятся из профиля
+нод (profiler.py), а не из текста ошибок:
+
+- enable_batching - HTTP Request, который получает много item'ов за
+  выполнение и шлет запрос на каждый: options.batching ограничивает
+  число одновременных запросов (при ошибках ноды - с паузой между
+  пачками), чтобы сервис не отвечал отказами и ограничениями частоты
+- run_once_for_all_items - Code нода в режиме "Run Once for Each Item"
+  на больших списках: код запускается один раз для всех item'ов вместо
+  отдельного запуска песочницы на каждый
+- add_cache - LLM/TTS нода, которой часто приходят одинаковые входы:
+  перед ней ставится поиск ответа в кэше (static data workflow'а),
+  после нее - сохранение ответа
+- split_in_batches - медленная нода на длинных списках item'ов
+  обрабатывает их пачками через Split In Batches
+
+Каждое исправление имеет уровень риска (шаблоны исправителя), а после
+записи проходит проверку до/после: медиана длительности workflow'а по
+выполнениям, начатым после записи исправления, сравнивается с медианой
+до него. Регресс (и, по настройке, отсутствие выигрыша) откатывается.
+Незавершенные проверки хранятся в журнале исправлений и переживают рестарт.
+"""
+
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analyzer import FixType
+from connector import DEFAULT_INSTANCE
+from fix_ledger import FixLedger
+from metrics import REGISTRY
+from profiler import WorkflowProfiler
+from simulator import is_trigger
+from workflow_graph import WorkflowGraph
+
+logger = logging.getLogger(__name__)
+
+PERFORMANCE_BENCHMARKS = REGISTRY.counter(
+    "n8n_performance_benchmarks", "Before/after checks of performance fixes by fix type and verdict",
+    ["fix_type", "verdict"]
+)
+
+HTTP_REQUEST_TYPE = "n8n-nodes-base.httpRequest"
+CODE_TYPE = "n8n-nodes-base.code"
+SPLIT_IN_BATCHES_TYPE = "n8n-nodes-base.splitInBatches"
+
+# Устаревшие обращения к текущему item'у ($node["X"], $item(i), $data,
+# $position, $evaluateExpression), которые обертка RUN_ONCE_FOR_ALL_CODE
+# исправителя не подменяет для каждого item'а: такие Code ноды не переводятся
+LEGACY_ITEM_ACCESSORS = re.compile(r"\$(?:node\b|item\s*\(|data\b|position\b|evaluateExpression\b)")
+
+def runs_once_for_all_items(code: str) -> bool:
+    """Можно ли перевести код из режима по item'ам в один запуск на все item'ы"""
+    return LEGACY_ITEM_ACCESSORS.search(code) is None
+
+# Порядок риска - для отбора исправлений по допустимому уровню
+RISK_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+@dataclass
+class PerformanceFinding:
+    """Медленная нода и исправление, которое должно ее ускорить"""
+    fix_type: FixType
+    node: str
+    parameters: Dict[str, Any]
+    reasons: List[str]
+    # Время ноды на кону: медиана ее длительности за выполнение (секунды)
+    node_seconds: float
+    workload: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "fix_type": self.fix_type.value}
+
+class PerformanceAdvisor:
+    """Находки по профилю нод workflow'а"""
+
+    def __init__(self, profiler: WorkflowProfiler, min_runs: int = 20, min_node_seconds: float = 1.0,
+                 batching_min_items: int = 20, batch_size: int = 10, batch_interval_ms: int = 1000,
+                 code_min_items: int = 10, cache_min_repeat_ratio: float = 0.3,
+                 cache_ttl_seconds: int = 86400, cache_max_entries: int = 1000,
+                 split_min_items: int = 500, split_batch_size: int = 100):
+        """
+        Инициализация
+
+        Args:
+            profiler: Профайлер с распределениями нод
+            min_runs: Минимум выполнений ноды для находки
+            min_node_seconds: Нода медленнее этой медианы (секунды) - кандидат
+            batching_min_items: Медиана item'ов HTTP Request для batching
+            batch_size, batch_interval_ms: Пачка запросов и пауза (пауза - только при ошибках ноды)
+            code_min_items: Медиана item'ов Code ноды для запуска один раз на все item'ы
+            cache_min_repeat_ratio: Доля повторных входов LLM/TTS ноды для кэша
+            cache_ttl_seconds, cache_max_entries: Время жизни и размер кэша
+            split_min_items: p95 item'ов ноды для Split In Batches
+            split_batch_size: Размер пачки Split In Batches
+        """
+        self.profiler = profiler
+        self.min_runs = min_runs
+        self.min_node_seconds = min_node_seconds
+        self.batching_min_items = batching_min_items
+        self.batch_size = batch_size
+        self.batch_interval_ms = batch_interval_ms
+        self.code_min_items = code_min_items
+        self.cache_min_repeat_ratio = cache_min_repeat_ratio
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_max_entries = cache_max_entries
+        self.split_min_items = split_min_items
+        self.split_batch_size = split_batch_size
+
+    def advise(self, graph: WorkflowGraph, workflow_id: str,
+               instance: str = DEFAULT_INSTANCE) -> List[PerformanceFinding]:
+        """Находки по нодам workflow'а, самые медленные ноды первыми (не больше одной на ноду)"""
+        findings = []
+        for node in graph.nodes:
+            workload = self.profiler.get_node_workload(workflow_id, node.name, instance)
+            if workload is None or workload["runs"] < self.min_runs or workload.get("p50", 0.0) < self.min_node_seconds:
+                continue
+            finding = (self._cache(graph, node, workload)
+                       or self._run_once_for_all_items(node, workload)
+                       or self._batching(node, workload)
+                       or self._split_in_batches(graph, node, workload))
+            if finding is not None:
+                findings.append(finding)
+
+        findings.sort(key=lambda finding: finding.node_seconds, reverse=True)
+        return findings
+
+    @staticmethod
+    def _finding(fix_type: FixType, node, workload: Dict[str, Any], parameters: Dict[str, Any],
+                 reasons: List[str]) -> PerformanceFinding:
+        return PerformanceFinding(fix_type=fix_type, node=node.name, parameters={"node_names": [node.name], **parameters},
+                                  reasons=reasons, node_seconds=workload["p50"], workload=workload)
+
+    def _batching(self, node, workload: Dict[str, Any]) -> Optional[PerformanceFinding]:
+        options = node.parameters.get("options")
+        if node.type != HTTP_REQUEST_TYPE or (isinstance(options, dict) and options.get("batching")):
+            return None
+        if workload["items_p50"] < self.batching_min_items:
+            return None
+
+        batch_size = int(min(self.batch_size, workload["items_p50"]))
+        interval_ms = self.batch_interval_ms if workload["failures"] else 0
+        reasons = [f"{workload['items_p50']:.0f} items per execution (median) sent as one request each, "
+                   f"p50 {workload['p50']:.1f}s: at most {batch_size} requests at a time"]
+        if interval_ms:
+            reasons.append(f"{workload['failures']} failures observed: {interval_ms} ms between batches")
+        return self._finding(FixType.ENABLE_BATCHING, node, workload,
+                             {"batch_size": batch_size, "batch_interval_ms": interval_ms}, reasons)
+
+    def _run_once_for_all_items(self, node, workload: Dict[str, Any]) -> Optional[PerformanceFinding]:
+        if node.type != CODE_TYPE or node.parameters.get("mode") != "runOnceForEachItem":
+            return None
+        code = node.parameters.get("jsCode")
+        if node.parameters.get("language", "javaScript") != "javaScript" or not code:
+            return None
+        if workload["items_p50"] < self.code_min_items or not runs_once_for_all_items(code):
+            return None
+        return self._finding(FixType.RUN_ONCE_FOR_ALL_ITEMS, node, workload, {}, [
+            f"code runs once per item on {workload['items_p50']:.0f} items per execution (median), "
+            f"p50 {workload['p50']:.1f}s: one run for all items"
+        ])
+
+    def _cache(self, graph: WorkflowGraph, node, workload: Dict[str, Any]) -> Optional[PerformanceFinding]:
+        ratio = workload.get("repeat_ratio")
+        if ratio is None or ratio < self.cache_min_repeat_ratio or workload["inputs_seen"] < self.min_runs:
+            return None
+        # Кэш ставится на main вход: под-ноды (модели агентов) и триггеры не оборачиваются
+        if not graph.predecessors(node.name, "main") or f"{node.name} Cache Lookup" in graph:
+            return None
+        return self._finding(FixType.ADD_CACHE, node, workload, {
+            "ttl_seconds": self.cache_ttl_seconds,
+            "max_entries": self.cache_max_entries
+        }, [
+            f"{ratio:.0%} of the last {workload['inputs_seen']} inputs repeat an earlier one, "
+            f"p50 {workload['p50']:.1f}s per execution: cache responses for {self.cache_ttl_seconds}s"
+        ])
+
+    def _split_in_batches(self, graph: WorkflowGraph, node, workload: Dict[str, Any]) -> Optional[PerformanceFinding]:
+        if workload["items_p95"] < max(self.split_min_items, self.split_batch_size + 1):
+            return None
+        if node.type == SPLIT_IN_BATCHES_TYPE or is_trigger(node.type):
+            return None
+        predecessors = graph.predecessors(node.name, "main")
+        if not predecessors or any(graph.node(name).type == SPLIT_IN_BATCHES_TYPE for name in predecessors):
+            return None
+        # Выход "done" заменяет только первый выход ноды
+        if any(edge.kind == "main" and edge.source_output > 0 for edge in graph.outgoing.get(node.name, ())):
+            return None
+        return self._finding(FixType.SPLIT_IN_BATCHES, node, workload, {"batch_size": self.split_batch_size}, [
+            f"up to {workload['items_p95']:.0f} items per execution (p95), p95 {workload.get('p95', 0.0):.1f}s: "
+            f"process in batches of {self.split_batch_size}"
+        ])
+
+@dataclass
+class PerformanceBenchmark:
+    """Проверка исправления: длительности workflow'а до и после записи"""
+    fix_id: str
+    fix_type: str
+    workflow_id: str
+    instance: str
+    node: str
+    before: List[float]
+    # Момент записи исправления: "после" - выполнения, начатые не раньше него
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def before_p50(self) -> float:
+        return float(np.median(self.before))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PerformanceBenchmark":
+        return cls(**{name: data[name] for name in cls.__dataclass_fields__ if name in data})
+
+class BenchmarkTracker:
+    """Проверки до/после примененных исправлений производительности"""
+
+    def __init__(self, profiler: WorkflowProfiler, ledger: Optional[FixLedger] = None, min_runs: int = 20,
+                 baseline_window: int = 200, regression_tolerance: float = 0.1, min_improvement: float = 0.05,
+                 max_age_hours: float = 72.0):
+        """
+        Инициализация
+
+        Args:
+            profiler: Профайлер с распределениями workflow'ов
+            ledger: Журнал исправлений, в котором хранятся незавершенные проверки
+            min_runs: Выполнений до и после исправления для вердикта
+            baseline_window: Последних выполнений до исправления в базе сравнения
+            regression_tolerance: Замедление медианы больше этой доли - регресс
+            min_improvement: Ускорение медианы не меньше этой доли - выигрыш
+            max_age_hours: Без min_runs выполнений за это время - inconclusive
+        """
+        self.profiler = profiler
+        self.min_runs = min_runs
+        self.baseline_window = baseline_window
+        self.regression_tolerance = regression_tolerance
+        self.min_improvement = min_improvement
+        self.max_age_seconds = max_age_hours * 3600
+
+        self.ledger = ledger
+        self._pending: Dict[str, PerformanceBenchmark] = {}
+        if ledger is not None:
+            for state in ledger.pending_benchmarks():
+                benchmark = PerformanceBenchmark.from_dict(state)
+                self._pending[benchmark.fix_id] = benchmark
+            if self._pending:
+                logger.info(f"📊 Restored {len(self._pending)} pending performance benchmarks")
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self, fix_id: str, finding: PerformanceFinding, workflow_id: str,
+              instance: str = DEFAULT_INSTANCE) -> Optional[PerformanceBenchmark]:
+        """Фиксирует базу сравнения в момент записи исправления (None - мало выполнений до него)"""
+        distribution = self.profiler.workflow_durations.get((instance, workflow_id))
+        if distribution is None or len(distribution.samples) < self.min_runs:
+            return None
+        benchmark = PerformanceBenchmark(
+            fix_id=fix_id,
+            fix_type=finding.fix_type.value,
+            workflow_id=workflow_id,
+            instance=instance,
+            node=finding.node,
+            before=list(distribution.samples)[-self.baseline_window:]
+        )
+        self._pending[fix_id] = benchmark
+        if self.ledger is not None:
+            self.ledger.start_benchmark(fix_id, benchmark.to_dict())
+        return benchmark
+
+    def pending_for(self, workflow_id: str, instance: str = DEFAULT_INSTANCE) -> bool:
+        """Есть ли у workflow'а непроверенное исправление"""
+        return any(benchmark.workflow_id == workflow_id and benchmark.instance == instance
+                   for benchmark in self._pending.values())
+
+    def evaluate(self) -> List[Tuple[PerformanceBenchmark, Dict[str, Any]]]:
+        """
+        Вердикты по исправлениям, набравшим min_runs выполнений после записи
+
+        Учитываются только выполнения, начатые после записи исправления:
+        старые выполнения, профилированные позже (история, очередь), в
+        "после" не попадают. Вердикт: improved, no_gain, regressed или
+        inconclusive (не набрал выполнений за max_age_hours). Проверенные
+        исправления снимаются с учета.
+        """
+        verdicts = []
+        now = time.time()
+        for fix_id, benchmark in list(self._pending.items()):
+            after = self.profiler.get_runs_since(benchmark.workflow_id, benchmark.started_at, benchmark.instance)
+
+            if len(after) < self.min_runs:
+                if now - benchmark.started_at < self.max_age_seconds:
+                    continue
+                verdict = {"verdict": "inconclusive", "runs_after": len(after), "before_p50": benchmark.before_p50}
+            else:
+                after_p50 = float(np.median(after))
+                change = after_p50 / benchmark.before_p50 - 1 if benchmark.before_p50 > 0 else 0.0
+                if change > self.regression_tolerance:
+                    outcome = "regressed"
+                elif change <= -self.min_improvement:
+                    outcome = "improved"
+                else:
+                    outcome = "no_gain"
+                verdict = {
+                    "verdict": outcome,
+                    "before_p50": benchmark.before_p50,
+                    "after_p50": after_p50,
+                    "change": change,
+                    "runs_before": len(benchmark.before),
+                    "runs_after": len(after)
+                }
+
+            del self._pending[fix_id]
+            if self.ledger is not None:
+                self.ledger.finish_benchmark(fix_id)
+            PERFORMANCE_BENCHMARKS.labels(benchmark.fix_type, verdict["verdict"]).inc()
+            verdicts.append((benchmark, verdict))
+        return verdicts
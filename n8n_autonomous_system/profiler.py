@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+"""
+⏱️ PROFILER - Профилирование нод workflow'ов по runData
+
+N8N записывает для каждого запуска ноды startTime и executionTime в
+resultData.runData выполнения. Профайлер:
+- извлекает тайминги нод из каждого завершенного выполнения
+- собирает распределения длительности по workflow'ам и по нодам
+- находит критический путь выполнения по связям workflow'а
+- раскладывает время по стадиям видео-пайплайна (LLM, TTS, MCP, Drive)
+- считает item'ы на выходе нод и повторяемость входов LLM/TTS нод
+  (отпечатки входных item'ов) - для исправлений производительности
+
+Работает инкрементально (монитор передает завершения каждого тика) и
+пакетно по истории выполнений.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from connector import N8NConnector, ExecutionInfo, DEFAULT_INSTANCE
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Метрики профайлера (label stage - ограниченный набор значений)
+NODE_DURATION = REGISTRY.histogram(
+    "n8n_profiler_node_duration_seconds", "Node run duration from runData by pipeline stage", ["stage"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+PROFILED_EXECUTIONS = REGISTRY.counter(
+    "n8n_profiler_executions", "Executions profiled from runData", ["instance"]
+)
+
+# Стадии пайплайна: подстроки типа или имени ноды (без регистра, пробелов и дефисов)
+DEFAULT_STAGES = {
+    "llm": ["openai", "anthropic", "lmchat", "langchain", "gemini", "ollama", "mistral", "gpt", "llm"],
+    "tts": ["elevenlabs", "texttospeech", "tts", "speech", "voice"],
+    "mcp": ["mcp"],
+    "drive": ["googledrive", "drive"],
+}
+OTHER_STAGE = "other"
+
+@dataclass
+class NodeTiming:
+    """Один запуск ноды"""
+    node: str
+    run_index: int
+    start_time: float        # epoch секунды
+    execution_time: float    # секунды
+    status: str = "success"
+    items: int = 0           # item'ов на выходах запуска
+
+    @property
+    def end_time(self) -> float:
+        return self.start_time + self.execution_time
+
+@dataclass
+class ExecutionGraph:
+    """
+    Связи и типы нод workflow'а для разбора выполнений
+
+    Облегченный граф профайлера: только кто за кем идет (критический путь)
+    и типы нод (стадии); редактируемый граф исправителя - workflow_graph.
+    """
+    edges: Dict[str, List[str]]
+    node_types: Dict[str, str]
+    fetched_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_n8n(cls, connections: Dict[str, Any], node_types: Dict[str, str]) -> "ExecutionGraph":
+        """Строит граф из connections N8N ({source: {output: [[{"node": target}]]}})"""
+        edges: Dict[str, List[str]] = defaultdict(list)
+        for source, outputs in (connections or {}).items():
+            for branches in (outputs or {}).values():
+                for branch in branches or []:
+                    for link in branch or []:
+                        target = link.get("node") if isinstance(link, dict) else None
+                        if target and target not in edges[source]:
+                            edges[source].append(target)
+        return cls(edges=dict(edges), node_types=node_types)
+
+@dataclass
+class ExecutionProfile:
+    """Профиль одного выполнения"""
+    execution_id: str
+    workflow_id: str
+    instance: str
+    status: str
+    total_time: float
+    node_times: Dict[str, float]
+    stage_times: Dict[str, float]
+    critical_path: List[str]
+    critical_path_time: float
+    started_at: Optional[datetime] = None
+    # Нода -> времена (epoch секунды) запусков, завершившихся ошибкой
+    node_failures: Dict[str, List[float]] = field(default_factory=dict)
+    # Нода -> item'ов на выходе за выполнение (по всем запускам)
+    node_items: Dict[str, int] = field(default_factory=dict)
+    # Нода -> отпечатки входных item'ов (только стадии из fingerprint_stages)
+    node_inputs: Dict[str, List[str]] = field(default_factory=dict)
+
+class LatencyDistribution:
+    """Распределение длительностей: точные счетчики и окно последних значений для перцентилей"""
+
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, reservoir_size: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: deque = deque(maxlen=reservoir_size)
+
+    def add(self, value: float):
+        """Добавляет наблюдение"""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, percentiles: Sequence[float] = (50, 95, 99)) -> Dict[str, float]:
+        """Перцентили по последним наблюдениям"""
+        if not self.samples:
+            return {}
+        values = np.percentile(np.fromiter(self.samples, np.float64, len(self.samples)), percentiles)
+        return {f"p{p:g}": float(v) for p, v in zip(percentiles, values)}
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"count": self.count, "mean": self.mean, "max": self.max, **self.percentiles()}
+
+def extract_node_timings(run_data: Dict[str, List[Dict[str, Any]]]) -> List[NodeTiming]:
+    """Извлекает все запуски нод (включая повторы в циклах) из runData, по времени старта"""
+    timings = []
+    for node_name, runs in (run_data or {}).items():
+        if not isinstance(runs, list):
+            continue
+        for run_index, run in enumerate(runs):
+            if not isinstance(run, dict) or run.get("startTime") is None:
+                continue
+            outputs = (run.get("data") or {}).get("main") or []
+            timings.append(NodeTiming(
+                node=node_name,
+                run_index=run_index,
+                start_time=run["startTime"] / 1000,
+                execution_time=(run.get("executionTime") or 0) / 1000,
+                status="error" if run.get("error") else run.get("executionStatus", "success"),
+                items=sum(len(output) for output in outputs if isinstance(output, list))
+            ))
+    timings.sort(key=lambda timing: timing.start_time)
+    return timings
+
+def input_fingerprints(run_data: Dict[str, List[Dict[str, Any]]], run: Dict[str, Any]) -> List[str]:
+    """Отпечатки входных item'ов запуска ноды: выход предыдущей ноды, на который указывает source"""
+    fingerprints = []
+    for source in run.get("source") or []:
+        if not isinstance(source, dict):
+            continue
+        previous_runs = run_data.get(source.get("previousNode"))
+        run_index = source.get("previousNodeRun") or 0
+        if not isinstance(previous_runs, list) or run_index >= len(previous_runs):
+            continue
+        outputs = ((previous_runs[run_index] or {}).get("data") or {}).get("main") or []
+        output = source.get("previousNodeOutput") or 0
+        items = outputs[output] if output < len(outputs) and isinstance(outputs[output], list) else []
+        for item in items:
+            payload = json.dumps(item.get("json") if isinstance(item, dict) else item, sort_keys=True, default=str)
+            fingerprints.append(hashlib.blake2b(payload.encode(), digest_size=8).hexdigest())
+    return fingerprints
+
+def critical_path(timings: List[NodeTiming], edges: Dict[str, List[str]]) -> Tuple[List[str], float]:
+    """
+    Самая долгая цепочка нод по связям workflow'а
+
+    Вес ноды - суммарное время ее запусков. Ребро учитывается, только если
+    источник стартовал раньше цели, поэтому циклы (повторные запуски) не
+    создают петель. Без графа N8N выполняет ноды последовательно, и путь -
+    все ноды в порядке старта.
+    """
+    weights: Dict[str, float] = defaultdict(float)
+    first_start: Dict[str, float] = {}
+    for timing in timings:
+        weights[timing.node] += timing.execution_time
+        first_start.setdefault(timing.node, timing.start_time)
+
+    order = sorted(first_start, key=first_start.get)
+    if not order:
+        return [], 0.0
+    if not edges:
+        return order, sum(weights.values())
+
+    predecessors: Dict[str, List[str]] = defaultdict(list)
+    for source, targets in edges.items():
+        if source in weights:
+            for target in targets:
+                if target in weights:
+                    predecessors[target].append(source)
+
+    position = {node: index for index, node in enumerate(order)}
+    best: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for node in order:
+        best[node], previous[node] = weights[node], None
+        for source in predecessors[node]:
+            if position[source] < position[node] and best[source] + weights[node] > best[node]:
+                best[node], previous[node] = best[source] + weights[node], source
+
+    node = max(best, key=best.get)
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    path.reverse()
+    return path, best[path[-1]]
+
+class WorkflowProfiler:
+    """
+    Профайлер выполнений workflow'ов
+
+    Распределения хранятся по (инстанс, workflow) и (инстанс, workflow, нода),
+    графы workflow'ов кэшируются на graph_ttl_seconds. Уже профилированные
+    выполнения пропускаются, поэтому пакетный проход по истории можно
+    запускать параллельно с инкрементальным.
+    """
+
+    def __init__(self, connector: N8NConnector, config: Dict[str, Any] = None,
+                 connectors: Dict[str, N8NConnector] = None):
+        """Инициализация профайлера"""
+        self.connector = connector
+        self.config = config or {}
+        self.connectors = connectors or {connector.instance: connector}
+
+        self.batch_size = self.config.get("batch_size", 50)
+        self.reservoir_size = self.config.get("reservoir_size", 1000)
+        self.graph_ttl = self.config.get("graph_ttl_seconds", 300)
+        self.stages = {
+            stage: [self._normalize(keyword) for keyword in keywords]
+            for stage, keywords in self.config.get("stages", DEFAULT_STAGES).items()
+        }
+        # Стадии, входы нод которых проверяются на повторы (кандидаты в кэш)
+        self.fingerprint_stages = set(self.config.get("fingerprint_stages", ["llm", "tts"]))
+
+        # Распределения
+        self.workflow_durations: Dict[Tuple[str, str], LatencyDistribution] = {}
+        # Последние выполнения workflow'а (время старта epoch, длительность) -
+        # для проверок до/после по моменту записи исправления
+        self.workflow_runs: Dict[Tuple[str, str], deque] = {}
+        self.node_durations: Dict[Tuple[str, str, str], LatencyDistribution] = {}
+        # Для подбора timeout'ов и retry: длительности только успешных запусков
+        # (упавший по timeout'у запуск длится ровно timeout) и времена ошибок
+        self.node_success_durations: Dict[Tuple[str, str, str], LatencyDistribution] = {}
+        self.node_failure_times: Dict[Tuple[str, str, str], deque] = {}
+        # Для исправлений производительности: item'ов за выполнение и отпечатки входов
+        self.node_items: Dict[Tuple[str, str, str], LatencyDistribution] = {}
+        self.node_input_fingerprints: Dict[Tuple[str, str, str], deque] = {}
+        self.stage_totals: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.critical_paths: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+        self.critical_path_durations: Dict[Tuple[str, str], LatencyDistribution] = {}
+        self.node_stages: Dict[Tuple[str, str, str], str] = {}
+
+        # Кэш графов и уже профилированные выполнения
+        self._graphs: Dict[Tuple[str, str], ExecutionGraph] = {}
+        self._profiled: set = set()
+        self._profiled_order: deque = deque()
+        self._profiled_limit = self.config.get("dedupe_window", 100000)
+
+        self.executions_profiled = 0
+
+        logger.info("⏱️ Workflow Profiler initialized")
+
+    @staticmethod
+    def _normalize(value: str) -> str:
+        return (value or "").lower().replace(" ", "").replace("-", "").replace("_", "")
+
+    def classify_stage(self, node_name: str, node_type: str = "") -> str:
+        """Определяет стадию пайплайна ноды по типу, затем по имени"""
+        for text in (self._normalize(node_type), self._normalize(node_name)):
+            if not text:
+                continue
+            for stage, keywords in self.stages.items():
+                if any(keyword in text for keyword in keywords):
+                    return stage
+        return OTHER_STAGE
+
+    def _connector_for(self, instance: Optional[str]) -> N8NConnector:
+        """Коннектор инстанса N8N (основной, если инстанс не указан)"""
+        if instance is None:
+            return self.connector
+        connector = self.connectors.get(instance)
+        if connector is None:
+            raise ValueError(f"Unknown N8N instance: {instance}")
+        return connector
+
+    async def _get_graph(self, connector: N8NConnector, workflow_id: str) -> ExecutionGraph:
+        """Граф workflow'а из кэша или из БД"""
+        key = (connector.instance, workflow_id)
+        graph = self._graphs.get(key)
+        if graph is not None and time.monotonic() - graph.fetched_at < self.graph_ttl:
+            return graph
+
+        connections = await connector.get_workflow_connections(workflow_id)
+        nodes = await connector.get_workflow_nodes(workflow_id)
+        graph = ExecutionGraph.from_n8n(connections, {node.name: node.type for node in nodes})
+        self._graphs[key] = graph
+        return graph
+
+    def _mark_profiled(self, key: Tuple[str, str]) -> bool:
+        """Запоминает выполнение; False, если оно уже профилировано"""
+        if key in self._profiled:
+            return False
+        self._profiled.add(key)
+        self._profiled_order.append(key)
+        if len(self._profiled_order) > self._profiled_limit:
+            self._profiled.discard(self._profiled_order.popleft())
+        return True
+
+    async def profile_executions(self, executions: List[ExecutionInfo], instance: Optional[str] = None,
+                                 run_data: Optional[Dict[str, Dict[str, List[Dict[str, Any]]]]] = None
+                                 ) -> List[ExecutionProfile]:
+        """
+        Профилирует завершенные выполнения инстанса
+
+        runData запрашивается пакетами, если его не передал вызывающий
+        (монитор читает execution data завершений один раз - для ошибок и профиля).
+        """
+        connector = self._connector_for(instance)
+        pending = [
+            execution for execution in executions
+            if execution.finished and (connector.instance, execution.id) not in self._profiled
+        ]
+
+        profiles = []
+        for i in range(0, len(pending), self.batch_size):
+            chunk = pending[i:i + self.batch_size]
+            chunk_run_data = run_data
+            if chunk_run_data is None:
+                chunk_run_data = await connector.get_executions_run_data([execution.id for execution in chunk])
+
+            for execution in chunk:
+                if execution.id not in chunk_run_data:
+                    continue
+                try:
+                    graph = await self._get_graph(connector, execution.workflow_id)
+                    profile = self.build_profile(execution, chunk_run_data[execution.id], graph, connector.instance)
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to profile execution {execution.id}: {e}")
+                    continue
+
+                if profile and self._mark_profiled((connector.instance, execution.id)):
+                    self.record(profile)
+                    profiles.append(profile)
+
+        if profiles:
+            PROFILED_EXECUTIONS.labels(connector.instance).inc(len(profiles))
+            logger.debug(f"⏱️ Profiled {len(profiles)} executions ({connector.instance})")
+        return profiles
+
+    def build_profile(self, execution: ExecutionInfo, run_data: Dict[str, List[Dict[str, Any]]],
+                      graph: Optional[ExecutionGraph] = None,
+                      instance: str = DEFAULT_INSTANCE) -> Optional[ExecutionProfile]:
+        """Строит профиль выполнения из runData и графа workflow'а"""
+        timings = extract_node_timings(run_data)
+        if not timings:
+            return None
+
+        graph = graph or ExecutionGraph(edges={}, node_types={})
+        node_times: Dict[str, float] = defaultdict(float)
+        stage_times: Dict[str, float] = defaultdict(float)
+        node_failures: Dict[str, List[float]] = defaultdict(list)
+        node_items: Dict[str, int] = defaultdict(int)
+        node_inputs: Dict[str, List[str]] = defaultdict(list)
+        for timing in timings:
+            node_times[timing.node] += timing.execution_time
+            node_items[timing.node] += timing.items
+            if timing.status == "error":
+                node_failures[timing.node].append(timing.start_time)
+        for node, seconds in node_times.items():
+            stage = self.classify_stage(node, graph.node_types.get(node, ""))
+            stage_times[stage] += seconds
+            if stage in self.fingerprint_stages:
+                for run in run_data.get(node) or []:
+                    if isinstance(run, dict):
+                        node_inputs[node].extend(input_fingerprints(run_data, run))
+
+        path, path_time = critical_path(timings, graph.edges)
+
+        # Время выполнения из execution_entity, иначе - от первого старта до последнего финиша
+        total_time = execution.execution_time
+        if total_time is None:
+            total_time = max(timing.end_time for timing in timings) - timings[0].start_time
+
+        return ExecutionProfile(
+            execution_id=execution.id,
+            workflow_id=execution.workflow_id,
+            instance=instance,
+            status=execution.status,
+            total_time=total_time,
+            node_times=dict(node_times),
+            stage_times=dict(stage_times),
+            critical_path=path,
+            critical_path_time=path_time,
+            started_at=execution.started_at,
+            node_failures=dict(node_failures),
+            node_items=dict(node_items),
+            node_inputs={node: fingerprints for node, fingerprints in node_inputs.items() if fingerprints}
+        )
+
+    def record(self, profile: ExecutionProfile):
+        """Добавляет профиль в распределения"""
+        key = (profile.instance, profile.workflow_id)
+        self._distribution(self.workflow_durations, key).add(profile.total_time)
+        if profile.started_at is not None:
+            runs = self.workflow_runs.get(key)
+            if runs is None:
+                runs = self.workflow_runs[key] = deque(maxlen=self.reservoir_size)
+            runs.append((profile.started_at.timestamp(), profile.total_time))
+
+        graph = self._graphs.get(key)
+        for node, seconds in profile.node_times.items():
+            node_key = key + (node,)
+            self._distribution(self.node_durations, node_key).add(seconds)
+            if node in profile.node_items:
+                self._distribution(self.node_items, node_key).add(profile.node_items[node])
+            fingerprints = profile.node_inputs.get(node)
+            if fingerprints:
+                window = self.node_input_fingerprints.get(node_key)
+                if window is None:
+                    window = self.node_input_fingerprints[node_key] = deque(maxlen=self.reservoir_size)
+                window.extend(fingerprints)
+            failures = profile.node_failures.get(node)
+            if failures:
+                times = self.node_failure_times.get(node_key)
+                if times is None:
+                    times = self.node_failure_times[node_key] = deque(maxlen=self.reservoir_size)
+                times.extend(failures)
+            else:
+                self._distribution(self.node_success_durations, node_key).add(seconds)
+            stage = self.node_stages.get(node_key)
+            if stage is None:
+                stage = self.classify_stage(node, graph.node_types.get(node, "") if graph else "")
+                self.node_stages[node_key] = stage
+            NODE_DURATION.labels(stage).observe(seconds)
+
+        stage_totals = self.stage_totals[key]
+        for stage, seconds in profile.stage_times.items():
+            stage_totals[stage] += seconds
+
+        if profile.critical_path:
+            self.critical_paths[key][tuple(profile.critical_path)] += 1
+            self._distribution(self.critical_path_durations, key).add(profile.critical_path_time)
+
+        self.executions_profiled += 1
+
+    def _distribution(self, distributions: Dict, key) -> LatencyDistribution:
+        distribution = distributions.get(key)
+        if distribution is None:
+            distribution = distributions[key] = LatencyDistribution(self.reservoir_size)
+        return distribution
+
+    async def profile_history(self, limit: int = 1000, page_size: int = 200,
+                              workflow_id: Optional[str] = None,
+                              instances: Optional[Iterable[str]] = None) -> int:
+        """
+        Пакетно профилирует историю выполнений (от новых к старым)
+
+        Returns:
+            Количество профилированных выполнений
+        """
+        profiled = 0
+        for instance in instances or list(self.connectors):
+            connector = self._connector_for(instance)
+            before = None
+            scanned = 0
+
+            while scanned < limit:
+                page = await connector.get_finished_executions(
+                    limit=min(page_size, limit - scanned), before=before, workflow_id=workflow_id
+                )
+                if not page:
+                    break
+
+                scanned += len(page)
+                profiled += len(await self.profile_executions(page, instance=instance))
+                before = page[-1].started_at
+                if before is None or len(page) < page_size:
+                    break
+
+        logger.info(f"⏱️ Profiled {profiled} historical executions")
+        return profiled
+
+    def get_node_stats(self, workflow_id: str, instance: str = DEFAULT_INSTANCE) -> List[Dict[str, Any]]:
+        """Распределения длительности нод workflow'а, самые медленные (по p95) первыми"""
+        stats = []
+        for (node_instance, node_workflow, node), distribution in self.node_durations.items():
+            if node_instance == instance and node_workflow == workflow_id:
+                stats.append({
+                    "node": node,
+                    "stage": self.node_stages.get((node_instance, node_workflow, node), OTHER_STAGE),
+                    **distribution.to_dict()
+                })
+        stats.sort(key=lambda item: item.get("p95", 0.0), reverse=True)
+        return stats
+
+    def get_runs_since(self, workflow_id: str, since: float, instance: str = DEFAULT_INSTANCE) -> List[float]:
+        """Длительности выполнений workflow'а, начатых не раньше since (epoch секунды)"""
+        runs = self.workflow_runs.get((instance, workflow_id), ())
+        return [duration for started_at, duration in runs if started_at >= since]
+
+    def get_node_behaviour(self, workflow_id: str, node: str,
+                           instance: str = DEFAULT_INSTANCE) -> Tuple[List[float], List[float]]:
+        """Длительности успешных запусков ноды (секунды) и времена ее ошибок (epoch секунды, по возрастанию)"""
+        key = (instance, workflow_id, node)
+        successes = self.node_success_durations.get(key)
+        failures = self.node_failure_times.get(key)
+        return list(successes.samples) if successes else [], sorted(failures) if failures else []
+
+    def get_node_workload(self, workflow_id: str, node: str,
+                          instance: str = DEFAULT_INSTANCE) -> Optional[Dict[str, Any]]:
+        """
+        Нагрузка ноды: длительность за выполнение, item'ы на выходе, ошибки и повторяемость входов
+
+        repeat_ratio - доля входных item'ов (по последним отпечаткам), уже
+        встречавшихся раньше в окне; None - входы ноды не отслеживаются.
+        """
+        key = (instance, workflow_id, node)
+        durations = self.node_durations.get(key)
+        if durations is None:
+            return None
+
+        items = self.node_items.get(key)
+        fingerprints = self.node_input_fingerprints.get(key)
+        item_percentiles = items.percentiles((50, 95)) if items else {}
+        return {
+            "node": node,
+            "stage": self.node_stages.get(key, OTHER_STAGE),
+            "runs": durations.count,
+            **durations.percentiles((50, 95)),
+            "items_p50": item_percentiles.get("p50", 0.0),
+            "items_p95": item_percentiles.get("p95", 0.0),
+            "failures": len(self.node_failure_times.get(key, ())),
+            "inputs_seen": len(fingerprints) if fingerprints else 0,
+            "repeat_ratio": 1 - len(set(fingerprints)) / len(fingerprints) if fingerprints else None
+        }
+
+    def get_stage_breakdown(self, workflow_id: Optional[str] = None,
+                            instance: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Куда уходит время: секунды и доля по стадиям (по всем или одному workflow'у)"""
+        totals: Dict[str, float] = defaultdict(float)
+        for (stage_instance, stage_workflow), stages in self.stage_totals.items():
+            if (workflow_id is None or stage_workflow == workflow_id) and (instance is None or stage_instance == instance):
+                for stage, seconds in stages.items():
+                    totals[stage] += seconds
+
+        overall = sum(totals.values())
+        return {
+            stage: {"seconds": seconds, "share": seconds / overall if overall else 0.0}
+            for stage, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        }
+
+    def get_critical_paths(self, workflow_id: str, instance: str = DEFAULT_INSTANCE,
+                           top: int = 5) -> List[Dict[str, Any]]:
+        """Самые частые критические пути workflow'а"""
+        paths = self.critical_paths.get((instance, workflow_id))
+        if not paths:
+            return []
+        total = sum(paths.values())
+        return [
+            {"path": list(path), "count": count, "share": count / total}
+            for path, count in paths.most_common(top)
+        ]
+
+    def get_report(self, workflow_id: Optional[str] = None, top_nodes: int = 5) -> Dict[str, Any]:
+        """Сводный отчет: распределения workflow'ов, медленные ноды, критические пути и стадии"""
+        workflows = {}
+        for (instance, profiled_workflow), distribution in self.workflow_durations.items():
+            if workflow_id is not None and profiled_workflow != workflow_id:
+                continue
+            critical = self.critical_path_durations.get((instance, profiled_workflow))
+            workflows[f"{instance}/{profiled_workflow}"] = {
+                "duration": distribution.to_dict(),
+                "stages": self.get_stage_breakdown(profiled_workflow, instance),
+                "slowest_nodes": self.get_node_stats(profiled_workflow, instance)[:top_nodes],
+                "critical_paths": self.get_critical_paths(profiled_workflow, instance),
+                "critical_path_duration": critical.to_dict() if critical else {}
+            }
+
+        return {
+            "executions_profiled": self.executions_profiled,
+            "stages": self.get_stage_breakdown(workflow_id),
+            "workflows": workflows
+        }
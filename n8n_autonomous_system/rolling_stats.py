@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+📈 ROLLING STATS - Инкрементальная статистика анализатора по временным корзинам
+
+Каждый анализ и каждый результат исправления добавляется в текущую
+корзину трех колец фиксированного размера:
+- 60 корзин по 1 минуте (последний час)
+- 24 корзины по 1 часу (последние сутки)
+- 30 корзин по 1 дню (последний месяц)
+
+Корзина хранит число анализов, сумму уверенности, счетчики категорий и
+источников классификации, успехи и неудачи по типам исправлений.
+Статистика окна собирается из корзин самого мелкого кольца, которое его
+покрывает, - O(корзин) вместо прохода по истории. Граница окна
+округляется до корзины (окно включает корзину, в которую попадает его
+начало). Отдельно ведутся итоги за все время.
+"""
+
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from event_store import parse_window
+
+# (ширина корзины в секундах, число корзин)
+RESOLUTIONS: Tuple[Tuple[int, int], ...] = ((60, 60), (3600, 24), (86400, 30))
+
+class _Bucket:
+    """Агрегаты одного интервала"""
+
+    __slots__ = ("start", "analyses", "confidence_sum", "categories", "sources", "fixes")
+
+    def __init__(self, start: float = 0.0):
+        self.start = start
+        self.analyses = 0
+        self.confidence_sum = 0.0
+        self.categories: Counter = Counter()
+        self.sources: Counter = Counter()
+        # Тип исправления -> [успехи, неудачи]
+        self.fixes: Dict[str, List[int]] = {}
+
+    def add_analysis(self, category: str, confidence: float, source: str):
+        self.analyses += 1
+        self.confidence_sum += confidence
+        self.categories[category] += 1
+        self.sources[source] += 1
+
+    def add_fix(self, fix_type: str, success: bool):
+        outcome = self.fixes.get(fix_type)
+        if outcome is None:
+            outcome = self.fixes[fix_type] = [0, 0]
+        outcome[0 if success else 1] += 1
+
+    def merge(self, other: "_Bucket"):
+        self.analyses += other.analyses
+        self.confidence_sum += other.confidence_sum
+        self.categories.update(other.categories)
+        self.sources.update(other.sources)
+        for fix_type, (successes, failures) in other.fixes.items():
+            outcome = self.fixes.setdefault(fix_type, [0, 0])
+            outcome[0] += successes
+            outcome[1] += failures
+
+class _Ring:
+    """Кольцо корзин одной ширины"""
+
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.size = size
+        self.buckets: List[Optional[_Bucket]] = [None] * size
+
+    @property
+    def span(self) -> int:
+        return self.width * self.size
+
+    def current(self, now: float) -> _Bucket:
+        """Корзина момента now (устаревшая корзина в той же ячейке сбрасывается)"""
+        slot = int(now // self.width)
+        start = slot * self.width
+        bucket = self.buckets[slot % self.size]
+        if bucket is None or bucket.start != start:
+            bucket = self.buckets[slot % self.size] = _Bucket(start)
+        return bucket
+
+    def since(self, since: float, now: float) -> Iterator[_Bucket]:
+        """Корзины, пересекающиеся с [since, now]"""
+        for bucket in self.buckets:
+            if bucket is not None and since - self.width < bucket.start <= now:
+                yield bucket
+
+class RollingStats:
+    """Агрегаты анализов и исправлений по окнам времени"""
+
+    def __init__(self, resolutions: Tuple[Tuple[int, int], ...] = RESOLUTIONS):
+        """Инициализация колец (от мелких корзин к крупным)"""
+        self.rings = [_Ring(width, size) for width, size in sorted(resolutions)]
+        self.lifetime = _Bucket()
+
+    @property
+    def max_window(self) -> int:
+        return self.rings[-1].span
+
+    def record_analysis(self, category: str, confidence: float, source: str = "rules",
+                        now: Optional[float] = None):
+        """Учитывает анализ"""
+        now = time.time() if now is None else now
+        for ring in self.rings:
+            ring.current(now).add_analysis(category, confidence, source)
+        self.lifetime.add_analysis(category, confidence, source)
+
+    def record_fix(self, fix_type: str, success: bool, now: Optional[float] = None):
+        """Учитывает результат исправления"""
+        now = time.time() if now is None else now
+        for ring in self.rings:
+            ring.current(now).add_fix(fix_type, success)
+        self.lifetime.add_fix(fix_type, success)
+
+    def _aggregate(self, window: Union[str, float, int, None], now: Optional[float]) -> _Bucket:
+        """Сумма корзин окна (None - за все время)"""
+        seconds = parse_window(window)
+        if seconds is None:
+            return self.lifetime
+        if seconds > self.max_window:
+            raise ValueError(f"Window {window!r} exceeds the longest kept window ({self.max_window}s)")
+
+        now = time.time() if now is None else now
+        ring = next(ring for ring in self.rings if ring.span >= seconds)
+        total = _Bucket()
+        for bucket in ring.since(now - seconds, now):
+            total.merge(bucket)
+        return total
+
+    def summary(self, window: Union[str, float, int, None] = None, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Статистика окна ("15m", "1h", "7d", секунды; None - за все время)
+
+        Returns:
+            analyses, average_confidence, category_distribution, sources и
+            fix_outcomes (успехи, неудачи и доля успехов по типам исправлений)
+        """
+        total = self._aggregate(window, now)
+        return {
+            "analyses": total.analyses,
+            "average_confidence": total.confidence_sum / total.analyses if total.analyses else 0.0,
+            "category_distribution": dict(total.categories),
+            "sources": dict(total.sources),
+            "fix_outcomes": {
+                fix_type: {
+                    "successes": successes,
+                    "failures": failures,
+                    "success_rate": successes / (successes + failures)
+                }
+                for fix_type, (successes, failures) in total.fixes.items()
+            }
+        }
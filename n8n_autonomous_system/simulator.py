@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+🧮 FIX SIMULATOR - Офлайн симуляция исправлений и статическая проверка workflow'а
+
+Живая проверка исправления - запись в production, перезапуск n8n и
+тестовый прогон - занимает около минуты. Симулятор отсеивает плохие
+кандидаты за миллисекунды до записи:
+
+- кандидат применяется к копии WorkflowGraph в памяти
+- StaticVerifier проверяет граф до и после:
+  - schema: обязательные параметры известных типов нод, синтаксис
+    (баланс скобок) JavaScript в Code нодах
+  - expressions: баланс {{ }}, ссылки $node["..."] / $("...") на
+    существующие ноды выше по графу, битые пути $json
+  - credentials: наличие credentials нужного типа с id у нод, которым
+    они нужны
+  - connections: связи на существующие ноды, ноды, не достижимые от
+    триггеров
+- кандидат отклоняется, если упал, ничего не изменил или добавил новые
+  ошибки (уже существовавшие ошибки не мешают исправлению)
+- принятые кандидаты ранжируются: исправленные находки, изменения
+  упавшей ноды, новые предупреждения и риск стратегии
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from analyzer import RepairStrategy
+from metrics import REGISTRY
+from workflow_graph import WorkflowGraph
+
+logger = logging.getLogger(__name__)
+
+SIMULATIONS = REGISTRY.counter("n8n_fix_simulations", "Simulated fix candidates by verdict", ["result"])
+SIMULATION_DURATION = REGISTRY.histogram(
+    "n8n_fix_simulation_seconds", "Duration of one candidate simulation including static checks",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+STICKY_NOTE = "n8n-nodes-base.stickyNote"
+
+# Тип ноды -> параметры, из которых должен быть задан хотя бы один в каждой группе
+REQUIRED_PARAMETERS: Dict[str, List[Tuple[str, ...]]] = {
+    "n8n-nodes-base.httpRequest": [("url",)],
+    "n8n-nodes-base.webhook": [("path",)],
+    "n8n-nodes-base.code": [("jsCode", "pythonCode")],
+    "n8n-nodes-base.set": [("values", "assignments", "fields")],
+    "@n8n/n8n-nodes-langchain.memoryBufferWindow": [("sessionId", "sessionIdExpression", "sessionKey")],
+}
+
+# Подстрока типа ноды -> допустимые типы credentials
+REQUIRED_CREDENTIALS: Dict[str, Tuple[str, ...]] = {
+    "lmChatOpenRouter": ("openRouterApi",),
+    "lmChatOpenAi": ("openAiApi",),
+    "googleDrive": ("googleDriveOAuth2Api", "googleApi"),
+}
+
+RISK_PENALTY = {"low": 0.0, "medium": 0.1, "high": 0.3}
+
+_NODE_REFERENCE = re.compile(r"""\$(?:node\[\s*|\(\s*|items\(\s*)(["'])(.+?)\1""")
+_BROKEN_JSON_PATH = re.compile(r"\$json\s*(?:\.\s*\.|\.\s*\$json)")
+
+@dataclass(frozen=True)
+class Finding:
+    """Находка статической проверки"""
+    check: str
+    severity: str
+    node: Optional[str]
+    message: str
+
+    def __str__(self) -> str:
+        where = f"[{self.node}] " if self.node else ""
+        return f"{self.severity} {self.check}: {where}{self.message}"
+
+def is_trigger(node_type: str) -> bool:
+    """Стартовая нода workflow'а"""
+    lowered = node_type.lower()
+    return "trigger" in lowered or lowered.endswith(".webhook")
+
+def _strings(value: Any) -> Iterator[str]:
+    """Все строки во вложенных параметрах"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+def js_bracket_error(code: str) -> Optional[str]:
+    """Ошибка баланса скобок в JavaScript (строки и комментарии пропускаются)"""
+    pairs = {")": "(", "]": "[", "}": "{"}
+    stack: List[str] = []
+    i, length = 0, len(code)
+    while i < length:
+        char = code[i]
+        if char in "\"'`":
+            i += 1
+            while i < length and code[i] != char:
+                i += 2 if code[i] == "\\" else 1
+            if i >= length:
+                return f"unterminated string literal {char}"
+        elif code.startswith("//", i):
+            newline = code.find("\n", i)
+            i = length if newline < 0 else newline
+        elif code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            if end < 0:
+                return "unterminated block comment"
+            i = end + 1
+        elif char in "([{":
+            stack.append(char)
+        elif char in ")]}":
+            if not stack or stack.pop() != pairs[char]:
+                return f"unexpected '{char}'"
+        i += 1
+    return f"unclosed '{stack[-1]}'" if stack else None
+
+class StaticVerifier:
+    """Статические проверки графа workflow'а"""
+
+    def __init__(self, credential_ids: Optional[Set[str]] = None):
+        """
+        Инициализация
+
+        Args:
+            credential_ids: Известные id credentials инстанса (None - id не сверяются)
+        """
+        self.credential_ids = credential_ids
+
+    def verify(self, graph: WorkflowGraph) -> List[Finding]:
+        """Все находки по графу"""
+        findings: List[Finding] = []
+        for node in graph.nodes:
+            if node.type == STICKY_NOTE:
+                continue
+            findings.extend(self._check_schema(node))
+            findings.extend(self._check_expressions(graph, node))
+            findings.extend(self._check_credentials(node))
+        findings.extend(self._check_connections(graph))
+        return findings
+
+    def _check_schema(self, node) -> List[Finding]:
+        findings = []
+        for group in REQUIRED_PARAMETERS.get(node.type, ()):
+            if not any(node.parameters.get(name) not in (None, "") for name in group):
+                findings.append(Finding("schema", "error", node.name, f"missing required parameter {' or '.join(group)}"))
+
+        code = node.parameters.get("jsCode") if node.type == "n8n-nodes-base.code" else None
+        if isinstance(code, str):
+            problem = js_bracket_error(code)
+            if problem:
+                findings.append(Finding("schema", "error", node.name, f"JavaScript syntax: {problem}"))
+
+        options = node.parameters.get("options")
+        timeout = options.get("timeout") if isinstance(options, dict) else None
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+            findings.append(Finding("schema", "error", node.name, f"invalid timeout {timeout!r}"))
+
+        batching = options.get("batching") if isinstance(options, dict) else None
+        if isinstance(batching, dict):
+            batch = batching.get("batch") or {}
+            size, interval = batch.get("batchSize", 50), batch.get("batchInterval", 1000)
+            if not isinstance(size, int) or size < 1:
+                findings.append(Finding("schema", "error", node.name, f"invalid batch size {size!r}"))
+            if not isinstance(interval, int) or interval < 0:
+                findings.append(Finding("schema", "error", node.name, f"invalid batch interval {interval!r}"))
+
+        # Пределы настроек повторов в n8n
+        if node.settings.get("retryOnFail"):
+            max_tries = node.settings.get("maxTries", 3)
+            wait = node.settings.get("waitBetweenTries", 1000)
+            if not isinstance(max_tries, int) or not 2 <= max_tries <= 5:
+                findings.append(Finding("schema", "error", node.name, f"invalid maxTries {max_tries!r}"))
+            if not isinstance(wait, int) or not 0 <= wait <= 5000:
+                findings.append(Finding("schema", "error", node.name, f"invalid waitBetweenTries {wait!r}"))
+        return findings
+
+    def _check_expressions(self, graph: WorkflowGraph, node) -> List[Finding]:
+        findings = []
+        upstream: Optional[Set[str]] = None
+        has_input = bool(graph.predecessors(node.name, "main")) or is_trigger(node.type)
+
+        for text in _strings(node.parameters):
+            if "$" not in text and "{{" not in text and "}}" not in text:
+                continue
+            # Баланс {{ }} - только в выражениях (строки "=..."), не в коде
+            if text.startswith("=") and text.count("{{") != text.count("}}"):
+                findings.append(Finding("expressions", "error", node.name, f"unbalanced braces in {text[:60]!r}"))
+            if _BROKEN_JSON_PATH.search(text):
+                findings.append(Finding("expressions", "error", node.name, f"broken $json path in {text[:60]!r}"))
+            if "$json" in text and not has_input:
+                findings.append(Finding("expressions", "warning", node.name, "$json used in a node without input"))
+
+            for _, referenced in _NODE_REFERENCE.findall(text):
+                if referenced not in graph:
+                    findings.append(Finding("expressions", "error", node.name, f"reference to unknown node {referenced!r}"))
+                    continue
+                if upstream is None:
+                    upstream = graph.upstream(node.name)
+                if referenced not in upstream:
+                    findings.append(Finding("expressions", "warning", node.name, f"node {referenced!r} does not run before this node"))
+        return findings
+
+    def _check_credentials(self, node) -> List[Finding]:
+        findings = []
+        credentials = node.credentials or {}
+        for fragment, accepted in REQUIRED_CREDENTIALS.items():
+            if fragment.lower() in node.type.lower() and not any(name in credentials for name in accepted):
+                findings.append(Finding("credentials", "error", node.name, f"missing credentials {' or '.join(accepted)}"))
+
+        if node.parameters.get("authentication") in ("predefinedCredentialType", "genericCredentialType") and not credentials:
+            findings.append(Finding("credentials", "error", node.name, "authentication is configured without credentials"))
+
+        for credential_type, credential in credentials.items():
+            credential_id = credential.get("id") if isinstance(credential, dict) else None
+            if not credential_id:
+                findings.append(Finding("credentials", "error", node.name, f"credentials {credential_type} without id"))
+            elif self.credential_ids is not None and credential_id not in self.credential_ids:
+                findings.append(Finding("credentials", "error", node.name, f"unknown credentials id for {credential_type}"))
+        return findings
+
+    def _check_connections(self, graph: WorkflowGraph) -> List[Finding]:
+        findings = []
+        for source, edges in graph.outgoing.items():
+            for edge in edges:
+                if source not in graph:
+                    findings.append(Finding("connections", "error", source, f"connection from unknown node to {edge.target!r}"))
+                elif edge.target not in graph:
+                    findings.append(Finding("connections", "error", source, f"connection to unknown node {edge.target!r}"))
+
+        triggers = [node.name for node in graph.nodes if is_trigger(node.type)]
+        if not triggers:
+            return findings
+
+        # Достижимые от триггеров ноды и их под-ноды (память, модели, инструменты - связи ai_*)
+        attached = set(triggers)
+        for trigger in triggers:
+            attached |= graph.downstream(trigger)
+        changed = True
+        while changed:
+            changed = False
+            for node in graph.nodes:
+                if node.name not in attached and any(target in attached for target in graph.successors(node.name)):
+                    attached.add(node.name)
+                    changed = True
+
+        for node in graph.nodes:
+            if node.name not in attached and node.type != STICKY_NOTE:
+                findings.append(Finding("connections", "warning", node.name, "node is not reachable from any trigger"))
+        return findings
+
+@dataclass
+class SimulationResult:
+    """Результат симуляции одного кандидата"""
+    strategy: RepairStrategy
+    accepted: bool
+    score: float = 0.0
+    changes: List[Dict[str, Any]] = field(default_factory=list)
+    new_findings: List[Finding] = field(default_factory=list)
+    resolved_findings: List[Finding] = field(default_factory=list)
+    duration_ms: float = 0.0
+    reason: Optional[str] = None
+    # Граф после применения кандидата (принятый кандидат применяется без повторного прогона)
+    graph: Optional[WorkflowGraph] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fix_type": self.strategy.fix_type.value,
+            "accepted": self.accepted,
+            "score": round(self.score, 3),
+            "changes": len(self.changes),
+            "new_findings": [str(finding) for finding in self.new_findings],
+            "resolved_findings": len(self.resolved_findings),
+            "duration_ms": round(self.duration_ms, 3),
+            "reason": self.reason
+        }
+
+# Применение стратегии к графу: (граф, стратегия, упавшие ноды) -> изменения
+StrategyApplier = Callable[[WorkflowGraph, RepairStrategy, List[str]], Awaitable[List[Dict[str, Any]]]]
+
+class FixSimulator:
+    """Симуляция кандидатов исправления на копиях графа"""
+
+    def __init__(self, apply_strategy: StrategyApplier, verifier: Optional[StaticVerifier] = None,
+                 reject_on_warnings: bool = False):
+        """
+        Инициализация
+
+        Args:
+            apply_strategy: Применяет стратегию к графу в памяти (AutoFixer._apply_fix_strategy)
+            verifier: Статические проверки
+            reject_on_warnings: Отклонять кандидаты, добавившие предупреждения
+        """
+        self.apply_strategy = apply_strategy
+        self.verifier = verifier or StaticVerifier()
+        self.reject_on_warnings = reject_on_warnings
+
+    async def simulate(self, graph: WorkflowGraph, strategy: RepairStrategy, affected_nodes: List[str],
+                       baseline: Optional[List[Finding]] = None) -> SimulationResult:
+        """Применяет кандидата к копии графа и проверяет результат"""
+        started = time.perf_counter()
+        baseline = self.verifier.verify(graph) if baseline is None else baseline
+        candidate = graph.copy()
+        result = SimulationResult(strategy=strategy, accepted=False, graph=candidate)
+
+        try:
+            result.changes = await self.apply_strategy(candidate, strategy, affected_nodes)
+        except Exception as e:
+            result.reason = f"strategy failed: {e}"
+        else:
+            if not result.changes:
+                result.reason = "no changes"
+            else:
+                findings = self.verifier.verify(candidate)
+                before, after = set(baseline), set(findings)
+                result.new_findings = [finding for finding in findings if finding not in before]
+                result.resolved_findings = [finding for finding in baseline if finding not in after]
+                new_errors = [finding for finding in result.new_findings if finding.severity == "error"]
+                new_warnings = len(result.new_findings) - len(new_errors)
+
+                if new_errors:
+                    result.reason = f"introduces {len(new_errors)} error(s): {new_errors[0]}"
+                elif new_warnings and self.reject_on_warnings:
+                    result.reason = f"introduces {new_warnings} warning(s): {result.new_findings[0]}"
+                else:
+                    result.accepted = True
+                    touches_affected = any(change.get("node_name") in affected_nodes for change in result.changes)
+                    result.score = (
+                        len(result.resolved_findings)
+                        + (0.5 if touches_affected else 0.0)
+                        - 0.1 * new_warnings
+                        - RISK_PENALTY.get(strategy.risk_level, 0.0)
+                    )
+
+        result.duration_ms = (time.perf_counter() - started) * 1000
+        SIMULATIONS.labels("accepted" if result.accepted else "rejected").inc()
+        SIMULATION_DURATION.observe(result.duration_ms / 1000)
+        if not result.accepted:
+            logger.debug(f"🧮 Candidate {strategy.fix_type.value} rejected in {result.duration_ms:.1f}ms: {result.reason}")
+        return result
+
+    async def rank(self, graph: WorkflowGraph, strategies: List[RepairStrategy],
+                   affected_nodes: List[str]) -> List[SimulationResult]:
+        """Симулирует кандидатов: принятые первыми по убыванию оценки, при равенстве - порядок анализатора"""
+        baseline = self.verifier.verify(graph)
+        results = [await self.simulate(graph, strategy, affected_nodes, baseline) for strategy in strategies]
+        order = {id(result): index for index, result in enumerate(results)}
+        return sorted(results, key=lambda result: (not result.accepted, -result.score, order[id(result)]))
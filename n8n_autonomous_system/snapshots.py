@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+📸 WORKFLOW SNAPSHOTS - Локальные копии активных workflow'ов
+
+Исправителю нужны ноды и connections workflow'а для backup'а и графа.
+Вместо двух запросов к БД перед каждым исправлением сервис держит
+локальные копии всех активных workflow'ов:
+
+- при старте - одна выборка id, name, nodes, connections, "updatedAt"
+  всех активных workflow'ов через серверный курсор
+- обновление - один легкий запрос версий (updatedAt и md5 содержимого,
+  посчитанный в БД), затем выборка содержимого только изменившихся;
+  деактивированные и удаленные workflow'ы выбрасываются
+- после записи исправления копия обновляется локально и помечается
+  непроверенной: следующий refresh перечитает ее версию из БД
+
+Запись исправления по копии защищена оптимистичной блокировкой по
+updatedAt: если workflow изменился в n8n после снимка, запись не
+выполняется, а копия сбрасывается.
+"""
+
+import copy
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from connector import DEFAULT_INSTANCE, N8NConnector, NodeInfo, WorkflowContent
+from metrics import REGISTRY
+from workflow_graph import WorkflowGraph
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FETCHES = REGISTRY.counter(
+    "n8n_workflow_snapshot_fetches", "Workflow contents fetched into snapshots by reason", ["reason"]
+)
+SNAPSHOTS_STORED = REGISTRY.gauge("n8n_workflow_snapshots", "Workflows with a local snapshot")
+SNAPSHOT_REFRESH_DURATION = REGISTRY.histogram(
+    "n8n_workflow_snapshot_refresh_seconds", "Duration of a snapshot refresh across all instances"
+)
+
+class WorkflowSnapshots:
+    """Локальные копии активных workflow'ов всех инстансов"""
+
+    def __init__(self, connectors: Dict[str, N8NConnector], active_only: bool = True, prefetch: int = 50):
+        """
+        Инициализация
+
+        Args:
+            connectors: Коннекторы по имени инстанса
+            active_only: Держать копии только активных workflow'ов
+            prefetch: Строк за одну выборку курсора
+        """
+        self.connectors = connectors
+        self.active_only = active_only
+        self.prefetch = prefetch
+
+        # (инстанс, workflow_id) -> содержимое; updated_at None - версия не подтверждена БД
+        self._snapshots: Dict[Tuple[str, str], WorkflowContent] = {}
+
+        self.loaded = False
+        self.last_refresh_at: Optional[datetime] = None
+        self._statistics = {"refreshes": 0, "fetched": 0, "removed": 0, "invalidated": 0}
+
+        SNAPSHOTS_STORED.set_function(lambda: len(self._snapshots))
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    # ------------------------------------------------------------------
+    # Загрузка и обновление
+    # ------------------------------------------------------------------
+
+    async def load(self) -> int:
+        """Загружает копии всех (активных) workflow'ов - один курсор на инстанс"""
+        started = time.perf_counter()
+        fetched = 0
+        for instance, connector in self.connectors.items():
+            async for content in connector.stream_workflow_contents(active_only=self.active_only,
+                                                                    prefetch=self.prefetch):
+                self._snapshots[(instance, content.id)] = content
+                fetched += 1
+
+        SNAPSHOT_FETCHES.labels("initial").inc(fetched)
+        self._statistics["fetched"] += fetched
+        self.loaded = True
+        self.last_refresh_at = datetime.now()
+        logger.info(f"📸 Loaded {fetched} workflow snapshots in {time.perf_counter() - started:.2f}s")
+        return fetched
+
+    async def refresh(self) -> Dict[str, int]:
+        """
+        Перечитывает изменившиеся workflow'ы
+
+        Returns:
+            Число перечитанных, выброшенных и не изменившихся workflow'ов
+        """
+        started = time.perf_counter()
+        summary = {"fetched": 0, "removed": 0, "unchanged": 0}
+
+        for instance, connector in self.connectors.items():
+            versions = await connector.get_workflow_versions(active_only=self.active_only)
+            if versions is None:
+                # Версии недоступны - копии инстанса нельзя подтвердить, но и выбрасывать рано
+                continue
+
+            for key in [key for key in self._snapshots if key[0] == instance and key[1] not in versions]:
+                del self._snapshots[key]
+                summary["removed"] += 1
+
+            changed = []
+            for workflow_id, (updated_at, content_hash) in versions.items():
+                snapshot = self._snapshots.get((instance, workflow_id))
+                if snapshot is None or snapshot.updated_at != updated_at or snapshot.content_hash != content_hash:
+                    changed.append(workflow_id)
+                else:
+                    summary["unchanged"] += 1
+
+            if not changed:
+                continue
+
+            received = set()
+            async for content in connector.stream_workflow_contents(changed, active_only=self.active_only,
+                                                                    prefetch=self.prefetch):
+                self._snapshots[(instance, content.id)] = content
+                received.add(content.id)
+
+            # Непрочитанные изменившиеся копии устарели - исправитель пойдет в БД
+            for workflow_id in changed:
+                if workflow_id not in received:
+                    self._snapshots.pop((instance, workflow_id), None)
+            summary["fetched"] += len(received)
+
+        SNAPSHOT_FETCHES.labels("changed").inc(summary["fetched"])
+        self._statistics["refreshes"] += 1
+        self._statistics["fetched"] += summary["fetched"]
+        self._statistics["removed"] += summary["removed"]
+        self.last_refresh_at = datetime.now()
+        SNAPSHOT_REFRESH_DURATION.observe(time.perf_counter() - started)
+
+        if summary["fetched"] or summary["removed"]:
+            logger.info(f"📸 Snapshots refreshed: {summary['fetched']} fetched, {summary['removed']} removed, "
+                        f"{summary['unchanged']} unchanged")
+        return summary
+
+    # ------------------------------------------------------------------
+    # Доступ и локальные изменения
+    # ------------------------------------------------------------------
+
+    def get(self, workflow_id: str, instance: str = DEFAULT_INSTANCE) -> Optional[WorkflowContent]:
+        """Копия workflow'а (не изменять: для исправлений - graph())"""
+        return self._snapshots.get((instance, workflow_id))
+
+    def graph(self, workflow_id: str, instance: str = DEFAULT_INSTANCE) -> Optional[WorkflowGraph]:
+        """
+        Граф из подтвержденной копии (None - копии нет или она еще не подтверждена БД)
+
+        Граф получает свои экземпляры нод и version = updatedAt копии для
+        оптимистичной записи.
+        """
+        snapshot = self._snapshots.get((instance, workflow_id))
+        if snapshot is None or snapshot.updated_at is None or not snapshot.nodes:
+            return None
+        return WorkflowGraph(copy.deepcopy(snapshot.nodes), copy.deepcopy(snapshot.connections),
+                             version=snapshot.updated_at)
+
+    def record_write(self, workflow_id: str, instance: str, nodes: List[NodeInfo],
+                     connections: Optional[Dict[str, Any]] = None):
+        """Обновляет копию после записи в n8n (версию подтвердит следующий refresh)"""
+        key = (instance, workflow_id)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            return
+        self._snapshots[key] = WorkflowContent(
+            id=workflow_id,
+            name=snapshot.name,
+            nodes=copy.deepcopy(nodes),
+            connections=copy.deepcopy(connections) if connections is not None else snapshot.connections
+        )
+
+    def invalidate(self, workflow_id: str, instance: str = DEFAULT_INSTANCE):
+        """Выбрасывает копию (запись по ней не удалась - например, workflow изменился после снимка)"""
+        if self._snapshots.pop((instance, workflow_id), None) is not None:
+            self._statistics["invalidated"] += 1
+            logger.info(f"📸 Snapshot of workflow {workflow_id} dropped, next read goes to the database")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Статистика копий"""
+        return {
+            "snapshots": len(self._snapshots),
+            "loaded": self.loaded,
+            "last_refresh_at": self.last_refresh_at.isoformat() if self.last_refresh_at else None,
+            **self._statistics
+        }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+🎯 STRATEGY LEARNER - Онлайн обучение выбору стратегий исправления
+
+Для каждой пары (категория ошибки, тип исправления, тип ноды) хранятся
+два числа - затухающие счетчики успехов и неудач. Вместе с априорным
+распределением они задают Beta-апостериорное распределение вероятности
+успеха исправления:
+
+    Beta(prior_successes + successes, prior_failures + failures)
+
+Затухание экспоненциальное по времени (half_life_hours) и ленивое:
+счетчики домножаются на 0.5 ** (dt / half_life) при обращении, поэтому и
+обновление, и оценка - O(1) без хранения истории результатов.
+
+Результаты учитываются на трех уровнях: (категория, исправление, нода),
+(категория, исправление) и (исправление). Оценка берется с самого
+точного уровня, на котором есть данные, - новый тип ноды сразу получает
+опыт по категории.
+
+Выбор с исследованием - Thompson sampling: вместо среднего берется
+случайная выборка из апостериорного распределения, редко пробованные
+стратегии иногда получают шанс.
+"""
+
+import json
+import logging
+import math
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ключ статистики: (категория, тип исправления, тип ноды); None - уровень агрегации
+ArmKey = Tuple[Optional[str], str, Optional[str]]
+
+# Версия формата снимка
+SNAPSHOT_VERSION = 1
+
+class StrategyLearner:
+    """Затухающие Beta-апостериорные оценки успешности исправлений"""
+
+    def __init__(self, half_life_hours: Optional[float] = 168, prior_successes: float = 1.0,
+                 prior_failures: float = 1.0, min_evidence: float = 0.5,
+                 rng: Optional[random.Random] = None):
+        """
+        Инициализация
+
+        Args:
+            half_life_hours: Период полураспада результатов (None - без затухания)
+            prior_successes: Априорные успехи (alpha)
+            prior_failures: Априорные неудачи (beta)
+            min_evidence: Минимум (затухших) наблюдений, чтобы уровень считался обученным
+            rng: Генератор случайных чисел для Thompson sampling
+        """
+        self.half_life_seconds = half_life_hours * 3600 if half_life_hours else None
+        self.prior_successes = prior_successes
+        self.prior_failures = prior_failures
+        self.min_evidence = min_evidence
+        self.rng = rng or random.Random()
+
+        # Ключ -> [успехи, неудачи, время последнего обновления]
+        self._arms: Dict[ArmKey, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._arms)
+
+    def _decay(self, now: float, updated_at: float) -> float:
+        """Множитель затухания за прошедшее время"""
+        if self.half_life_seconds is None or now <= updated_at:
+            return 1.0
+        return 0.5 ** ((now - updated_at) / self.half_life_seconds)
+
+    def _counts(self, key: ArmKey, now: float) -> Tuple[float, float]:
+        """Затухшие (успехи, неудачи) ключа"""
+        arm = self._arms.get(key)
+        if arm is None:
+            return 0.0, 0.0
+        factor = self._decay(now, arm[2])
+        return arm[0] * factor, arm[1] * factor
+
+    @staticmethod
+    def _levels(category: Optional[str], fix_type: str, node_type: Optional[str]) -> Tuple[ArmKey, ...]:
+        """Уровни от самого точного к самому общему"""
+        return (category, fix_type, node_type), (category, fix_type, None), (None, fix_type, None)
+
+    def record(self, category: Optional[str], fix_type: str, success: bool,
+               node_type: Optional[str] = None, now: Optional[float] = None):
+        """Учитывает результат исправления на всех уровнях"""
+        now = time.time() if now is None else now
+        for key in dict.fromkeys(self._levels(category, fix_type, node_type)):
+            arm = self._arms.get(key)
+            if arm is None:
+                arm = self._arms[key] = [0.0, 0.0, now]
+            else:
+                factor = self._decay(now, arm[2])
+                arm[0] *= factor
+                arm[1] *= factor
+                arm[2] = now
+            arm[0 if success else 1] += 1.0
+
+    def posterior(self, category: Optional[str], fix_type: str, node_type: Optional[str] = None,
+                  now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """
+        Параметры (alpha, beta) апостериорного распределения
+
+        Берется самый точный уровень с данными; None - результатов еще не было.
+        """
+        now = time.time() if now is None else now
+        for key in self._levels(category, fix_type, node_type):
+            successes, failures = self._counts(key, now)
+            if successes + failures >= self.min_evidence:
+                return self.prior_successes + successes, self.prior_failures + failures
+        return None
+
+    def expected_success(self, category: Optional[str], fix_type: str, node_type: Optional[str] = None,
+                         now: Optional[float] = None) -> Optional[float]:
+        """Среднее апостериорного распределения (None - нет данных)"""
+        params = self.posterior(category, fix_type, node_type, now)
+        if params is None:
+            return None
+        alpha, beta = params
+        return alpha / (alpha + beta)
+
+    def sample_success(self, category: Optional[str], fix_type: str, node_type: Optional[str] = None,
+                       now: Optional[float] = None) -> float:
+        """Выборка из апостериорного распределения (без данных - из априорного)"""
+        params = self.posterior(category, fix_type, node_type, now)
+        alpha, beta = params if params is not None else (self.prior_successes, self.prior_failures)
+        return self.rng.betavariate(alpha, beta)
+
+    def get_success_rates(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Апостериорные средние по типам исправлений"""
+        now = time.time() if now is None else now
+        rates = {}
+        for key in self._arms:
+            category, fix_type, node_type = key
+            if category is None and node_type is None:
+                successes, failures = self._counts(key, now)
+                alpha = self.prior_successes + successes
+                rates[fix_type] = alpha / (alpha + self.prior_failures + failures)
+        return rates
+
+    def snapshot(self, now: Optional[float] = None, min_weight: float = 1e-3) -> Dict[str, Any]:
+        """
+        Компактный снимок состояния
+
+        Счетчики приводятся к моменту снимка (затухание применяется), ключи
+        с почти нулевым весом не сохраняются.
+        """
+        now = time.time() if now is None else now
+        arms = []
+        for key, arm in self._arms.items():
+            successes, failures = self._counts(key, now)
+            if successes + failures >= min_weight:
+                arms.append([key[0], key[1], key[2], round(successes, 6), round(failures, 6)])
+        return {"version": SNAPSHOT_VERSION, "taken_at": now, "arms": arms}
+
+    def restore(self, snapshot: Dict[str, Any]):
+        """Восстанавливает состояние из снимка (затухание продолжается с момента снимка)"""
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.warning(f"⚠️ Unsupported strategy learning snapshot version: {snapshot.get('version')}")
+            return
+
+        taken_at = snapshot.get("taken_at", time.time())
+        self._arms = {
+            (category, fix_type, node_type): [float(successes), float(failures), taken_at]
+            for category, fix_type, node_type, successes, failures in snapshot.get("arms", [])
+            if math.isfinite(successes) and math.isfinite(failures)
+        }
+
+    def save(self, path: str):
+        """Сохраняет снимок в JSON файл (атомарно)"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_suffix(target.suffix + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        temporary.replace(target)
+
+    def load(self, path: str) -> bool:
+        """Загружает снимок из JSON файла; False - файла нет или он не читается"""
+        target = Path(path)
+        if not target.exists():
+            return False
+        try:
+            with open(target) as f:
+                self.restore(json.load(f))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to load strategy learning state from {path}: {e}")
+            return False
+        logger.info(f"🎯 Strategy learning state loaded: {len(self._arms)} arms")
+        return True
@@ -27,17 +27,21 @@ class TestResult:
 class TestHarness:
     """Система тестирования workflow'ов"""
     
-    def __init__(self, connector: N8NConnector, config: Dict[str, Any] = None):
+    def __init__(self, connector: N8NConnector, config: Dict[str, Any] = None,
+                 connectors: Dict[str, N8NConnector] = None):
         self.connector = connector
         self.config = config or {}
+        self.connectors = connectors or {connector.instance: connector}
     
-    async def test_workflow(self, workflow_id: str, test_type: str = "basic") -> TestResult:
-        """Тестирует workflow"""
+    async def test_workflow(self, workflow_id: str, test_type: str = "basic",
+                            instance: Optional[str] = None) -> TestResult:
+        """Тестирует workflow (в указанном инстансе N8N)"""
         try:
             start_time = datetime.now()
+            connector = self.connectors[instance] if instance else self.connector
             
             # Выполняем workflow
-            execution_id = await self.connector.execute_workflow(
+            execution_id = await connector.execute_workflow(
                 workflow_id, 
                 {"topic": "Test execution"}
             )
@@ -0,0 +1,6 @@
+"""Модули системы импортируются по имени, как в скриптах запуска"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
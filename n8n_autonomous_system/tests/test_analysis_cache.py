@@ -0,0 +1,96 @@
+"""Кэш анализов: LRU, TTL, версия правил и прогрев из SQLite"""
+
+import pytest
+
+import analysis_cache
+from analysis_cache import AnalysisCache
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(analysis_cache.time, "time", clock)
+    return clock
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = AnalysisCache(max_entries=2, name="test-lru")
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+
+    cache.put("c", {"n": 3})
+    assert "b" not in cache
+    assert cache.get("a") == {"n": 1} and cache.get("c") == {"n": 3}
+    assert cache.get_stats()["evictions"] == 1
+
+def test_size_limit_evicts_and_tracks_bytes(clock):
+    cache = AnalysisCache(max_bytes=40, name="test-bytes")
+    cache.put("a", {"text": "x" * 10})
+    cache.put("b", {"text": "y" * 10})
+    assert len(cache) == 1 and "b" in cache
+    assert cache.size_bytes == len('{"text": "yyyyyyyyyy"}')
+
+    # Перезапись ключа не удваивает учтенный размер
+    cache.put("b", {"text": "z"})
+    assert cache.size_bytes == len('{"text": "z"}')
+
+def test_ttl_expires_entries(clock):
+    cache = AnalysisCache(ttl_seconds=60, name="test-ttl")
+    cache.put("a", {"n": 1})
+    clock.now += 60
+    assert cache.get("a") == {"n": 1}
+
+    clock.now += 1
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.get_stats()["misses"] == 1
+
+def test_rules_version_change_drops_entries(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = AnalysisCache(path=path, name="test-version")
+    cache.set_version("rules-1")
+    cache.put("a", {"n": 1})
+
+    cache.set_version("rules-2")
+    assert cache.get("a") is None and len(cache) == 0
+    cache.put("b", {"n": 2})
+    cache.close()
+
+    # Записи старой версии удалены и с диска
+    cache = AnalysisCache(path=path, name="test-version")
+    cache.set_version("rules-1")
+    assert cache.load() == 0
+    cache.close()
+
+def test_warm_up_loads_freshest_entries_of_current_version(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = AnalysisCache(ttl_seconds=3600, path=path, name="test-warm")
+    cache.set_version("rules-1")
+    for key in ("stale", "old", "newer", "newest"):
+        cache.put(key, {"key": key})
+        clock.now += 1000
+    cache.close()
+
+    # "stale" старше TTL, из остальных помещаются две самые свежие
+    restored = AnalysisCache(max_entries=2, ttl_seconds=3600, path=path, name="test-warm",
+                             deserialize=lambda data: data["key"])
+    restored.set_version("rules-1")
+    assert restored.load() == 2
+    assert restored.get("newer") == "newer" and restored.get("newest") == "newest"
+    assert "old" not in restored and "stale" not in restored
+    restored.close()
+
+    # Самая свежая запись - последняя в LRU порядке: при переполнении уходит "newer"
+    restored = AnalysisCache(max_entries=2, ttl_seconds=3600, path=path, name="test-warm")
+    restored.set_version("rules-1")
+    restored.load()
+    restored.put("next", {"key": "next"})
+    assert "newer" not in restored and "newest" in restored
+    restored.close()
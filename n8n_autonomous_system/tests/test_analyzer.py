@@ -0,0 +1,37 @@
+"""Анализатор: выбор стратегии для повторяющейся ошибки после неудачного исправления"""
+
+import asyncio
+
+from analyzer import ErrorAnalyzer
+
+MESSAGE = "connect ECONNREFUSED 10.0.0.1:443 connection timeout"
+
+class MeanRandom:
+    """Выборка Thompson = среднее апостериорного распределения (детерминированно)"""
+
+    def betavariate(self, alpha, beta):
+        return alpha / (alpha + beta)
+
+def analyze(analyzer):
+    return asyncio.run(analyzer.analyze_error("wf", "NetworkError", MESSAGE, "Call API",
+                                              node_type="n8n-nodes-base.httpRequest"))
+
+def test_failed_fix_invalidates_cached_strategy():
+    analyzer = ErrorAnalyzer({"strategy_learning": {"exploration": "thompson"}})
+    analyzer.learner.rng = MeanRandom()
+
+    first = analyze(analyzer)
+    assert analyze(analyzer) is first
+
+    # Успех не сбрасывает кэш, неудача - сбрасывает, и стратегия выбирается заново
+    analyzer.record_fix_result(first.error_id, first.suggested_fix.fix_type, True)
+    assert analyze(analyzer) is first
+
+    for _ in range(3):
+        analyzer.record_fix_result(first.error_id, first.suggested_fix.fix_type, False)
+    assert first.error_id not in analyzer.error_cache
+
+    second = analyze(analyzer)
+    assert second.error_id == first.error_id
+    assert second.suggested_fix.fix_type != first.suggested_fix.fix_type
+    assert analyze(analyzer) is second
@@ -0,0 +1,66 @@
+"""Хранилище backup'ов: дедупликация блобов, счетчики ссылок и сборка мусора"""
+
+from datetime import datetime, timedelta
+
+from backup_store import BackupStore, canonical_json, content_hash
+
+TRIGGER = {"id": "t", "name": "Trigger", "type": "n8n-nodes-base.webhook", "parameters": {"path": "p"}}
+CALL = {"id": "h", "name": "Call API", "type": "n8n-nodes-base.httpRequest", "parameters": {"url": "x"}}
+CALL_FIXED = {**CALL, "parameters": {"url": "x", "options": {"timeout": 60000}}}
+CONNECTIONS = {"Trigger": {"main": [[{"node": "Call API", "type": "main", "index": 0}]]}}
+
+def blob_refs(store):
+    return dict(store._db.execute("SELECT hash, refs FROM blobs"))
+
+def digest(value):
+    return content_hash(canonical_json(value))
+
+def put(store, backup_id, nodes, **kwargs):
+    return store.put(backup_id, "wf", nodes, CONNECTIONS, f"before {backup_id}", "default", **kwargs)
+
+def test_identical_blobs_are_stored_once_with_refcounts():
+    store = BackupStore()
+    put(store, "b1", [TRIGGER, CALL])
+    put(store, "b2", [TRIGGER, CALL_FIXED])
+    # Одинаковая нода дважды в одном backup'е - две ссылки на один блоб
+    put(store, "b3", [TRIGGER, TRIGGER])
+
+    assert blob_refs(store) == {digest(TRIGGER): 4, digest(CALL): 1, digest(CALL_FIXED): 1, digest(CONNECTIONS): 3}
+    statistics = store.get_statistics()
+    assert statistics["backups"] == 3 and statistics["blobs"] == 4
+    assert statistics["blob_references"] == 9
+
+def test_delete_collects_unreferenced_blobs():
+    store = BackupStore()
+    put(store, "b1", [TRIGGER, CALL])
+    put(store, "b2", [TRIGGER, CALL_FIXED])
+    stored_bytes = store.blob_bytes
+
+    assert store.delete(["b1", "missing"]) == 1
+    assert blob_refs(store) == {digest(TRIGGER): 1, digest(CALL_FIXED): 1, digest(CONNECTIONS): 1}
+    assert store.blob_count == 3 and 0 < store.blob_bytes < stored_bytes
+    assert "b1" not in store and "b2" in store
+
+    assert store.delete(["b2"]) == 1
+    assert blob_refs(store) == {}
+    assert (len(store), store.blob_count, store.blob_bytes) == (0, 0, 0)
+
+def test_backups_survive_restart_and_are_found_by_fix(tmp_path):
+    path = str(tmp_path / "backups.db")
+    store = BackupStore(path)
+    old = put(store, "b1", [TRIGGER, CALL], created_at=datetime.now() - timedelta(days=10), fix_ids=["f1"])
+    put(store, "b2", [TRIGGER, CALL_FIXED], fix_ids=["f2", "f3"], metadata={"transaction": True})
+    store.close()
+
+    store = BackupStore(path)
+    assert (len(store), store.blob_count) == (2, 4)
+    manifest = store.find_by_fix("f3")
+    assert manifest.backup_id == "b2" and sorted(manifest.fix_ids) == ["f2", "f3"]
+    assert manifest.metadata == {"transaction": True}
+    assert store.assemble(manifest) == {"nodes": [TRIGGER, CALL_FIXED], "connections": CONNECTIONS}
+    assert store.get_manifest("b1").created_at == old.created_at
+
+    assert store.delete_older_than(datetime.now() - timedelta(days=1)) == 1
+    assert store.find_by_fix("f1") is None
+    assert blob_refs(store) == {digest(TRIGGER): 1, digest(CALL_FIXED): 1, digest(CONNECTIONS): 1}
+    store.close()
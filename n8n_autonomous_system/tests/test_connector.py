@@ -0,0 +1,24 @@
+"""Набор коннекторов: выбор инстанса по имени"""
+
+import asyncio
+
+import pytest
+
+from connector import ConnectorFleet, N8NConnector
+from profiler import WorkflowProfiler
+
+def fleet():
+    return ConnectorFleet([N8NConnector(api_url="http://main:5678", instance="main"),
+                           N8NConnector(api_url="http://edge:5678", instance="edge")])
+
+def test_unknown_instance_is_rejected():
+    connectors = fleet()
+    assert connectors.get() is connectors.primary
+    assert connectors.get("edge").instance == "edge"
+    with pytest.raises(ValueError, match="Unknown N8N instance: typo"):
+        connectors.get("typo")
+
+    # Профайлер тоже не подменяет неизвестный инстанс основным
+    profiler = WorkflowProfiler(connectors.primary, connectors=connectors.connectors)
+    with pytest.raises(ValueError, match="Unknown N8N instance: typo"):
+        asyncio.run(profiler.profile_executions([], instance="typo"))
@@ -0,0 +1,110 @@
+"""Журнал событий: восстановление хвоста, ротация, retention и чтение по сегментам"""
+
+from event_log import INDEX_INTERVAL, SEGMENT_PREFIX, EventLog
+
+def segment_files(directory):
+    return sorted(directory.glob(f"{SEGMENT_PREFIX}*"))
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    log = EventLog(str(tmp_path))
+    for i in range(3):
+        log.append({"n": i})
+    log.close()
+
+    # Обрыв записи посреди строки и мусор без перевода строки
+    with open(segment_files(tmp_path)[-1], "ab") as f:
+        f.write(b'{"n": 3, "unfinished')
+
+    log = EventLog(str(tmp_path))
+    assert log.next_offset == 3
+    assert [record["n"] for _, record in log.read_from(0)] == [0, 1, 2]
+
+    # Новые записи продолжают offset'ы после валидного хвоста
+    assert log.append({"n": 3}) == 3
+    assert [offset for offset, _ in log.read_from(0)] == [0, 1, 2, 3]
+    log.close()
+
+def test_invalid_json_line_ends_recovery(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append({"n": 0})
+    log.close()
+    with open(segment_files(tmp_path)[-1], "ab") as f:
+        f.write(b"not json\n")
+
+    log = EventLog(str(tmp_path))
+    assert log.next_offset == 1
+    log.close()
+
+def test_rotation_and_read_from_across_segments(tmp_path):
+    log = EventLog(str(tmp_path), segment_max_bytes=100)
+    for i in range(20):
+        assert log.append({"n": i, "payload": "x" * 20}) == i
+
+    assert len(segment_files(tmp_path)) > 2
+    assert [record["n"] for _, record in log.read_from(0)] == list(range(20))
+    # Чтение с середины сегмента и с ограничением
+    assert [offset for offset, _ in log.read_from(7, limit=5)] == [7, 8, 9, 10, 11]
+    assert list(log.read_from(20)) == []
+    log.close()
+
+    # После рестарта сканируется только последний сегмент, offset'ы сохраняются
+    log = EventLog(str(tmp_path), segment_max_bytes=100)
+    assert log.next_offset == 20
+    assert [record["n"] for _, record in log.read_from(15)] == [15, 16, 17, 18, 19]
+    log.close()
+
+def test_retention_removes_oldest_segments(tmp_path):
+    log = EventLog(str(tmp_path), segment_max_bytes=100, retention_bytes=250)
+    for i in range(40):
+        log.append({"n": i, "payload": "x" * 20})
+
+    assert log.first_offset > 0
+    total = sum(path.stat().st_size for path in segment_files(tmp_path))
+    assert total <= 250 + 100
+
+    # Чтение с удаленного offset'а начинается с первого доступного
+    records = list(log.read_from(0))
+    assert records[0][0] == log.first_offset
+    assert [offset for offset, _ in records] == list(range(log.first_offset, 40))
+    log.close()
+
+def test_consumer_offsets_survive_restart(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append({"n": 0})
+    log.commit_offset("orchestrator", 0)
+    log.commit_offset("orchestrator", -1)
+    log.close()
+
+    log = EventLog(str(tmp_path))
+    assert log.committed_offset("orchestrator") == 0
+    assert log.committed_offset("unknown") is None
+    log.close()
+
+def test_read_from_seeks_through_sparse_index(tmp_path):
+    log = EventLog(str(tmp_path), segment_max_bytes=4096)
+    total = 3 * INDEX_INTERVAL + 10
+    for i in range(total):
+        log.append({"n": i})
+    assert len(segment_files(tmp_path)) > 1
+
+    expected = list(range(total))
+    for offset in (0, 1, INDEX_INTERVAL - 1, INDEX_INTERVAL, INDEX_INTERVAL + 7, total - 1):
+        assert [record["n"] for _, record in log.read_from(offset, limit=50)] == expected[offset:offset + 50]
+    log.close()
+
+    # После рестарта индекс строится заново: при восстановлении и при первом чтении
+    log = EventLog(str(tmp_path), segment_max_bytes=4096)
+    assert [offset for offset, _ in log.read_from(0)] == expected
+    for i in range(total, total + 5):
+        log.append({"n": i})
+    assert [record["n"] for _, record in log.read_from(total - 2)] == list(range(total - 2, total + 5))
+
+    # Чтение с середины сегмента не проходит его начало: если склеить первые две строки,
+    # сканирование с начала сдвинуло бы offset'ы, а чтение по индексу - нет
+    first = segment_files(tmp_path)[0]
+    data = first.read_bytes()
+    line_end = data.index(b"\n")
+    first.write_bytes(data[:line_end] + b" " + data[line_end + 1:])
+    offset = INDEX_INTERVAL + 3
+    assert next(log.read_from(offset)) == (offset, {"n": offset})
+    log.close()
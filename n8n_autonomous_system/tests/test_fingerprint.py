@@ -0,0 +1,45 @@
+"""Отпечатки ошибок: идемпотентная нормализация и сохранение HTTP статусов"""
+
+from fingerprint import MAX_TEMPLATE_LENGTH, fingerprint_error, normalize_message
+
+MESSAGES = [
+    "Timeout after 30012ms calling https://api.example.com/v1/items?id=77",
+    "Request 3f2b8c1e-9a4d-4e6f-8b2a-1c3d5e7f9a0b failed at 2026-01-05T10:22:31.123Z",
+    "Connection refused: 10.0.0.12:5432 (user bob@example.com)",
+    "Execution abc123def456ghi789 hit limit 1.5 of 2",
+    "Request failed with status code 429 after 3 retries",
+    "HTTP/1.1 503 Service Unavailable, token deadbeef0042cafe",
+    "  multi\n\tline   message  ",
+]
+
+def test_normalization_is_idempotent():
+    for message in MESSAGES:
+        template = normalize_message(message)
+        assert normalize_message(template) == template, message
+
+def test_variable_parts_are_replaced():
+    assert normalize_message(MESSAGES[0]) == "Timeout after <n>ms calling <url>"
+    assert normalize_message(MESSAGES[1]) == "Request <uuid> failed at <ts>"
+    assert normalize_message(MESSAGES[2]) == "Connection refused: <ip> (user <email>)"
+    assert normalize_message(MESSAGES[3]) == "Execution <id> hit limit <n> of <n>"
+    assert normalize_message(MESSAGES[6]) == "multi line message"
+    assert normalize_message(None) == ""
+
+def test_http_status_codes_are_preserved():
+    assert normalize_message(MESSAGES[4]) == "Request failed with status code 429 after <n> retries"
+    assert normalize_message(MESSAGES[5]) == "HTTP/1.1 503 Service Unavailable, token <hex>"
+    assert normalize_message("code: 500 from upstream") == "code: 500 from upstream"
+
+    rate_limited, _ = fingerprint_error("wf", "NodeApiError", "Request failed with status code 429", "Call API")
+    server_error, _ = fingerprint_error("wf", "NodeApiError", "Request failed with status code 500", "Call API")
+    assert rate_limited != server_error
+
+def test_fingerprint_is_stable_across_variable_parts():
+    first, template = fingerprint_error("wf", "TimeoutError", "Timeout after 30012ms", "Call API")
+    second, _ = fingerprint_error("wf", "TimeoutError", "Timeout after 30044ms", "Call API")
+    other_node, _ = fingerprint_error("wf", "TimeoutError", "Timeout after 30012ms", "Other")
+    assert first == second != other_node
+    assert len(first) == 32 and template == "Timeout after <n>ms"
+
+def test_template_is_truncated():
+    assert len(normalize_message("word " * 1000)) == MAX_TEMPLATE_LENGTH
@@ -0,0 +1,78 @@
+"""Журнал исправлений: проигрывание после рестарта, статусы rollback, индексы и вытеснение"""
+
+from datetime import datetime, timedelta
+
+from fix_ledger import FixLedger, FixResult, FixStatus
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+def fix(number, minutes=None, workflow_id="wf", backup_id="backup-1", success=True):
+    return FixResult(
+        fix_id=f"fix-{number}",
+        success=success,
+        status=FixStatus.APPLIED if success else FixStatus.FAILED,
+        applied_at=START + timedelta(minutes=number if minutes is None else minutes),
+        description=f"fix {number}",
+        backup_id=backup_id,
+        rollback_available=success,
+        workflow_id=workflow_id
+    )
+
+def ids(results):
+    return [result.fix_id for result in results]
+
+def test_replay_restores_fixes_statuses_and_statistics(tmp_path):
+    ledger = FixLedger(str(tmp_path))
+    ledger.record([fix(0), fix(1), fix(2, success=False)])
+    ledger.record([fix(3, backup_id="backup-2")])
+    rolled_back = ledger.update_status(
+        [result.fix_id for result in ledger.by_backup("backup-1") if result.success],
+        FixStatus.ROLLED_BACK
+    )
+    assert ids(rolled_back) == ["fix-0", "fix-1"]
+    # Повторная смена на тот же статус ничего не пишет
+    assert ledger.update_status(["fix-0"], FixStatus.ROLLED_BACK) == []
+    ledger.close()
+
+    ledger = FixLedger(str(tmp_path))
+    assert len(ledger) == 4
+    assert ledger.get("fix-0").status == FixStatus.ROLLED_BACK
+    assert ledger.get("fix-2").status == FixStatus.FAILED
+    assert ledger.get("fix-3").status == FixStatus.APPLIED
+    assert ids(ledger.by_backup("backup-1")) == ["fix-0", "fix-1", "fix-2"]
+
+    statistics = ledger.get_statistics()
+    assert statistics["total_fixes"] == 4
+    assert statistics["successful_fixes"] == 3
+    assert statistics["rolled_back_fixes"] == 2
+    assert statistics["status_counts"] == {"rolled_back": 2, "failed": 1, "applied": 1}
+    ledger.close()
+
+def test_late_record_keeps_time_order():
+    ledger = FixLedger()
+    ledger.record([fix(0), fix(2), fix(4)])
+    ledger.record([fix(1, minutes=3)])
+
+    assert ids(ledger.recent()) == ["fix-4", "fix-1", "fix-2", "fix-0"]
+    assert ids(ledger.between(START + timedelta(minutes=2), START + timedelta(minutes=3))) == ["fix-2", "fix-1"]
+    assert ids(ledger.by_workflow("wf", limit=2)) == ["fix-1", "fix-4"]
+
+def test_eviction_drops_oldest_from_all_indices():
+    ledger = FixLedger(max_entries=10)
+    # Запас вытеснения - 10%, т.е. одна запись: пачка уходит при 12-й
+    ledger.record(fix(n, workflow_id=f"wf-{n % 2}", backup_id=f"backup-{n // 4}") for n in range(11))
+    assert len(ledger) == 11
+
+    ledger.record([fix(11, workflow_id="wf-1", backup_id="backup-2")])
+    assert len(ledger) == 10
+    assert "fix-0" not in ledger and "fix-1" not in ledger
+    assert ids(ledger.by_backup("backup-0")) == ["fix-2", "fix-3"]
+    assert ids(ledger.by_workflow("wf-0")) == ["fix-10", "fix-8", "fix-6", "fix-4", "fix-2"]
+    assert ids(ledger.recent(limit=100))[-1] == "fix-2"
+    assert ledger.between(START, START + timedelta(minutes=1)) == []
+
+    # Транзакция, вытесненная целиком, исчезает из индекса
+    ledger.record(fix(n, backup_id="backup-9") for n in range(12, 16))
+    assert ledger.by_backup("backup-0") == []
+    # Статистика ведется по всему журналу, а не только по окну
+    assert ledger.get_statistics()["total_fixes"] == 16
@@ -0,0 +1,93 @@
+"""Транзакция исправлений: упавшее исправление откатывается, остальные записываются"""
+
+import asyncio
+import copy
+
+import pytest
+
+from analyzer import ErrorAnalysis, ErrorCategory, FixType, RepairStrategy
+from connector import DEFAULT_INSTANCE, node_to_dict, parse_nodes
+from fix_ledger import FixStatus
+from fixer import AutoFixer
+
+NODES = [
+    {"id": "t", "name": "Trigger", "type": "n8n-nodes-base.webhook", "position": [0, 0], "typeVersion": 2,
+     "parameters": {"path": "p"}},
+    {"id": "h", "name": "Call API", "type": "n8n-nodes-base.httpRequest", "position": [200, 0], "typeVersion": 4.2,
+     "parameters": {"url": "https://old.example.com", "options": {}}},
+    {"id": "s", "name": "Store", "type": "n8n-nodes-base.set", "position": [400, 0], "typeVersion": 3,
+     "parameters": {"mode": "raw"}},
+]
+CONNECTIONS = {
+    "Trigger": {"main": [[{"node": "Call API", "type": "main", "index": 0}]]},
+    "Call API": {"main": [[{"node": "Store", "type": "main", "index": 0}]]},
+}
+
+class FakeConnector:
+    instance = DEFAULT_INSTANCE
+
+    def __init__(self):
+        self.nodes = copy.deepcopy(NODES)
+        self.connections = copy.deepcopy(CONNECTIONS)
+        self.writes = 0
+
+    async def get_workflow_nodes(self, workflow_id):
+        return parse_nodes(copy.deepcopy(self.nodes))
+
+    async def get_workflow_connections(self, workflow_id):
+        return copy.deepcopy(self.connections)
+
+    async def get_workflow_by_id(self, workflow_id):
+        return None
+
+    async def update_workflow_nodes(self, workflow_id, nodes, connections=None, expected_updated_at=None):
+        self.nodes = [node_to_dict(node) for node in nodes]
+        if connections is not None:
+            self.connections = connections
+        self.writes += 1
+        return True
+
+def analysis(fix_type, affected_nodes, **parameters):
+    strategy = RepairStrategy(fix_type=fix_type, description=fix_type.value, confidence_threshold=0.5,
+                              parameters=parameters)
+    return ErrorAnalysis(error_id=f"error-{fix_type.value}", category=ErrorCategory.CONFIGURATION, confidence=0.9,
+                         description="test", suggested_fix=strategy, affected_nodes=affected_nodes)
+
+def node(connector, name):
+    return next(item for item in connector.nodes if item["name"] == name)
+
+@pytest.mark.parametrize("simulation", [True, False])
+def test_failed_fix_is_rolled_back_inside_transaction(tmp_path, monkeypatch, simulation):
+    monkeypatch.chdir(tmp_path)
+    connector = FakeConnector()
+    fixer = AutoFixer(connector, {"backup_store": {"persistent": False}, "fix_ledger": {"persistent": False},
+                                  "simulation": {"enabled": simulation}})
+    analyses = [
+        analysis(FixType.UPDATE_PARAMETER, ["Call API"], parameter="url", value="https://new.example.com",
+                 node_name="Call API"),
+        # Первый план применяется, второй падает (нет max_tries) - изменение первого должно откатиться
+        analysis(FixType.TUNE_TIMEOUT_RETRY, ["Call API", "Store"], plans={
+            "Call API": {"timeout_ms": 5000},
+            "Store": {"retry_on_fail": True}
+        }),
+        analysis(FixType.UPDATE_PARAMETER, ["Store"], parameter="mode", value="manual", node_name="Store"),
+    ]
+
+    results = asyncio.run(fixer.apply_fixes("wf", analyses))
+
+    assert [result.status for result in results] == [FixStatus.APPLIED, FixStatus.FAILED, FixStatus.APPLIED]
+    assert results[1].error and not results[1].success
+
+    # Одна запись: оба успешных исправления, без следов упавшего
+    assert connector.writes == 1
+    assert node(connector, "Call API")["parameters"] == {"url": "https://new.example.com", "options": {}}
+    assert node(connector, "Store")["parameters"]["mode"] == "manual"
+    assert "retryOnFail" not in node(connector, "Store")
+
+    # Общий backup транзакции хранит исходное состояние и находит все исправления
+    backup_id = results[0].backup_id
+    assert all(result.backup_id == backup_id for result in results)
+    manifest = fixer.backup_store.find_by_fix(results[1].fix_id)
+    assert manifest.backup_id == backup_id
+    assert fixer.backup_store.assemble(manifest)["nodes"][1]["parameters"]["url"] == "https://old.example.com"
+    assert [result.fix_id for result in fixer.ledger.by_backup(backup_id)] == [result.fix_id for result in results]
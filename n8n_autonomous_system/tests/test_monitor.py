@@ -0,0 +1,230 @@
+"""Монитор: первый опрос инстанса и доставка событий подпискам"""
+
+import asyncio
+import json
+from datetime import datetime
+
+from connector import ExecutionInfo
+from event_log import EventLog
+from event_store import EventStore
+from monitor import EventType, ExecutionEvent, ExecutionMonitor, Severity
+from profiler import WorkflowProfiler
+
+class FakeConnector:
+    instance = "default"
+
+    def __init__(self):
+        self.executions = []
+
+    async def get_recent_executions(self, limit: int = 100):
+        return list(self.executions)
+
+    async def get_executions_errors(self, execution_ids):
+        return {execution_id: [{"node": "HTTP Request", "error": {"type": "NodeApiError", "message": "503"}}]
+                for execution_id in execution_ids}
+
+def execution(execution_id: str, status: str = "error") -> ExecutionInfo:
+    return ExecutionInfo(id=execution_id, workflow_id="wf", status=status, finished=True,
+                         started_at=datetime.now(), stopped_at=datetime.now())
+
+def failures(monitor: ExecutionMonitor):
+    return [event for event in monitor.recent_events if event.event_type == EventType.EXECUTION_FAILED]
+
+def test_first_poll_of_empty_instance_does_not_swallow_first_failures():
+    connector = FakeConnector()
+    monitor = ExecutionMonitor(connector)
+    instance = monitor.instances["default"]
+
+    async def scenario():
+        # Новый инстанс: выполнений еще нет
+        await monitor._poll_executions(instance)
+        assert instance.initialized
+
+        connector.executions = [execution("1")]
+        await monitor._poll_executions(instance)
+
+    asyncio.run(scenario())
+    assert [event.execution_id for event in failures(monitor)] == ["1"]
+
+def test_first_poll_remembers_history_without_events():
+    connector = FakeConnector()
+    connector.executions = [execution("old")]
+    monitor = ExecutionMonitor(connector)
+    instance = monitor.instances["default"]
+
+    async def scenario():
+        await monitor._poll_executions(instance)
+        connector.executions.append(execution("new"))
+        await monitor._poll_executions(instance)
+
+    asyncio.run(scenario())
+    assert [event.execution_id for event in failures(monitor)] == ["new"]
+
+def event(number: int) -> ExecutionEvent:
+    return ExecutionEvent(id=f"complete_{number}", event_type=EventType.EXECUTION_FAILED, severity=Severity.ERROR,
+                          workflow_id="wf", execution_id=str(number), timestamp=datetime.now())
+
+def test_subscription_catches_up_from_log_then_receives_live_events(tmp_path):
+    log = EventLog(str(tmp_path))
+    monitor = ExecutionMonitor(FakeConnector(), event_log=log)
+
+    async def scenario():
+        await monitor._append_events([event(i) for i in range(3)])
+        subscription = await monitor.subscribe("consumer", from_offset=0)
+        assert subscription.catching_up
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert not subscription.catching_up
+
+        await monitor._append_events([event(i) for i in range(3, 5)])
+        return [delivered.offset for delivered in subscription.drain()]
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+    log.close()
+
+def test_catch_up_during_backpressure_does_not_duplicate_events(tmp_path):
+    log = EventLog(str(tmp_path))
+    monitor = ExecutionMonitor(FakeConnector(), event_log=log)
+
+    async def scenario():
+        slow = await monitor.subscribe("slow", maxsize=1)
+        # Публикация пакета упирается в полную очередь slow на втором событии
+        publishing = asyncio.create_task(monitor._append_events([event(i) for i in range(5)]))
+        await asyncio.sleep(0)
+        assert slow.queue.full() and not publishing.done()
+
+        # Тем временем вторая подписка дочитывает журнал, где уже весь пакет
+        fresh = await monitor.subscribe("fresh", from_offset=0)
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert not fresh.catching_up
+
+        slow_offsets = []
+        while not publishing.done() or not slow.queue.empty():
+            slow_offsets.append((await slow.get()).offset)
+        await publishing
+        await monitor._append_events([event(5)])
+        slow_offsets += [delivered.offset for delivered in slow.drain()]
+        return slow_offsets, [delivered.offset for delivered in fresh.drain()]
+
+    slow_offsets, fresh_offsets = asyncio.run(scenario())
+    assert slow_offsets == [0, 1, 2, 3, 4, 5]
+    assert fresh_offsets == [0, 1, 2, 3, 4, 5]
+    log.close()
+
+class DataConnector(FakeConnector):
+    """Коннектор со счетчиком чтений execution_data"""
+
+    def __init__(self):
+        super().__init__()
+        self.data_reads = []
+
+    async def get_executions_data(self, execution_ids):
+        self.data_reads.append(list(execution_ids))
+        run = {"startTime": 1_700_000_000_000, "executionTime": 1500}
+        data = {}
+        for execution_id in execution_ids:
+            node_run = dict(run, error={"message": "503"}) if execution_id == "failed" else run
+            data[execution_id] = {"resultData": {"runData": {"HTTP Request": [node_run]}}}
+        return data
+
+    async def get_executions_errors(self, execution_ids):
+        raise AssertionError("execution data must be read once per batch")
+
+    async def get_executions_run_data(self, execution_ids):
+        raise AssertionError("execution data must be read once per batch")
+
+    async def get_workflow_connections(self, workflow_id):
+        return {}
+
+    async def get_workflow_nodes(self, workflow_id):
+        return []
+
+def test_profiled_completions_read_execution_data_once():
+    connector = DataConnector()
+    profiler = WorkflowProfiler(connector)
+    monitor = ExecutionMonitor(connector, profiler=profiler)
+    instance = monitor.instances["default"]
+
+    completed = [execution("failed"), execution("ok", status="success")]
+    asyncio.run(monitor._process_completions(instance, completed))
+
+    assert connector.data_reads == [["failed", "ok"]]
+    failure = failures(monitor)[0]
+    assert failure.node_name == "HTTP Request" and failure.error_message == "503"
+    assert profiler.executions_profiled == 2
+
+def test_event_store_failure_does_not_block_publication():
+    store = EventStore(capacity=100)
+    monitor = ExecutionMonitor(FakeConnector(), event_store=store)
+
+    async def scenario():
+        subscription = await monitor.subscribe("consumer")
+        broken = event(1)
+        broken.duration = "abc"
+        await monitor._append_events([event(0), broken])
+        return subscription.drain()
+
+    delivered = asyncio.run(scenario())
+    assert [item.execution_id for item in delivered] == ["0", "1"]
+    # Пакет не попал в кольцо целиком, последующие пакеты пишутся
+    assert store.size == 0
+    asyncio.run(monitor._append_events([event(2)]))
+    assert store.size == 1
+
+def test_webhook_records_with_bad_fields_are_counted_invalid():
+    monitor = ExecutionMonitor(FakeConnector())
+    records = [
+        {"eventType": "execution_failed", "severity": "error", "workflowId": 42, "executionId": 7,
+         "duration": "1.5", "nodeName": "HTTP Request"},
+        {"eventType": "execution_failed", "duration": "abc"},
+        {"eventType": "execution_failed", "workflowId": ["wf"]},
+        {"eventType": "execution_failed", "instance": {"name": "eu"}},
+        {"eventType": "execution_failed", "duration": float("inf")},
+        {"eventType": "execution_failed", "duration": True},
+        "not an object",
+    ]
+
+    events = monitor._events_from_records(records)
+    assert len(events) == 1
+    assert (events[0].workflow_id, events[0].execution_id, events[0].duration) == ("42", "7", 1.5)
+    assert monitor.ingestion_stats.invalid_events == 6
+
+class BatchRequest:
+    def __init__(self, records):
+        self.body = "\n".join(json.dumps(record) for record in records).encode()
+
+    async def read(self):
+        return self.body
+
+def test_batch_larger_than_ingest_queue_gets_413():
+    monitor = ExecutionMonitor(FakeConnector(), webhook_config={"ingest_queue_size": 3})
+    record = {"eventType": "execution_failed", "workflowId": "wf"}
+
+    async def scenario():
+        oversized = await monitor._handle_events_batch(BatchRequest([record] * 4))
+        accepted = await monitor._handle_events_batch(BatchRequest([record] * 2))
+        # Очередь временно заполнена - 429 с Retry-After, пакет пройдет позже
+        busy = await monitor._handle_events_batch(BatchRequest([record] * 2))
+        return oversized, accepted, busy
+
+    oversized, accepted, busy = asyncio.run(scenario())
+    assert oversized.status == 413 and "Retry-After" not in oversized.headers
+    assert accepted.status == 202
+    assert busy.status == 429 and busy.headers["Retry-After"] == "1"
+    assert monitor.ingestion_stats.rejected_batches == 2
+
+def test_restore_from_log_replays_only_recent_events(tmp_path):
+    log = EventLog(str(tmp_path))
+    for i in range(3000):
+        log.append(event(i).to_dict())
+
+    store = EventStore(capacity=100000)
+    monitor = ExecutionMonitor(FakeConnector(), event_log=log, event_store=store, replay_limit=1500)
+    assert monitor.restore_from_log() == 1500
+    assert store.size == 1500
+    assert monitor.recent_events[-1].execution_id == "2999"
+
+    # Меньше recent_events не проигрывается
+    monitor = ExecutionMonitor(FakeConnector(), event_log=log, replay_limit=10)
+    assert monitor.restore_from_log() == monitor.recent_events.maxlen
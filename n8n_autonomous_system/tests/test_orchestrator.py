@@ -0,0 +1,62 @@
+"""Оркестратор: обработка событий подписки без потерь при ошибке обработчика"""
+
+import asyncio
+from datetime import datetime
+
+from monitor import EventSubscription, EventType, ExecutionEvent, Severity
+from orchestrator import AutonomousOrchestrator
+
+def event(offset: int) -> ExecutionEvent:
+    return ExecutionEvent(id=f"complete_{offset}", event_type=EventType.EXECUTION_FAILED, severity=Severity.ERROR,
+                          workflow_id="wf", execution_id=str(offset), timestamp=datetime.now(), offset=offset)
+
+def orchestrator(failing, max_attempts=3):
+    """Оркестратор без компонентов: только подписка и обработчик, падающий на событиях failing"""
+    instance = object.__new__(AutonomousOrchestrator)
+    instance.config = {"monitoring": {"event_max_attempts": max_attempts}}
+    instance._pending_events = []
+    instance._pending_attempts = 0
+    instance.event_subscription = EventSubscription("orchestrator")
+    instance.handled = []
+
+    async def handle(event):
+        if event.offset in failing:
+            raise RuntimeError(f"handler failed on {event.offset}")
+        instance.handled.append(event.offset)
+
+    instance._handle_execution_error = handle
+    return instance
+
+def deliver(instance, offsets):
+    for offset in offsets:
+        instance.event_subscription.queue.put_nowait(event(offset))
+
+def test_failed_event_and_following_stay_unacked_until_handled():
+    failing = {2}
+    instance = orchestrator(failing)
+    deliver(instance, range(5))
+
+    asyncio.run(instance._monitoring_phase())
+    assert instance.handled == [0, 1]
+    assert instance.event_subscription.acked_offset == 1
+    assert [event.offset for event in instance._pending_events] == [2, 3, 4]
+
+    # Следующий цикл: сначала отложенные события, потом новые
+    failing.clear()
+    deliver(instance, [5])
+    asyncio.run(instance._monitoring_phase())
+    assert instance.handled == [0, 1, 2, 3, 4, 5]
+    assert instance.event_subscription.acked_offset == 5
+    assert instance._pending_events == []
+
+def test_event_is_skipped_after_max_attempts():
+    instance = orchestrator({1}, max_attempts=2)
+    deliver(instance, range(3))
+
+    asyncio.run(instance._monitoring_phase())
+    assert instance.event_subscription.acked_offset == 0
+
+    asyncio.run(instance._monitoring_phase())
+    assert instance.handled == [0, 2]
+    assert instance.event_subscription.acked_offset == 2
+    assert instance._pending_events == [] and instance._pending_attempts == 0
@@ -0,0 +1,142 @@
+"""Исправления производительности: перевод Code нод в один запуск, кэш ответов и проверка до/после"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from analyzer import FixType, RepairStrategy
+from connector import DEFAULT_INSTANCE, parse_nodes
+from fix_ledger import FixLedger
+from fixer import CACHE_HIT_CONDITION, AutoFixer
+from performance import BenchmarkTracker, PerformanceAdvisor, PerformanceFinding, runs_once_for_all_items
+from profiler import ExecutionProfile, WorkflowProfiler
+from workflow_graph import WorkflowGraph
+
+PER_ITEM_CODE = "return {json: {v: $json.v * 2, source: $('Trigger').item.json.id, i: $itemIndex}};"
+LEGACY_CODE = "return {json: {v: $node['Trigger'].json.v}};"
+
+def code_node(node_id, name, code, x):
+    return {"id": node_id, "name": name, "type": "n8n-nodes-base.code", "position": [x, 0], "typeVersion": 2,
+            "parameters": {"mode": "runOnceForEachItem", "jsCode": code}}
+
+def main_edge(target):
+    return {"main": [[{"node": target, "type": "main", "index": 0}]]}
+
+def build_graph():
+    nodes = [
+        {"id": "t", "name": "Trigger", "type": "n8n-nodes-base.webhook", "position": [0, 0], "typeVersion": 2,
+         "parameters": {"path": "p"}},
+        code_node("c", "Transform", PER_ITEM_CODE, 200),
+        code_node("l", "Legacy", LEGACY_CODE, 400),
+        {"id": "s", "name": "Summarize", "type": "@n8n/n8n-nodes-langchain.chainLlm", "position": [600, 0],
+         "typeVersion": 1, "parameters": {"text": "={{ $json.v }}"}},
+        {"id": "d", "name": "Done", "type": "n8n-nodes-base.noOp", "position": [800, 0], "typeVersion": 1,
+         "parameters": {}}
+    ]
+    connections = {"Trigger": main_edge("Transform"), "Transform": main_edge("Legacy"),
+                   "Legacy": main_edge("Summarize"), "Summarize": main_edge("Done")}
+    return WorkflowGraph(parse_nodes(nodes), connections)
+
+class BusyProfiler:
+    """Каждая нода медленная и получает много item'ов"""
+
+    def get_node_workload(self, workflow_id, node_name, instance):
+        return {"runs": 50, "p50": 3.0, "items_p50": 100, "items_p95": 100, "failures": 0}
+
+class OfflineConnector:
+    """Коннектор без обращений к N8N - исправления применяются к графу в памяти"""
+    instance = DEFAULT_INSTANCE
+
+def apply(fix_type, node_name, parameters=None):
+    fixer = AutoFixer(OfflineConnector(), {"backup_store": {"persistent": False}, "fix_ledger": {"persistent": False}})
+    graph = build_graph()
+    strategy = RepairStrategy(fix_type=fix_type, description=fix_type.value, confidence_threshold=0.5,
+                              parameters={"node_names": [node_name], **(parameters or {})})
+    changes = asyncio.run(fixer._apply_fix_strategy(graph, strategy, [node_name]))
+    return graph, changes
+
+def test_legacy_item_accessors_are_not_rebound():
+    assert runs_once_for_all_items(PER_ITEM_CODE)
+    assert not runs_once_for_all_items(LEGACY_CODE)
+    assert not runs_once_for_all_items("return {json: {p: $position}};")
+    assert not runs_once_for_all_items("return $item(0).$node['A'].json;")
+
+def test_advisor_keeps_legacy_code_per_item():
+    findings = PerformanceAdvisor(BusyProfiler()).advise(build_graph(), "wf")
+    run_once = [finding.node for finding in findings if finding.fix_type == FixType.RUN_ONCE_FOR_ALL_ITEMS]
+    assert run_once == ["Transform"]
+
+def test_run_once_fix_skips_legacy_code(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    graph, changes = apply(FixType.RUN_ONCE_FOR_ALL_ITEMS, "Legacy")
+    assert changes == []
+    assert graph.node("Legacy").parameters["jsCode"] == LEGACY_CODE
+
+    graph, changes = apply(FixType.RUN_ONCE_FOR_ALL_ITEMS, "Transform")
+    parameters = graph.node("Transform").parameters
+    assert [change["action"] for change in changes] == ["run_once_for_all_items"]
+    assert parameters["mode"] == "runOnceForAllItems"
+    assert PER_ITEM_CODE in parameters["jsCode"]
+    assert "pairedItem: {item: __index}" in parameters["jsCode"]
+
+def test_cache_passes_item_json_through(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    graph, changes = apply(FixType.ADD_CACHE, "Summarize", {"ttl_seconds": 60, "max_entries": 10})
+    assert [change["action"] for change in changes] == ["add_cache"]
+
+    lookup = graph.node("Summarize Cache Lookup").parameters["jsCode"]
+    store = graph.node("Summarize Cache Store").parameters["jsCode"]
+    hit = graph.node("Summarize Cache Hit?").parameters
+    # Ключ и признак попадания не попадают в json item'ов
+    for code in (lookup, store):
+        assert "_cacheKey" not in code and "_cacheHit" not in code
+    assert "return {...item, pairedItem: {item: index}};" in lookup
+    assert hit["conditions"]["boolean"][0]["value1"] == CACHE_HIT_CONDITION
+
+    # Legacy -> Lookup -> IF; промах (выход 1) -> нода -> Store -> Done, попадание (выход 0) -> Done
+    assert graph.predecessors("Summarize Cache Lookup", "main") == ["Legacy"]
+    edges = {(edge.source, edge.source_output, edge.target)
+             for outgoing in graph.outgoing.values() for edge in outgoing if edge.kind == "main"}
+    assert {("Summarize Cache Lookup", 0, "Summarize Cache Hit?"),
+            ("Summarize Cache Hit?", 1, "Summarize"),
+            ("Summarize Cache Hit?", 0, "Done"),
+            ("Summarize", 0, "Summarize Cache Store"),
+            ("Summarize Cache Store", 0, "Done")} <= edges
+    assert ("Summarize Cache Lookup", 0, "Summarize") not in edges
+
+def profile_runs(profiler, durations, started_at):
+    for index, duration in enumerate(durations):
+        profiler.record(ExecutionProfile(
+            execution_id=f"{started_at.timestamp()}-{index}", workflow_id="wf", instance=DEFAULT_INSTANCE,
+            status="success", total_time=duration, node_times={}, stage_times={}, critical_path=[],
+            critical_path_time=0.0, started_at=started_at + timedelta(seconds=index)
+        ))
+
+def test_benchmark_counts_only_runs_started_after_fix_and_survives_restart(tmp_path):
+    finding = PerformanceFinding(FixType.ENABLE_BATCHING, "Fetch", {}, [], 2.0)
+    profiler = WorkflowProfiler(OfflineConnector(), {})
+    profile_runs(profiler, [10.0] * 5, datetime.now() - timedelta(hours=1))
+
+    ledger = FixLedger(str(tmp_path / "ledger"))
+    tracker = BenchmarkTracker(profiler, ledger, min_runs=5)
+    assert tracker.start("fix-1", finding, "wf").before_p50 == 10.0
+
+    # Старые выполнения, профилированные после записи (история), в "после" не попадают
+    profile_runs(profiler, [30.0] * 5, datetime.now() - timedelta(minutes=30))
+    assert tracker.evaluate() == []
+
+    # Рестарт: проверка восстанавливается из журнала с тем же моментом записи
+    started_at = tracker._pending["fix-1"].started_at
+    ledger.close()
+    ledger = FixLedger(str(tmp_path / "ledger"))
+    tracker = BenchmarkTracker(profiler, ledger, min_runs=5)
+    assert tracker.pending_for("wf") and tracker._pending["fix-1"].started_at == started_at
+
+    profile_runs(profiler, [5.0] * 5, datetime.now() + timedelta(seconds=1))
+    [(benchmark, verdict)] = tracker.evaluate()
+    assert benchmark.fix_id == "fix-1"
+    assert verdict["verdict"] == "improved" and verdict["after_p50"] == 5.0 and verdict["runs_after"] == 5
+    ledger.close()
+
+    ledger = FixLedger(str(tmp_path / "ledger"))
+    assert ledger.pending_benchmarks() == []
+    ledger.close()
@@ -0,0 +1,66 @@
+"""Симуляция исправлений: сломанные кандидаты отклоняются, выбирается следующий"""
+
+import asyncio
+
+from analyzer import FixType, RepairStrategy
+from connector import parse_nodes
+from simulator import FixSimulator, StaticVerifier, js_bracket_error
+from workflow_graph import Edge, WorkflowGraph
+
+NODES = [
+    {"id": "t", "name": "Trigger", "type": "n8n-nodes-base.webhook", "position": [0, 0], "typeVersion": 2,
+     "parameters": {"path": "p"}},
+    {"id": "h", "name": "Call API", "type": "n8n-nodes-base.httpRequest", "position": [200, 0], "typeVersion": 4.2,
+     "parameters": {"url": "https://api.example.com", "options": {}}},
+    {"id": "c", "name": "Transform", "type": "n8n-nodes-base.code", "position": [400, 0], "typeVersion": 2,
+     "parameters": {"jsCode": "return $input.all().map(item => ({json: item.json}));"}},
+]
+CONNECTIONS = {
+    "Trigger": {"main": [[{"node": "Call API", "type": "main", "index": 0}]]},
+    "Call API": {"main": [[{"node": "Transform", "type": "main", "index": 0}]]},
+}
+
+def strategy(fix_type, risk_level="low"):
+    return RepairStrategy(fix_type=fix_type, description=fix_type.value, confidence_threshold=0.5,
+                          risk_level=risk_level)
+
+async def apply_strategy(graph, candidate, affected_nodes):
+    """Кандидаты теста: два сломанных и один корректный"""
+    if candidate.fix_type == FixType.UPDATE_PARAMETER:
+        graph.node("Transform").parameters["jsCode"] = "return [{json: {ok: true}];"
+        return [{"action": "update_parameter", "node_name": "Transform"}]
+    if candidate.fix_type == FixType.ADD_ERROR_HANDLING:
+        # Связь на ноду, которой нет в графе (connect такую не создаст - как у шаблона с ошибкой)
+        graph._add_edge(Edge("Call API", "Error Handler"))
+        return [{"action": "add_error_handling", "node_name": "Call API"}]
+    graph.node("Call API").parameters["options"]["timeout"] = 60000
+    return [{"action": "increase_timeout", "node_name": "Call API"}]
+
+def test_js_bracket_error():
+    assert js_bracket_error(NODES[2]["parameters"]["jsCode"]) is None
+    assert js_bracket_error("return [{json: {ok: true}];") == "unexpected ']'"
+    assert js_bracket_error("const s = ')'; // (\nreturn [];") is None
+    assert js_bracket_error("return [{json: {}}") == "unclosed '['"
+
+def test_broken_candidates_are_rejected_and_next_best_is_chosen():
+    graph = WorkflowGraph(parse_nodes(NODES), CONNECTIONS)
+    assert StaticVerifier().verify(graph) == []
+
+    simulator = FixSimulator(apply_strategy, StaticVerifier())
+    # Порядок анализатора: сломанные кандидаты впереди корректного
+    candidates = [strategy(FixType.UPDATE_PARAMETER), strategy(FixType.ADD_ERROR_HANDLING),
+                  strategy(FixType.INCREASE_TIMEOUT, "medium")]
+    ranked = asyncio.run(simulator.rank(graph, candidates, ["Call API"]))
+
+    assert [result.strategy.fix_type for result in ranked] == [
+        FixType.INCREASE_TIMEOUT, FixType.UPDATE_PARAMETER, FixType.ADD_ERROR_HANDLING
+    ]
+    chosen, syntax_error, dangling = ranked
+    assert chosen.accepted and chosen.graph.node("Call API").parameters["options"]["timeout"] == 60000
+    assert not syntax_error.accepted and "JavaScript syntax: unexpected ']'" in syntax_error.reason
+    assert not dangling.accepted and "connection to unknown node 'Error Handler'" in dangling.reason
+
+    # Симуляция идет на копиях: исходный граф не изменен
+    assert graph.node("Transform").parameters["jsCode"] == NODES[2]["parameters"]["jsCode"]
+    assert "timeout" not in graph.node("Call API").parameters["options"]
+    assert graph.successors("Call API") == ["Transform"]
@@ -0,0 +1,54 @@
+"""Подбор timeout'ов и retry: всплески ошибок, бюджет повторов и границы timeout'а"""
+
+from tuning import MAX_TRIES_LIMIT, ResilienceTuner, failure_bursts
+
+DURATIONS = [1.0] * 100
+ISOLATED = [1000 + i * 3600 for i in range(6)]
+# Пять всплесков по пять ошибок с интервалом 2s: 8s - в пределах бюджета повторов (20s)
+BURSTS = [b * 3600 + k * 2 for b in range(5) for k in range(5)]
+# Четыре отказа по 20 ошибок с интервалом 30s: 570s - больше бюджета
+OUTAGES = [b * 7200 + k * 30 for b in range(4) for k in range(20)]
+
+def test_failure_bursts_group_close_failures():
+    assert failure_bursts([200, 0, 100, 30], gap_seconds=60) == [(0, 30, 2), (100, 100, 1), (200, 200, 1)]
+    assert failure_bursts([], gap_seconds=60) == []
+
+def test_too_few_samples_leave_settings_unchanged():
+    plan = ResilienceTuner().plan("Call API", DURATIONS[:5], [ISOLATED[0]])
+    assert plan.is_empty
+    assert plan.max_tries is None and plan.wait_between_tries_ms is None
+    assert plan.reasons[0].startswith("timeout unchanged: 5 successful runs")
+    assert plan.reasons[1].startswith("retry unchanged: 1 failures")
+
+def test_isolated_failures_get_quick_retries():
+    plan = ResilienceTuner().plan("Call API", DURATIONS, ISOLATED)
+    assert plan.timeout_ms == 1500
+    assert (plan.retry_on_fail, plan.max_tries, plan.wait_between_tries_ms) == (True, 3, 1000)
+    assert "6 isolated failures" in plan.reasons[1]
+    assert (plan.samples, plan.failures) == (100, 6)
+
+def test_bursts_within_budget_are_bridged():
+    plan = ResilienceTuner().plan("Call API", DURATIONS, BURSTS)
+    # p90 длины всплеска 8s: 3 попытки по 4000 ms покрывают его
+    assert (plan.retry_on_fail, plan.max_tries, plan.wait_between_tries_ms) == (True, 3, 4000)
+    assert (plan.max_tries - 1) * plan.wait_between_tries_ms >= 8000
+    assert plan.reasons[-1] == "worst case with retries 12500 ms"
+
+def test_outages_over_budget_disable_retry():
+    plan = ResilienceTuner().plan("Call API", DURATIONS, OUTAGES)
+    assert plan.retry_on_fail is False
+    assert plan.max_tries is None and plan.wait_between_tries_ms is None
+    assert plan.reasons[1].startswith("retry disabled: 4 of 4 failure bursts")
+
+    # Половина всплесков укладывается в бюджет - retry остается
+    plan = ResilienceTuner().plan("Call API", DURATIONS, BURSTS[:10] + [100000 + t for t in OUTAGES[:40]])
+    assert plan.retry_on_fail is True and plan.max_tries <= MAX_TRIES_LIMIT
+
+def test_timeout_is_rounded_and_clamped():
+    tuner = ResilienceTuner(min_timeout_ms=1000, max_timeout_ms=300000, round_ms=500)
+    assert tuner.plan("Fast", [0.1] * 30, []).timeout_ms == 1000
+    assert tuner.plan("Slow", [500.0] * 30, []).timeout_ms == 300000
+    assert "clamped to [1000, 300000]" in tuner.plan("Slow", [500.0] * 30, []).reasons[0]
+
+    plan = tuner.plan("Call API", [1.1] * 30, [])
+    assert plan.timeout_ms == 2000 and "clamped" not in plan.reasons[0]
@@ -0,0 +1,101 @@
+"""Граф workflow'а: JSON Patch diff и вставка нод перед и после существующих"""
+
+import copy
+
+from connector import NodeInfo, node_to_dict, parse_nodes
+from workflow_graph import WorkflowGraph, json_diff
+
+def apply_patch(document, operations):
+    """Применяет JSON Patch (add/remove/replace по ключам словарей)"""
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if operation["path"] == "":
+            document = copy.deepcopy(operation["value"])
+            continue
+        *parents, last = [part.replace("~1", "/").replace("~0", "~")
+                          for part in operation["path"].split("/")[1:]]
+        target = document
+        for part in parents:
+            target = target[part]
+        if operation["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = copy.deepcopy(operation["value"])
+    return document
+
+def node(name, node_type="n8n-nodes-base.noOp", **parameters):
+    return {"id": name.lower().replace(" ", "-"), "name": name, "type": node_type, "position": [0, 0],
+            "typeVersion": 1, "parameters": parameters}
+
+def main(*outputs):
+    return {"main": [[{"node": target, "type": "main", "index": index} for target, index in output]
+                     for output in outputs]}
+
+def build_graph():
+    nodes = [node("Trigger", "n8n-nodes-base.webhook"), node("Route", "n8n-nodes-base.if"),
+             node("Call/API", "n8n-nodes-base.httpRequest", url="x"), node("Fallback"), node("Merge")]
+    connections = {
+        "Trigger": main([("Route", 0)]),
+        "Route": main([("Call/API", 0)], [("Fallback", 0), ("Merge", 1)]),
+        "Call/API": main([("Merge", 0)]),
+    }
+    return WorkflowGraph(parse_nodes(nodes), connections)
+
+def main_edges(graph):
+    return {(edge.source, edge.source_output, edge.target, edge.target_input)
+            for outgoing in graph.outgoing.values() for edge in outgoing if edge.kind == "main"}
+
+def document(nodes, connections):
+    return {"nodes": {item["name"]: item for item in nodes}, "connections": connections}
+
+def test_json_diff_round_trip():
+    old = {"a": 1, "b": {"c": [1, 2], "d": "x", "e/f": {"g~h": 1}}, "gone": None}
+    new = {"a": 1, "b": {"c": [1, 2, 3], "e/f": {"g~h": 2}, "i": {"j": True}}, "added": [1]}
+    operations = json_diff(old, new)
+
+    assert apply_patch(old, operations) == new
+    assert {"op": "replace", "path": "/b/e~1f/g~0h", "value": 2} in operations
+    # Неизменные поддеревья в patch не попадают
+    assert not any(operation["path"] == "/a" for operation in operations)
+    assert json_diff(new, new) == []
+    assert apply_patch(old, json_diff(old, [1])) == [1]
+
+def test_insert_before_moves_incoming_edges():
+    graph = build_graph()
+    graph.insert_before("Merge", NodeInfo(id="w", name="Wait", type="n8n-nodes-base.wait", parameters={},
+                                          position=[0, 0]))
+
+    edges = main_edges(graph)
+    assert {("Call/API", 0, "Wait", 0), ("Route", 1, "Wait", 0), ("Wait", 0, "Merge", 0)} <= edges
+    assert not any(edge[2] == "Merge" and edge[0] != "Wait" for edge in edges)
+    assert graph.predecessors("Merge") == ["Wait"]
+
+def test_insert_after_moves_edges_of_one_output():
+    graph = build_graph()
+    graph.insert_after("Route", NodeInfo(id="l", name="Log", type="n8n-nodes-base.noOp", parameters={},
+                                         position=[0, 0]), source_output=1)
+
+    edges = main_edges(graph)
+    assert ("Route", 0, "Call/API", 0) in edges
+    assert {("Route", 1, "Log", 0), ("Log", 0, "Fallback", 0), ("Log", 0, "Merge", 1)} <= edges
+    assert ("Route", 1, "Fallback", 0) not in edges and ("Route", 1, "Merge", 1) not in edges
+    assert graph.to_connections()["Route"] == main([("Call/API", 0)], [("Log", 0)])
+
+def test_graph_diff_patches_loaded_state_into_current():
+    graph = build_graph()
+    before = document(graph.original_nodes(), graph.original_connections)
+
+    graph.node("Call/API").parameters["options"] = {"timeout": 60000}
+    graph.insert_before("Call/API", NodeInfo(id="c", name="Cache", type="n8n-nodes-base.code",
+                                             parameters={"jsCode": "return $input.all();"}, position=[0, 0]))
+    graph.remove_node("Fallback")
+
+    after = document([node_to_dict(item) for item in graph.nodes], graph.to_connections())
+    operations = graph.diff()
+    assert apply_patch(before, operations) == after
+    assert {"op": "remove", "path": "/nodes/Fallback"} in operations
+    assert {"op": "add", "path": "/nodes/Call~1API/parameters/options", "value": {"timeout": 60000}} in operations
+
+    # Без изменений - пустой patch, connections - исходный объект
+    untouched = build_graph()
+    assert untouched.diff() == [] and untouched.to_connections() is untouched.original_connections
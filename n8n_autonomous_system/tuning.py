@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+🎛️ TUNING - Подбор timeout'ов и retry нод по наблюдаемому поведению
+
+Вместо удвоения числа из текста ошибки значения выводятся из профиля ноды:
+
+- timeout = p99 длительности успешных запусков × margin, округленный
+  вверх и ограниченный [min_timeout_ms, max_timeout_ms]: достаточно
+  свободный, чтобы медленный хвост не падал, и достаточно тесный, чтобы
+  настоящий отказ обнаруживался быстро
+- ошибки ноды группируются во всплески (между соседними меньше
+  burst_gap_seconds). Одиночные сбои лечатся несколькими быстрыми
+  повторами; всплески, которые укладываются в бюджет повторов
+  (maxTries и waitBetweenTries в пределах n8n), переживаются паузой,
+  покрывающей типичную длину всплеска; длинные отказы повторами не
+  лечатся - retry выключается, чтобы выполнение падало сразу
+
+Каждое решение сопровождается объяснением для changes_made.
+"""
+
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Пределы настроек ноды в n8n
+MAX_TRIES_LIMIT = 5
+MAX_WAIT_MS = 5000
+
+@dataclass
+class ResiliencePlan:
+    """Подобранные настройки ноды с объяснением"""
+    node: str
+    timeout_ms: Optional[int] = None
+    retry_on_fail: Optional[bool] = None
+    max_tries: Optional[int] = None
+    wait_between_tries_ms: Optional[int] = None
+    reasons: List[str] = field(default_factory=list)
+    samples: int = 0
+    failures: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return self.timeout_ms is None and self.retry_on_fail is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def failure_bursts(failure_times: Sequence[float], gap_seconds: float) -> List[Tuple[float, float, int]]:
+    """Всплески ошибок: (начало, конец, число ошибок), соседние ошибки ближе gap_seconds"""
+    bursts: List[Tuple[float, float, int]] = []
+    for moment in sorted(failure_times):
+        if bursts and moment - bursts[-1][1] <= gap_seconds:
+            start, _, count = bursts[-1]
+            bursts[-1] = (start, moment, count + 1)
+        else:
+            bursts.append((moment, moment, 1))
+    return bursts
+
+class ResilienceTuner:
+    """Подбор timeout'а и retry ноды по длительностям успешных запусков и времени ошибок"""
+
+    def __init__(self, timeout_margin: float = 1.5, min_samples: int = 20,
+                 min_timeout_ms: int = 1000, max_timeout_ms: int = 300000, round_ms: int = 500,
+                 burst_gap_seconds: float = 60.0, min_failures: int = 2):
+        """
+        Инициализация
+
+        Args:
+            timeout_margin: Запас над p99 успешных запусков
+            min_samples: Минимум успешных запусков для подбора timeout'а
+            min_timeout_ms, max_timeout_ms: Границы timeout'а
+            round_ms: Шаг округления timeout'а вверх
+            burst_gap_seconds: Ошибки ближе этого интервала - один всплеск
+            min_failures: Минимум ошибок для подбора retry
+        """
+        self.timeout_margin = timeout_margin
+        self.min_samples = min_samples
+        self.min_timeout_ms = min_timeout_ms
+        self.max_timeout_ms = max_timeout_ms
+        self.round_ms = round_ms
+        self.burst_gap_seconds = burst_gap_seconds
+        self.min_failures = min_failures
+
+    def plan(self, node: str, durations: Sequence[float], failure_times: Sequence[float]) -> ResiliencePlan:
+        """
+        Подбирает настройки ноды
+
+        Args:
+            node: Имя ноды
+            durations: Длительности успешных запусков (секунды)
+            failure_times: Времена ошибок (epoch секунды)
+        """
+        plan = ResiliencePlan(node=node, samples=len(durations), failures=len(failure_times))
+        self._plan_timeout(plan, durations)
+        self._plan_retry(plan, durations, failure_times)
+        return plan
+
+    def _plan_timeout(self, plan: ResiliencePlan, durations: Sequence[float]):
+        if len(durations) < self.min_samples:
+            plan.reasons.append(f"timeout unchanged: {len(durations)} successful runs observed, "
+                                f"{self.min_samples} required")
+            return
+
+        p99 = float(np.percentile(np.asarray(durations, dtype=np.float64), 99))
+        rounded_ms = int(math.ceil(p99 * 1000 * self.timeout_margin / self.round_ms) * self.round_ms)
+        timeout_ms = min(max(rounded_ms, self.min_timeout_ms), self.max_timeout_ms)
+
+        plan.timeout_ms = timeout_ms
+        plan.reasons.append(f"timeout {timeout_ms} ms = p99 {p99:.2f}s x margin {self.timeout_margin:g} "
+                            f"over {len(durations)} successful runs"
+                            + (f" (clamped to [{self.min_timeout_ms}, {self.max_timeout_ms}])"
+                               if timeout_ms != rounded_ms else ""))
+
+    def _plan_retry(self, plan: ResiliencePlan, durations: Sequence[float], failure_times: Sequence[float]):
+        if len(failure_times) < self.min_failures:
+            plan.reasons.append(f"retry unchanged: {len(failure_times)} failures observed, "
+                                f"{self.min_failures} required")
+            return
+
+        bursts = failure_bursts(failure_times, self.burst_gap_seconds)
+        spans = np.array([end - start for start, end, _ in bursts], dtype=np.float64)
+        budget_seconds = (MAX_TRIES_LIMIT - 1) * MAX_WAIT_MS / 1000
+        bridgeable = spans[spans <= budget_seconds]
+
+        # Большинство всплесков длиннее бюджета повторов - это отказы, повторы только задерживают ошибку
+        if len(bridgeable) * 2 < len(spans):
+            plan.retry_on_fail = False
+            plan.reasons.append(f"retry disabled: {len(spans) - len(bridgeable)} of {len(spans)} failure bursts "
+                                f"last longer than the {budget_seconds:g}s retry budget "
+                                f"(median {float(np.median(spans)):.0f}s), fail fast")
+            return
+
+        isolated = int(np.count_nonzero(bridgeable == 0))
+        if isolated == len(bridgeable):
+            # Одиночные сбои: короткая пауза порядка типичной длительности ноды
+            typical_ms = float(np.median(durations)) * 1000 if len(durations) else 1000.0
+            wait_ms = int(min(max(math.ceil(typical_ms / 100) * 100, 500), 2000))
+            max_tries = 3
+            plan.reasons.append(f"{isolated} isolated failures (no bursts within {self.burst_gap_seconds:g}s): "
+                                f"{max_tries} tries, {wait_ms} ms apart")
+        else:
+            # Пауза и число попыток покрывают p90 длины всплеска
+            target = float(np.percentile(bridgeable, 90))
+            max_tries = MAX_TRIES_LIMIT
+            for tries in range(2, MAX_TRIES_LIMIT + 1):
+                if (tries - 1) * MAX_WAIT_MS / 1000 >= target:
+                    max_tries = tries
+                    break
+            wait_ms = int(min(MAX_WAIT_MS, math.ceil(target * 1000 / (max_tries - 1) / 100) * 100))
+            wait_ms = max(wait_ms, 500)
+            plan.reasons.append(f"failure bursts last up to {target:.1f}s (p90 of {len(bridgeable)} bursts): "
+                                f"{max_tries} tries, {wait_ms} ms apart cover them")
+
+        plan.retry_on_fail = True
+        plan.max_tries = max_tries
+        plan.wait_between_tries_ms = wait_ms
+        if plan.timeout_ms is not None:
+            worst_ms = max_tries * plan.timeout_ms + (max_tries - 1) * wait_ms
+            plan.reasons.append(f"worst case with retries {worst_ms} ms")
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+🕸️ WORKFLOW GRAPH - Индексированная модель workflow'а для исправлений
+
+Граф загружается один раз на транзакцию исправлений из нод и
+connections:
+- поиск ноды по id и по имени - O(1), по типу - индекс тип -> ноды
+  (подстрока типа проверяется по различающимся типам, а не по всем нодам)
+- списки смежности в обе стороны: Edge хранит тип связи, номер выхода
+  источника и номер входа цели (формат connections n8n)
+- топологический порядок (Kahn) и достижимость (BFS вниз и вверх)
+- изменения структуры: добавление и удаление нод, связи, вставка ноды
+  перед и после существующей
+
+При сохранении diff() сравнивает граф с состоянием на момент загрузки и
+возвращает минимальный JSON Patch (RFC 6902) над представлением
+{"nodes": {имя: нода}, "connections": {...}}: меняются только
+затронутые поля.
+"""
+
+import copy
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from connector import NodeInfo, node_to_dict
+
+@dataclass(frozen=True)
+class Edge:
+    """Связь: выход source_output типа kind -> вход target_input ноды target"""
+    source: str
+    target: str
+    kind: str = "main"
+    source_output: int = 0
+    target_input: int = 0
+
+def _pointer(key: str) -> str:
+    """Экранирование ключа для JSON Pointer (RFC 6901)"""
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def json_diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Минимальный JSON Patch от old к new (словари сравниваются по ключам, прочее - целиком)"""
+    if old == new:
+        return []
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [{"op": "replace", "path": path, "value": new}]
+
+    operations = []
+    for key, value in old.items():
+        child = f"{path}/{_pointer(key)}"
+        if key not in new:
+            operations.append({"op": "remove", "path": child})
+        else:
+            operations.extend(json_diff(value, new[key], child))
+    for key, value in new.items():
+        if key not in old:
+            operations.append({"op": "add", "path": f"{path}/{_pointer(key)}", "value": value})
+    return operations
+
+class WorkflowGraph:
+    """Граф нод workflow'а с индексами и списками смежности"""
+
+    def __init__(self, nodes: Iterable[NodeInfo], connections: Optional[Dict[str, Any]] = None,
+                 version: Optional[Any] = None):
+        """
+        Инициализация
+
+        Args:
+            nodes: Ноды workflow'а (объекты используются напрямую и изменяются исправлениями)
+            connections: connections workflow'а в формате n8n
+            version: updatedAt загруженного состояния (для оптимистичной записи; None - неизвестен)
+        """
+        self.version = version
+        self.by_name: Dict[str, NodeInfo] = {}
+        self.by_id: Dict[str, NodeInfo] = {}
+        # Тип -> имена нод (dict как упорядоченное множество)
+        self.by_type: Dict[str, Dict[str, None]] = {}
+        # Порядок нод в workflow'е: результаты поиска возвращаются в нем
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+
+        self.outgoing: Dict[str, List[Edge]] = {}
+        self.incoming: Dict[str, List[Edge]] = {}
+        # Число выходов (source, kind): пустые хвостовые выходы исходных connections сохраняются
+        self._output_slots: Dict[Tuple[str, str], int] = {}
+
+        for node in nodes:
+            self._index(node)
+
+        connections = connections or {}
+        for source, kinds in connections.items():
+            for kind, outputs in (kinds or {}).items():
+                self._output_slots[(source, kind)] = len(outputs or [])
+                for output, targets in enumerate(outputs or []):
+                    for target in targets or []:
+                        self._add_edge(Edge(
+                            source=source,
+                            target=target.get("node", ""),
+                            kind=kind,
+                            source_output=output,
+                            target_input=target.get("index", 0)
+                        ))
+
+        # Состояние при загрузке - для diff() (глубокая копия: исправления меняют параметры на месте)
+        self._original_nodes: Dict[str, Dict[str, Any]] = {
+            name: json.loads(json.dumps(node_to_dict(node))) for name, node in self.by_name.items()
+        }
+        self._original_connections = json.loads(json.dumps(connections))
+        self._connections_changed = False
+
+    # ------------------------------------------------------------------
+    # Индексы и поиск
+    # ------------------------------------------------------------------
+
+    def _index(self, node: NodeInfo):
+        if node.name in self.by_name:
+            raise ValueError(f"Duplicate node name: {node.name}")
+        self.by_name[node.name] = node
+        if node.id:
+            self.by_id[node.id] = node
+        self.by_type.setdefault(node.type, {})[node.name] = None
+        self._order[node.name] = self._next_order
+        self._next_order += 1
+        self.outgoing.setdefault(node.name, [])
+        self.incoming.setdefault(node.name, [])
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    @property
+    def nodes(self) -> List[NodeInfo]:
+        """Ноды в порядке workflow'а"""
+        return list(self.by_name.values())
+
+    def node(self, name: str) -> Optional[NodeInfo]:
+        """Нода по имени"""
+        return self.by_name.get(name)
+
+    def node_by_id(self, node_id: str) -> Optional[NodeInfo]:
+        """Нода по id"""
+        return self.by_id.get(node_id)
+
+    def nodes_of_type(self, node_type: str) -> List[NodeInfo]:
+        """Ноды точного типа"""
+        return [self.by_name[name] for name in self.by_type.get(node_type, ())]
+
+    def nodes_where_type(self, predicate: Callable[[str], bool]) -> List[NodeInfo]:
+        """Ноды, тип которых удовлетворяет predicate (проверяется один раз на тип)"""
+        names = [name for node_type, names in self.by_type.items() if predicate(node_type) for name in names]
+        names.sort(key=self._order.__getitem__)
+        return [self.by_name[name] for name in names]
+
+    # ------------------------------------------------------------------
+    # Связи
+    # ------------------------------------------------------------------
+
+    def _add_edge(self, edge: Edge):
+        self.outgoing.setdefault(edge.source, []).append(edge)
+        self.incoming.setdefault(edge.target, []).append(edge)
+        key = (edge.source, edge.kind)
+        self._output_slots[key] = max(self._output_slots.get(key, 0), edge.source_output + 1)
+
+    def successors(self, name: str, kind: Optional[str] = None) -> List[str]:
+        """Имена нод, в которые ведут связи из name (kind - только связи этого типа)"""
+        return list(dict.fromkeys(
+            edge.target for edge in self.outgoing.get(name, ()) if kind is None or edge.kind == kind
+        ))
+
+    def predecessors(self, name: str, kind: Optional[str] = None) -> List[str]:
+        """Имена нод, связи из которых ведут в name"""
+        return list(dict.fromkeys(
+            edge.source for edge in self.incoming.get(name, ()) if kind is None or edge.kind == kind
+        ))
+
+    def connect(self, source: str, target: str, kind: str = "main",
+                source_output: int = 0, target_input: int = 0) -> Edge:
+        """Добавляет связь (повторная связь не дублируется)"""
+        for name in (source, target):
+            if name not in self.by_name:
+                raise KeyError(f"Unknown node: {name}")
+        edge = Edge(source, target, kind, source_output, target_input)
+        if edge not in self.outgoing[source]:
+            self._add_edge(edge)
+            self._connections_changed = True
+        return edge
+
+    def disconnect(self, edge: Edge):
+        """Удаляет связь"""
+        if edge in self.outgoing.get(edge.source, ()):
+            self.outgoing[edge.source].remove(edge)
+            self.incoming[edge.target].remove(edge)
+            self._connections_changed = True
+
+    # ------------------------------------------------------------------
+    # Изменение структуры
+    # ------------------------------------------------------------------
+
+    def add_node(self, node: NodeInfo) -> NodeInfo:
+        """Добавляет ноду (имя должно быть уникальным)"""
+        self._index(node)
+        return node
+
+    def remove_node(self, name: str):
+        """Удаляет ноду вместе с ее связями"""
+        node = self.by_name.pop(name, None)
+        if node is None:
+            return
+        if self.by_id.get(node.id) is node:
+            del self.by_id[node.id]
+        type_names = self.by_type.get(node.type, {})
+        type_names.pop(name, None)
+        if not type_names:
+            self.by_type.pop(node.type, None)
+        self._order.pop(name, None)
+        for edge in self.outgoing.pop(name, []) + self.incoming.pop(name, []):
+            if edge.target in self.incoming:
+                self.incoming[edge.target] = [e for e in self.incoming[edge.target] if e != edge]
+            if edge.source in self.outgoing:
+                self.outgoing[edge.source] = [e for e in self.outgoing[edge.source] if e != edge]
+            self._connections_changed = True
+
+    def insert_before(self, target: str, node: NodeInfo, kind: str = "main") -> NodeInfo:
+        """Вставляет ноду перед target: входящие связи kind переводятся на нее, она ведет в target"""
+        self.add_node(node)
+        for edge in [edge for edge in self.incoming[target] if edge.kind == kind]:
+            self.disconnect(edge)
+            self.connect(edge.source, node.name, kind, edge.source_output, 0)
+        self.connect(node.name, target, kind, 0, 0)
+        return node
+
+    def insert_after(self, source: str, node: NodeInfo, source_output: int = 0, kind: str = "main") -> NodeInfo:
+        """Вставляет ноду после выхода source_output ноды source: исходящие связи выхода переводятся на нее"""
+        self.add_node(node)
+        for edge in [edge for edge in self.outgoing[source]
+                     if edge.kind == kind and edge.source_output == source_output]:
+            self.disconnect(edge)
+            self.connect(node.name, edge.target, kind, 0, edge.target_input)
+        self.connect(source, node.name, kind, source_output, 0)
+        return node
+
+    # ------------------------------------------------------------------
+    # Обходы
+    # ------------------------------------------------------------------
+
+    def topological_order(self) -> List[str]:
+        """
+        Имена нод в топологическом порядке (Kahn, при равенстве - порядок workflow'а)
+
+        Ноды циклов (например, цикл SplitInBatches) идут в конце в порядке workflow'а.
+        """
+        in_degree = {name: 0 for name in self.by_name}
+        for name in self.by_name:
+            for target in self.successors(name):
+                if target in in_degree:
+                    in_degree[target] += 1
+
+        ready = deque(name for name, degree in in_degree.items() if degree == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for target in self.successors(name):
+                if target in in_degree:
+                    in_degree[target] -= 1
+                    if in_degree[target] == 0:
+                        ready.append(target)
+
+        if len(order) < len(in_degree):
+            placed = set(order)
+            order.extend(name for name in self.by_name if name not in placed)
+        return order
+
+    def _reach(self, start: str, step: Callable[[str], List[str]]) -> Set[str]:
+        seen = set()
+        queue = deque(step(start))
+        while queue:
+            name = queue.popleft()
+            if name in seen or name not in self.by_name:
+                continue
+            seen.add(name)
+            queue.extend(step(name))
+        return seen
+
+    def downstream(self, name: str) -> Set[str]:
+        """Ноды, достижимые из name"""
+        return self._reach(name, self.successors)
+
+    def upstream(self, name: str) -> Set[str]:
+        """Ноды, из которых достижима name"""
+        return self._reach(name, self.predecessors)
+
+    def is_reachable(self, source: str, target: str) -> bool:
+        """Достижима ли target из source"""
+        return target in self.downstream(source)
+
+    # ------------------------------------------------------------------
+    # Сохранение
+    # ------------------------------------------------------------------
+
+    @property
+    def connections_changed(self) -> bool:
+        return self._connections_changed
+
+    def to_connections(self) -> Dict[str, Any]:
+        """connections в формате n8n (без изменений связей - исходный объект)"""
+        if not self._connections_changed:
+            return self._original_connections
+
+        original_keys = {
+            (source, kind) for source, kinds in self._original_connections.items() for kind in (kinds or {})
+        }
+        connections: Dict[str, Any] = {}
+        for (source, kind), slots in self._output_slots.items():
+            if source not in self.by_name:
+                continue
+            outputs: List[List[Dict[str, Any]]] = [[] for _ in range(slots)]
+            for edge in self.outgoing.get(source, ()):
+                if edge.kind == kind:
+                    outputs[edge.source_output].append(
+                        {"node": edge.target, "type": edge.kind, "index": edge.target_input}
+                    )
+            # Исходные выходы без связей n8n хранит пустыми списками
+            if any(outputs) or (source, kind) in original_keys:
+                connections.setdefault(source, {})[kind] = outputs
+        return connections
+
+    def diff(self) -> List[Dict[str, Any]]:
+        """Минимальный JSON Patch от загруженного состояния к текущему"""
+        operations = []
+        for name, original in self._original_nodes.items():
+            node = self.by_name.get(name)
+            if node is None:
+                operations.append({"op": "remove", "path": f"/nodes/{_pointer(name)}"})
+            else:
+                operations.extend(json_diff(original, node_to_dict(node), f"/nodes/{_pointer(name)}"))
+        for name, node in self.by_name.items():
+            if name not in self._original_nodes:
+                operations.append({"op": "add", "path": f"/nodes/{_pointer(name)}",
+                                   "value": copy.deepcopy(node_to_dict(node))})
+        if self._connections_changed:
+            operations.extend(json_diff(self._original_connections, self.to_connections(), "/connections"))
+        return operations
+
+    def original_nodes(self) -> List[Dict[str, Any]]:
+        """Ноды в состоянии на момент загрузки (для backup'а)"""
+        return list(self._original_nodes.values())
+
+    @property
+    def original_connections(self) -> Dict[str, Any]:
+        return self._original_connections
+
+    def copy(self) -> "WorkflowGraph":
+        """Независимая копия графа (контрольная точка транзакции)"""
+        return copy.deepcopy(self)